@@ -13,14 +13,18 @@ Features:
 - Session management and caching
 """
 
+# Time every import from here on (served at /api/performance/imports)
+from src.core.utils.lazy_import import get_import_profiler, install_import_profiler, lazy_attribute, lazy_module
+install_import_profiler()
+
 from src.core.data.field_mapping import get_canonical_field
 import os
 import sys  # Add this import
 import logging
 import threading
-import pandas as pd  # Add this import
 import time
 import re
+import weakref
 import json
 
 # PythonAnywhere Performance Optimization
@@ -87,6 +91,8 @@ MAX_CONTENT_LENGTH = 100 * 1024 * 1024  # 100MB max file size
 UPLOAD_CHUNK_SIZE = 16384  # 16KB chunks for uploads
 
 MAX_SELECTED_TAGS_PER_REQUEST = 100  # Limit tags per request to prevent timeouts
+MULTI_TEMPLATE_TYPES = ('horizontal', 'vertical', 'mini', 'double', 'inventory')
+MAX_MULTI_TEMPLATE_WORKERS = 3  # Template types rendered concurrently by /api/generate-multi
 
 if IS_PRODUCTION:
     # Production optimizations (logging only)
@@ -112,6 +118,7 @@ from flask import (
     session,  # Add this
     send_from_directory,
     current_app,
+    stream_with_context,
     g  # Add this for per-request globals
 )
 from flask_cors import CORS
@@ -164,32 +171,66 @@ try:
     from flask_session import Session
 except ImportError:
     Session = None
-from docx import Document
-from docxtpl import DocxTemplate, InlineImage
 from io import BytesIO
 from datetime import datetime, timezone
 from functools import lru_cache
 import json  # Add this import
 from copy import deepcopy
-from docx.shared import Pt, RGBColor, Mm, Inches
-from docx.enum.text import WD_ALIGN_PARAGRAPH  # Add this import
 # import pprint  # Removed unused import
 import re
 import traceback
-from docxcompose.composer import Composer
-from openpyxl import load_workbook
-from PIL import Image as PILImage
 import copy
-from docx.enum.section import WD_ORIENT
-from docx.oxml import parse_xml, OxmlElement
-from docx.oxml.ns import qn
-from docx.enum.table import WD_ROW_HEIGHT_RULE
-from src.core.generation.template_processor import get_font_scheme, TemplateProcessor
-from src.core.generation.tag_generator import get_template_path
+
+# Heavy subsystems (pandas, python-docx/docxtpl, openpyxl, PIL, generation,
+# matching) are bound through lazy facades and imported on first use, so a
+# recycled worker can answer its first request without loading them all.
+pd = lazy_module('pandas')
+np = lazy_module('numpy')
+Document = lazy_attribute('docx', 'Document')
+DocxTemplate = lazy_attribute('docxtpl', 'DocxTemplate')
+InlineImage = lazy_attribute('docxtpl', 'InlineImage')
+Pt = lazy_attribute('docx.shared', 'Pt')
+RGBColor = lazy_attribute('docx.shared', 'RGBColor')
+Mm = lazy_attribute('docx.shared', 'Mm')
+Inches = lazy_attribute('docx.shared', 'Inches')
+WD_ALIGN_PARAGRAPH = lazy_attribute('docx.enum.text', 'WD_ALIGN_PARAGRAPH')
+Composer = lazy_attribute('docxcompose.composer', 'Composer')
+load_workbook = lazy_attribute('openpyxl', 'load_workbook')
+WD_ORIENT = lazy_attribute('docx.enum.section', 'WD_ORIENT')
+parse_xml = lazy_attribute('docx.oxml', 'parse_xml')
+OxmlElement = lazy_attribute('docx.oxml', 'OxmlElement')
+qn = lazy_attribute('docx.oxml.ns', 'qn')
+WD_ROW_HEIGHT_RULE = lazy_attribute('docx.enum.table', 'WD_ROW_HEIGHT_RULE')
+get_font_scheme = lazy_attribute('src.core.generation.template_processor', 'get_font_scheme')
+TemplateProcessor = lazy_attribute('src.core.generation.template_processor', 'TemplateProcessor')
+get_template_path = lazy_attribute('src.core.generation.tag_generator', 'get_template_path')
+pdf_renderer = lazy_module('src.core.generation.pdf_renderer')
+ExcelProcessor = lazy_attribute('src.core.data.excel_processor', 'ExcelProcessor')
+get_default_upload_file = lazy_attribute('src.core.data.excel_processor', 'get_default_upload_file')
+display_columns = lazy_attribute('src.core.data.inventory_schema', 'display_columns')
+open_export = lazy_attribute('src.core.data.frame_export', 'open_export')
+export_format = lazy_attribute('src.core.data.frame_export', 'export_format')
+export_filename = lazy_attribute('src.core.data.frame_export', 'export_filename')
+export_mimetype = lazy_attribute('src.core.data.frame_export', 'export_mimetype')
+iter_frame_chunks = lazy_attribute('src.core.data.frame_export', 'iter_frame_chunks')
+write_xlsx = lazy_attribute('src.core.data.frame_export', 'write_xlsx')
+create_database_backup = lazy_attribute('src.core.data.database_backup', 'create_backup')
+resolve_backup_compression = lazy_attribute('src.core.data.database_backup', 'resolve_compression')
+get_stats_tables = lazy_attribute('src.core.data.stats_tables', 'get_stats_tables')
+enable_copy_on_write = lazy_attribute('src.core.data.frame_snapshot', 'enable_copy_on_write')
+map_inventory_type_to_product_type = lazy_attribute('src.core.data.json_matcher', 'map_inventory_type_to_product_type')
+fetch_manifest = lazy_attribute('src.core.data.manifest_fetcher', 'fetch_manifest')
+get_manifest_fetcher = lazy_attribute('src.core.data.manifest_fetcher', 'get_manifest_fetcher')
+
+from src.core.generation.template_cache import get_template_cache_stats, prewarm_template_cache
+from src.core.generation.pdf_converter import OUTPUT_FORMATS, PDF_AVAILABLE, PDF_MIMETYPE, PDF_CONVERT_TIMEOUT, get_pdf_converter
 import time
 # Removed unused mini font sizing imports
-from src.core.data.excel_processor import ExcelProcessor, get_default_upload_file
-from src.core.data.json_matcher import map_inventory_type_to_product_type
+from src.core.data.selection_store import get_selection_store, get_tag_name_index, publish_to_processor, sync_from_processor
+from src.core.data.session_manager import get_current_session_id
+from src.core.utils.metrics import get_metrics_registry
+from src.core.utils.normalization import clear_normalization_caches, get_normalization_stats
+from src.core.utils.prewarm import get_worker_prewarm
 import random
 # Optional import for flask_caching
 # Import optimized upload handler
@@ -231,6 +272,7 @@ current_dir = os.path.dirname(os.path.abspath(__file__))
 # Global variables for lazy loading
 _initial_data_cache = None
 _cache_timestamp = None
+_initial_data_cache_key = None  # data the cached payload was built from (see _tag_payload_key)
 CACHE_DURATION = 300  # Cache for 5 minutes
 
 # Global ExcelProcessor instance
@@ -249,6 +291,7 @@ _enhanced_ai_matcher = None
 # Global processing status with better state management
 processing_status = {}  # filename -> status
 processing_timestamps = {}  # filename -> timestamp
+processing_stages = {}  # filename -> upload executor stage (queued/parsing/loading/...)
 processing_lock = threading.Lock()  # Add thread lock for status updates
 
 # Thread lock for ExcelProcessor initialization
@@ -367,7 +410,10 @@ def force_reload_excel_processor(new_file_path):
     _excel_processor_reset_flag = False
     logging.info("Cleared reset flag - loading new file")
     
-    # Load the new file with full processing rules
+    # Load the new file with full processing rules (not from a shared snapshot,
+    # which would skip re-applying lineage from the database)
+    if hasattr(_excel_processor._file_cache, 'discard_source'):
+        _excel_processor._file_cache.discard_source(new_file_path)
     success = _excel_processor.load_file(new_file_path)
     if success:
         _excel_processor._last_loaded_file = new_file_path
@@ -447,16 +493,61 @@ def cleanup_old_processing_status():
             del processing_status[filename]
             if filename in processing_timestamps:
                 del processing_timestamps[filename]
+            processing_stages.pop(filename, None)
             logging.debug(f"Cleaned up old processing status for: {filename}")
 
-def update_processing_status(filename, status):
+def update_processing_status(filename, status, stage=None):
     """Update processing status with timestamp."""
     with processing_lock:
         processing_status[filename] = status
         processing_timestamps[filename] = time.time()
-        logging.info(f"Updated processing status for {filename}: {status}")
+        if stage:
+            processing_stages[filename] = stage
+        else:
+            processing_stages.pop(filename, None)
+        logging.info(f"Updated processing status for {filename}: {status}" + (f" ({stage})" if stage else ""))
         logging.debug(f"Current processing statuses: {dict(processing_status)}")
 
+def _accept_upload_result(job, df):
+    """Install a parsed upload as the global processor and store it in the database off the request path."""
+    global _excel_processor
+    new_processor = ExcelProcessor()
+    new_processor.df = df
+    new_processor._last_loaded_file = job.file_path
+    try:
+        new_processor._cache_dropdown_values()
+    except Exception as e:
+        logging.warning(f"[BG] Failed to populate dropdown cache after upload: {e}")
+    
+    with excel_processor_lock:
+        _excel_processor = new_processor
+        logging.info(f"[BG] Global processor updated with {len(df)} rows from {job.filename}")
+    
+    def store_in_database():
+        try:
+            new_processor.enable_product_db_integration(True)
+            storage_result = new_processor._store_upload_in_database(new_processor.df, job.file_path)
+            logging.info(f"[BG] Database storage completed for {job.filename}: {storage_result}")
+        except Exception as storage_error:
+            logging.warning(f"[BG] Database storage failed for {job.filename}: {storage_error}")
+    
+    threading.Thread(target=store_in_database, name='upload-db-store', daemon=True).start()
+
+def get_app_upload_executor():
+    """Upload executor wired to the processing status table and the global processor."""
+    from src.core.data.upload_executor import get_upload_executor
+    return get_upload_executor(status_callback=update_processing_status, result_callback=_accept_upload_result)
+
+def get_upload_store_key():
+    """Store an upload belongs to, used for fair scheduling and superseding older uploads."""
+    try:
+        from flask import has_request_context
+        if has_request_context():
+            return request.form.get('store') or request.args.get('store') or 'default'
+    except Exception:
+        pass
+    return 'default'
+
 def get_excel_processor():
     """Lazy load ExcelProcessor to avoid startup delay. Optimize DataFrame after loading."""
     global _excel_processor, _excel_processor_reset_flag
@@ -676,26 +767,66 @@ def disable_product_db_integration():
     except Exception as e:
         logging.error(f"Error disabling product DB integration: {e}")
 
-def get_cached_initial_data():
-    """Get cached initial data if it's still valid."""
+def get_cached_initial_data(key=None):
+    """Get cached initial data if it's still valid.
+
+    With a key, the payload is valid for as long as it was built from that
+    data; without one, for CACHE_DURATION seconds.
+    """
     global _initial_data_cache, _cache_timestamp
-    if (_initial_data_cache is not None and 
-        _cache_timestamp is not None and 
-        time.time() - _cache_timestamp < CACHE_DURATION):
+    if _initial_data_cache is None or _cache_timestamp is None:
+        return None
+    if key is not None:
+        return _initial_data_cache if _initial_data_cache_key == key else None
+    if time.time() - _cache_timestamp < CACHE_DURATION:
         return _initial_data_cache
     return None
 
-def set_cached_initial_data(data):
-    """Cache initial data with timestamp."""
-    global _initial_data_cache, _cache_timestamp
+def set_cached_initial_data(data, key=None):
+    """Cache initial data with timestamp (and the key of the data it was built from)."""
+    global _initial_data_cache, _cache_timestamp, _initial_data_cache_key
     _initial_data_cache = data
     _cache_timestamp = time.time()
+    _initial_data_cache_key = key
 
 def clear_initial_data_cache():
     """Clear the initial data cache."""
-    global _initial_data_cache, _cache_timestamp
+    global _initial_data_cache, _cache_timestamp, _initial_data_cache_key
     _initial_data_cache = None
     _cache_timestamp = None
+    _initial_data_cache_key = None
+
+def _tag_payload_key(excel_processor):
+    """Identifies the loaded data: another processor, a new DataFrame or an in-place edit changes it."""
+    # data_version counts assignments and edits of the DataFrame; the processor is referenced
+    # weakly because ids of freed objects get reused
+    return (weakref.ref(excel_processor), getattr(excel_processor, 'data_version', 0),
+            getattr(excel_processor, '_last_loaded_file', None))
+
+def _build_initial_data_payload(excel_processor):
+    """Tag payload for /api/initial-data: filter options and every available tag of the loaded file."""
+    import math
+    key = _tag_payload_key(excel_processor)
+    # Use the same logic as filter-options to get properly formatted weight values
+    filters = excel_processor.get_dynamic_filter_options({})
+    def clean_list(lst):
+        return ['' if (v is None or (isinstance(v, float) and math.isnan(v))) else v for v in lst]
+    filters = {k: clean_list(v) for k, v in filters.items()}
+    current_file = getattr(excel_processor, '_last_loaded_file', None) or 'Unknown file'
+    available_tags = excel_processor.get_available_tags()
+    payload = {
+        'success': True,
+        'data_loaded': True,  # Add this field for frontend compatibility
+        'filename': os.path.basename(current_file),
+        'filepath': current_file,
+        'columns': excel_processor.df.columns.tolist(),
+        'filters': filters,  # Use the properly formatted filters
+        'available_tags': available_tags,
+        'selected_tags': [],  # Don't restore selected tags on page reload
+        'total_records': len(excel_processor.df)
+    }
+    set_cached_initial_data(payload, key)
+    return payload
 
 def set_landscape(doc):
     section = doc.sections[-1]
@@ -832,6 +963,23 @@ else:
 # Initialize Flask-Compress after app creation (if available)
 if Compress is not None:
     Compress(app)
+
+# Optional Prometheus text exposition endpoint (/metrics)
+PROMETHEUS_METRICS_ENABLED = os.environ.get('ENABLE_PROMETHEUS_METRICS', '').lower() in ('1', 'true', 'yes')
+
+@app.before_request
+def start_request_timer():
+    """Stamp the request start time for per-route latency metrics."""
+    g.request_start_time = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    """Record per-route latency and status into the metrics registry."""
+    start = getattr(g, 'request_start_time', None)
+    if start is not None:
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        get_metrics_registry().observe_request(route, request.method, response.status_code, time.perf_counter() - start)
+    return response
 # Global function to check session size
 def check_session_size():
     """Check if session is too large and clear it if necessary."""
@@ -975,14 +1123,8 @@ def initialize_excel_processor():
         # Skip initialization if startup file loading is disabled for performance
         if DISABLE_STARTUP_FILE_LOADING:
             logging.info("Startup file loading disabled for faster application startup")
-            # Create a minimal processor without any data loading
-            global _excel_processor
-            if _excel_processor is None:
-                from src.core.data.excel_processor import ExcelProcessor
-                _excel_processor = ExcelProcessor()
-                _excel_processor.df = pd.DataFrame()  # Empty DataFrame
-                _excel_processor.logger.setLevel(logging.WARNING)
-                logging.info("Created minimal Excel processor with empty DataFrame")
+            # get_excel_processor() creates the same minimal, empty processor on
+            # first use; building it here would import pandas and python-docx at startup
             return
         
         excel_processor = get_excel_processor()
@@ -1028,6 +1170,80 @@ if not os.environ.get('PYTHONANYWHERE_DOMAIN') and not os.environ.get('PYTHONANY
     except Exception as e:
         logging.warning(f"Startup initialization failed (non-fatal): {e}")
 
+
+
+def _prewarm_default_upload():
+    """Load the default upload into the shared processor (also builds its tag index and dropdown cache)."""
+    excel_processor = get_excel_processor()
+    if excel_processor.df is not None and not excel_processor.df.empty:
+        return {'rows': len(excel_processor.df), 'file': getattr(excel_processor, '_last_loaded_file', None)}
+    default_file = get_default_upload_file()
+    if not default_file or not os.path.exists(default_file):
+        return {'rows': 0, 'file': None}
+    if not excel_processor.load_file(default_file):
+        raise RuntimeError(f"Failed to load default file {default_file}")
+    excel_processor._last_loaded_file = default_file
+    return {'rows': len(excel_processor.df), 'file': os.path.basename(default_file)}
+
+def _prewarm_json_matcher():
+    """Build the matcher's sheet and strain caches against the loaded data."""
+    json_matcher = get_json_matcher()
+    if hasattr(json_matcher, '_build_sheet_cache'):
+        if json_matcher._sheet_cache is None:
+            json_matcher._build_sheet_cache()
+        if json_matcher._strain_cache is None:
+            json_matcher._build_strain_cache()
+        return {'sheet_cache': json_matcher.get_sheet_cache_status(),
+                'strain_cache': json_matcher.get_strain_cache_status()}
+    # EnhancedJSONMatcher keeps ML models and database products instead
+    json_matcher.warm_cache()
+    return {'matcher': type(json_matcher).__name__}
+
+def _prewarm_font_sizes():
+    """Load the font-size tables and run every field/template through the sizing code once."""
+    from src.core.generation.unified_font_sizing import FONT_SIZING_CONFIG, get_font_size
+    primed = 0
+    for orientation, fields in FONT_SIZING_CONFIG['standard'].items():
+        get_font_scheme(orientation)
+        for field_type in fields:
+            get_font_size('Blue Dream Pre-Roll 1g', field_type, orientation)
+            primed += 1
+    return {'fields': primed}
+
+def _prewarm_tag_payload():
+    """Build the /api/initial-data tag payload for the loaded file."""
+    excel_processor = get_excel_processor()
+    if excel_processor.df is None or excel_processor.df.empty:
+        return {'tags': 0}
+    return {'tags': len(_build_initial_data_payload(excel_processor)['available_tags'])}
+
+def _prewarm_pdf_listener():
+    """Start the LibreOffice listener so the first PDF request does not pay for office startup."""
+    if not PDF_AVAILABLE:
+        return {'listener': False, 'reason': 'LibreOffice not installed'}
+    return {'listener': get_pdf_converter().warm()}
+
+def start_worker_prewarm():
+    """
+    Warm this worker's caches in the background: default upload, matcher
+    caches, template buffers, font-size tables, the tag payload, then the
+    PDF listener.
+    Called from the WSGI entry; /api/health reports 'warming' (503) until done.
+    Before that, switches pandas to Copy-on-Write for the whole worker, so
+    processors share loaded inventory frames (see frame_snapshot.py).
+    """
+    # Process-wide pandas semantics: set here, before any request runs pandas, never as an import side effect
+    enable_copy_on_write()
+    prewarm = get_worker_prewarm()
+    if not prewarm.stage_names:
+        prewarm.add_stage('default_upload', _prewarm_default_upload)
+        prewarm.add_stage('json_matcher', _prewarm_json_matcher)
+        prewarm.add_stage('templates', prewarm_template_cache)
+        prewarm.add_stage('font_sizes', _prewarm_font_sizes)
+        prewarm.add_stage('tag_payload', _prewarm_tag_payload)
+        prewarm.add_stage('pdf_listener', _prewarm_pdf_listener)
+    return prewarm.start()
+
 # Add missing function
 def save_template_settings(template_type, font_settings):
     """Save template settings to a configuration file."""
@@ -1646,48 +1862,8 @@ def upload_file():
             # On PythonAnywhere: Start background thread to avoid timeout
             logging.info("[PYTHONANYWHERE] Starting background processing thread")
             
-            # Capture variables from request context for background thread
-            original_filename = file.filename
-            # Store context removed - using single database
-            
-            def process_in_background():
-                try:
-                    logging.info(f"[BACKGROUND] Processing file: {file_path}")
-                    processor = get_excel_processor()
-                    success = processor.load_file(file_path)
-                    
-                    if success:
-                        row_count = len(processor.df) if hasattr(processor, 'df') and processor.df is not None else 0
-                        logging.info(f"[BACKGROUND] File loaded: {row_count} rows")
-                        
-                        # Store in database
-                        try:
-                            from src.core.data.product_database import get_product_database
-                            product_db = get_product_database()
-                            
-                            if product_db and hasattr(product_db, 'store_excel_data'):
-                                logging.info(f"[BACKGROUND] Storing {row_count} products in database...")
-                                result = product_db.store_excel_data(processor.df, file_path)
-                                logging.info(f"[BACKGROUND] Database storage result: {result}")
-                        except Exception as db_error:
-                            logging.warning(f"[BACKGROUND] Database storage failed: {db_error}")
-                        
-                        update_processing_status(original_filename, 'ready')
-                        logging.info(f"[BACKGROUND] Processing complete for {original_filename}")
-                    else:
-                        logging.error("[BACKGROUND] File load returned False")
-                        update_processing_status(original_filename, 'error: File load failed')
-                        
-                except Exception as e:
-                    logging.error(f"[BACKGROUND] Processing error: {e}")
-                    logging.error(traceback.format_exc())
-                    update_processing_status(original_filename, f'error: {str(e)}')
-            
-            # Start background thread
-            import threading
-            thread = threading.Thread(target=process_in_background)
-            thread.daemon = True
-            thread.start()
+            # Parse in the upload process pool; a newer upload for the same store supersedes this one
+            process_excel_background(file.filename, file_path, store=get_upload_store_key())
             
             upload_time = time.time() - start_time
             logging.info(f"=== UPLOAD COMPLETE (background processing started): {upload_time:.3f}s ===")
@@ -1921,16 +2097,10 @@ def upload_file_simple():
         # Clear any existing status for this filename and mark as processing
         update_processing_status(file.filename, 'processing')
         
-        # Start background thread for fast processing
-        try:
-            thread = threading.Thread(target=process_excel_background, args=(file.filename, file_path))
-            thread.daemon = True
-            thread.start()
-            logging.info(f"Background processing thread started for {file.filename}")
-        except Exception as thread_error:
-            logging.error(f"Failed to start background thread: {thread_error}")
-            update_processing_status(file.filename, f'error: Failed to start processing')
+        # Queue for the upload process pool
+        if process_excel_background(file.filename, file_path) is None:
             return jsonify({'error': 'Failed to start file processing'}), 500
+        logging.info(f"Background processing queued for {file.filename}")
         
         # Store uploaded file path in session
         session['file_path'] = file_path
@@ -2009,57 +2179,22 @@ def process_excel_sync(filename, temp_path):
         return False
 
 
-def ultra_fast_background_processing(filename, temp_path):
-    """Ultra-fast background processing with minimal processing for maximum speed"""
+def ultra_fast_background_processing(filename, temp_path, store=None):
+    """Parse an upload in the upload process pool and wait for it to be installed."""
     try:
-        logging.info(f"[ULTRA-FAST-BG] Starting ultra-fast processing: {filename}")
+        logging.info(f"[ULTRA-FAST-BG] Starting processing: {filename}")
         start_time = time.time()
         
-        # Step 1: Quick file validation
         if not os.path.exists(temp_path):
             update_processing_status(filename, 'error: File not found')
             return
         
-        # Step 2: Create ExcelProcessor with minimal processing
-        from src.core.data.excel_processor import ExcelProcessor
-        processor = ExcelProcessor()
-        
-        # Enable database integration for product storage
-        if hasattr(processor, 'enable_product_db_integration'):
-            processor.enable_product_db_integration(True)  # Enable for database storage
-            logging.info("[ULTRA-FAST-BG] Database integration enabled for product storage")
-        
-        # Step 3: Load file with full processing to ensure JointRatio is handled
-        logging.info(f"[ULTRA-FAST-BG] Loading file with full processing for JointRatio support: {temp_path}")
-        load_start = time.time()
-        
-        # Use full load_file method to ensure JointRatio processing for pre-rolls
-        success = processor.load_file(temp_path)
-        
-        load_time = time.time() - load_start
-        logging.info(f"[ULTRA-FAST-BG] Load completed in {load_time:.3f}s, success: {success}")
-        
-        if not success or processor.df is None or processor.df.empty:
-            logging.error(f"[ULTRA-FAST-BG] Failed to load file or empty dataframe: {filename}")
-            update_processing_status(filename, 'error: Failed to load file or file is empty')
-            return
-        
-        # Step 4: Skip all heavy processing for maximum speed
-        logging.info(f"[ULTRA-FAST-BG] Skipping heavy processing for {len(processor.df)} rows - using raw data")
-        
-        # No processing - just use the raw data as-is for maximum speed
-        logging.info("[ULTRA-FAST-BG] Ultra-minimal processing completed - raw data ready")
-        
-        # Step 5: Store in global processor (skip database storage for speed)
-        global excel_processor
-        excel_processor = processor
-        
-        # Update processing status immediately
-        update_processing_status(filename, 'ready')
-        logging.info(f"[ULTRA-FAST-BG] Status updated to 'ready' for {filename}")
+        executor = get_app_upload_executor()
+        job = executor.submit(store or get_upload_store_key(), filename, temp_path)
+        ready = executor.wait(job, timeout=600)
         
         total_time = time.time() - start_time
-        logging.info(f"[ULTRA-FAST-BG] Ultra-fast processing completed in {total_time:.3f}s")
+        logging.info(f"[ULTRA-FAST-BG] Processing finished in {total_time:.3f}s, stage: {job.stage}, ready: {ready}")
         
     except Exception as e:
         logging.error(f"[ULTRA-FAST-BG] Ultra-fast processing failed: {e}")
@@ -2138,493 +2273,26 @@ def update_global_processor_fast(processor, temp_path):
             
     except Exception as e:
         logging.error(f"Error updating global processor: {str(e)}")
-def process_excel_background(filename, temp_path):
-    """ULTRA-FAST background processing - minimal operations for instant response"""
-    global os  # Ensure os is available in this scope
-    
+def process_excel_background(filename, temp_path, store=None):
+    """Queue an upload for parsing in the upload process pool; status is reported through processing_status."""
     try:
-        logging.info(f"[BG] ===== ULTRA-FAST BACKGROUND PROCESSING START =====")
-        logging.info(f"[BG] Processing: {filename}")
+        logging.info(f"[BG] Queueing upload for processing: {filename}")
         
-        # Quick file existence check
         if not os.path.exists(temp_path):
             update_processing_status(filename, f'error: File not found')
             logging.error(f"[BG] File not found: {temp_path}")
-            return
-        
-        start_time = time.time()
-        
-        # ULTRA-FAST LOADING: Load file with minimal processing
-        from src.core.data.excel_processor import ExcelProcessor
-        new_processor = ExcelProcessor()
-        
-        try:
-            # Disable product database integration for faster loading
-            if hasattr(new_processor, 'enable_product_db_integration'):
-                new_processor.enable_product_db_integration(False)
-                logging.info("[BG] Product database integration disabled for faster loading")
-            
-            # Use fast load for immediate response
-            success = new_processor.load_file(temp_path)
-            if not success or new_processor.df is None or new_processor.df.empty:
-                update_processing_status(filename, f'error: Failed to load file')
-                return
-            
-            logging.info(f"[BG] File loaded successfully: {len(new_processor.df)} rows")
-            
-            # Mark as ready immediately
-            update_processing_status(filename, 'ready')
-            logging.info(f"[BG] Marked {filename} as ready")
-            
-        except Exception as load_error:
-            logging.error(f"[BG] Load error: {load_error}")
-            update_processing_status(filename, f'error: Load failed')
-            return
-        
-        # ULTRA-FAST PROCESSING: Update global processor immediately
-        global _excel_processor
-        with excel_processor_lock:
-            _excel_processor = new_processor
-            logging.info(f"[BG] ✅ Global processor updated with {len(new_processor.df)} rows")
-        
-        # Store in database (non-blocking) - only if enabled
-        try:
-            if hasattr(new_processor, 'enable_product_db_integration') and hasattr(new_processor, '_store_upload_in_database'):
-                # Re-enable database integration for storage
-                new_processor.enable_product_db_integration(True)
-                storage_result = new_processor._store_upload_in_database(new_processor.df, temp_path)
-                logging.info(f"[BG] ✅ Database storage completed: {storage_result}")
-        except Exception as storage_error:
-            logging.warning(f"[BG] Database storage failed: {storage_error}")
-        
-        processing_time = time.time() - start_time
-        logging.info(f"[BG] ===== ULTRA-FAST PROCESSING COMPLETE =====")
-        logging.info(f"[BG] Processing time: {processing_time:.3f}s")
-        logging.info(f"[BG] Rows processed: {len(new_processor.df)}")
-        
-    except Exception as e:
-        logging.error(f"[BG] ===== ULTRA-FAST PROCESSING FAILED =====")
-        logging.error(f"[BG] Error: {str(e)}")
-        update_processing_status(filename, f'error: {str(e)}')
-        
-        # Step 1: Use fast loading for immediate response
-        load_start = time.time()
-        
-        # Add timeout check
-        if time.time() - start_time > max_processing_time:
-            update_processing_status(filename, f'error: Processing timeout during file load')
-            logging.error(f"[BG] Processing timeout for {filename}")
-            return
-        
-        # Create a new ExcelProcessor instance directly
-        try:
-            from src.core.data.excel_processor import ExcelProcessor
-            logging.info(f"[BG] Importing ExcelProcessor...")
-            new_processor = ExcelProcessor()
-            logging.info(f"[BG] ExcelProcessor created successfully")
-        except Exception as import_error:
-            logging.error(f"[BG] CRITICAL ERROR: Failed to import/create ExcelProcessor: {import_error}")
-            logging.error(f"[BG] Import traceback: {traceback.format_exc()}")
-            update_processing_status(filename, f'error: Failed to create ExcelProcessor: {import_error}')
-            return
-        
-        # CRITICAL FIX: Disable default file loading to prevent interference
-        try:
-            new_processor._last_loaded_file = temp_path  # Set this immediately to prevent default loading
-            logging.info(f"[BG] CRITICAL FIX: Set _last_loaded_file to uploaded file: {temp_path}")
-        except Exception as set_error:
-            logging.error(f"[BG] Error setting _last_loaded_file: {set_error}")
-        
-        # Enable product database integration for new product storage
-        try:
-            if hasattr(new_processor, 'enable_product_db_integration'):
-                new_processor.enable_product_db_integration(True)
-                logging.info("[BG] Product database integration enabled for new product storage")
-        except Exception as db_error:
-            logging.warning(f"[BG] Error enabling product database integration: {db_error}")
-        
-        # Use full load_file method to ensure identical processing to local version
-        logging.info(f"[BG] Loading file with full load_file method: {temp_path}")
-        
-        # Use the full load_file method for complete data processing
-        try:
-            success = new_processor.load_file(temp_path)
-            load_time = time.time() - load_start
-            logging.info(f"[BG] File load completed in {load_time:.3f}s, success: {success}")
-        except Exception as load_error:
-            logging.error(f"[BG] CRITICAL ERROR: File load failed: {load_error}")
-            logging.error(f"[BG] Load traceback: {traceback.format_exc()}")
-            update_processing_status(filename, f'error: File load failed: {load_error}')
-            return
-        
-        if not success:
-            update_processing_status(filename, f'error: Failed to load file data')
-            logging.error(f"[BG] File load failed for {filename}")
-            return
-        
-        # Verify the load was successful
-        if new_processor.df is None or new_processor.df.empty:
-            update_processing_status(filename, f'error: Failed to load file data - DataFrame is empty')
-            logging.error(f"[BG] File load failed for {filename} - DataFrame is empty")
-            return
-        
-        # CRITICAL FIX: Populate dropdown cache after successful file load
-        if hasattr(new_processor, '_cache_dropdown_values'):
-            try:
-                new_processor._cache_dropdown_values()
-                logging.info(f"[BG] Successfully populated dropdown cache after file load")
-                # Log the strain count specifically
-                if 'strain' in new_processor.dropdown_cache:
-                    strain_count = len(new_processor.dropdown_cache['strain'])
-                    logging.info(f"[BG] Dropdown cache contains {strain_count} strains")
-                else:
-                    logging.warning("[BG] No strain filter found in dropdown cache")
-            except Exception as e:
-                logging.error(f"[BG] Failed to populate dropdown cache after file load: {e}")
-        else:
-            logging.warning("[BG] ExcelProcessor does not have _cache_dropdown_values method")
-        
-        # CRITICAL FIX: Verify we loaded the correct file (with more robust comparison)
-        logging.info(f"[BG] CRITICAL FIX: Verifying loaded file matches uploaded file")
-        logging.info(f"[BG] Expected file: {temp_path}")
-        logging.info(f"[BG] Loaded file: {new_processor._last_loaded_file}")
-        
-        # More robust file path comparison
-        expected_path = os.path.abspath(temp_path) if temp_path else None
-        loaded_path = os.path.abspath(new_processor._last_loaded_file) if new_processor._last_loaded_file else None
-        
-        logging.info(f"[BG] Normalized expected path: {expected_path}")
-        logging.info(f"[BG] Normalized loaded path: {loaded_path}")
-        
-        # Check if file verification should be bypassed (for debugging)
-        bypass_verification = os.environ.get('BYPASS_FILE_VERIFICATION', 'false').lower() == 'true'
-        if bypass_verification:
-            logging.warning(f"[BG] File verification bypassed due to BYPASS_FILE_VERIFICATION environment variable")
-        elif expected_path != loaded_path:
-            logging.error(f"[BG] CRITICAL ERROR: Loaded wrong file! Expected {expected_path}, got {loaded_path}")
-            update_processing_status(filename, f'error: Loaded incorrect file')
-            return
-        else:
-            logging.info(f"[BG] File verification passed - loaded correct file")
-        
-        # Debug Vendor data
-        if hasattr(new_processor, 'df') and new_processor.df is not None:
-            vendor_columns = [col for col in new_processor.df.columns if 'vendor' in col.lower()]
-            logging.info(f"[BG] Vendor columns found: {vendor_columns}")
-            if vendor_columns:
-                sample_vendor_data = new_processor.df[vendor_columns[0]].head(5).tolist()
-                logging.info(f"[BG] Sample vendor data: {sample_vendor_data}")
-        
-        # CRITICAL FIX: Clear all caches to ensure new file is processed
-        logging.info(f"[BG] CRITICAL FIX: Clearing all caches for new file")
-        if hasattr(new_processor, '_file_cache'):
-            new_processor._file_cache.clear()
-            logging.info(f"[BG] Cleared file cache")
-        if hasattr(new_processor, '_dropdown_cache'):
-            new_processor._dropdown_cache.clear()
-            logging.info(f"[BG] Cleared dropdown cache")
-        if hasattr(new_processor, '_available_tags_cache'):
-            new_processor._available_tags_cache.clear()
-            logging.info(f"[BG] Cleared available tags cache")
-        
-        # Avoid redundant reload after fast load on PythonAnywhere for performance
-        if os.environ.get('FORCE_RELOAD_AFTER_FAST_LOAD', 'false').lower() == 'true':
-            logging.info(f"[BG] FORCE_RELOAD_AFTER_FAST_LOAD is enabled; reloading file for verification")
-            new_processor._last_loaded_file = None
-            new_processor.df = None
-            if hasattr(new_processor, '_file_cache'):
-                new_processor._file_cache.clear()
-            reload_success = new_processor.load_file(temp_path)
-            if not reload_success:
-                logging.error(f"[BG] CRITICAL ERROR: Failed to reload file {temp_path}")
-                update_processing_status(filename, f'error: Failed to reload file')
-                return
-            logging.info(f"[BG] File reloaded successfully with fresh data")
-            
-            # CRITICAL FIX: Populate dropdown cache after redundant reload
-            if hasattr(new_processor, '_cache_dropdown_values'):
-                try:
-                    new_processor._cache_dropdown_values()
-                    logging.info(f"[BG] Successfully populated dropdown cache after redundant reload")
-                    # Log the strain count specifically
-                    if 'strain' in new_processor.dropdown_cache:
-                        strain_count = len(new_processor.dropdown_cache['strain'])
-                        logging.info(f"[BG] Dropdown cache contains {strain_count} strains")
-                    else:
-                        logging.warning("[BG] No strain filter found in dropdown cache")
-                except Exception as e:
-                    logging.error(f"[BG] Failed to populate dropdown cache after redundant reload: {e}")
-            else:
-                logging.warning("[BG] ExcelProcessor does not have _cache_dropdown_values method")
-        else:
-            logging.info(f"[BG] Using pythonanywhere_fast_load data without redundant reload")
-        
-        # CRITICAL FIX: Clear global cache to force fresh data
-        logging.info(f"[BG] CRITICAL FIX: Clearing global cache to force fresh data")
-        try:
-            from flask import has_request_context
-            if has_request_context():
-                # Clear all cache keys that might contain old data
-                cache_keys_to_clear = [
-                    'available_tags', 'selected_tags', 'filter_options', 'dropdowns',
-                    'json_matched_tags', 'full_excel_tags', 'initial_data'
-                ]
-                
-                for cache_key_name in cache_keys_to_clear:
-                    try:
-                        # Try different cache key patterns
-                        cache_keys_to_try = [
-                            get_session_cache_key(cache_key_name),
-                            f"{cache_key_name}_default",
-                            cache_key_name,
-                            f"full_excel_cache_key",
-                            f"json_matched_cache_key"
-                        ]
-                        
-                        for key in cache_keys_to_try:
-                            cache.delete(key)
-                            logging.info(f"[BG] Cleared global cache key: {key}")
-                    except Exception as key_error:
-                        logging.warning(f"[BG] Error clearing global cache key {cache_key_name}: {key_error}")
-            else:
-                logging.info("[BG] Skipping global cache clear - not in request context")
-        except Exception as global_cache_error:
-            logging.warning(f"[BG] Error in global cache clearing: {global_cache_error}")
-        # CRITICAL FIX: Store uploaded data in database for persistence and analytics
-        # JSON matched tags will be automatically excluded from database storage
-        try:
-            logging.info(f"[BG] CRITICAL: Forcing database storage of uploaded data")
-            logging.info(f"[BG] DataFrame shape: {new_processor.df.shape if hasattr(new_processor.df, 'shape') else 'No DataFrame'}")
-            logging.info(f"[BG] DataFrame columns: {list(new_processor.df.columns) if hasattr(new_processor.df, 'columns') else 'No columns'}")
-            
-            # Check for JSON matched tags before storage
-            json_match_count = 0
-            if hasattr(new_processor.df, 'columns') and 'Source' in new_processor.df.columns:
-                json_match_mask = new_processor.df['Source'].astype(str).str.contains('JSON Match|AI Match|JSON|AI|Match|Generated', case=False, na=False)
-                json_match_count = json_match_mask.sum()
-                logging.info(f"[BG] Detected {json_match_count} JSON matched tags that will be excluded from database storage")
-            
-            if hasattr(new_processor, '_store_upload_in_database'):
-                logging.info("[BG] Using ExcelProcessor _store_upload_in_database method")
-                storage_result = new_processor._store_upload_in_database(new_processor.df, temp_path)
-                logging.info(f"[BG] ✅ Database storage completed successfully: {storage_result}")
-                
-                # Log JSON match exclusion details
-                if 'excluded_json_matches' in storage_result:
-                    excluded_count = storage_result['excluded_json_matches']
-                    logging.info(f"[BG] ✅ Excluded {excluded_count} JSON matched tags from database storage")
-                    logging.info(f"[BG] ✅ Stored {storage_result.get('stored', 0)} products in database")
-                else:
-                    logging.warning("[BG] Storage result missing excluded_json_matches field")
-                    
-            else:
-                logging.warning("[BG] ExcelProcessor does not have _store_upload_in_database method")
-                # Try alternative database storage method
-                try:
-                    logging.info("[BG] Attempting alternative database storage with ProductDatabase")
-                    # Store context removed - using single database
-                    product_db = get_product_database()
-                    logging.info(f"[BG] ProductDatabase obtained: {product_db}")
-                    
-                    if hasattr(product_db, 'store_excel_data'):
-                        logging.info("[BG] ProductDatabase has store_excel_data method, calling it...")
-                        storage_result = product_db.store_excel_data(new_processor.df, temp_path)
-                        logging.info(f"[BG] ✅ Alternative database storage completed: {storage_result}")
-                        
-                        # Log JSON match exclusion details
-                        if 'excluded_json_matches' in storage_result:
-                            excluded_count = storage_result['excluded_json_matches']
-                            logging.info(f"[BG] ✅ Excluded {excluded_count} JSON matched tags from database storage")
-                            logging.info(f"[BG] ✅ Stored {storage_result.get('stored', 0)} products in database")
-                        else:
-                            logging.warning("[BG] Storage result missing excluded_json_matches field")
-                            
-                    else:
-                        logging.warning("[BG] ProductDatabase does not have store_excel_data method")
-                        logging.error("[BG] CRITICAL: No database storage method available!")
-                except Exception as alt_storage_error:
-                    logging.error(f"[BG] Alternative database storage failed: {alt_storage_error}")
-                    import traceback
-                    logging.error(f"[BG] Alternative storage traceback: {traceback.format_exc()}")
-        except Exception as storage_error:
-            logging.error(f"[BG] ❌ Database storage failed: {storage_error}")
-            import traceback
-            logging.error(f"[BG] Storage error traceback: {traceback.format_exc()}")
-            # Don't fail the upload - continue without database storage
-        
-        # Mark as ready as soon as DataFrame is loaded so frontend can proceed
-        try:
-            update_processing_status(filename, 'ready')
-            logging.info(f"[BG] Marked {filename} as ready (DataFrame loaded)")
-        except Exception as mark_ready_error:
-            logging.warning(f"[BG] Failed to mark ready: {mark_ready_error}")
-
-        # Step 2: Update the global processor safely with minimal clearing
-        with excel_processor_lock:
-            # Clear the old processor completely
-            if _excel_processor is not None:
-                # Explicitly clear all data from old processor
-                if hasattr(_excel_processor, 'df') and _excel_processor.df is not None:
-                    del _excel_processor.df
-                    logging.info("[BG] Cleared old DataFrame from ExcelProcessor")
-                
-                if hasattr(_excel_processor, 'selected_tags'):
-                    logging.info(f"[BG] Clearing selected tags from ExcelProcessor. Previous count: {len(_excel_processor.selected_tags) if _excel_processor.selected_tags else 0}")
-                    _excel_processor.selected_tags = []
-                    logging.info("[BG] Cleared selected tags from ExcelProcessor")
-                
-                if hasattr(_excel_processor, 'dropdown_cache'):
-                    _excel_processor.dropdown_cache = {}
-                    logging.info("[BG] Cleared dropdown cache from ExcelProcessor")
-                
-                # Clear any other data attributes
-                for attr in ['data', 'original_data', 'processed_data']:
-                    if hasattr(_excel_processor, attr):
-                        delattr(_excel_processor, attr)
-                        logging.info(f"[BG] Cleared {attr} from ExcelProcessor")
-                
-                # Force garbage collection
-                import gc
-                gc.collect()
-                logging.info("[BG] Forced garbage collection to free memory")
-            
-            # Replace with the new processor
-            _excel_processor = new_processor
-            _excel_processor._last_loaded_file = temp_path
-            
-            # Store store context in the processor for validation (without Flask session)
-            try:
-                # Don't use Flask session in background thread - it's not available
-                # Just set a default store context
-                _excel_processor._store_context = 'uploaded_file'
-                logging.info(f"[BG] Store context set for processor: uploaded_file")
-            except Exception as store_error:
-                logging.warning(f"[BG] Error setting store context: {store_error}")
-            
-            logging.info(f"[BG] Global Excel processor updated with new file: {temp_path}")
-            
-            # CRITICAL FIX: Verify the global processor was set correctly
-            if _excel_processor is not None and _excel_processor.df is not None:
-                logging.info(f"[BG] ✅ VERIFICATION: Global processor has {len(_excel_processor.df)} rows")
-                logging.info(f"[BG] ✅ VERIFICATION: Global processor file: {_excel_processor._last_loaded_file}")
-            else:
-                logging.error(f"[BG] ❌ CRITICAL ERROR: Global processor is None or has no data!")
-                logging.error(f"[BG] ❌ Global processor: {_excel_processor}")
-                if _excel_processor is not None:
-                    logging.error(f"[BG] ❌ Global processor df: {_excel_processor.df}")
-                    logging.error(f"[BG] ❌ Global processor df is None: {_excel_processor.df is None}")
-                    if hasattr(_excel_processor, 'df') and _excel_processor.df is not None:
-                        logging.error(f"[BG] ❌ Global processor df empty: {_excel_processor.df.empty}")
-        
-        # ULTRA-FAST CACHE OPTIMIZATION - Minimal clearing
-        clear_initial_data_cache()
-        
-        # Only clear the most critical caches for instant response
-        try:
-            from flask import has_request_context
-            if has_request_context():
-                # Clear only the most essential caches
-                critical_keys = ['full_excel_cache_key', 'json_matched_cache_key']
-                cleared_count = 0
-                for key in critical_keys:
-                    if cache.has(key):
-                        cache.delete(key)
-                        cleared_count += 1
-                logging.info(f"[BG] Cleared {cleared_count} critical cache entries for instant response")
-            else:
-                logging.info("[BG] Skipping Flask cache clear - not in request context")
-        except Exception as cache_error:
-            logging.warning(f"[BG] Error clearing file caches: {cache_error}")
-        
-        # Clear specific cache keys that might persist (only if in request context)
-        try:
-            from flask import has_request_context
-            if has_request_context():
-                cache_keys_to_clear = [
-                    'available_tags', 'selected_tags', 'filter_options', 'dropdowns',
-                    'json_matched_tags', 'full_excel_tags'
-                ]
-                
-                for cache_key_name in cache_keys_to_clear:
-                    try:
-                        # Try different cache key patterns
-                        cache_keys_to_try = [
-                            get_session_cache_key(cache_key_name),
-                            f"{cache_key_name}_default",  # Use default instead of session.get()
-                            cache_key_name
-                        ]
-                        
-                        for key in cache_keys_to_try:
-                            cache.delete(key)
-                            logging.info(f"[BG] Cleared cache key: {key}")
-                    except Exception as key_error:
-                        logging.warning(f"[BG] Error clearing cache key {cache_key_name}: {key_error}")
-            else:
-                logging.info("[BG] Skipping cache key clear - not in request context")
-        except Exception as cache_key_error:
-            logging.warning(f"[BG] Error in cache key clearing: {cache_key_error}")
-        
-        # Clear session data that might persist (only if in request context)
-        try:
-            from flask import has_request_context, session, g
-            if has_request_context():
-                session_keys_to_clear = [
-                    'selected_tags', 'current_filter_mode', 'json_matched_cache_key',
-                    'full_excel_cache_key'
-                ]
-                
-                for key in session_keys_to_clear:
-                    if key in session:
-                        del session[key]
-                        logging.info(f"[BG] Cleared session key: {key}")
-                
-                # Clear any g context that might exist
-                if hasattr(g, 'excel_processor'):
-                    delattr(g, 'excel_processor')
-                    logging.info("[BG] Cleared g.excel_processor context")
-            else:
-                logging.info("[BG] Skipping session/g context clear - not in request context (background thread)")
-        except Exception as session_error:
-            logging.warning(f"[BG] Error clearing session/g context: {session_error}")
-        
-        # Update processing status to success
-        update_processing_status(filename, 'ready')
-        logging.info(f"[BG] ===== BACKGROUND PROCESSING COMPLETE =====")
-        logging.info(f"[BG] File processing completed successfully: {filename}")
-        
-        # Step 3: Mark as ready immediately (no delay needed with fast loading)
-        logging.info(f"[BG] Marking file as ready: {filename}")
-        update_processing_status(filename, 'ready')
-        logging.info(f"[BG] File marked as ready: {filename}")
-        logging.info(f"[BG] Current processing statuses: {dict(processing_status)}")
+            return None
         
-        # Step 4: Schedule full processing in background if needed
-        # This allows the UI to be responsive immediately while full processing happens later
-        try:
-            import threading
-            def full_processing_background():
-                """Background task for full data processing if needed."""
-                try:
-                    logging.info(f"[BG-FULL] Starting full processing for: {filename}")
-                    # Here you could add any additional processing that's not critical for basic functionality
-                    # For now, we'll just log that full processing is complete
-                    logging.info(f"[BG-FULL] Full processing complete for: {filename}")
-                except Exception as e:
-                    logging.error(f"[BG-FULL] Error in full processing: {e}")
-            
-            # Start full processing in background (non-blocking)
-            full_thread = threading.Thread(target=full_processing_background)
-            full_thread.daemon = True
-            full_thread.start()
-            logging.info(f"[BG] Full processing thread started for {filename}")
-        except Exception as full_thread_error:
-            logging.warning(f"[BG] Failed to start full processing thread: {full_thread_error}")
+        # The executor supersedes older uploads for the same store and marks the file ready once installed
+        job = get_app_upload_executor().submit(store or get_upload_store_key(), filename, temp_path)
+        logging.info(f"[BG] Upload job {job.job_id} queued for store '{job.store}'")
+        return job
         
     except Exception as e:
-        logging.error(f"[BG] ===== BACKGROUND PROCESSING FAILED =====")
-        logging.error(f"[BG] Error in background processing: {str(e)}")
+        logging.error(f"[BG] Failed to queue upload {filename}: {str(e)}")
         logging.error(f"[BG] Traceback: {traceback.format_exc()}")
         update_processing_status(filename, f'error: {str(e)}')
+        return None
 
 @app.route('/api/upload-status', methods=['GET'])
 def upload_status():
@@ -2665,10 +2333,17 @@ def upload_status():
         
         with processing_lock:
             status = processing_status.get(filename, 'not_found')
+            stage = processing_stages.get(filename)
             all_statuses = dict(processing_status)  # Copy for debugging
             timestamp = processing_timestamps.get(filename, 0)
             age = time.time() - timestamp if timestamp > 0 else 0
         
+        # Jobs still in the upload executor are authoritative; the processor-has-data shortcut below
+        # would otherwise report the previous upload as ready
+        from src.core.data.upload_executor import ACTIVE_STAGES
+        upload_job = get_app_upload_executor().get_job(filename)
+        job_active = upload_job is not None and upload_job.stage in ACTIVE_STAGES
+        
         logging.info(f"Upload status request for {filename}: {status} (age: {age:.1f}s)")
         logging.debug(f"All processing statuses: {all_statuses}")
         
@@ -2696,7 +2371,7 @@ def upload_status():
                 logging.info(f"File {filename} appears to be processed (processor has data)")
             else:
                 status = 'processing'  # Still processing
-        elif status == 'processing' and file_exists:
+        elif status == 'processing' and file_exists and not job_active:
             # Check if processing is actually complete
             local_processor = get_excel_processor()
             if local_processor and hasattr(local_processor, 'df') and local_processor.df is not None and not local_processor.df.empty:
@@ -2714,7 +2389,9 @@ def upload_status():
             'age_seconds': round(age, 1),
             'total_processing_files': len(all_statuses),
             'file_exists': file_exists,
-            'upload_folder': upload_folder
+            'upload_folder': upload_folder,
+            'stage': stage,
+            'job': upload_job.to_dict() if upload_job is not None else None
         }
         
         # If status is 'ready' and age is less than 30 seconds, don't clear it yet
@@ -2982,283 +2659,143 @@ def get_template_settings_api():
 # Add undo/clear support for tag moves and filters
 from flask import session
 
-# Helper: maintain an undo stack in session
+# Legacy undo stack key (replaced by the selection store and its session state)
 UNDO_STACK_KEY = 'undo_stack'
+# Selection and recent undo/redo by name, shared by every worker serving the session
+SELECTION_STATE_KEY = 'selection_state'
+
+def _session_selection(excel_processor):
+    """Server-side selection of the current session, caught up with the session and excel_processor.selected_tags."""
+    selection = get_selection_store().get(get_current_session_id(), get_tag_name_index(excel_processor))
+    with selection.lock:
+        state = session.get(SELECTION_STATE_KEY)
+        if state and state.get('token') != selection.state_token:
+            # Another worker changed the selection since this one last saw it
+            selection.load_state(state)
+            selection.synced_list = []
+            sync_from_processor(selection, session.get('selected_tags', selection.selected_names()))
+            publish_to_processor(selection, excel_processor)
+        sync_from_processor(selection, excel_processor.selected_tags)
+    return selection
+
+def _persist_selection(selection):
+    session[SELECTION_STATE_KEY] = selection.to_state()
+    session.pop(UNDO_STACK_KEY, None)
+
+def _selection_response(selection, excel_processor, **extra):
+    """Publish the selection to the processor and session and return the lists the UI redraws from."""
+    selected_names = publish_to_processor(selection, excel_processor)
+    session['selected_tags'] = selected_names
+    _persist_selection(selection)
+    return jsonify({
+        'success': True,
+        'available_tags': selection.available_names(),
+        'selected_tags': selected_names,
+        'undo_stack_size': selection.undo_depth,
+        'redo_stack_size': selection.redo_depth,
+        **extra
+    })
 
 @app.route('/api/move-tags', methods=['POST'])
 def move_tags():
     try:
-        logging.info("=== MOVE TAGS ACTION START ===")
-        logging.info(f"Move tags request at {datetime.now().strftime('%H:%M:%S')}")
-        logging.info(f"Request method: {request.method}")
-        logging.info(f"Request URL: {request.url}")
-        logging.info(f"Request headers: {dict(request.headers)}")
-        
-        # Check session size but don't optimize unless necessary
-        check_session_size()
+        data = request.get_json() or {}
+        action = data.get('action', 'move')
+        logging.info(f"Move tags - action: {action}")
         
-        # Store validation to prevent cross-store data access
-        # Store context removed - using single database
-        file_store = session.get('file_store', '')
+        excel_processor = get_session_excel_processor()
+        selection = _session_selection(excel_processor)
+        
+        with selection.lock:
+            # Handle reorder action
+            if action == 'reorder':
+                new_order = data.get('newOrder', [])
+                if new_order:
+                    order_ids, order_extras = selection.index.ids_for(new_order)
+                    selection.reorder(order_ids, extras=order_extras)
+                    logging.info(f"Reordered {len(selection)} selected tags")
+                    return _selection_response(selection, excel_processor, message='Tags reordered successfully')
+            
+            # Handle move action
+            tags_to_move = data.get('tags', [])
+            direction = data.get('direction', 'to_selected')
+            select_all = data.get('selectAll', False)
+            
+            # Add safety check to prevent race conditions
+            if not tags_to_move and not select_all:
+                logging.warning("No tags to move and select_all is False, returning current state")
+                return _selection_response(selection, excel_processor)
+            
+            # Names not in the current data (product database matches) are moved as extras
+            tag_ids, unknown = selection.index.ids_for(tags_to_move)
+            if unknown:
+                logging.info(f"Move tags - {len(unknown)} tags not in the current data kept by name")
+            
+            # Each move records only the tags it changed as its undo entry
+            if direction == 'to_selected':
+                moved = selection.select_all() if select_all else selection.select(tag_ids, extras=unknown)
+            else:  # to_available
+                moved = selection.clear() if select_all else selection.deselect(tag_ids, extras=unknown)
+            logging.info(f"Move tags - {direction}: {len(moved)} tags moved, {len(selection)} selected")
+            
+            return _selection_response(selection, excel_processor, moved_tags=selection.index.names_for(moved))
         
-        # Store validation removed - using single database
+    except Exception as e:
+        logging.error(f"Error in move_tags: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/undo-move', methods=['POST'])
+def undo_move():
+    try:
+        excel_processor = get_session_excel_processor()
+        selection = _session_selection(excel_processor)
         
-        data = request.get_json()
-        action = data.get('action', 'move')
-        logging.info(f"Action: {action}")
-        logging.info(f"Request data: {data}")
+        with selection.lock:
+            logging.info(f"Undo move requested - Stack size: {selection.undo_depth}")
+            if selection.undo() is None:
+                logging.warning("No undo history available - user tried to undo without any previous moves")
+                return jsonify({'error': 'No undo history available'}), 400
+            return _selection_response(selection, excel_processor)
         
+    except Exception as e:
+        logging.error(f"Error in undo_move: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/redo-move', methods=['POST'])
+def redo_move():
+    try:
         excel_processor = get_session_excel_processor()
-        available_tags = excel_processor.get_available_tags()
+        selection = _session_selection(excel_processor)
         
-        # Convert available_tags to just names for efficiency
-        available_tag_names = [tag.get('Product Name*', '') for tag in available_tags if tag.get('Product Name*', '')]
+        with selection.lock:
+            if selection.redo() is None:
+                return jsonify({'error': 'No redo history available'}), 400
+            return _selection_response(selection, excel_processor)
         
-        # Get selected tags - handle both dict and string objects
-        selected_tags = []
-        for tag in excel_processor.selected_tags:
-            if isinstance(tag, dict):
-                selected_tags.append(tag.get('Product Name*', ''))
-            elif isinstance(tag, str):
-                selected_tags.append(tag)
-            else:
-                selected_tags.append(str(tag))
+    except Exception as e:
+        logging.error(f"Error in redo_move: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/save-selection-state', methods=['POST'])
+def save_selection_state():
+    """
+    Checkpoint the selection for undo. Moves record their own undo entries, so
+    this only folds in selection changes made by other endpoints since the
+    last checkpoint.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        action_type = data.get('action_type', 'checkbox_selection')  # 'checkbox_selection', 'move', etc.
         
-        logging.info(f"Move tags - Current selected tags: {selected_tags}")
-        
-        # Handle reorder action
-        if action == 'reorder':
-            new_order = data.get('newOrder', [])
-            
-            if new_order:
-                # Validate that all items in new_order exist in selected_tags
-                current_selected = set(selected_tags)
-                new_order_valid = [tag for tag in new_order if tag in current_selected]
-                
-                # If no valid tags found, use the original order
-                if not new_order_valid:
-                    new_order_valid = selected_tags.copy()
-                else:
-                    # Add any missing tags from current selection
-                    for tag in selected_tags:
-                        if tag not in new_order_valid:
-                            new_order_valid.append(tag)
-                
-                # Update the selected tags order - convert names back to dictionary objects
-                # First, find the corresponding dictionary objects for each name
-                updated_selected_tags = []
-                for tag_name in new_order_valid:
-                    # Try to find the corresponding dictionary in available_tags
-                    for available_tag in available_tags:
-                        if isinstance(available_tag, dict) and available_tag.get('Product Name*', '') == tag_name:
-                            updated_selected_tags.append(available_tag)
-                            break
-                    else:
-                        # If not found, create a simple dict with just the name
-                        updated_selected_tags.append({'Product Name*': tag_name})
-                
-                excel_processor.selected_tags = updated_selected_tags
-                # Update session with the full dictionary objects
-                session['selected_tags'] = updated_selected_tags
-                
-                # Force session to be saved
-                session.modified = True
-                
-                logging.info(f"Reordered selected tags: {new_order_valid}")
-                
-                return jsonify({
-                    'success': True,
-                    'message': 'Tags reordered successfully',
-                    'selected_tags': new_order_valid,
-                    'available_tags': available_tag_names
-                })
-        
-        # Handle move action (existing functionality)
-        tags_to_move = data.get('tags', [])
-        direction = data.get('direction', 'to_selected')
-        select_all = data.get('selectAll', False)
-        
-        logging.info(f"Move tags - Tags to move: {tags_to_move}")
-        logging.info(f"Move tags - Direction: {direction}")
-        
-        # Add safety check to prevent race conditions
-        if not tags_to_move and not select_all:
-            logging.warning("No tags to move and select_all is False, returning current state")
-            return jsonify({
-                'success': True,
-                'available_tags': available_tag_names,
-                'selected_tags': selected_tags
-            })
-        
-        # Save current state for undo using the dedicated endpoint
-        try:
-            undo_response = requests.post(
-                f"http://127.0.0.1:{app.config.get('PORT', 8001)}/api/save-selection-state",
-                json={'action_type': 'move_tags'},
-                headers={'Content-Type': 'application/json'}
-            )
-            if undo_response.ok:
-                logging.info(f"Selection state saved for undo - Stack size: {undo_response.json().get('undo_stack_size', 0)}")
-            else:
-                logging.warning(f"Failed to save selection state for undo: {undo_response.status_code}")
-        except Exception as e:
-            logging.warning(f"Failed to save selection state for undo: {str(e)}")
-            # Continue with the operation even if undo save fails
-        
-        if direction == 'to_selected':
-            if select_all:
-                # Ensure no duplicates when selecting all
-                seen = set()
-                deduplicated_tags = []
-                for tag in available_tag_names:
-                    if tag not in seen:
-                        deduplicated_tags.append(tag)
-                        seen.add(tag)
-                excel_processor.selected_tags = deduplicated_tags
-                logging.info(f"Move tags - Select all: Added {len(deduplicated_tags)} tags to selected")
-            else:
-                added_count = 0
-                for tag in tags_to_move:
-                    if tag not in excel_processor.selected_tags:
-                        excel_processor.selected_tags.append(tag)
-                        added_count += 1
-                logging.info(f"Move tags - To selected: Added {added_count} tags to selected")
-        else:  # to_available
-            if select_all:
-                removed_count = len(excel_processor.selected_tags)
-                excel_processor.selected_tags.clear()
-                logging.info(f"Move tags - Select all: Removed {removed_count} tags from selected")
-            else:
-                before_count = len(excel_processor.selected_tags)
-                # Add safety check to prevent corruption of selected tags
-                if not isinstance(excel_processor.selected_tags, list):
-                    logging.error("selected_tags is not a list, resetting to empty list")
-                    excel_processor.selected_tags = []
-                    before_count = 0
-                
-                excel_processor.selected_tags = [tag for tag in excel_processor.selected_tags if tag not in tags_to_move]
-                after_count = len(excel_processor.selected_tags)
-                removed_count = before_count - after_count
-                logging.info(f"Move tags - To available: Removed {removed_count} tags from selected (before: {before_count}, after: {after_count})")
-        
-        # Update session with new selected tags (store only tag names to reduce session size)
-        # Add safety check to ensure selected_tags is a list before copying
-        if isinstance(excel_processor.selected_tags, list):
-            session['selected_tags'] = excel_processor.selected_tags.copy()
-        else:
-            logging.error("selected_tags is not a list, setting session to empty list")
-            session['selected_tags'] = []
-        
-        # Return only the necessary data for UI updates
-        # Add safety checks to ensure we return valid data
-        if not isinstance(excel_processor.selected_tags, list):
-            logging.error("selected_tags is not a list in final response, using empty list")
-            excel_processor.selected_tags = []
-        
-        updated_available_names = [name for name in available_tag_names if name not in excel_processor.selected_tags]
-        updated_selected_names = excel_processor.selected_tags.copy()
-        
-        logging.info(f"Move tags - Final response: {len(updated_available_names)} available, {len(updated_selected_names)} selected")
-        
-        return jsonify({
-            'success': True,
-            'available_tags': updated_available_names,
-            'selected_tags': updated_selected_names
-        })
-        
-    except Exception as e:
-        logging.error(f"Error in move_tags: {str(e)}")
-        return jsonify({'error': str(e)}), 500
-
-@app.route('/api/undo-move', methods=['POST'])
-def undo_move():
-    try:
-        # Check session size but don't optimize unless necessary
-        check_session_size()
-        
-        excel_processor = get_session_excel_processor()
-        undo_stack = session.get(UNDO_STACK_KEY, [])
-        
-        # Debug logging for undo stack
-        logging.info(f"Undo move requested - Stack size: {len(undo_stack)}")
-        logging.info(f"Undo stack contents: {undo_stack}")
-        
-        if not undo_stack:
-            logging.warning("No undo history available - user tried to undo without any previous moves")
-            return jsonify({'error': 'No undo history available'}), 400
-        
-        # Get the last state
-        last_state = undo_stack.pop()
-        session[UNDO_STACK_KEY] = undo_stack
-        
-        # Restore the previous state
-        excel_processor.selected_tags = last_state['selected_tag_names'].copy()
-        session['selected_tags'] = excel_processor.selected_tags.copy()
-        
-        # Get current available tags
-        available_tags = excel_processor.get_available_tags()
-        available_tag_names = [tag.get('Product Name*', '') for tag in available_tags if tag.get('Product Name*', '')]
-        
-        # Return only the necessary data for UI updates
-        updated_available_names = [name for name in available_tag_names if name not in excel_processor.selected_tags]
-        updated_selected_names = excel_processor.selected_tags.copy()
+        excel_processor = get_session_excel_processor()
+        selection = _session_selection(excel_processor)
+        with selection.lock:
+            _persist_selection(selection)
+        logging.debug(f"Selection state saved - Stack size: {selection.undo_depth}, Action type: {action_type}")
         
         return jsonify({
             'success': True,
-            'available_tags': updated_available_names,
-            'selected_tags': updated_selected_names
-        })
-        
-    except Exception as e:
-        logging.error(f"Error in undo_move: {str(e)}")
-        return jsonify({'error': str(e)}), 500
-
-@app.route('/api/save-selection-state', methods=['POST'])
-def save_selection_state():
-    """Save the current selection state for undo functionality."""
-    try:
-        # Check session size but don't optimize unless necessary
-        check_session_size()
-        
-        data = request.get_json()
-        action_type = data.get('action_type', 'checkbox_selection')  # 'checkbox_selection', 'move', etc.
-        
-        excel_processor = get_session_excel_processor()
-        available_tags = excel_processor.get_available_tags()
-        
-        # Convert available_tags to just names for efficiency
-        available_tag_names = [tag.get('Product Name*', '') for tag in available_tags if tag.get('Product Name*', '')]
-        
-        # Get selected tags - handle both dict and string objects
-        selected_tags = []
-        for tag in excel_processor.selected_tags:
-            if isinstance(tag, dict):
-                selected_tags.append(tag.get('Product Name*', ''))
-            elif isinstance(tag, str):
-                selected_tags.append(tag)
-            else:
-                selected_tags.append(str(tag))
-        
-        # Save current state for undo (store only tag names to reduce session size)
-        undo_stack = session.get(UNDO_STACK_KEY, [])
-        undo_stack.append({
-            'available_tag_names': available_tag_names,
-            'selected_tag_names': selected_tags.copy(),
-            'action_type': action_type,
-            'timestamp': datetime.now().isoformat()
-        })
-        # Limit undo stack size to prevent session bloat
-        if len(undo_stack) > 5:
-            undo_stack = undo_stack[-5:]
-        session[UNDO_STACK_KEY] = undo_stack
-        
-        # Debug logging for undo stack
-        logging.info(f"Selection state saved - Stack size: {len(undo_stack)}, Action type: {action_type}")
-        logging.info(f"Current selected tags: {len(selected_tags)}")
-        
-        return jsonify({
-            'success': True,
-            'undo_stack_size': len(undo_stack)
+            'undo_stack_size': selection.undo_depth
         })
         
     except Exception as e:
@@ -3364,7 +2901,9 @@ def clear_filters():
         else:
             logging.info(f"Preserving selected tags from recent JSON matching ({current_time - json_match_timestamp:.1f}s ago)")
         
-        session[UNDO_STACK_KEY] = []
+        session.pop(UNDO_STACK_KEY, None)
+        session.pop(SELECTION_STATE_KEY, None)
+        get_selection_store().discard(get_current_session_id())
         excel_processor.dropdown_cache = {}
         json_matcher = get_session_json_matcher()
         json_matcher.clear_matches()
@@ -3401,13 +2940,15 @@ def get_pending_changes():
                 'entity_type': change.entity_type,
                 'timestamp': change.timestamp.isoformat(),
                 'user_id': change.user_id,
-                'details': change.details
+                'details': change.details,
+                'version': change.version
             })
         
         return jsonify({
             'success': True,
             'changes': serializable_changes,
-            'change_count': len(serializable_changes)
+            'change_count': len(serializable_changes),
+            'cursor': serializable_changes[-1]['version'] if serializable_changes else None
         })
     except Exception as e:
         logging.error(f"Error getting pending changes: {str(e)}")
@@ -3764,73 +3305,46 @@ def _validate_tags_against_excel(excel_processor, selected_tags):
     valid_selected_tags = []
     invalid_selected_tags = []
     
-    # Create case-insensitive lookup map for available product names
-    available_product_names_lower = {}
-    # Try multiple possible column names for product names
-    possible_product_name_columns = ['Product Name*', 'ProductName', 'Product Name', 'product_name']
-    product_name_column = None
-    
-    # Find the first available column
-    for col in possible_product_name_columns:
-        if excel_processor.df is not None and col in excel_processor.df.columns:
-            product_name_column = col
-            break
-    
-    if product_name_column:
-        for _, row in excel_processor.df.iterrows():
-            # Handle pandas Series objects properly
-            product_name_value = row[product_name_column]
-            if isinstance(product_name_value, pd.Series):
-                product_name = str(product_name_value.iloc[0]).strip() if len(product_name_value) > 0 else ''
-            else:
-                product_name = str(product_name_value).strip()
-            if product_name and product_name != 'nan':
-                # CRITICAL FIX: Store all products with the same name, not just the last one
-                if product_name.lower() not in available_product_names_lower:
-                    available_product_names_lower[product_name.lower()] = []
-                available_product_names_lower[product_name.lower()].append(product_name)  # Store all instances
-        
+    # Case-insensitive lookup from the processor's maintained tag index (no DataFrame scan)
+    tag_index = excel_processor.get_tag_index()
+    if tag_index.name_column:
+        available_product_names_lower = tag_index.ids_by_lowercase_name()
         logging.debug(f"Available product names count: {len(available_product_names_lower)}")
-        logging.debug(f"Sample available product names: {list(available_product_names_lower.values())[:5]}")
-        logging.debug(f"Using column: {product_name_column}")
+        logging.debug(f"Using column: {tag_index.name_column}")
     else:
+        available_product_names_lower = {}
         logging.warning(f"No product name column found. Available columns: {list(excel_processor.df.columns) if excel_processor.df is not None else 'No DataFrame'}")
     
     logging.debug(f"Validating {len(selected_tags)} selected tags against Excel data")
     for tag in selected_tags:
         tag_lower = tag.strip().lower()
+        clean_tag = tag_lower
         found_match = False  # Initialize found_match for each tag
         
-        # First try exact match
-        if tag_lower in available_product_names_lower:
-            # Use all original cases from Excel data (now a list)
-            original_case_tags = available_product_names_lower[tag_lower]
-            for original_case_tag in original_case_tags:
-                valid_selected_tags.append(original_case_tag)
-                logging.debug(f"Found exact tag '{tag}' -> using original case: '{original_case_tag}'")
-            found_match = True  # Mark as found since we found an exact match
+        # First try exact match, then the normalized name
+        tag_ids = available_product_names_lower.get(tag_lower)
+        if not tag_ids:
+            tag_id = tag_index.id_for_name(tag)
+            tag_ids = [tag_id] if tag_id is not None else []
+        if tag_ids:
+            # Use the original case from Excel data
+            valid_selected_tags.extend(tag_index.names_for(tag_ids))
+            found_match = True
         else:
             # Try partial matching - the frontend might send clean names while Excel has "Product Name by Vendor"
             
             # CRITICAL FIX: Remove vendor suffixes for better matching
             # Common patterns: "by Vendor", " - Vendor", etc.
-            import re
-            clean_tag = re.sub(r'\s*(?:by|from|-\s*)([^-]*?)(?:\s*$)', '', tag_lower)
-            clean_tag = clean_tag.strip()
-            
-            for excel_name, original_names in available_product_names_lower.items():
-                # Check if the frontend tag is contained within the Excel product name
-                if tag_lower in excel_name.lower():
-                    for original_name in original_names:
-                        valid_selected_tags.append(original_name)
-                        logging.debug(f"Found partial match '{tag}' -> contained in Excel name: '{original_name}'")
-                        found_match = True
-                # CRITICAL FIX: Also try matching with vendor suffix removed
-                elif clean_tag in excel_name.lower():
-                    for original_name in original_names:
+            clean_tag = re.sub(r'\s*(?:by|from|-\s*)([^-]*?)(?:\s*$)', '', tag_lower).strip()
+            
+            for excel_name, excel_tag_ids in available_product_names_lower.items():
+                # Check if the frontend tag is contained within the Excel product name,
+                # also with the vendor suffix removed
+                if tag_lower in excel_name or clean_tag in excel_name:
+                    for original_name in tag_index.names_for(excel_tag_ids):
                         valid_selected_tags.append(original_name)
-                        logging.debug(f"Found match with vendor suffix removed '{tag}' (cleaned: '{clean_tag}') -> Excel name: '{original_name}'")
-                        found_match = True
+                        logging.debug(f"Found partial match '{tag}' (cleaned: '{clean_tag}') -> Excel name: '{original_name}'")
+                    found_match = True
         
         if not found_match:
             invalid_selected_tags.append(tag.strip())
@@ -3979,6 +3493,674 @@ def _replace_json_tags_with_database_data(selected_tags, product_db):
         logging.error(f"Error replacing JSON tags with database data: {e}")
         return selected_tags  # Return original tags if enhancement fails
 
+def _resolve_generation_records(selected_tags_from_request, file_path=None, filters=None, template_type='vertical'):
+    """
+    Resolve the records a generation request renders: make sure inventory data is
+    loaded, pick the selected tags (request body first, then session/cache),
+    validate them and build template records from the database, falling back to
+    the Excel data.
+
+    Returns (records, None) on success or (None, (error message, HTTP status)).
+    """
+    # Enable product DB integration for proper tag matching
+    excel_processor = get_excel_processor()
+    excel_processor.enable_product_db_integration(True)
+
+    # CRITICAL FIX: Preserve JSON matched products when reloading Excel data
+    json_matched_products = None
+    if excel_processor.df is not None and not excel_processor.df.empty:
+        # Check if there are JSON matched products in the current DataFrame
+        if 'Source' in excel_processor.df.columns:
+            json_mask = excel_processor.df['Source'].astype(str).str.contains('JSON Match', case=False, na=False)
+            if json_mask.any():
+                json_matched_products = excel_processor.df[json_mask].copy()
+                logging.info(f"CRITICAL FIX: Preserving {len(json_matched_products)} JSON matched products before reloading Excel data")
+    
+    # Only load file if not already loaded
+    if file_path:
+        if excel_processor._last_loaded_file != file_path or excel_processor.df is None or excel_processor.df.empty:
+            excel_processor.load_file(file_path)
+    else:
+        # Ensure data is loaded - try to reload default file if needed
+        if excel_processor.df is None:
+            from src.core.data.excel_processor import get_default_upload_file
+            default_file = get_default_upload_file()
+            if default_file:
+                excel_processor.load_file(default_file)
+    
+    # CRITICAL FIX: Restore JSON matched products after reloading Excel data
+    if json_matched_products is not None and excel_processor.df is not None:
+        # Check if JSON products are already in the DataFrame
+        if 'Source' in excel_processor.df.columns:
+            existing_json_mask = excel_processor.df['Source'].astype(str).str.contains('JSON Match', case=False, na=False)
+            if not existing_json_mask.any():
+                # Add JSON matched products back to the DataFrame
+                excel_processor.df = pd.concat([excel_processor.df, json_matched_products], ignore_index=True)
+                logging.info(f"CRITICAL FIX: Restored {len(json_matched_products)} JSON matched products to Excel data")
+            else:
+                logging.info(f"CRITICAL FIX: JSON matched products already present in Excel data")
+        else:
+            # Add Source column and JSON products
+            excel_processor.df['Source'] = 'Excel Import'
+            excel_processor.df = pd.concat([excel_processor.df, json_matched_products], ignore_index=True)
+            logging.info(f"CRITICAL FIX: Added Source column and restored {len(json_matched_products)} JSON matched products")
+    
+    # CRITICAL FIX: Fallback - restore JSON matched products from cache if not in Excel data
+    if excel_processor.df is not None and 'Source' in excel_processor.df.columns:
+        existing_json_mask = excel_processor.df['Source'].astype(str).str.contains('JSON Match', case=False, na=False)
+        if not existing_json_mask.any():
+            # Try to restore from cache
+            json_matched_cache_key = session.get('json_matched_cache_key')
+            if json_matched_cache_key:
+                json_matched_tags = cache.get(json_matched_cache_key) or []
+                if json_matched_tags:
+                    logging.info(f"CRITICAL FIX: Restoring {len(json_matched_tags)} JSON matched products from cache")
+                    try:
+                        # Convert JSON matched tags to DataFrame format
+                        json_df_data = []
+                        for tag in json_matched_tags:
+                            if isinstance(tag, dict):
+                                # Create a row that matches Excel format
+                                # CRITICAL FIX: Use the same column names as the existing Excel data
+                                product_name = tag.get('Product Name*', tag.get('ProductName', ''))
+                                row = {
+                                    'ProductName': product_name,  # Use ProductName to match Excel data
+                                    'Product Name*': product_name,  # Also include Product Name* for compatibility
+                                    'Product Brand': tag.get('Product Brand', ''),
+                                    'Product Type*': tag.get('Product Type*', 'Edible (Solid)'),  # Database default
+                                    'Vendor/Supplier*': tag.get('Vendor/Supplier*', 'A Greener Today'),  # Database default
+                                    'Description': tag.get('Description', product_name),  # Use product name as description
+                                    'Lineage': tag.get('Lineage', 'MIXED'),  # Database default
+                                    'THC test result': tag.get('THC test result', '0.00'),  # Database default
+                                    'CBD test result': tag.get('CBD test result', '0.00'),  # Database default
+                                    'Test result unit (% or mg)': tag.get('Test result unit (% or mg)', '%'),  # Database default
+                                    'Weight*': tag.get('Weight*', '1'),  # Database default (no units in weight field)
+                                    'Units': tag.get('Units', 'g'),  # Database default units
+                                    'Price': tag.get('Price', '25.00'),  # Database default price
+                                    'Quantity*': tag.get('Quantity*', '1'),  # Database default
+                                    'Product Brand': tag.get('Product Brand', 'CERES'),  # Database default
+                                    'Product Strain': tag.get('Product Strain', 'Mixed'),  # Database default
+                                    'displayName': tag.get('displayName', product_name),
+                                    'Source': tag.get('Source', 'Database Priority (100% DB)')  # Updated source
+                                }
+                                json_df_data.append(row)
+                        
+                        if json_df_data:
+                            json_df = pd.DataFrame(json_df_data)
+                            excel_processor.df = pd.concat([excel_processor.df, json_df], ignore_index=True)
+                            logging.info(f"DATABASE PRIORITY: Successfully restored {len(json_df)} database-priority products from cache")
+                    except Exception as cache_error:
+                        logging.error(f"DATABASE PRIORITY: Error restoring database-priority products from cache: {cache_error}")
+
+    # Check if we have data in Excel processor OR database
+    has_excel_data = excel_processor.df is not None and not excel_processor.df.empty
+    has_database = False
+    
+    # If no Excel data, try to load the default inventory file
+    if not has_excel_data:
+        try:
+            default_file = "uploads/A Greener Today - Bothell_inventory_08-29-2025  8_38 PM.xlsx"
+            logging.info(f"Loading default Excel file: {default_file}")
+            excel_processor.load_file(default_file)
+            has_excel_data = excel_processor.df is not None and not excel_processor.df.empty
+            if has_excel_data:
+                logging.info(f"Successfully loaded default Excel file with {len(excel_processor.df)} records")
+            else:
+                logging.warning("Default Excel file loaded but DataFrame is empty")
+        except Exception as e:
+            logging.warning(f"Could not load default Excel file: {e}")
+    
+    # Check if database is available
+    try:
+        from src.core.data.product_database import get_product_database
+        # Store context removed - using single database
+        product_db = get_product_database()
+        if product_db:
+            # Test if database has data
+            conn = product_db._get_connection()
+            cursor = conn.cursor()
+            cursor.execute("SELECT COUNT(*) FROM products")
+            count = cursor.fetchone()[0]
+            has_database = count > 0
+            logging.info(f"Database has {count} products")
+    except Exception as e:
+        logging.warning(f"Could not check database: {e}")
+    
+    if not has_excel_data and not has_database:
+        logging.error("No data loaded in Excel processor or database")
+        return None, ('No data loaded. Please upload an Excel file or ensure database is populated.', 400)
+
+    # Apply filters early
+    filtered_df = excel_processor.apply_filters(filters) if filters else excel_processor.df
+
+    # Use cached dropdowns for UI (if needed elsewhere)
+    dropdowns = excel_processor.dropdown_cache
+
+    # Use selected tags from request body or session, this updates the processor's internal state
+    selected_tags_to_use = selected_tags_from_request
+    
+            # If no selected tags in request body, check session for JSON-matched tags
+    if not selected_tags_to_use:
+        # CRITICAL FIX: Check multiple session locations for selected tags
+        session_selected_tags = session.get('selected_tags', [])
+        json_selected_tags = session.get('json_selected_tags', [])
+        last_json_match_count = session.get('last_json_match_count', 0)
+        
+        logging.info(f"CRITICAL FIX: Session selected_tags: {len(session_selected_tags)}")
+        logging.info(f"CRITICAL FIX: Session json_selected_tags: {len(json_selected_tags)}")
+        logging.info(f"CRITICAL FIX: Last JSON match count: {last_json_match_count}")
+        
+        # CRITICAL FIX: Check cache for selected tags as primary source
+        selected_tags_cache_key = session.get('selected_tags_cache_key')
+        if selected_tags_cache_key:
+            cached_selected_tags = cache.get(selected_tags_cache_key)
+            if cached_selected_tags:
+                logging.info(f"CRITICAL FIX: Using selected tags from cache: {len(cached_selected_tags)} tags")
+                selected_tags_to_use = cached_selected_tags
+                # Restore to session and Excel processor
+                session['selected_tags'] = cached_selected_tags
+                excel_processor.selected_tags = cached_selected_tags
+        
+        # CRITICAL FIX: Check for JSON matched tags in cache as fallback
+        json_matched_cache_key = session.get('json_matched_cache_key')
+        if json_matched_cache_key:
+            json_matched_tags = cache.get(json_matched_cache_key)
+            if json_matched_tags:
+                logging.info(f"CRITICAL FIX: Found JSON matched tags in cache: {len(json_matched_tags)} tags")
+                # Extract product names from JSON matched tags
+                product_names = []
+                for tag in json_matched_tags:
+                    if isinstance(tag, dict):
+                        product_name = tag.get('Product Name*', tag.get('ProductName', ''))
+                        if product_name:
+                            product_names.append(product_name)
+                
+                if product_names:
+                    logging.info(f"CRITICAL FIX: Using {len(product_names)} product names from JSON matched tags")
+                    selected_tags_to_use = product_names
+                    # Restore to session and Excel processor
+                    session['selected_tags'] = product_names
+                    excel_processor.selected_tags = product_names
+                    logging.info(f"CRITICAL FIX: Set selected_tags_to_use to {len(product_names)} tags")
+        
+        if session_selected_tags:
+            logging.info(f"Using selected tags from session: {len(session_selected_tags)} tags")
+            selected_tags_to_use = session_selected_tags
+        elif json_selected_tags:
+            logging.info(f"Using selected tags from json_selected_tags: {len(json_selected_tags)} tags")
+            selected_tags_to_use = json_selected_tags
+            # Restore to main session location
+            session['selected_tags'] = json_selected_tags
+            excel_processor.selected_tags = json_selected_tags
+        else:
+            # Also check excel_processor.selected_tags (set by JSON matching)
+            if hasattr(excel_processor, 'selected_tags') and excel_processor.selected_tags:
+                logging.info(f"Using selected tags from excel_processor: {len(excel_processor.selected_tags)} tags")
+                selected_tags_to_use = excel_processor.selected_tags
+                # Restore to session
+                session['selected_tags'] = excel_processor.selected_tags
+    
+    if selected_tags_to_use:
+        # Normalize selected tags - convert dictionary objects to product names
+        normalized_tags = []
+        for tag in selected_tags_to_use:
+            if isinstance(tag, dict):
+                # Extract product name from dictionary
+                product_name = (tag.get('Product Name*') or 
+                              tag.get('displayName') or 
+                              tag.get('ProductName') or 
+                              str(tag))
+                if product_name and str(product_name).strip():
+                    normalized_tags.append(str(product_name).strip())
+            elif isinstance(tag, str):
+                # Already a string
+                normalized_tags.append(tag.strip())
+            else:
+                # Convert to string
+                normalized_tags.append(str(tag).strip())
+        
+        logging.info(f"Normalized {len(selected_tags_to_use)} tags to {len(normalized_tags)} product names")
+        logging.debug(f"Sample normalized tags: {normalized_tags[:3]}")
+        
+        # CRITICAL FIX: Check if these are JSON matched tags first
+        json_matched_cache_key = session.get('json_matched_cache_key')
+        is_json_matched_session = json_matched_cache_key is not None
+        
+        # Try to validate tags against database first, then fall back to Excel data
+        valid_selected_tags = []
+        invalid_selected_tags = []
+        
+        # CRITICAL FIX: For JSON matched sessions, be more lenient with validation
+        if is_json_matched_session:
+            logging.info(f"CRITICAL FIX: JSON matched session detected, using lenient validation for {len(normalized_tags)} tags")
+            # For JSON matched tags, accept all tags as valid since they were already processed
+            valid_selected_tags = normalized_tags
+            logging.info(f"CRITICAL FIX: Accepted all {len(valid_selected_tags)} JSON matched tags as valid")
+        else:
+            # First, try to check if we have database data available
+            try:
+                from src.core.data.product_database import get_product_database
+                # Store context removed - using single database
+                product_db = get_product_database()
+                if product_db:
+                    logging.info("Attempting to validate selected tags against database...")
+                    # Check if tags exist in database by trying to get them
+                    db_records = product_db.get_products_by_names(normalized_tags)
+                    if db_records:
+                        # Some or all tags were found in database
+                        found_names = []
+                        for record in db_records:
+                            if isinstance(record, dict):
+                                name = record.get('Product Name*', record.get('ProductName', ''))
+                                if name:
+                                    found_names.append(name)
+                        
+                        # Use the found names as valid tags
+                        valid_selected_tags = found_names
+                        invalid_selected_tags = [tag for tag in normalized_tags if tag not in found_names]
+                        
+                        logging.info(f"CRITICAL FIX: Found {len(valid_selected_tags)} tags in database")
+                        logging.info(f"CRITICAL FIX: {len(invalid_selected_tags)} tags not found in database")
+                        
+                        if invalid_selected_tags:
+                            logging.warning(f"CRITICAL FIX: Some tags not found in database: {invalid_selected_tags}")
+                    else:
+                        logging.warning("No database records found for selected tags, falling back to Excel validation")
+                        # Fall back to Excel validation
+                        valid_selected_tags, invalid_selected_tags = _validate_tags_against_excel(excel_processor, normalized_tags)
+                else:
+                    logging.warning("Product database not available, using Excel validation")
+                    # Fall back to Excel validation
+                    valid_selected_tags, invalid_selected_tags = _validate_tags_against_excel(excel_processor, normalized_tags)
+            except Exception as e:
+                logging.warning(f"Database validation failed, falling back to Excel validation: {e}")
+                # Fall back to Excel validation
+                valid_selected_tags, invalid_selected_tags = _validate_tags_against_excel(excel_processor, normalized_tags)
+        
+        if invalid_selected_tags:
+            logging.warning(f"Removed {len(invalid_selected_tags)} invalid tags: {invalid_selected_tags}")
+            
+            # CRITICAL FIX: If we're in a JSON matched session and have invalid tags, try to restore from cache
+            if is_json_matched_session and invalid_selected_tags:
+                logging.info(f"CRITICAL FIX: JSON matched session with invalid tags, attempting to restore from cache")
+                json_matched_cache_key = session.get('json_matched_cache_key')
+                if json_matched_cache_key:
+                    json_matched_tags = cache.get(json_matched_cache_key)
+                    if json_matched_tags:
+                        # Extract product names from JSON matched tags
+                        cache_product_names = []
+                        for tag in json_matched_tags:
+                            if isinstance(tag, dict):
+                                product_name = tag.get('Product Name*', tag.get('ProductName', ''))
+                                if product_name:
+                                    cache_product_names.append(product_name)
+                        
+                        # Add any missing tags from cache
+                        for invalid_tag in invalid_selected_tags:
+                            if invalid_tag in cache_product_names:
+                                valid_selected_tags.append(invalid_tag)
+                                logging.info(f"CRITICAL FIX: Restored invalid tag '{invalid_tag}' from JSON matched cache")
+                        
+                        # Remove from invalid list
+                        invalid_selected_tags = [tag for tag in invalid_selected_tags if tag not in valid_selected_tags]
+                        logging.info(f"CRITICAL FIX: After cache restoration: {len(valid_selected_tags)} valid, {len(invalid_selected_tags)} invalid")
+            
+            if not valid_selected_tags:
+                return None, (f'No valid tags selected. All selected tags ({len(invalid_selected_tags)}) do not exist in the loaded data. Please ensure you have selected tags that exist in the current Excel file or database.', 400)
+        
+        # Store the valid tags in both the Excel processor and session for persistence
+        excel_processor.selected_tags = valid_selected_tags
+        session['selected_tags'] = valid_selected_tags
+        session.modified = True
+        
+        logging.info(f"✅ Successfully validated and stored {len(valid_selected_tags)} tags")
+        logging.debug(f"Updated excel_processor.selected_tags: {excel_processor.selected_tags}")
+        logging.debug(f"Updated session['selected_tags']: {session['selected_tags']}")
+    else:
+        logging.warning("No selected_tags provided in request body or session")
+        return None, ('No tags selected. Please select at least one tag before generating labels.', 400)
+    
+    # PRIORITY: Use database data when available, fall back to Excel data
+    records = []
+    
+    # First, try to get records from database (preferred source)
+    if has_database:
+        logging.info("Using database for record generation (preferred source)")
+        try:
+            from src.core.data.product_database import get_product_database
+            # Store context removed - using single database
+            product_db = get_product_database()
+            if product_db:
+                # ENHANCED: Replace JSON matched tags with database data
+                logging.info(f"Original valid_selected_tags: {valid_selected_tags}")
+                enhanced_tags = _replace_json_tags_with_database_data(valid_selected_tags, product_db)
+                logging.info(f"Enhanced {len(valid_selected_tags)} tags with database data, result: {len(enhanced_tags)} tags")
+                
+                # Get products from database using the enhanced tags
+                logging.info(f"Looking up products for enhanced tags: {enhanced_tags}")
+                db_records = product_db.get_products_by_names(enhanced_tags)
+                logging.info(f"Found {len(db_records)} database records")
+                if db_records:
+                    # Filter out products with None or empty ProductName
+                    valid_db_records = [record for record in db_records if record.get('Product Name*') and record.get('Product Name*') != 'None']
+                    logging.info(f"Filtered {len(db_records)} database records to {len(valid_db_records)} valid records")
+                    
+                    if not valid_db_records:
+                        return None, ('No valid products found in database (all products have missing ProductName)', 400)
+                    
+                    # Convert database records to the format expected by TemplateProcessor
+                    records = []
+                    for db_record in valid_db_records:
+                        logging.info(f"Processing database record: {db_record.get('Product Name*', '')} - Units: {db_record.get('Units', 'MISSING')}, Weight: {db_record.get('Weight*', 'MISSING')}")
+                        
+                        # CRITICAL FIX: Use process_database_product_for_api to ensure consistent DescAndWeight creation
+                        processed_record = process_database_product_for_api(db_record)
+                        
+                        # Map database fields to template fields (using correct field names from database)
+                        record = {
+                            'Product Name*': processed_record.get('Product Name*', ''),
+                            'ProductName': processed_record.get('Product Name*', ''),  # Add ProductName for Excel processor compatibility
+                            'ProductType': processed_record.get('Product Type*', ''),
+                            'Lineage': processed_record.get('Lineage', 'MIXED'),
+                            'ProductBrand': processed_record.get('Product Brand', ''),
+                            'Product Brand': processed_record.get('Product Brand', ''),  # Add Product Brand for template processor compatibility
+                            'Vendor': processed_record.get('Vendor/Supplier*', ''),
+                            'Product Strain': processed_record.get('Product Strain', ''),  # Correct field name
+                            'ProductStrain': processed_record.get('Product Strain', ''),  # Add ProductStrain for template processor compatibility
+                            'Price': processed_record.get('Price', '25'),  # Default price if missing
+                            'DOH': processed_record.get('DOH', ''),
+                            'Ratio': processed_record.get('Ratio', ''),
+                            'Weight*': processed_record.get('Weight*', '1'),  # Default weight if missing
+                            'Units': processed_record.get('Units', 'g'),  # Default units if missing
+                            'WeightUnits': processed_record.get('CombinedWeight', f"{processed_record.get('Weight*', '1')}{processed_record.get('Units', 'g')}"),  # Use processed CombinedWeight
+                            'CombinedWeight': processed_record.get('CombinedWeight', f"{processed_record.get('Weight*', '1')}{processed_record.get('Units', 'g')}"),  # Use processed CombinedWeight
+                            # CRITICAL FIX: Use processed DescAndWeight from process_database_product_for_api
+                            'Description': processed_record.get('DescAndWeight', processed_record.get('Product Name*', '')),  # Use processed DescAndWeight
+                            'DescAndWeight': processed_record.get('DescAndWeight', f"{processed_record.get('Product Name*', '')} - {processed_record.get('CombinedWeight', '1g')}"),  # Use processed DescAndWeight
+                            'THC test result': processed_record.get('THC test result', ''),
+                            'CBD test result': processed_record.get('CBD test result', ''),
+                            'Test result unit (% or mg)': processed_record.get('Test result unit (% or mg)', '%'),  # Default to % if missing
+                            'Quantity*': processed_record.get('Quantity*', '1'),  # Default quantity if missing
+                            'Concentrate Type': processed_record.get('Concentrate Type', ''),  # Correct field name
+                            'JointRatio': _calculate_joint_ratio_for_record(processed_record),
+                            'Ratio_or_THC_CBD': processed_record.get('Ratio_or_THC_CBD', ''),
+                            'State': processed_record.get('State', 'active'),  # Default state if missing
+                            'Is Sample? (yes/no)': processed_record.get('Is Sample? (yes/no)', 'no'),  # Default sample status
+                            'Is MJ product?(yes/no)': processed_record.get('Is MJ product?(yes/no)', 'yes'),  # Default MJ product status
+                            'Discountable? (yes/no)': processed_record.get('Discountable? (yes/no)', 'yes'),  # Default discountable status
+                            'Room*': processed_record.get('Room*', 'Default'),  # Default room if missing
+                            'Batch Number': processed_record.get('Batch Number', ''),  # Correct field name
+                            'Lot Number': processed_record.get('Lot Number', ''),  # Correct field name
+                            'Barcode*': processed_record.get('Barcode*', ''),  # Correct field name
+                            'Medical Only (Yes/No)': processed_record.get('Medical Only (Yes/No)', ''),  # Correct field name
+                            'Med Price': processed_record.get('Med Price', ''),  # Correct field name
+                            'Expiration Date(YYYY-MM-DD)': processed_record.get('Expiration Date(YYYY-MM-DD)', ''),  # Correct field name
+                            'Is Archived? (yes/no)': processed_record.get('Is Archived? (yes/no)', 'no'),  # Default archived status
+                            'THC Per Serving': processed_record.get('THC Per Serving', ''),  # Correct field name
+                            'Allergens': processed_record.get('Allergens', ''),  # Correct field name
+                            'Solvent': processed_record.get('Solvent', ''),  # Correct field name
+                            'Accepted Date': processed_record.get('Accepted Date', ''),  # Correct field name
+                            'Internal Product Identifier': processed_record.get('Internal Product Identifier', ''),  # Correct field name
+                            'Product Tags (comma separated)': processed_record.get('Product Tags (comma separated)', ''),  # Correct field name
+                            'Image URL': processed_record.get('Image URL', ''),  # Correct field name
+                            'Ingredients': processed_record.get('Ingredients', ''),  # Correct field name
+                            'Description_Complexity': processed_record.get('Description_Complexity', ''),  # Correct field name
+                            'Total THC': processed_record.get('Total THC', ''),
+                            'THCA': processed_record.get('THCA', ''),
+                            'CBDA': processed_record.get('CBDA', ''),
+                            'CBN': processed_record.get('CBN', ''),
+                            # Add missing fields for template processor compatibility
+                            'THC': processed_record.get('THC', ''),
+                            'CBD': processed_record.get('CBD', ''),
+                            'AI': processed_record.get('Total THC', ''),  # Map Total THC to AI field for template processor
+                            'AJ': processed_record.get('THCA', ''),  # Map THCA to AJ field for template processor
+                            'AK': processed_record.get('CBDA', ''),  # Map CBDA to AK field for template processor
+                            'ProductVendor': processed_record.get('Vendor/Supplier*', ''),
+                            'Quantity Received*': processed_record.get('Quantity Received*', ''),
+                            'Barcode': processed_record.get('Barcode*', ''),
+                            'Quantity': processed_record.get('Quantity*', '1')
+                        }
+                        print(f"DEBUG: Database record processed - DescAndWeight: '{record.get('DescAndWeight', '')}' (from processed: '{processed_record.get('DescAndWeight', '')}')")
+                        print(f"DEBUG: THC/CBD values - THC: '{processed_record.get('THC test result', '')}', CBD: '{processed_record.get('CBD test result', '')}', Unit: '{processed_record.get('Test result unit (% or mg)', '')}'")
+                        print(f"DEBUG: AI/AJ/AK values - AI (Total THC): '{processed_record.get('Total THC', '')}', AJ (THCA): '{processed_record.get('THCA', '')}', AK (CBDA): '{processed_record.get('CBDA', '')}'")
+                        records.append(record)
+                    logging.info(f"✅ Generated {len(records)} records from database")
+                else:
+                    logging.warning("No database records found for selected tags, falling back to Excel data")
+                    records = []
+            else:
+                logging.warning("Product database not available, falling back to Excel data")
+                records = []
+        except Exception as e:
+            logging.warning(f"Error getting records from database, falling back to Excel data: {e}")
+            records = []
+    
+    # Fallback to Excel data if database didn't provide records
+    if not records and has_excel_data:
+        logging.info("LINEAGE DEBUG: Using Excel data for record generation (fallback)")
+        records = excel_processor.get_selected_records(template_type)
+        logging.debug(f"LINEAGE DEBUG: Records returned from get_selected_records: {len(records) if records else 0}")
+        
+        # CRITICAL FIX: Log lineage values for debugging
+        if records:
+            for i, record in enumerate(records[:3]):  # Log first 3 records
+                product_name = record.get('ProductName', 'Unknown')
+                lineage = record.get('Lineage', 'NOT_FOUND')
+                logging.info(f"LINEAGE DEBUG: Record {i+1} - Product: '{product_name}', Lineage: '{lineage}'")
+        logging.debug(f"Records returned from get_selected_records: {len(records) if records else 0}")
+
+    if not records:
+        logging.error("No selected tags found in the data or failed to process records.")
+        return None, ('No selected tags found in the data or failed to process records. Please ensure you have selected tags and they exist in the loaded data.', 400)
+
+    return records, None
+
+
+def _render_label_document(template_type, records, template_settings, scale_factor=1.0):
+    """Render records into a label document of one template type; returns a BytesIO or None."""
+    # Use saved settings if available, otherwise use defaults
+    saved_scale_factor = template_settings.get('scale', scale_factor)
+    saved_font = template_settings.get('font', 'Arial')
+    saved_font_size_mode = template_settings.get('fontSizeMode', 'auto')
+    saved_field_font_sizes = template_settings.get('fieldFontSizes', {})
+    
+    # Use the already imported TemplateProcessor and get_font_scheme
+    font_scheme = get_font_scheme(template_type)
+    processor = TemplateProcessor(template_type, font_scheme, saved_scale_factor)
+    
+    # CRITICAL: For mini templates, NEVER force re-expansion as they have fixed capacity
+    if hasattr(processor, '_expand_template_if_needed') and processor.template_type != 'mini':
+        # Force re-expansion (but not for mini templates)
+        processor._expanded_template_buffer = processor._expand_template_if_needed(
+            force_expand=True
+        )
+    elif processor.template_type == 'mini':
+        # Mini templates have fixed capacity - log this for debugging
+        logging.info(f"Mini template detected - skipping forced re-expansion to maintain fixed 20-label capacity")
+    # Apply custom template settings if they exist
+    if template_settings:
+        # Apply custom font sizes if in fixed mode
+        if saved_font_size_mode == 'fixed' and saved_field_font_sizes:
+            # Update the processor's font sizing configuration
+            processor.custom_font_sizes = saved_field_font_sizes
+        
+        # Apply other settings to the processor
+        processor.custom_settings = {
+            'font_family': saved_font,
+            'line_breaks': template_settings.get('lineBreaks', True),
+            'text_wrapping': template_settings.get('textWrapping', True),
+            'bold_headers': template_settings.get('boldHeaders', False),
+            'italic_descriptions': template_settings.get('italicDescriptions', False),
+            'line_spacing': float(template_settings.get('lineSpacing', '1.0')),
+            'paragraph_spacing': int(template_settings.get('paragraphSpacing', '0')),
+            'text_color': template_settings.get('textColor', '#000000'),
+            'background_color': template_settings.get('backgroundColor', '#ffffff'),
+            'header_color': template_settings.get('headerColor', '#333333'),
+            'accent_color': template_settings.get('accentColor', '#007bff'),
+            'auto_resize': template_settings.get('autoResize', True),
+            'smart_truncation': template_settings.get('smartTruncation', True),
+            'optimization': template_settings.get('optimization', False)
+        }
+    
+    # The TemplateProcessor now handles all post-processing internally
+    final_doc = processor.process_records(records)
+    if final_doc is None:
+        return None
+
+    # Apply custom formatting based on saved settings
+    if template_settings:
+        from src.core.generation.docx_formatting import apply_custom_formatting
+        apply_custom_formatting(final_doc, template_settings)
+    else:
+        # Ensure all fonts are Arial Bold for consistency across platforms
+        from src.core.generation.docx_formatting import enforce_arial_bold_all_text
+        enforce_arial_bold_all_text(final_doc)
+    
+    # CRITICAL: Additional preroll-specific formatting enforcement
+    # This ensures preroll labels have proper bold formatting
+    from src.core.generation.docx_formatting import enforce_preroll_bold_formatting
+    enforce_preroll_bold_formatting(final_doc)
+
+    # Save the final document to a buffer
+    output_buffer = BytesIO()
+    final_doc.save(output_buffer)
+    output_buffer.seek(0)
+    return output_buffer
+
+
+def _build_label_filename(records, template_type):
+    """Descriptive download filename from the template type and the records' vendor, lineage and product type."""
+    # Build a comprehensive informative filename
+    today_str = datetime.now().strftime('%Y%m%d')
+    time_str = datetime.now().strftime('%H%M%S')
+    
+    # Get template type and tag count
+    template_display = {
+        'horizontal': 'HORIZ',
+        'vertical': 'VERT', 
+        'mini': 'MINI',
+        'double': 'DOUBLE'
+    }.get(template_type, template_type.upper())
+    
+    tag_count = len(records)
+    
+    # Get vendor information from the processed records
+    vendor_counts = {}
+    product_type_counts = {}
+    
+    # Get most common lineage from processed records
+    lineage_counts = {}
+    for record in records:
+        # Extract lineage from the wrapped marker format
+        lineage_text = record.get('Lineage', '')
+        if 'LINEAGE_START' in lineage_text and 'LINEAGE_END' in lineage_text:
+            # Extract the actual lineage value from between the markers
+            start_marker = 'LINEAGE_START'
+            end_marker = 'LINEAGE_END'
+            start_idx = lineage_text.find(start_marker) + len(start_marker)
+            end_idx = lineage_text.find(end_marker)
+            if start_idx != -1 and end_idx != -1:
+                lineage = lineage_text[start_idx:end_idx].strip().upper()
+            else:
+                lineage = 'MIXED'
+        else:
+            lineage = str(lineage_text).strip().upper()
+        
+        lineage_counts[lineage] = lineage_counts.get(lineage, 0) + 1
+    
+    main_lineage = max(lineage_counts.items(), key=lambda x: x[1])[0] if lineage_counts else 'MIXED'
+    lineage_abbr = {
+        'SATIVA': 'S',
+        'INDICA': 'I', 
+        'HYBRID': 'H',
+        'HYBRID/SATIVA': 'HS',
+        'HYBRID/INDICA': 'HI',
+        'CBD': 'CBD',
+        'MIXED': 'MIX',
+        'PARAPHERNALIA': 'PARA'
+    }.get(main_lineage, main_lineage[:3])
+    
+    # Count vendors and product types from processed records efficiently
+    for record in records:
+        # Get vendor from ProductBrand field
+        vendor = str(record.get('ProductBrand', '')).strip()
+        if vendor and vendor != 'Unknown' and vendor != '':
+            vendor_counts[vendor] = vendor_counts.get(vendor, 0) + 1
+        
+        # Get product type from ProductType field
+        product_type = str(record.get('ProductType', '')).strip()
+        if product_type and product_type != 'Unknown' and product_type != '':
+            product_type_counts[product_type] = product_type_counts.get(product_type, 0) + 1
+    
+    # Get primary vendor and product type
+    primary_vendor = max(vendor_counts.items(), key=lambda x: x[1])[0] if vendor_counts else 'Unknown'
+    primary_product_type = max(product_type_counts.items(), key=lambda x: x[1])[0] if product_type_counts else 'Unknown'
+    
+    # Clean vendor name for filename - more comprehensive sanitization
+    vendor_clean = primary_vendor.replace(' ', '_').replace('&', 'AND').replace(',', '').replace('.', '').replace('-', '_').replace('(', '').replace(')', '').replace('/', '_').replace('\\', '_').replace("'", '').replace('"', '')[:20]
+    product_type_clean = primary_product_type.replace(' ', '_').replace('(', '').replace(')', '').replace('/', '_').replace('-', '_').replace('\\', '_').replace("'", '').replace('"', '')[:15]
+    
+    # Create comprehensive filename with more details
+    if tag_count == 1:
+        tag_suffix = "tag"
+    else:
+        tag_suffix = "tags"
+        
+    # Add lineage abbreviation and product type to filename for better identification
+    # Use a descriptive format with vendor and template information
+    # For edibles, use brand instead of lineage
+    edible_types = {"edible (solid)", "edible (liquid)", "high cbd edible liquid", "tincture", "topical", "capsule"}
+    is_edible = primary_product_type.lower() in edible_types
+    
+    if is_edible:
+        # For edibles, use brand instead of lineage
+        filename = f"AGT_{vendor_clean}_{template_display}_{vendor_clean}_{product_type_clean}_{tag_count}{tag_suffix}_{today_str}_{time_str}.docx"
+    else:
+        # For non-edibles, use lineage as before
+        filename = f"AGT_{vendor_clean}_{template_display}_{lineage_abbr}_{product_type_clean}_{tag_count}{tag_suffix}_{today_str}_{time_str}.docx"
+    
+    # Ensure filename is safe for all operating systems
+    filename = sanitize_filename(filename)
+    
+    # Fallback to a simple descriptive filename if sanitization fails
+    if not filename or filename == 'None':
+        logging.warning("Filename sanitization failed, using fallback")
+        filename = f"AGT_Labels_{template_type}_{tag_count}tags_{today_str}_{time_str}.docx"
+    
+    # Log final filename for debugging
+    logging.debug(f"Generated filename: {filename} for {tag_count} tags")
+    return filename
+
+
+def _validate_output_format(data):
+    """Requested output format for a generation request; returns (format, None) or (None, (error, status))."""
+    output_format = str((data or {}).get('output_format') or 'docx').strip().lower()
+    if output_format not in OUTPUT_FORMATS:
+        return None, (f"Unknown output_format '{output_format}'. Use one of: {', '.join(OUTPUT_FORMATS)}", 400)
+    if output_format != 'docx' and not PDF_AVAILABLE:
+        return None, ('PDF output is not available on this server (LibreOffice is not installed).', 503)
+    return output_format, None
+
+
+def _converted_download_response(docx_bytes, filename, output_format):
+    """Send the PDF of a generated document, or a zip with both the .docx and the .pdf."""
+    pdf_bytes = get_pdf_converter().convert(docx_bytes, timeout=PDF_CONVERT_TIMEOUT)
+    pdf_filename = os.path.splitext(filename)[0] + '.pdf'
+    if output_format == 'pdf':
+        response = send_file(BytesIO(pdf_bytes), as_attachment=True, download_name=pdf_filename, mimetype=PDF_MIMETYPE)
+        return set_download_filename(response, pdf_filename)
+
+    import zipfile
+    zip_buffer = BytesIO()
+    with zipfile.ZipFile(zip_buffer, 'w', compression=zipfile.ZIP_STORED) as archive:
+        archive.writestr(filename, docx_bytes)
+        archive.writestr(pdf_filename, pdf_bytes)
+    zip_buffer.seek(0)
+    zip_filename = os.path.splitext(filename)[0] + '.zip'
+    response = send_file(zip_buffer, as_attachment=True, download_name=zip_filename, mimetype='application/zip')
+    return set_download_filename(response, zip_filename)
+
+
 @app.route('/api/generate', methods=['POST'])
 @performance_monitor if PERFORMANCE_ENABLED else lambda x: x
 def generate_labels():
@@ -4023,6 +4205,20 @@ def generate_labels():
         selected_tags_from_request = data.get('selected_tags', [])
         file_path = data.get('file_path')
         filters = data.get('filters', None)
+        engine = str(data.get('engine') or 'docx').strip().lower()
+        if engine not in ('docx', 'direct'):
+            return jsonify({'error': f"Unknown engine '{engine}'. Use 'docx' or 'direct'."}), 400
+        if engine == 'direct':
+            # Always a PDF, drawn without LibreOffice, so output_format does not apply
+            if not pdf_renderer.REPORTLAB_AVAILABLE:
+                return jsonify({'error': 'Direct PDF rendering is not available on this server (reportlab is not installed).'}), 503
+            if template_type not in pdf_renderer.SUPPORTED_TEMPLATES:
+                return jsonify({'error': f"Direct PDF rendering supports: {', '.join(pdf_renderer.SUPPORTED_TEMPLATES)}"}), 400
+            output_format = 'pdf'
+        else:
+            output_format, error = _validate_output_format(data)
+            if error:
+                return jsonify({'error': error[0]}), error[1]
 
         # CRITICAL: Limit the number of selected tags to prevent timeouts
         if len(selected_tags_from_request) > MAX_SELECTED_TAGS_PER_REQUEST:
@@ -4038,456 +4234,9 @@ def generate_labels():
             logging.info(f"   - Sample tags: {selected_tags_from_request[:3]}")
         logging.debug(f"Selected tags from request: {selected_tags_from_request}")
 
-        # Enable product DB integration for proper tag matching
-        excel_processor = get_excel_processor()
-        excel_processor.enable_product_db_integration(True)
-
-        # CRITICAL FIX: Preserve JSON matched products when reloading Excel data
-        json_matched_products = None
-        if excel_processor.df is not None and not excel_processor.df.empty:
-            # Check if there are JSON matched products in the current DataFrame
-            if 'Source' in excel_processor.df.columns:
-                json_mask = excel_processor.df['Source'].astype(str).str.contains('JSON Match', case=False, na=False)
-                if json_mask.any():
-                    json_matched_products = excel_processor.df[json_mask].copy()
-                    logging.info(f"CRITICAL FIX: Preserving {len(json_matched_products)} JSON matched products before reloading Excel data")
-        
-        # Only load file if not already loaded
-        if file_path:
-            if excel_processor._last_loaded_file != file_path or excel_processor.df is None or excel_processor.df.empty:
-                excel_processor.load_file(file_path)
-        else:
-            # Ensure data is loaded - try to reload default file if needed
-            if excel_processor.df is None:
-                from src.core.data.excel_processor import get_default_upload_file
-                default_file = get_default_upload_file()
-                if default_file:
-                    excel_processor.load_file(default_file)
-        
-        # CRITICAL FIX: Restore JSON matched products after reloading Excel data
-        if json_matched_products is not None and excel_processor.df is not None:
-            # Check if JSON products are already in the DataFrame
-            if 'Source' in excel_processor.df.columns:
-                existing_json_mask = excel_processor.df['Source'].astype(str).str.contains('JSON Match', case=False, na=False)
-                if not existing_json_mask.any():
-                    # Add JSON matched products back to the DataFrame
-                    excel_processor.df = pd.concat([excel_processor.df, json_matched_products], ignore_index=True)
-                    logging.info(f"CRITICAL FIX: Restored {len(json_matched_products)} JSON matched products to Excel data")
-                else:
-                    logging.info(f"CRITICAL FIX: JSON matched products already present in Excel data")
-            else:
-                # Add Source column and JSON products
-                excel_processor.df['Source'] = 'Excel Import'
-                excel_processor.df = pd.concat([excel_processor.df, json_matched_products], ignore_index=True)
-                logging.info(f"CRITICAL FIX: Added Source column and restored {len(json_matched_products)} JSON matched products")
-        
-        # CRITICAL FIX: Fallback - restore JSON matched products from cache if not in Excel data
-        if excel_processor.df is not None and 'Source' in excel_processor.df.columns:
-            existing_json_mask = excel_processor.df['Source'].astype(str).str.contains('JSON Match', case=False, na=False)
-            if not existing_json_mask.any():
-                # Try to restore from cache
-                json_matched_cache_key = session.get('json_matched_cache_key')
-                if json_matched_cache_key:
-                    json_matched_tags = cache.get(json_matched_cache_key) or []
-                    if json_matched_tags:
-                        logging.info(f"CRITICAL FIX: Restoring {len(json_matched_tags)} JSON matched products from cache")
-                        try:
-                            # Convert JSON matched tags to DataFrame format
-                            json_df_data = []
-                            for tag in json_matched_tags:
-                                if isinstance(tag, dict):
-                                    # Create a row that matches Excel format
-                                    # CRITICAL FIX: Use the same column names as the existing Excel data
-                                    product_name = tag.get('Product Name*', tag.get('ProductName', ''))
-                                    row = {
-                                        'ProductName': product_name,  # Use ProductName to match Excel data
-                                        'Product Name*': product_name,  # Also include Product Name* for compatibility
-                                        'Product Brand': tag.get('Product Brand', ''),
-                                        'Product Type*': tag.get('Product Type*', 'Edible (Solid)'),  # Database default
-                                        'Vendor/Supplier*': tag.get('Vendor/Supplier*', 'A Greener Today'),  # Database default
-                                        'Description': tag.get('Description', product_name),  # Use product name as description
-                                        'Lineage': tag.get('Lineage', 'MIXED'),  # Database default
-                                        'THC test result': tag.get('THC test result', '0.00'),  # Database default
-                                        'CBD test result': tag.get('CBD test result', '0.00'),  # Database default
-                                        'Test result unit (% or mg)': tag.get('Test result unit (% or mg)', '%'),  # Database default
-                                        'Weight*': tag.get('Weight*', '1'),  # Database default (no units in weight field)
-                                        'Units': tag.get('Units', 'g'),  # Database default units
-                                        'Price': tag.get('Price', '25.00'),  # Database default price
-                                        'Quantity*': tag.get('Quantity*', '1'),  # Database default
-                                        'Product Brand': tag.get('Product Brand', 'CERES'),  # Database default
-                                        'Product Strain': tag.get('Product Strain', 'Mixed'),  # Database default
-                                        'displayName': tag.get('displayName', product_name),
-                                        'Source': tag.get('Source', 'Database Priority (100% DB)')  # Updated source
-                                    }
-                                    json_df_data.append(row)
-                            
-                            if json_df_data:
-                                json_df = pd.DataFrame(json_df_data)
-                                excel_processor.df = pd.concat([excel_processor.df, json_df], ignore_index=True)
-                                logging.info(f"DATABASE PRIORITY: Successfully restored {len(json_df)} database-priority products from cache")
-                        except Exception as cache_error:
-                            logging.error(f"DATABASE PRIORITY: Error restoring database-priority products from cache: {cache_error}")
-
-        # Check if we have data in Excel processor OR database
-        has_excel_data = excel_processor.df is not None and not excel_processor.df.empty
-        has_database = False
-        
-        # If no Excel data, try to load the default inventory file
-        if not has_excel_data:
-            try:
-                default_file = "uploads/A Greener Today - Bothell_inventory_08-29-2025  8_38 PM.xlsx"
-                logging.info(f"Loading default Excel file: {default_file}")
-                excel_processor.load_file(default_file)
-                has_excel_data = excel_processor.df is not None and not excel_processor.df.empty
-                if has_excel_data:
-                    logging.info(f"Successfully loaded default Excel file with {len(excel_processor.df)} records")
-                else:
-                    logging.warning("Default Excel file loaded but DataFrame is empty")
-            except Exception as e:
-                logging.warning(f"Could not load default Excel file: {e}")
-        
-        # Check if database is available
-        try:
-            from src.core.data.product_database import get_product_database
-            # Store context removed - using single database
-            product_db = get_product_database()
-            if product_db:
-                # Test if database has data
-                conn = product_db._get_connection()
-                cursor = conn.cursor()
-                cursor.execute("SELECT COUNT(*) FROM products")
-                count = cursor.fetchone()[0]
-                has_database = count > 0
-                logging.info(f"Database has {count} products")
-        except Exception as e:
-            logging.warning(f"Could not check database: {e}")
-        
-        if not has_excel_data and not has_database:
-            logging.error("No data loaded in Excel processor or database")
-            return jsonify({'error': 'No data loaded. Please upload an Excel file or ensure database is populated.'}), 400
-
-        # Apply filters early
-        filtered_df = excel_processor.apply_filters(filters) if filters else excel_processor.df
-
-        # Use cached dropdowns for UI (if needed elsewhere)
-        dropdowns = excel_processor.dropdown_cache
-
-        # Use selected tags from request body or session, this updates the processor's internal state
-        selected_tags_to_use = selected_tags_from_request
-        
-                # If no selected tags in request body, check session for JSON-matched tags
-        if not selected_tags_to_use:
-            # CRITICAL FIX: Check multiple session locations for selected tags
-            session_selected_tags = session.get('selected_tags', [])
-            json_selected_tags = session.get('json_selected_tags', [])
-            last_json_match_count = session.get('last_json_match_count', 0)
-            
-            logging.info(f"CRITICAL FIX: Session selected_tags: {len(session_selected_tags)}")
-            logging.info(f"CRITICAL FIX: Session json_selected_tags: {len(json_selected_tags)}")
-            logging.info(f"CRITICAL FIX: Last JSON match count: {last_json_match_count}")
-            
-            # CRITICAL FIX: Check cache for selected tags as primary source
-            selected_tags_cache_key = session.get('selected_tags_cache_key')
-            if selected_tags_cache_key:
-                cached_selected_tags = cache.get(selected_tags_cache_key)
-                if cached_selected_tags:
-                    logging.info(f"CRITICAL FIX: Using selected tags from cache: {len(cached_selected_tags)} tags")
-                    selected_tags_to_use = cached_selected_tags
-                    # Restore to session and Excel processor
-                    session['selected_tags'] = cached_selected_tags
-                    excel_processor.selected_tags = cached_selected_tags
-            
-            # CRITICAL FIX: Check for JSON matched tags in cache as fallback
-            json_matched_cache_key = session.get('json_matched_cache_key')
-            if json_matched_cache_key:
-                json_matched_tags = cache.get(json_matched_cache_key)
-                if json_matched_tags:
-                    logging.info(f"CRITICAL FIX: Found JSON matched tags in cache: {len(json_matched_tags)} tags")
-                    # Extract product names from JSON matched tags
-                    product_names = []
-                    for tag in json_matched_tags:
-                        if isinstance(tag, dict):
-                            product_name = tag.get('Product Name*', tag.get('ProductName', ''))
-                            if product_name:
-                                product_names.append(product_name)
-                    
-                    if product_names:
-                        logging.info(f"CRITICAL FIX: Using {len(product_names)} product names from JSON matched tags")
-                        selected_tags_to_use = product_names
-                        # Restore to session and Excel processor
-                        session['selected_tags'] = product_names
-                        excel_processor.selected_tags = product_names
-                        logging.info(f"CRITICAL FIX: Set selected_tags_to_use to {len(product_names)} tags")
-            
-            if session_selected_tags:
-                logging.info(f"Using selected tags from session: {len(session_selected_tags)} tags")
-                selected_tags_to_use = session_selected_tags
-            elif json_selected_tags:
-                logging.info(f"Using selected tags from json_selected_tags: {len(json_selected_tags)} tags")
-                selected_tags_to_use = json_selected_tags
-                # Restore to main session location
-                session['selected_tags'] = json_selected_tags
-                excel_processor.selected_tags = json_selected_tags
-            else:
-                # Also check excel_processor.selected_tags (set by JSON matching)
-                if hasattr(excel_processor, 'selected_tags') and excel_processor.selected_tags:
-                    logging.info(f"Using selected tags from excel_processor: {len(excel_processor.selected_tags)} tags")
-                    selected_tags_to_use = excel_processor.selected_tags
-                    # Restore to session
-                    session['selected_tags'] = excel_processor.selected_tags
-        
-        if selected_tags_to_use:
-            # Normalize selected tags - convert dictionary objects to product names
-            normalized_tags = []
-            for tag in selected_tags_to_use:
-                if isinstance(tag, dict):
-                    # Extract product name from dictionary
-                    product_name = (tag.get('Product Name*') or 
-                                  tag.get('displayName') or 
-                                  tag.get('ProductName') or 
-                                  str(tag))
-                    if product_name and str(product_name).strip():
-                        normalized_tags.append(str(product_name).strip())
-                elif isinstance(tag, str):
-                    # Already a string
-                    normalized_tags.append(tag.strip())
-                else:
-                    # Convert to string
-                    normalized_tags.append(str(tag).strip())
-            
-            logging.info(f"Normalized {len(selected_tags_to_use)} tags to {len(normalized_tags)} product names")
-            logging.debug(f"Sample normalized tags: {normalized_tags[:3]}")
-            
-            # CRITICAL FIX: Check if these are JSON matched tags first
-            json_matched_cache_key = session.get('json_matched_cache_key')
-            is_json_matched_session = json_matched_cache_key is not None
-            
-            # Try to validate tags against database first, then fall back to Excel data
-            valid_selected_tags = []
-            invalid_selected_tags = []
-            
-            # CRITICAL FIX: For JSON matched sessions, be more lenient with validation
-            if is_json_matched_session:
-                logging.info(f"CRITICAL FIX: JSON matched session detected, using lenient validation for {len(normalized_tags)} tags")
-                # For JSON matched tags, accept all tags as valid since they were already processed
-                valid_selected_tags = normalized_tags
-                logging.info(f"CRITICAL FIX: Accepted all {len(valid_selected_tags)} JSON matched tags as valid")
-            else:
-                # First, try to check if we have database data available
-                try:
-                    from src.core.data.product_database import get_product_database
-                    # Store context removed - using single database
-                    product_db = get_product_database()
-                    if product_db:
-                        logging.info("Attempting to validate selected tags against database...")
-                        # Check if tags exist in database by trying to get them
-                        db_records = product_db.get_products_by_names(normalized_tags)
-                        if db_records:
-                            # Some or all tags were found in database
-                            found_names = []
-                            for record in db_records:
-                                if isinstance(record, dict):
-                                    name = record.get('Product Name*', record.get('ProductName', ''))
-                                    if name:
-                                        found_names.append(name)
-                            
-                            # Use the found names as valid tags
-                            valid_selected_tags = found_names
-                            invalid_selected_tags = [tag for tag in normalized_tags if tag not in found_names]
-                            
-                            logging.info(f"CRITICAL FIX: Found {len(valid_selected_tags)} tags in database")
-                            logging.info(f"CRITICAL FIX: {len(invalid_selected_tags)} tags not found in database")
-                            
-                            if invalid_selected_tags:
-                                logging.warning(f"CRITICAL FIX: Some tags not found in database: {invalid_selected_tags}")
-                        else:
-                            logging.warning("No database records found for selected tags, falling back to Excel validation")
-                            # Fall back to Excel validation
-                            valid_selected_tags, invalid_selected_tags = _validate_tags_against_excel(excel_processor, normalized_tags)
-                    else:
-                        logging.warning("Product database not available, using Excel validation")
-                        # Fall back to Excel validation
-                        valid_selected_tags, invalid_selected_tags = _validate_tags_against_excel(excel_processor, normalized_tags)
-                except Exception as e:
-                    logging.warning(f"Database validation failed, falling back to Excel validation: {e}")
-                    # Fall back to Excel validation
-                    valid_selected_tags, invalid_selected_tags = _validate_tags_against_excel(excel_processor, normalized_tags)
-            
-            if invalid_selected_tags:
-                logging.warning(f"Removed {len(invalid_selected_tags)} invalid tags: {invalid_selected_tags}")
-                
-                # CRITICAL FIX: If we're in a JSON matched session and have invalid tags, try to restore from cache
-                if is_json_matched_session and invalid_selected_tags:
-                    logging.info(f"CRITICAL FIX: JSON matched session with invalid tags, attempting to restore from cache")
-                    json_matched_cache_key = session.get('json_matched_cache_key')
-                    if json_matched_cache_key:
-                        json_matched_tags = cache.get(json_matched_cache_key)
-                        if json_matched_tags:
-                            # Extract product names from JSON matched tags
-                            cache_product_names = []
-                            for tag in json_matched_tags:
-                                if isinstance(tag, dict):
-                                    product_name = tag.get('Product Name*', tag.get('ProductName', ''))
-                                    if product_name:
-                                        cache_product_names.append(product_name)
-                            
-                            # Add any missing tags from cache
-                            for invalid_tag in invalid_selected_tags:
-                                if invalid_tag in cache_product_names:
-                                    valid_selected_tags.append(invalid_tag)
-                                    logging.info(f"CRITICAL FIX: Restored invalid tag '{invalid_tag}' from JSON matched cache")
-                            
-                            # Remove from invalid list
-                            invalid_selected_tags = [tag for tag in invalid_selected_tags if tag not in valid_selected_tags]
-                            logging.info(f"CRITICAL FIX: After cache restoration: {len(valid_selected_tags)} valid, {len(invalid_selected_tags)} invalid")
-                
-                if not valid_selected_tags:
-                    return jsonify({'error': f'No valid tags selected. All selected tags ({len(invalid_selected_tags)}) do not exist in the loaded data. Please ensure you have selected tags that exist in the current Excel file or database.'}), 400
-            
-            # Store the valid tags in both the Excel processor and session for persistence
-            excel_processor.selected_tags = valid_selected_tags
-            session['selected_tags'] = valid_selected_tags
-            session.modified = True
-            
-            logging.info(f"✅ Successfully validated and stored {len(valid_selected_tags)} tags")
-            logging.debug(f"Updated excel_processor.selected_tags: {excel_processor.selected_tags}")
-            logging.debug(f"Updated session['selected_tags']: {session['selected_tags']}")
-        else:
-            logging.warning("No selected_tags provided in request body or session")
-            return jsonify({'error': 'No tags selected. Please select at least one tag before generating labels.'}), 400
-        
-        # PRIORITY: Use database data when available, fall back to Excel data
-        records = []
-        
-        # First, try to get records from database (preferred source)
-        if has_database:
-            logging.info("Using database for record generation (preferred source)")
-            try:
-                from src.core.data.product_database import get_product_database
-                # Store context removed - using single database
-                product_db = get_product_database()
-                if product_db:
-                    # ENHANCED: Replace JSON matched tags with database data
-                    logging.info(f"Original valid_selected_tags: {valid_selected_tags}")
-                    enhanced_tags = _replace_json_tags_with_database_data(valid_selected_tags, product_db)
-                    logging.info(f"Enhanced {len(valid_selected_tags)} tags with database data, result: {len(enhanced_tags)} tags")
-                    
-                    # Get products from database using the enhanced tags
-                    logging.info(f"Looking up products for enhanced tags: {enhanced_tags}")
-                    db_records = product_db.get_products_by_names(enhanced_tags)
-                    logging.info(f"Found {len(db_records)} database records")
-                    if db_records:
-                        # Filter out products with None or empty ProductName
-                        valid_db_records = [record for record in db_records if record.get('Product Name*') and record.get('Product Name*') != 'None']
-                        logging.info(f"Filtered {len(db_records)} database records to {len(valid_db_records)} valid records")
-                        
-                        if not valid_db_records:
-                            return jsonify({'error': 'No valid products found in database (all products have missing ProductName)'}), 400
-                        
-                        # Convert database records to the format expected by TemplateProcessor
-                        records = []
-                        for db_record in valid_db_records:
-                            logging.info(f"Processing database record: {db_record.get('Product Name*', '')} - Units: {db_record.get('Units', 'MISSING')}, Weight: {db_record.get('Weight*', 'MISSING')}")
-                            
-                            # CRITICAL FIX: Use process_database_product_for_api to ensure consistent DescAndWeight creation
-                            processed_record = process_database_product_for_api(db_record)
-                            
-                            # Map database fields to template fields (using correct field names from database)
-                            record = {
-                                'Product Name*': processed_record.get('Product Name*', ''),
-                                'ProductName': processed_record.get('Product Name*', ''),  # Add ProductName for Excel processor compatibility
-                                'ProductType': processed_record.get('Product Type*', ''),
-                                'Lineage': processed_record.get('Lineage', 'MIXED'),
-                                'ProductBrand': processed_record.get('Product Brand', ''),
-                                'Product Brand': processed_record.get('Product Brand', ''),  # Add Product Brand for template processor compatibility
-                                'Vendor': processed_record.get('Vendor/Supplier*', ''),
-                                'Product Strain': processed_record.get('Product Strain', ''),  # Correct field name
-                                'ProductStrain': processed_record.get('Product Strain', ''),  # Add ProductStrain for template processor compatibility
-                                'Price': processed_record.get('Price', '25'),  # Default price if missing
-                                'DOH': processed_record.get('DOH', ''),
-                                'Ratio': processed_record.get('Ratio', ''),
-                                'Weight*': processed_record.get('Weight*', '1'),  # Default weight if missing
-                                'Units': processed_record.get('Units', 'g'),  # Default units if missing
-                                'WeightUnits': processed_record.get('CombinedWeight', f"{processed_record.get('Weight*', '1')}{processed_record.get('Units', 'g')}"),  # Use processed CombinedWeight
-                                'CombinedWeight': processed_record.get('CombinedWeight', f"{processed_record.get('Weight*', '1')}{processed_record.get('Units', 'g')}"),  # Use processed CombinedWeight
-                                # CRITICAL FIX: Use processed DescAndWeight from process_database_product_for_api
-                                'Description': processed_record.get('DescAndWeight', processed_record.get('Product Name*', '')),  # Use processed DescAndWeight
-                                'DescAndWeight': processed_record.get('DescAndWeight', f"{processed_record.get('Product Name*', '')} - {processed_record.get('CombinedWeight', '1g')}"),  # Use processed DescAndWeight
-                                'THC test result': processed_record.get('THC test result', ''),
-                                'CBD test result': processed_record.get('CBD test result', ''),
-                                'Test result unit (% or mg)': processed_record.get('Test result unit (% or mg)', '%'),  # Default to % if missing
-                                'Quantity*': processed_record.get('Quantity*', '1'),  # Default quantity if missing
-                                'Concentrate Type': processed_record.get('Concentrate Type', ''),  # Correct field name
-                                'JointRatio': _calculate_joint_ratio_for_record(processed_record),
-                                'Ratio_or_THC_CBD': processed_record.get('Ratio_or_THC_CBD', ''),
-                                'State': processed_record.get('State', 'active'),  # Default state if missing
-                                'Is Sample? (yes/no)': processed_record.get('Is Sample? (yes/no)', 'no'),  # Default sample status
-                                'Is MJ product?(yes/no)': processed_record.get('Is MJ product?(yes/no)', 'yes'),  # Default MJ product status
-                                'Discountable? (yes/no)': processed_record.get('Discountable? (yes/no)', 'yes'),  # Default discountable status
-                                'Room*': processed_record.get('Room*', 'Default'),  # Default room if missing
-                                'Batch Number': processed_record.get('Batch Number', ''),  # Correct field name
-                                'Lot Number': processed_record.get('Lot Number', ''),  # Correct field name
-                                'Barcode*': processed_record.get('Barcode*', ''),  # Correct field name
-                                'Medical Only (Yes/No)': processed_record.get('Medical Only (Yes/No)', ''),  # Correct field name
-                                'Med Price': processed_record.get('Med Price', ''),  # Correct field name
-                                'Expiration Date(YYYY-MM-DD)': processed_record.get('Expiration Date(YYYY-MM-DD)', ''),  # Correct field name
-                                'Is Archived? (yes/no)': processed_record.get('Is Archived? (yes/no)', 'no'),  # Default archived status
-                                'THC Per Serving': processed_record.get('THC Per Serving', ''),  # Correct field name
-                                'Allergens': processed_record.get('Allergens', ''),  # Correct field name
-                                'Solvent': processed_record.get('Solvent', ''),  # Correct field name
-                                'Accepted Date': processed_record.get('Accepted Date', ''),  # Correct field name
-                                'Internal Product Identifier': processed_record.get('Internal Product Identifier', ''),  # Correct field name
-                                'Product Tags (comma separated)': processed_record.get('Product Tags (comma separated)', ''),  # Correct field name
-                                'Image URL': processed_record.get('Image URL', ''),  # Correct field name
-                                'Ingredients': processed_record.get('Ingredients', ''),  # Correct field name
-                                'Description_Complexity': processed_record.get('Description_Complexity', ''),  # Correct field name
-                                'Total THC': processed_record.get('Total THC', ''),
-                                'THCA': processed_record.get('THCA', ''),
-                                'CBDA': processed_record.get('CBDA', ''),
-                                'CBN': processed_record.get('CBN', ''),
-                                # Add missing fields for template processor compatibility
-                                'THC': processed_record.get('THC', ''),
-                                'CBD': processed_record.get('CBD', ''),
-                                'AI': processed_record.get('Total THC', ''),  # Map Total THC to AI field for template processor
-                                'AJ': processed_record.get('THCA', ''),  # Map THCA to AJ field for template processor
-                                'AK': processed_record.get('CBDA', ''),  # Map CBDA to AK field for template processor
-                                'ProductVendor': processed_record.get('Vendor/Supplier*', ''),
-                                'Quantity Received*': processed_record.get('Quantity Received*', ''),
-                                'Barcode': processed_record.get('Barcode*', ''),
-                                'Quantity': processed_record.get('Quantity*', '1')
-                            }
-                            print(f"DEBUG: Database record processed - DescAndWeight: '{record.get('DescAndWeight', '')}' (from processed: '{processed_record.get('DescAndWeight', '')}')")
-                            print(f"DEBUG: THC/CBD values - THC: '{processed_record.get('THC test result', '')}', CBD: '{processed_record.get('CBD test result', '')}', Unit: '{processed_record.get('Test result unit (% or mg)', '')}'")
-                            print(f"DEBUG: AI/AJ/AK values - AI (Total THC): '{processed_record.get('Total THC', '')}', AJ (THCA): '{processed_record.get('THCA', '')}', AK (CBDA): '{processed_record.get('CBDA', '')}'")
-                            records.append(record)
-                        logging.info(f"✅ Generated {len(records)} records from database")
-                    else:
-                        logging.warning("No database records found for selected tags, falling back to Excel data")
-                        records = []
-                else:
-                    logging.warning("Product database not available, falling back to Excel data")
-                    records = []
-            except Exception as e:
-                logging.warning(f"Error getting records from database, falling back to Excel data: {e}")
-                records = []
-        
-        # Fallback to Excel data if database didn't provide records
-        if not records and has_excel_data:
-            logging.info("LINEAGE DEBUG: Using Excel data for record generation (fallback)")
-            records = excel_processor.get_selected_records(template_type)
-            logging.debug(f"LINEAGE DEBUG: Records returned from get_selected_records: {len(records) if records else 0}")
-            
-            # CRITICAL FIX: Log lineage values for debugging
-            if records:
-                for i, record in enumerate(records[:3]):  # Log first 3 records
-                    product_name = record.get('ProductName', 'Unknown')
-                    lineage = record.get('Lineage', 'NOT_FOUND')
-                    logging.info(f"LINEAGE DEBUG: Record {i+1} - Product: '{product_name}', Lineage: '{lineage}'")
-            logging.debug(f"Records returned from get_selected_records: {len(records) if records else 0}")
-
-        if not records:
-            logging.error("No selected tags found in the data or failed to process records.")
-            return jsonify({'error': 'No selected tags found in the data or failed to process records. Please ensure you have selected tags and they exist in the loaded data.'}), 400
+        records, error = _resolve_generation_records(selected_tags_from_request, file_path, filters, template_type)
+        if error:
+            return jsonify({'error': error[0]}), error[1]
         
         # For mini templates, log how many labels will be filled vs. left blank
         if template_type == 'mini':
@@ -4503,175 +4252,22 @@ def generate_labels():
         except Exception:
             data = {}
         request_template_settings = (data.get('templateSettings') or {}) if isinstance(data, dict) else {}
-        template_settings = {**session.get('template_settings', {}), **request_template_settings}
-        
-        # Use saved settings if available, otherwise use defaults
-        saved_scale_factor = template_settings.get('scale', scale_factor)
-        saved_font = template_settings.get('font', 'Arial')
-        saved_font_size_mode = template_settings.get('fontSizeMode', 'auto')
-        saved_field_font_sizes = template_settings.get('fieldFontSizes', {})
-        
-        # Use the already imported TemplateProcessor and get_font_scheme
-        font_scheme = get_font_scheme(template_type)
-        processor = TemplateProcessor(template_type, font_scheme, saved_scale_factor)
-        
-        # CRITICAL: For mini templates, NEVER force re-expansion as they have fixed capacity
-        if hasattr(processor, '_expand_template_if_needed') and processor.template_type != 'mini':
-            # Force re-expansion (but not for mini templates)
-            processor._expanded_template_buffer = processor._expand_template_if_needed(
-                force_expand=True
-            )
-        elif processor.template_type == 'mini':
-            # Mini templates have fixed capacity - log this for debugging
-            logging.info(f"Mini template detected - skipping forced re-expansion to maintain fixed 20-label capacity")
-        # Apply custom template settings if they exist
-        if template_settings:
-            # Apply custom font sizes if in fixed mode
-            if saved_font_size_mode == 'fixed' and saved_field_font_sizes:
-                # Update the processor's font sizing configuration
-                processor.custom_font_sizes = saved_field_font_sizes
-            
-            # Apply other settings to the processor
-            processor.custom_settings = {
-                'font_family': saved_font,
-                'line_breaks': template_settings.get('lineBreaks', True),
-                'text_wrapping': template_settings.get('textWrapping', True),
-                'bold_headers': template_settings.get('boldHeaders', False),
-                'italic_descriptions': template_settings.get('italicDescriptions', False),
-                'line_spacing': float(template_settings.get('lineSpacing', '1.0')),
-                'paragraph_spacing': int(template_settings.get('paragraphSpacing', '0')),
-                'text_color': template_settings.get('textColor', '#000000'),
-                'background_color': template_settings.get('backgroundColor', '#ffffff'),
-                'header_color': template_settings.get('headerColor', '#333333'),
-                'accent_color': template_settings.get('accentColor', '#007bff'),
-                'auto_resize': template_settings.get('autoResize', True),
-                'smart_truncation': template_settings.get('smartTruncation', True),
-                'optimization': template_settings.get('optimization', False)
-            }
-        
-        # The TemplateProcessor now handles all post-processing internally
-        final_doc = processor.process_records(records)
-        if final_doc is None:
-            return jsonify({'error': 'Failed to generate document.'}), 500
-
-        # Apply custom formatting based on saved settings
-        if template_settings:
-            from src.core.generation.docx_formatting import apply_custom_formatting
-            apply_custom_formatting(final_doc, template_settings)
-        else:
-            # Ensure all fonts are Arial Bold for consistency across platforms
-            from src.core.generation.docx_formatting import enforce_arial_bold_all_text
-            enforce_arial_bold_all_text(final_doc)
-        
-        # CRITICAL: Additional preroll-specific formatting enforcement
-        # This ensures preroll labels have proper bold formatting
-        from src.core.generation.docx_formatting import enforce_preroll_bold_formatting
-        enforce_preroll_bold_formatting(final_doc)
-
-        # Save the final document to a buffer
-        output_buffer = BytesIO()
-        final_doc.save(output_buffer)
-        output_buffer.seek(0)
-
-        # Build a comprehensive informative filename
-        today_str = datetime.now().strftime('%Y%m%d')
-        time_str = datetime.now().strftime('%H%M%S')
-        
-        # Get template type and tag count
-        template_display = {
-            'horizontal': 'HORIZ',
-            'vertical': 'VERT', 
-            'mini': 'MINI',
-            'double': 'DOUBLE'
-        }.get(template_type, template_type.upper())
-        
-        tag_count = len(records)
-        
-        # Get vendor information from the processed records
-        vendor_counts = {}
-        product_type_counts = {}
-        
-        # Get most common lineage from processed records
-        lineage_counts = {}
-        for record in records:
-            # Extract lineage from the wrapped marker format
-            lineage_text = record.get('Lineage', '')
-            if 'LINEAGE_START' in lineage_text and 'LINEAGE_END' in lineage_text:
-                # Extract the actual lineage value from between the markers
-                start_marker = 'LINEAGE_START'
-                end_marker = 'LINEAGE_END'
-                start_idx = lineage_text.find(start_marker) + len(start_marker)
-                end_idx = lineage_text.find(end_marker)
-                if start_idx != -1 and end_idx != -1:
-                    lineage = lineage_text[start_idx:end_idx].strip().upper()
-                else:
-                    lineage = 'MIXED'
-            else:
-                lineage = str(lineage_text).strip().upper()
-            
-            lineage_counts[lineage] = lineage_counts.get(lineage, 0) + 1
-        
-        main_lineage = max(lineage_counts.items(), key=lambda x: x[1])[0] if lineage_counts else 'MIXED'
-        lineage_abbr = {
-            'SATIVA': 'S',
-            'INDICA': 'I', 
-            'HYBRID': 'H',
-            'HYBRID/SATIVA': 'HS',
-            'HYBRID/INDICA': 'HI',
-            'CBD': 'CBD',
-            'MIXED': 'MIX',
-            'PARAPHERNALIA': 'PARA'
-        }.get(main_lineage, main_lineage[:3])
-        
-        # Count vendors and product types from processed records efficiently
-        for record in records:
-            # Get vendor from ProductBrand field
-            vendor = str(record.get('ProductBrand', '')).strip()
-            if vendor and vendor != 'Unknown' and vendor != '':
-                vendor_counts[vendor] = vendor_counts.get(vendor, 0) + 1
-            
-            # Get product type from ProductType field
-            product_type = str(record.get('ProductType', '')).strip()
-            if product_type and product_type != 'Unknown' and product_type != '':
-                product_type_counts[product_type] = product_type_counts.get(product_type, 0) + 1
-        
-        # Get primary vendor and product type
-        primary_vendor = max(vendor_counts.items(), key=lambda x: x[1])[0] if vendor_counts else 'Unknown'
-        primary_product_type = max(product_type_counts.items(), key=lambda x: x[1])[0] if product_type_counts else 'Unknown'
-        
-        # Clean vendor name for filename - more comprehensive sanitization
-        vendor_clean = primary_vendor.replace(' ', '_').replace('&', 'AND').replace(',', '').replace('.', '').replace('-', '_').replace('(', '').replace(')', '').replace('/', '_').replace('\\', '_').replace("'", '').replace('"', '')[:20]
-        product_type_clean = primary_product_type.replace(' ', '_').replace('(', '').replace(')', '').replace('/', '_').replace('-', '_').replace('\\', '_').replace("'", '').replace('"', '')[:15]
-        
-        # Create comprehensive filename with more details
-        if tag_count == 1:
-            tag_suffix = "tag"
-        else:
-            tag_suffix = "tags"
-            
-        # Add lineage abbreviation and product type to filename for better identification
-        # Use a descriptive format with vendor and template information
-        # For edibles, use brand instead of lineage
-        edible_types = {"edible (solid)", "edible (liquid)", "high cbd edible liquid", "tincture", "topical", "capsule"}
-        is_edible = primary_product_type.lower() in edible_types
-        
-        if is_edible:
-            # For edibles, use brand instead of lineage
-            filename = f"AGT_{vendor_clean}_{template_display}_{vendor_clean}_{product_type_clean}_{tag_count}{tag_suffix}_{today_str}_{time_str}.docx"
-        else:
-            # For non-edibles, use lineage as before
-            filename = f"AGT_{vendor_clean}_{template_display}_{lineage_abbr}_{product_type_clean}_{tag_count}{tag_suffix}_{today_str}_{time_str}.docx"
-        
-        # Ensure filename is safe for all operating systems
-        filename = sanitize_filename(filename)
-        
-        # Fallback to a simple descriptive filename if sanitization fails
-        if not filename or filename == 'None':
-            logging.warning("Filename sanitization failed, using fallback")
-            filename = f"AGT_Labels_{template_type}_{tag_count}tags_{today_str}_{time_str}.docx"
+        template_settings = {**session.get('template_settings', {}), **request_template_settings}
+
+        if engine == 'direct':
+            # Draw the labels straight to PDF, no Word document involved
+            pdf_bytes = pdf_renderer.render_labels_pdf(records, template_type, template_settings.get('scale', scale_factor))
+            filename = os.path.splitext(_build_label_filename(records, template_type))[0] + '.pdf'
+            response = send_file(BytesIO(pdf_bytes), as_attachment=True, download_name=filename, mimetype=PDF_MIMETYPE)
+            return set_download_filename(response, filename)
         
-        # Log final filename for debugging
-        logging.debug(f"Generated filename: {filename} for {tag_count} tags")
+        output_buffer = _render_label_document(template_type, records, template_settings, scale_factor)
+        if output_buffer is None:
+            return jsonify({'error': 'Failed to generate document.'}), 500
+
+        filename = _build_label_filename(records, template_type)
+        if output_format != 'docx':
+            return _converted_download_response(output_buffer.getvalue(), filename, output_format)
 
         # Create response with explicit headers
         response = send_file(
@@ -4699,6 +4295,100 @@ def generate_labels():
 
 
 
+@app.route('/api/generate-multi', methods=['POST'])
+@performance_monitor if PERFORMANCE_ENABLED else lambda x: x
+def generate_labels_multi():
+    """
+    Generate one selection in several template types as a single zip.
+
+    Records are resolved once and shared by every template type, which render
+    concurrently; zip entries follow the order of the requested types.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    import zipfile
+
+    try:
+        client_ip = request.remote_addr
+        if not check_rate_limit(client_ip):
+            logging.warning(f"Rate limit exceeded for IP: {client_ip}")
+            return jsonify({'error': 'Rate limit exceeded. Please wait before generating more labels.'}), 429
+
+        data = request.get_json(silent=True) or {}
+        requested_types = data.get('template_types') or []
+        if isinstance(requested_types, str):
+            requested_types = [requested_types]
+        template_types = list(dict.fromkeys(str(t).strip().lower() for t in requested_types if str(t).strip()))
+        unknown_types = [t for t in template_types if t not in MULTI_TEMPLATE_TYPES]
+        if not template_types:
+            return jsonify({'error': 'No template types requested. Provide template_types, e.g. ["vertical", "horizontal", "mini"].'}), 400
+        if unknown_types:
+            return jsonify({'error': f"Unknown template types: {', '.join(unknown_types)}"}), 400
+
+        output_format, error = _validate_output_format(data)
+        if error:
+            return jsonify({'error': error[0]}), error[1]
+
+        scale_factor = float(data.get('scale_factor', 1.0))
+        selected_tags_from_request = data.get('selected_tags', [])
+        if len(selected_tags_from_request) > MAX_SELECTED_TAGS_PER_REQUEST:
+            logging.warning(f"Too many tags selected ({len(selected_tags_from_request)}), limiting to {MAX_SELECTED_TAGS_PER_REQUEST}")
+            selected_tags_from_request = selected_tags_from_request[:MAX_SELECTED_TAGS_PER_REQUEST]
+
+        logging.info(f"Multi-template generation request: {template_types}, {len(selected_tags_from_request)} tags")
+
+        records, error = _resolve_generation_records(
+            selected_tags_from_request, data.get('file_path'), data.get('filters'), template_types[0]
+        )
+        if error:
+            return jsonify({'error': error[0]}), error[1]
+
+        request_template_settings = data.get('templateSettings') or {}
+        template_settings = {**session.get('template_settings', {}), **request_template_settings}
+
+        def render(template_type):
+            # Each render gets its own record dicts so no template can leak changes into another
+            start = time.perf_counter()
+            buffer = _render_label_document(template_type, [dict(r) for r in records], template_settings, scale_factor)
+            logging.info(f"Rendered {template_type} labels in {time.perf_counter() - start:.2f}s")
+            return buffer
+
+        workers = max(1, min(MAX_MULTI_TEMPLATE_WORKERS, len(template_types)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='label-render') as executor:
+            buffers = list(executor.map(render, template_types))
+
+        failed = [t for t, buffer in zip(template_types, buffers) if buffer is None]
+        if failed:
+            return jsonify({'error': f"Failed to generate document for: {', '.join(failed)}"}), 500
+
+        # Queue every PDF conversion up front so they run side by side in the converter pool
+        pdf_futures = [get_pdf_converter().submit(buffer.getvalue()) for buffer in buffers] if output_format != 'docx' else []
+
+        zip_buffer = BytesIO()
+        # Word documents and PDFs are already compressed, so entries are stored as-is
+        with zipfile.ZipFile(zip_buffer, 'w', compression=zipfile.ZIP_STORED) as archive:
+            used_names = set()
+            for index, (template_type, buffer) in enumerate(zip(template_types, buffers)):
+                entry_name = _build_label_filename(records, template_type)
+                if entry_name in used_names:
+                    entry_name = f"{template_type}_{entry_name}"
+                used_names.add(entry_name)
+                if output_format in ('docx', 'both'):
+                    archive.writestr(entry_name, buffer.getvalue())
+                if output_format in ('pdf', 'both'):
+                    archive.writestr(os.path.splitext(entry_name)[0] + '.pdf', pdf_futures[index].result(timeout=PDF_CONVERT_TIMEOUT))
+        zip_buffer.seek(0)
+
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        filename = sanitize_filename(f"AGT_Labels_{'_'.join(t.upper() for t in template_types)}_{len(records)}tags_{timestamp}.zip")
+        response = send_file(zip_buffer, as_attachment=True, download_name=filename, mimetype='application/zip')
+        return set_download_filename(response, filename)
+
+    except Exception as e:
+        logging.error(f"Error during multi-template label generation: {str(e)}")
+        logging.error(traceback.format_exc())
+        return jsonify({'error': f'An unexpected error occurred: {str(e)}'}), 500
+
+
 # Batch generation endpoint for large tag sets
 @app.route('/api/generate-batch', methods=['POST'])
 def generate_labels_batch():
@@ -4797,6 +4487,24 @@ def process_record(row, template_type, excel_processor):
             'Product Strain': ''
         }
 
+def _process_record_value(value):
+    # process_record's cleanup for one cell
+    if pd.isna(value):
+        return ''
+    if isinstance(value, (int, float, np.number, np.bool_)):
+        return str(value)
+    return value
+
+def process_records_frame(df):
+    """process_record applied to every row of df, column by column instead of through iterrows."""
+    output = pd.DataFrame(index=df.index)
+    for col in df.columns:
+        output[col] = df[col].astype(object).map(_process_record_value)
+    for field in ['Product Name*', 'ProductType', 'Lineage', 'ProductBrand', 'Vendor', 'Product Strain']:
+        if field not in output.columns:
+            output[field] = ''
+    return output.reset_index(drop=True)
+
 @app.route('/api/download-transformed-excel', methods=['POST'])
 def download_transformed_excel():
     """Generate and return an Excel file containing the processed records."""
@@ -4823,52 +4531,29 @@ def download_transformed_excel():
         if not product_name_column:
             return jsonify({'error': 'No product name column found in data'}), 400
         
-        filtered_df = excel_processor.df[excel_processor.df[product_name_column].isin(selected_tags)]
-        processed_records = []
-        for _, row in filtered_df.iterrows():
-            processed_records.append(process_record(row, data.get('template_type', ''), get_excel_processor()))
-        
-        output_df = pd.DataFrame(processed_records)
-        output_stream = BytesIO()
-        output_df.to_excel(output_stream, index=False)
-        output_stream.seek(0)
+        base_df = excel_processor.df
+        positions = np.flatnonzero(base_df[product_name_column].isin(selected_tags).to_numpy(dtype=bool))
+        # Same values as process_record on every row, converted a column at a time
+        output_df = process_records_frame(base_df.take(positions)[display_columns(base_df)])
+        fmt = export_format(data.get('format'))
         
         # Get vendor information for filename
-        vendor_counts = {}
-        # Try multiple possible column names for vendor
         vendor_column = None
         possible_vendor_columns = ['Vendor', 'ProductBrand', 'Brand', 'vendor']
         for col in possible_vendor_columns:
-            if col in filtered_df.columns:
+            if col in base_df.columns:
                 vendor_column = col
                 break
         
-        if vendor_column:
-            for _, row in filtered_df.iterrows():
-                vendor = str(row.get(vendor_column, 'Unknown')).strip()
-                if vendor and vendor != 'Unknown':
-                    vendor_counts[vendor] = vendor_counts.get(vendor, 0) + 1
-        
-        primary_vendor = max(vendor_counts.items(), key=lambda x: x[1])[0] if vendor_counts else 'Unknown'
-        vendor_clean = primary_vendor.replace(' ', '_').replace('&', 'AND').replace(',', '').replace('.', '')[:15]
+        vendors = base_df[vendor_column].take(positions) if vendor_column else pd.Series([], dtype=object)
+        vendor_clean = primary_vendor(vendors).replace(' ', '_').replace('&', 'AND').replace(',', '').replace('.', '')[:15]
         
         # Get current timestamp for filename
         today_str = datetime.now().strftime('%Y%m%d')
         time_str = datetime.now().strftime('%H%M%S')
         
-        filename = f"AGT_{vendor_clean}_Transformed_Data_{len(selected_tags)}TAGS_{today_str}_{time_str}.xlsx"
-        
-        # Create response with proper headers
-        response = send_file(
-            output_stream,
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-            as_attachment=True,
-            download_name=filename
-        )
-        
-        # Set proper download filename with headers
-        response = set_download_filename(response, filename)
-        response.headers['Content-Type'] = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+        filename_stem = f"AGT_{vendor_clean}_Transformed_Data_{len(selected_tags)}TAGS_{today_str}_{time_str}"
+        response = streamed_export_response(output_df, fmt, filename_stem)
         
         return response
         
@@ -5398,10 +5083,13 @@ def download_processed_excel():
             'strain': 'Product Strain'
         }
 
-        # Apply filters if provided
+        # Apply filters if provided. Filters narrow a row mask over the shared
+        # frame; the matching rows are taken once at the end instead of copying
+        # the whole frame up front
         excel_processor = get_excel_processor()
-        df = excel_processor.df.copy()  # Create a copy to avoid modifying the original
-        logging.debug(f"Initial DataFrame shape: {df.shape}")
+        base_df = excel_processor.df
+        mask = np.ones(len(base_df), dtype=bool)
+        logging.debug(f"Initial DataFrame shape: {base_df.shape}")
         
         if filters:
             for col, val in filters.items():
@@ -5429,75 +5117,57 @@ def download_processed_excel():
                 # Find the first available column
                 actual_col = None
                 for possible_col in possible_columns:
-                    if possible_col in df.columns:
+                    if possible_col in base_df.columns:
                         actual_col = possible_col
                         break
                 
                 if actual_col is None:
-                    logging.warning(f"Column '{df_col}' not found in DataFrame. Available columns: {list(df.columns)}")
+                    logging.warning(f"Column '{df_col}' not found in DataFrame. Available columns: {list(base_df.columns)}")
                     continue  # skip if column doesn't exist
                     
                 try:
                     if isinstance(val, list):
                         logging.debug(f"Applying list filter: {actual_col} in {val}")
-                        df = df[df[actual_col].isin(val)]
+                        mask &= base_df[actual_col].isin(val).to_numpy(dtype=bool)
                     else:
                         logging.debug(f"Applying string filter: {actual_col} == {val}")
                         # Handle potential NaN values in the column
-                        df = df[df[actual_col].astype(str).str.lower() == str(val).lower()]
+                        mask &= (base_df[actual_col].astype(str).str.lower() == str(val).lower()).to_numpy(dtype=bool)
                     
-                    logging.debug(f"After filter '{col}': DataFrame shape: {df.shape}")
+                    logging.debug(f"After filter '{col}': {int(mask.sum())} rows")
                 except Exception as filter_error:
                     logging.error(f"Error applying filter {col} ({actual_col}): {str(filter_error)}")
-                    logging.error(f"Column data type: {df[actual_col].dtype}")
-                    logging.error(f"Column sample values: {df[actual_col].head().tolist()}")
+                    logging.error(f"Column data type: {base_df[actual_col].dtype}")
+                    logging.error(f"Column sample values: {base_df[actual_col].head().tolist()}")
                     raise
 
         # Further filter by selected tags if provided
         if selected_tags:
             logging.debug(f"Filtering by selected tags: {selected_tags}")
-            if 'ProductName' not in df.columns:
-                logging.error(f"'ProductName' column not found. Available columns: {list(df.columns)}")
+            if 'ProductName' not in base_df.columns:
+                logging.error(f"'ProductName' column not found. Available columns: {list(base_df.columns)}")
                 return jsonify({'error': 'ProductName column not found in data'}), 500
-            df = df[df['ProductName'].isin(selected_tags)]
-            logging.debug(f"After tag filtering: DataFrame shape: {df.shape}")
+            mask &= base_df['ProductName'].isin(selected_tags).to_numpy(dtype=bool)
+            logging.debug(f"After tag filtering: {int(mask.sum())} rows")
 
-        if df is None or df.empty:
+        positions = np.flatnonzero(mask)
+        if not len(positions):
             return jsonify({'error': 'No data available after filtering'}), 400
 
-        # Create output buffer
-        output_buffer = BytesIO()
-        logging.debug(f"Creating Excel file with {df.shape[0]} rows and {df.shape[1]} columns")
-        df.to_excel(output_buffer, index=False, engine='openpyxl')
-        output_buffer.seek(0)
+        # Rows are written chunk by chunk from a snapshot of the shared frame
+        fmt = export_format(data.get('format'))
+        logging.debug(f"Streaming {fmt} export with {len(positions)} rows")
 
         # Generate descriptive filename with vendor and record count
         today_str = datetime.now().strftime('%Y%m%d')
         time_str = datetime.now().strftime('%H%M%S')
         
         # Get vendor information for filename
-        vendor_counts = {}
-        for _, row in df.iterrows():
-            vendor = str(row.get('Vendor', 'Unknown')).strip()
-            if vendor and vendor != 'Unknown':
-                vendor_counts[vendor] = vendor_counts.get(vendor, 0) + 1
-        
-        primary_vendor = max(vendor_counts.items(), key=lambda x: x[1])[0] if vendor_counts else 'Unknown'
-        vendor_clean = primary_vendor.replace(' ', '_').replace('&', 'AND').replace(',', '').replace('.', '')[:15]
-        
-        filename = f"AGT_{vendor_clean}_Processed_Data_{len(df)}RECORDS_{today_str}_{time_str}.xlsx"
-
-        # Create response with proper headers
-        response = send_file(
-            output_buffer,
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-            as_attachment=True,
-            download_name=filename
-        )
+        vendors = base_df['Vendor'].take(positions) if 'Vendor' in base_df.columns else pd.Series([], dtype=object)
+        vendor_clean = primary_vendor(vendors).replace(' ', '_').replace('&', 'AND').replace(',', '').replace('.', '')[:15]
         
-        # Set proper download filename with headers
-        response = set_download_filename(response, filename)
-        response.headers['Content-Type'] = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+        filename_stem = f"AGT_{vendor_clean}_Processed_Data_{len(positions)}RECORDS_{today_str}_{time_str}"
+        response = streamed_export_response(base_df, fmt, filename_stem, columns=display_columns(base_df), positions=positions)
         
         return response
     except Exception as e:
@@ -5662,102 +5332,46 @@ def batch_update_lineage():
         if excel_processor.df is None:
             return jsonify({'error': 'No data loaded'}), 400
         
-        # Track changes for logging and database updates
-        changes_made = []
-        lineage_updates_for_db = {}  # strain_name -> new_lineage for batch database update
-        
-        # Process all updates in memory first
+        # Later entries for the same tag win
+        requested = {}
         for update in lineage_updates:
             tag_name = update.get('tag_name')
             new_lineage = update.get('lineage')
-            
-            if not tag_name or not new_lineage:
-                continue
-                
-            # Find the tag in the DataFrame
-            mask = excel_processor.df['ProductName'] == tag_name
-            if not mask.any():
-                mask = excel_processor.df['Product Name*'] == tag_name
-                
-            if mask.any():
-                try:
-                    original_lineage = excel_processor.df.loc[mask, 'Lineage'].iloc[0]
-                    
-                    # Check if this is a paraphernalia product and enforce PARAPHERNALIA lineage
-                    try:
-                        product_type = excel_processor.df.loc[mask, 'Product Type*'].iloc[0]
-                        if str(product_type).strip().lower() == 'paraphernalia':
-                            # Force paraphernalia products to always have PARAPHERNALIA lineage
-                            new_lineage = 'PARAPHERNALIA'
-                            logging.info(f"Enforcing PARAPHERNALIA lineage for paraphernalia product: {tag_name}")
-                    except (IndexError, KeyError):
-                        pass  # If we can't determine product type, proceed with user's choice
-                    
-                    # Note: Only updating database, not Excel file (for performance)
-                    # Excel file is source data, database is authoritative for lineage
-                    changes_made.append({
-                        'tag_name': tag_name,
-                        'original': original_lineage,
-                        'new': new_lineage
-                    })
-                    
-                    # Get strain name for database persistence
-                    try:
-                        strain_name = excel_processor.df.loc[mask, 'Product Strain'].iloc[0]
-                        if strain_name and str(strain_name).strip():
-                            lineage_updates_for_db[strain_name] = new_lineage
-                    except (IndexError, KeyError):
-                        logging.warning(f"Could not get strain name for tag '{tag_name}'")
-                        
-                except (IndexError, KeyError):
-                    continue
+            if tag_name and new_lineage:
+                requested[tag_name] = new_lineage
+        
+        # One vectorized mask update over the current data (PARAPHERNALIA enforced per row)
+        item_results = excel_processor.apply_lineage_updates(requested)
+        changes_made = [
+            {'tag_name': r['key'], 'original': r['original'], 'new': r['new']}
+            for r in item_results if r['success']
+        ]
         
-        # Update lineages in database for persistence (ALWAYS ENABLED)
-        if lineage_updates_for_db:
+        # One DB transaction for every strain touched; tags without a strain persist under their own name
+        db_updates = [
+            {'strain_name': r['strain_name'] or r['key'], 'lineage': r['new'], 'product_name': r['key']}
+            for r in item_results if r['success']
+        ]
+        database_updated = False
+        if db_updates:
             try:
-                success = excel_processor.batch_update_lineages(lineage_updates_for_db)
-                if success:
-                    logging.info(f"Successfully persisted {len(lineage_updates_for_db)} lineage changes to database")
-                else:
-                    logging.warning(f"Some lineage changes failed to persist to database")
+                product_db = get_product_database()
+                if product_db:
+                    db_results = product_db.batch_update_lineages(db_updates, create_missing=True, sovereign=True)
+                    database_updated = all(r['success'] for r in db_results)
+                    for item, db_result in zip((r for r in item_results if r['success']), db_results):
+                        item['database_updated'] = db_result['success']
+                    logging.info(f"Persisted {sum(r['success'] for r in db_results)}/{len(db_results)} lineage changes to database")
             except Exception as db_error:
                 logging.error(f"Error persisting batch lineage changes to database: {db_error}")
         
-        # Note: Session excel processor updates removed for performance
-        # Database is authoritative source for lineage data
-        
-        # Note: Excel file saving removed for performance
-        # Database is authoritative source for lineage data
-        
-        # Force database persistence for batch lineage changes
-        try:
-            # Store context removed - using single database
-            product_db = get_product_database()
-            if product_db:
-                for change in changes_made:
-                    tag_name = change['tag_name']
-                    new_lineage = change['new']
-                    
-                    # Get product info to find strain
-                    product_info = product_db.get_product_info(tag_name)
-                    if product_info and product_info.get('strain_name'):
-                        strain_name = product_info['strain_name']
-                        # Update strain lineage in database
-                        product_db.add_or_update_strain(strain_name, new_lineage, sovereign=True)
-                        logging.info(f"Updated strain '{strain_name}' lineage to '{new_lineage}' in database")
-                    else:
-                        # If no strain found, create a new strain entry
-                        product_db.add_or_update_strain(tag_name, new_lineage, sovereign=True)
-                        logging.info(f"Created new strain '{tag_name}' with lineage '{new_lineage}' in database")
-        except Exception as db_error:
-            logging.warning(f"Failed to update database for batch lineage changes: {db_error}")
-        
         return jsonify({
             'success': True,
             'message': f'Updated {len(changes_made)} lineages in database',
             'changes': changes_made,
+            'results': item_results,
             'saved': False,  # No longer saving to Excel file
-            'database_updated': True
+            'database_updated': database_updated
         })
         
     except Exception as e:
@@ -6032,50 +5646,33 @@ def database_stats():
             logging.error(f"Database connection test failed: {test_error}")
             return jsonify({'error': f'Database connection failed: {test_error}'}), 500
         
-        # Get vendor stats for the frontend
+        # Auto-cleanup blank entries, only when products changed since the summaries were built
+        stats_tables = get_stats_tables(product_db.db_path)
+        try:
+            if not stats_tables.is_current():
+                blank_check = product_db.cleanup_blank_entries()
+                if blank_check.get('cleaned', 0) > 0:
+                    logging.info(f"Auto-cleanup removed {blank_check['cleaned']} blank entries from database")
+                    stats_tables.refresh()
+        except Exception as cleanup_error:
+            logging.warning(f"Auto-cleanup failed: {cleanup_error}")
+        
+        # Get vendor stats for the frontend from the precomputed summary tables
         vendor_stats = {}
+        staleness = None
         try:
-            import sqlite3
-            with sqlite3.connect(product_db.db_path) as conn:
-                # Get basic counts
-                cursor = conn.cursor()
-                
-                # Check if products table exists
-                cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='products'")
-                if not cursor.fetchone():
-                    logging.error("Products table does not exist in database")
-                    return jsonify({
-                        'stats': {
-                            'total_products': 0,
-                            'unique_vendors': 0,
-                            'unique_brands': 0,
-                            'unique_product_types': 0,
-                            'product_type_distribution': {}
-                        },
-                        'vendor_stats': {'vendors': [], 'brands': []},
-                        'error': 'Products table not found in database'
-                    })
-                
-                # Total products
-                cursor.execute("SELECT COUNT(*) FROM products")
-                total_products = cursor.fetchone()[0]
-                
-                # Unique vendors
-                cursor.execute("SELECT COUNT(DISTINCT \"Vendor/Supplier*\") FROM products WHERE \"Vendor/Supplier*\" IS NOT NULL AND \"Vendor/Supplier*\" != '' AND \"Vendor/Supplier*\" != 'Vendor/Supplier*'")
-                unique_vendors = cursor.fetchone()[0]
-                
-                # Unique brands
-                cursor.execute("SELECT COUNT(DISTINCT \"Product Brand\") FROM products WHERE \"Product Brand\" IS NOT NULL AND \"Product Brand\" != '' AND \"Product Brand\" != 'Product Brand'")
-                unique_brands = cursor.fetchone()[0]
-                
-                # Unique product types
-                cursor.execute("SELECT COUNT(DISTINCT \"Product Type*\") FROM products WHERE \"Product Type*\" IS NOT NULL AND \"Product Type*\" != '' AND \"Product Type*\" != 'Product Type*'")
-                unique_product_types = cursor.fetchone()[0]
-                
-                # Product type distribution
-                cursor.execute("SELECT \"Product Type*\", COUNT(*) FROM products WHERE \"Product Type*\" IS NOT NULL AND \"Product Type*\" != '' AND \"Product Type*\" != 'Product Type*' GROUP BY \"Product Type*\" ORDER BY COUNT(*) DESC LIMIT 10")
-                product_types = cursor.fetchall()
-                product_type_distribution = {pt[0]: pt[1] for pt in product_types}
+            with stats_tables.snapshot() as snapshot:
+                staleness = snapshot.staleness
+                not_vendor = {'vendor': 'Vendor/Supplier*'}
+                not_brand = {'brand': 'Product Brand'}
+                not_product_type = {'product_type': 'Product Type*'}
+                total_products = snapshot.totals().get('total_products', 0)
+                unique_vendors = snapshot.count('stats_vendors', exclude=not_vendor)
+                unique_brands = snapshot.count('stats_brands', exclude=not_brand)
+                unique_product_types = snapshot.count('stats_product_types', exclude=not_product_type)
+                product_types = snapshot.rows('stats_product_types', order_by='product_count DESC', limit=10,
+                                              exclude=not_product_type)
+                product_type_distribution = {pt['product_type']: pt['product_count'] for pt in product_types}
                 
                 stats = {
                     'total_products': total_products,
@@ -6086,36 +5683,16 @@ def database_stats():
                 }
                 
                 vendor_stats = {
-                    'vendors': [],
-                    'brands': []
+                    'vendors': [{'vendor': v['vendor'], 'product_count': v['product_count']}
+                                for v in snapshot.rows('stats_vendors', order_by='product_count DESC', limit=15,
+                                                       exclude=not_vendor)],
+                    'brands': [{'brand': b['brand'], 'product_count': b['product_count']}
+                               for b in snapshot.rows('stats_brands', order_by='product_count DESC', limit=15,
+                                                      exclude=not_brand)]
                 }
                 
-                # Get top vendors
-                cursor.execute("SELECT \"Vendor/Supplier*\", COUNT(*) as count FROM products WHERE \"Vendor/Supplier*\" IS NOT NULL AND \"Vendor/Supplier*\" != '' AND \"Vendor/Supplier*\" != 'Vendor/Supplier*' GROUP BY \"Vendor/Supplier*\" ORDER BY count DESC LIMIT 15")
-                vendors = cursor.fetchall()
-                vendor_stats['vendors'] = [{'vendor': v[0], 'product_count': v[1]} for v in vendors]
-                
-                # Get top brands
-                cursor.execute("SELECT \"Product Brand\", COUNT(*) as count FROM products WHERE \"Product Brand\" IS NOT NULL AND \"Product Brand\" != '' AND \"Product Brand\" != 'Product Brand' GROUP BY \"Product Brand\" ORDER BY count DESC LIMIT 15")
-                brands = cursor.fetchall()
-                vendor_stats['brands'] = [{'brand': b[0], 'product_count': b[1]} for b in brands]
-                
                 logging.info(f"Database stats retrieved successfully: {total_products} products, {unique_vendors} vendors, {unique_brands} brands")
                 
-                # Auto-cleanup blank entries
-                try:
-                    blank_check = product_db.cleanup_blank_entries()
-                    if blank_check.get('cleaned', 0) > 0:
-                        logging.info(f"Auto-cleanup removed {blank_check['cleaned']} blank entries from database")
-                        # Re-run stats after cleanup
-                        cursor.execute("SELECT COUNT(*) FROM products")
-                        total_products_after_cleanup = cursor.fetchone()[0]
-                        if total_products_after_cleanup != total_products:
-                            logging.info(f"Product count after cleanup: {total_products_after_cleanup} (was {total_products})")
-                            stats['total_products'] = total_products_after_cleanup
-                except Exception as cleanup_error:
-                    logging.warning(f"Auto-cleanup failed: {cleanup_error}")
-                
         except Exception as db_error:
             logging.error(f"Error querying database: {db_error}")
             logging.error(f"Database path: {product_db.db_path}")
@@ -6131,7 +5708,8 @@ def database_stats():
         
         return jsonify({
             'stats': stats,
-            'vendor_stats': vendor_stats
+            'vendor_stats': vendor_stats,
+            'staleness': staleness
         })
         
     except Exception as e:
@@ -6230,62 +5808,24 @@ def database_vendor_stats():
             logging.error(f"Database connection test failed: {test_error}")
             return jsonify({'error': f'Database connection failed: {test_error}'}), 500
         
-        with sqlite3.connect(product_db.db_path) as conn:
-            # Get all vendors with their product counts
-            vendors_df = pd.read_sql_query('''
-                SELECT "Vendor/Supplier*" as vendor, COUNT(*) as product_count, 
-                       COUNT(DISTINCT "Product Brand") as unique_brands,
-                       COUNT(DISTINCT "Product Type*") as unique_product_types
-                FROM products 
-                WHERE "Vendor/Supplier*" IS NOT NULL AND "Vendor/Supplier*" != ''
-                GROUP BY "Vendor/Supplier*"
-                ORDER BY product_count DESC
-            ''', conn)
-            
-            # Get all brands with their product counts
-            brands_df = pd.read_sql_query('''
-                SELECT "Product Brand" as brand, COUNT(*) as product_count,
-                       COUNT(DISTINCT "Vendor/Supplier*") as unique_vendors,
-                       COUNT(DISTINCT "Product Type*") as unique_product_types
-                FROM products 
-                WHERE "Product Brand" IS NOT NULL AND "Product Brand" != ''
-                GROUP BY "Product Brand"
-                ORDER BY product_count DESC
-            ''', conn)
-            
-            # Get all product types with their counts
-            product_types_df = pd.read_sql_query('''
-                SELECT "Product Type*" as product_type, COUNT(*) as product_count,
-                       COUNT(DISTINCT "Vendor/Supplier*") as unique_vendors,
-                       COUNT(DISTINCT "Product Brand") as unique_brands
-                FROM products 
-                WHERE "Product Type*" IS NOT NULL AND "Product Type*" != ''
-                GROUP BY "Product Type*"
-                ORDER BY product_count DESC
-            ''', conn)
-            
-            # Get vendor-brand combinations
-            vendor_brands_df = pd.read_sql_query('''
-                SELECT "Vendor/Supplier*" as vendor, "Product Brand" as brand, COUNT(*) as product_count,
-                       COUNT(DISTINCT "Product Type*") as unique_product_types
-                FROM products 
-                WHERE "Vendor/Supplier*" IS NOT NULL AND "Vendor/Supplier*" != '' 
-                  AND "Product Brand" IS NOT NULL AND "Product Brand" != ''
-                GROUP BY "Vendor/Supplier*", "Product Brand"
-                ORDER BY product_count DESC
-            ''', conn)
+        with get_stats_tables(product_db.db_path).snapshot() as snapshot:
+            vendors = snapshot.rows('stats_vendors', order_by='product_count DESC')
+            brands = snapshot.rows('stats_brands', order_by='product_count DESC')
+            product_types = snapshot.rows('stats_product_types', order_by='product_count DESC')
+            vendor_brands = snapshot.rows('stats_vendor_brands', order_by='product_count DESC')
             
             return jsonify({
-                'vendors': vendors_df.to_dict('records'),
-                'brands': brands_df.to_dict('records'),
-                'product_types': product_types_df.to_dict('records'),
-                'vendor_brands': vendor_brands_df.to_dict('records'),
+                'vendors': vendors,
+                'brands': brands,
+                'product_types': product_types,
+                'vendor_brands': vendor_brands,
                 'summary': {
-                    'total_vendors': len(vendors_df),
-                    'total_brands': len(brands_df),
-                    'total_product_types': len(product_types_df),
-                    'total_vendor_brand_combinations': len(vendor_brands_df)
-                }
+                    'total_vendors': len(vendors),
+                    'total_brands': len(brands),
+                    'total_product_types': len(product_types),
+                    'total_vendor_brand_combinations': len(vendor_brands)
+                },
+                'staleness': snapshot.staleness
             })
     except Exception as e:
         logging.error(f"Error getting vendor stats: {str(e)}")
@@ -6683,51 +6223,24 @@ def database_analytics():
             logging.error(f"Database connection test failed: {test_error}")
             return jsonify({'error': f'Database connection failed: {test_error}'}), 500
         
-        with sqlite3.connect(product_db.db_path) as conn:
-            # Get product type distribution
-            product_types_df = pd.read_sql_query('''
-                SELECT "Product Type*" as product_type, COUNT(*) as count
-                FROM products
-                WHERE "Product Type*" IS NOT NULL AND "Product Type*" != ''
-                GROUP BY "Product Type*"
-                ORDER BY count DESC
-            ''', conn)
-            
-            # Get lineage distribution
-            lineage_df = pd.read_sql_query('''
-                SELECT canonical_lineage, COUNT(*) as count
-                FROM strains
-                WHERE canonical_lineage IS NOT NULL AND canonical_lineage != ''
-                GROUP BY canonical_lineage
-                ORDER BY count DESC
-            ''', conn)
-            
-            # Get vendor performance
-            vendor_performance_df = pd.read_sql_query('''
-                SELECT "Vendor/Supplier*" as vendor, COUNT(*) as product_count,
-                       COUNT(DISTINCT "Product Brand") as unique_brands,
-                       COUNT(DISTINCT "Product Type*") as unique_types
-                FROM products
-                WHERE "Vendor/Supplier*" IS NOT NULL AND "Vendor/Supplier*" != ''
-                GROUP BY "Vendor/Supplier*"
-                ORDER BY product_count DESC
-                LIMIT 10
-            ''', conn)
+        with get_stats_tables(product_db.db_path).snapshot() as snapshot:
+            product_types = snapshot.rows('stats_product_types', order_by='product_count DESC')
+            lineages = snapshot.rows('stats_lineages', order_by='count DESC')
+            vendor_performance = snapshot.rows('stats_vendors', order_by='product_count DESC', limit=10)
             
-            # Get recent activity (last 30 days) - using id as proxy for recent activity
+            # Recent activity - using id as proxy for recent activity
             # Since last_seen_date column doesn't exist in this schema, use id ordering
-            recent_activity_df = pd.read_sql_query('''
-                SELECT 'Recent' as date, COUNT(*) as new_products
-                FROM products
-                WHERE id > (SELECT MAX(id) - 100 FROM products)
-            ''', conn)
+            recent_activity = [{'date': 'Recent', 'new_products': snapshot.totals().get('recent_products', 0)}]
             
             return jsonify({
-                'product_type_distribution': dict(zip(product_types_df['product_type'], product_types_df['count'])),
-                'lineage_distribution': dict(zip(lineage_df['canonical_lineage'], lineage_df['count'])),
-                'vendor_performance': vendor_performance_df.to_dict('records'),
-                'recent_activity': recent_activity_df.to_dict('records'),
-                'analytics_generated': datetime.now().isoformat()
+                'product_type_distribution': {pt['product_type']: pt['product_count'] for pt in product_types},
+                'lineage_distribution': {l['canonical_lineage']: l['count'] for l in lineages},
+                'vendor_performance': [{'vendor': v['vendor'], 'product_count': v['product_count'],
+                                        'unique_brands': v['unique_brands'], 'unique_types': v['unique_product_types']}
+                                       for v in vendor_performance],
+                'recent_activity': recent_activity,
+                'analytics_generated': datetime.now().isoformat(),
+                'staleness': snapshot.staleness
             })
     except Exception as e:
         logging.error(f"Error getting database analytics: {str(e)}")
@@ -7520,7 +7033,7 @@ def advanced_search():
 
 @app.route('/api/database-backup', methods=['POST'])
 def create_backup():
-    """Create a database backup."""
+    """Create a database backup (full, incremental, or products/strains/vendors tables)."""
     try:
         data = request.get_json()
         backup_name = data.get('backup_name', '').strip()
@@ -7530,61 +7043,30 @@ def create_backup():
         if not backup_name:
             return jsonify({'error': 'Backup name is required'}), 400
         
-        import sqlite3
-        import shutil
-        import tempfile
-        from datetime import datetime
-        
         product_db = get_product_database('AGT_Bothell')
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        backup_filename = f"{backup_name}_{timestamp}.db"
-        
-        # Create backup directory if it doesn't exist
-        backup_dir = Path("backups")
-        backup_dir.mkdir(exist_ok=True)
         
-        backup_path = backup_dir / backup_filename
-        
-        # Create backup based on type
-        if backup_type == 'full':
-            # Full database backup
-            shutil.copy2(product_db.db_path, backup_path)
-        else:
-            # Partial backup - create new database with specific tables
-            with sqlite3.connect(backup_path) as backup_conn:
-                with sqlite3.connect(product_db.db_path) as source_conn:
-                    if backup_type == 'products':
-                        backup_conn.execute('''
-                            CREATE TABLE products AS 
-                            SELECT * FROM source_conn.products
-                        ''')
-                    elif backup_type == 'strains':
-                        backup_conn.execute('''
-                            CREATE TABLE strains AS 
-                            SELECT * FROM source_conn.strains
-                        ''')
-                    elif backup_type == 'vendors':
-                        backup_conn.execute('''
-                            CREATE TABLE products AS 
-                            SELECT * FROM source_conn.products
-                        ''')
-        
-        # Compress if requested
-        if compress:
-            import gzip
-            compressed_path = backup_path.with_suffix('.db.gz')
-            with open(backup_path, 'rb') as f_in:
-                with gzip.open(compressed_path, 'wb') as f_out:
-                    shutil.copyfileobj(f_in, f_out)
-            backup_path.unlink()  # Remove uncompressed file
-            backup_path = compressed_path
+        # Paged online backup / snapshot row copy, so writers are not blocked meanwhile
+        backup = create_database_backup(
+            product_db.db_path,
+            Path("backups"),
+            sanitize_filename(backup_name),
+            backup_type=backup_type,
+            compression=resolve_backup_compression(data.get('compression'), compress),
+            since=data.get('since')
+        )
         
         return jsonify({
             'success': True,
-            'backup_path': str(backup_path),
-            'backup_size': backup_path.stat().st_size,
-            'created_at': datetime.now().isoformat()
+            'backup_path': backup['path'],
+            'backup_size': backup['size'],
+            'backup_type': backup['type'],
+            'compression': backup['compression'],
+            'since': backup.get('since'),
+            'rows': backup.get('rows'),
+            'created_at': backup['completed_at']
         })
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         logging.error(f"Error creating backup: {str(e)}")
         return jsonify({'error': str(e)}), 500
@@ -7642,23 +7124,15 @@ def optimize_database():
 def trend_analysis():
     """Get product trend analysis data."""
     try:
-        import sqlite3
-        from datetime import datetime, timedelta
+        from datetime import datetime
         
         product_db = get_product_database('AGT_Bothell')
         
-        with sqlite3.connect(product_db.db_path) as conn:
-            # Get product trends over time
-            trends_df = pd.read_sql_query('''
-                SELECT p."Product Name*" as product_name, p."Lineage" as canonical_lineage,
-                       COUNT(*) as occurrence_count,
-                       'Recent' as date
-                FROM products p
-                WHERE p.id > (SELECT MAX(id) - 50 FROM products)
-                GROUP BY p."Product Name*"
-                ORDER BY occurrence_count DESC
-                LIMIT 20
-            ''', conn)
+        with get_stats_tables(product_db.db_path).snapshot() as snapshot:
+            # Product trends over the most recent products
+            trends_df = pd.DataFrame(snapshot.rows('stats_recent_products', order_by='occurrence_count DESC'),
+                                     columns=['product_name', 'canonical_lineage', 'occurrence_count'])
+            trends_df['date'] = 'Recent'
             
             # Calculate trend metrics
             trending_products = trends_df.groupby('product_name').agg({
@@ -7672,7 +7146,8 @@ def trend_analysis():
                 'trending_products': trending_products.head(20).to_dict('records'),
                 'trend_data': trends_df.to_dict('records'),
                 'analysis_period': '90 days',
-                'generated_at': datetime.now().isoformat()
+                'generated_at': datetime.now().isoformat(),
+                'staleness': snapshot.staleness
             })
     except Exception as e:
         logging.error(f"Error analyzing trends: {str(e)}")
@@ -7709,6 +7184,7 @@ def clear_cache():
         global processing_status, processing_timestamps
         processing_status.clear()
         processing_timestamps.clear()
+        processing_stages.clear()
         logging.info("Cleared processing status")
         
         return jsonify({
@@ -7982,7 +7458,9 @@ def performance_stats():
         excel_stats = {
             'file_loaded': excel_processor.df is not None,
             'dataframe_shape': excel_processor.df.shape if excel_processor.df is not None else None,
-            'cache_size': len(excel_processor._file_cache) if hasattr(excel_processor, '_file_cache') else 0
+            'cache_size': len(excel_processor._file_cache) if hasattr(excel_processor, '_file_cache') else 0,
+            'snapshots': excel_processor._file_cache.stats() if hasattr(excel_processor._file_cache, 'stats') else None,
+            'schema': getattr(excel_processor, 'schema_report', None)
         }
         
         # Get product database stats
@@ -7990,22 +7468,16 @@ def performance_stats():
         if hasattr(excel_processor, 'get_product_db_stats'):
             product_db_stats = excel_processor.get_product_db_stats()
         
-        # Get upload processing stats with historical data
-        from datetime import datetime, timedelta
+        # Real request/stage telemetry from the in-process metrics registry
+        metrics = get_metrics_registry()
+        stage_latency = metrics.stage_latency()
+        history_limit = request.args.get('history', default=60, type=int)
+        # Measured latency of the upload routes, averaged over every upload request
+        upload_routes = [summary for route, summary in metrics.route_latency().items() if route.startswith('POST /upload')]
+        upload_requests = sum(summary['count'] for summary in upload_routes)
+        upload_response_time = (round(sum(summary['sum'] for summary in upload_routes) / upload_requests, 6)
+                                if upload_requests else None)
         
-        # Generate historical data for the last 7 days
-        historical_data = []
-        for i in range(7):
-            date = datetime.now() - timedelta(days=i)
-            historical_data.append({
-                'date': date.strftime('%Y-%m-%d'),
-                'processing_files': len([s for s in processing_status.values() if s == 'processing']),
-                'ready_files': len([s for s in processing_status.values() if s == 'ready']),
-                'error_files': len([s for s in processing_status.values() if 'error' in str(s)]),
-                'total_files': len(processing_status),
-                'memory_usage_mb': round(memory.used / (1024 * 1024), 2)
-            })
-            
         upload_stats = {
             'current': {
                 'processing_files': len([s for s in processing_status.values() if s == 'processing']),
@@ -8013,10 +7485,10 @@ def performance_stats():
                 'error_files': len([s for s in processing_status.values() if 'error' in str(s)]),
                 'total_files': len(processing_status)
             },
-            'historical': historical_data,
-            'avg_processing_time': 2.5,  # Estimated average processing time in seconds
-            'upload_response_time': 0.8,  # Estimated upload response time in seconds
-            'background_processing_time': 1.7  # Estimated background processing time
+            'historical': metrics.history(history_limit),
+            'avg_processing_time': stage_latency.get('upload_parse', {}).get('avg'),
+            'upload_response_time': upload_response_time,
+            'background_processing_time': stage_latency.get('db_upsert', {}).get('avg')
         }
         
         return jsonify({
@@ -8028,12 +7500,29 @@ def performance_stats():
             'cache': cache_info,
             'excel_processor': excel_stats,
             'product_database': product_db_stats,
-            'upload_processing': upload_stats
+            'upload_processing': upload_stats,
+            'routes': metrics.route_latency(),
+            'stages': stage_latency,
+            'counters': {
+                'cache_hits': metrics.counter_totals('cache_hits_total', 'cache'),
+                'cache_misses': metrics.counter_totals('cache_misses_total', 'cache'),
+                'db_queries': metrics.counter_totals('db_queries_total').get('total', 0)
+            }
         })
     except Exception as e:
         logging.error(f"Error getting performance stats: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Prometheus text exposition of the in-process metrics (opt-in via ENABLE_PROMETHEUS_METRICS)."""
+    if not PROMETHEUS_METRICS_ENABLED:
+        return jsonify({'error': 'Prometheus metrics endpoint is disabled'}), 404
+    return current_app.response_class(
+        get_metrics_registry().render_prometheus(),
+        mimetype='text/plain; version=0.0.4'
+    )
+
 @app.route('/api/upload-database', methods=['POST'])
 def upload_database():
     """Upload or replace the product database Excel file (alternative endpoint)."""
@@ -8389,9 +7878,7 @@ def json_debug():
         if not url:
             return jsonify({'error': 'URL is required'}), 400
             
-        import requests
-        response = requests.get(url, timeout=30)
-        payload = response.json()
+        payload = fetch_manifest(url)
         
         if isinstance(payload, list):
             json_items = payload
@@ -8502,11 +7989,7 @@ def json_match():
         
         # DEBUG: Log the actual JSON data to understand why only 6 products
         try:
-            import requests
-            response = requests.get(url, timeout=30)
-            import requests
-            response = requests.get(url, timeout=30)
-            payload = response.json()
+            payload = fetch_manifest(url)
             
             if isinstance(payload, list):
                 json_items = payload
@@ -8802,9 +8285,7 @@ def json_match_detailed():
             return jsonify({'error': 'Failed to initialize JSON matcher'}), 500
             
         # Fetch JSON items first
-        import requests
-        response = requests.get(url, timeout=30)
-        payload = response.json()
+        payload = fetch_manifest(url)
         
         if isinstance(payload, list):
             json_items = payload
@@ -9019,16 +8500,8 @@ def proxy_json():
         import requests
         import json
         
-        # Set default headers if none provided
-        if not headers:
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-                'Accept': 'application/json',
-                'Accept-Language': 'en-US,en;q=0.9',
-                'Accept-Encoding': 'gzip, deflate, br',
-                'Connection': 'keep-alive',
-                'Upgrade-Insecure-Requests': '1'
-            }
+        # Session defaults cover User-Agent/Accept; only decodable encodings are advertised
+        headers = {k: v for k, v in dict(headers or {}).items() if k.lower() != 'accept-encoding'}
         
         # Add any additional headers from the request
         if 'Authorization' in data:
@@ -9038,17 +8511,9 @@ def proxy_json():
         if 'X-Auth-Token' in data:
             headers['X-Auth-Token'] = data['X-Auth-Token']
         
-        # Fetch the JSON from the external URL with custom headers
-        response = requests.get(url, headers=headers, timeout=30)
-        response.raise_for_status()  # Raise an exception for bad status codes
-        
-        try:
-            json_data = response.json()
-            return jsonify(json_data)
-        except json.JSONDecodeError as e:
-            logging.error(f"Invalid JSON from {url}: {e}")
-            logging.error(f"Response content: {response.text[:500]}...")
-            return jsonify({'error': f'Invalid JSON from URL: {e}', 'content_preview': response.text[:200]}), 400
+        # Fetch the JSON from the external URL with custom headers (conditional GET, cached parse)
+        json_data = fetch_manifest(url, headers=headers)
+        return jsonify(json_data)
         
     except requests.exceptions.HTTPError as e:
         logging.error(f"HTTP error fetching JSON from {url}: {e.response.status_code}")
@@ -9103,7 +8568,8 @@ def debug_upload_status():
             'processing_files': [f for f, s in all_statuses.items() if s == 'processing'],
             'ready_files': [f for f, s in all_statuses.items() if s == 'ready'],
             'error_files': [f for f, s in all_statuses.items() if s.startswith('error')],
-            'excel_processor': excel_processor_info
+            'excel_processor': excel_processor_info,
+            'upload_executor': get_app_upload_executor().get_stats()
         })
         
     except Exception as e:
@@ -9208,6 +8674,7 @@ def clear_upload_status():
                     count = len(processing_status)
                     processing_status.clear()
                     processing_timestamps.clear()
+                    processing_stages.clear()
                     logging.info(f"Cleared all upload statuses ({count} files)")
                     return jsonify({'message': f'Cleared all statuses ({count} files)'})
                 
@@ -9256,6 +8723,31 @@ def set_download_filename(response, filename):
     response.headers['Expires'] = '0'
     
     return response
+
+def streamed_export_response(df, fmt, filename_stem, columns=None, positions=None):
+    """
+    Stream df (optionally only some columns and row positions) as an xlsx/csv/parquet download.
+
+    The export reads a snapshot of df taken here and is started before the
+    response: an XLSX/Parquet file is fully spooled, so failures raise to the
+    caller instead of cutting off a 200 response.
+    """
+    fmt = export_format(fmt)
+    filename = export_filename(filename_stem, fmt)
+    blocks = open_export(df, fmt, columns=columns, positions=positions)
+    response = app.response_class(
+        stream_with_context(blocks),
+        mimetype=export_mimetype(fmt)
+    )
+    response = set_download_filename(response, filename)
+    response.headers['X-Accel-Buffering'] = 'no'  # let nginx pass chunks through unbuffered
+    return response
+
+def primary_vendor(vendors):
+    """Most frequent vendor in a column of vendor names, for download filenames."""
+    vendors = vendors.astype(str).str.strip()
+    vendors = vendors[(vendors != '') & (vendors != 'Unknown')]
+    return vendors.value_counts(sort=True).index[0] if len(vendors) else 'Unknown'
 def cleanup_old_files():
     """
     Clean up old files to stay within disk limits.
@@ -9465,7 +8957,19 @@ def cleanup_status():
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
-    """Health check endpoint for monitoring system status."""
+    """Health check endpoint for monitoring system status.
+
+    Answers 503 while the worker prewarm is still running, so the proxy can
+    route around cold workers.
+    """
+    prewarm_status = get_worker_prewarm().status()
+    if not prewarm_status['ready']:
+        return jsonify({
+            'status': 'warming',
+            'ready': False,
+            'timestamp': datetime.now().isoformat(),
+            'prewarm': prewarm_status
+        }), 503
     try:
         import psutil
         import os
@@ -9519,7 +9023,9 @@ def health_check():
         
         health_status = {
             'status': 'healthy',
+            'ready': True,
             'timestamp': datetime.now().isoformat(),
+            'prewarm': prewarm_status,
             'system': {
                 'disk_usage_percent': round(disk_percent, 1),
                 'disk_free_gb': round(disk_usage.free / (1024**3), 1),
@@ -9560,6 +9066,10 @@ def health_check():
             health_status['warnings'].append(f'ExcelProcessor error: {excel_processor_error}')
             health_status['status'] = 'warning'
         
+        if prewarm_status['failed']:
+            health_status['warnings'].append(f"Prewarm stages failed: {', '.join(prewarm_status['failed'])}")
+            health_status['status'] = 'warning'
+        
         return jsonify(health_status)
         
     except Exception as e:
@@ -9648,35 +9158,11 @@ def get_initial_data():
         if hasattr(excel_processor, 'df') and excel_processor.df is not None:
             logging.info(f"Data loaded - DataFrame shape: {excel_processor.df.shape}")
             
-            # Use the same logic as filter-options to get properly formatted weight values
-            logging.info("Getting dynamic filter options...")
-            filters = excel_processor.get_dynamic_filter_options({})
-            import math
-            def clean_list(lst):
-                return ['' if (v is None or (isinstance(v, float) and math.isnan(v))) else v for v in lst]
-            filters = {k: clean_list(v) for k, v in filters.items()}
-            logging.info(f"Filter options processed: {len(filters)} filter categories")
-            
-            # Get the current file path
-            current_file = getattr(excel_processor, '_last_loaded_file', 'Unknown file')
-            logging.info(f"Current file: {current_file}")
-            
-            # Get available tags
-            logging.info("Getting available tags...")
-            available_tags = excel_processor.get_available_tags()
-            logging.info(f"Available tags count: {len(available_tags)}")
-            
-            initial_data = {
-                'success': True,
-                'data_loaded': True,  # Add this field for frontend compatibility
-                'filename': os.path.basename(current_file),
-                'filepath': current_file,
-                'columns': excel_processor.df.columns.tolist(),
-                'filters': filters,  # Use the properly formatted filters
-                'available_tags': available_tags,
-                'selected_tags': [],  # Don't restore selected tags on page reload
-                'total_records': len(excel_processor.df)
-            }
+            # Served from the tag payload cache (built by the worker prewarm or an
+            # earlier request) while the loaded data is unchanged
+            initial_data = get_cached_initial_data(_tag_payload_key(excel_processor))
+            if initial_data is None:
+                initial_data = _build_initial_data_payload(excel_processor)
             logging.info(f"Initial data loaded: {len(initial_data['available_tags'])} tags, {initial_data['total_records']} records")
             logging.info("=== INITIAL DATA REQUEST COMPLETE ===")
             return jsonify(initial_data)
@@ -9890,15 +9376,17 @@ def update_library_product():
         if product_id >= len(processor.df):
             return jsonify({'success': False, 'message': 'Product not found'})
         
-        # Update the product data
-        processor.df.at[product_id, 'ProductName'] = data.get('product_name', '')
-        processor.df.at[product_id, 'Product Brand'] = data.get('product_brand', '')
-        processor.df.at[product_id, 'Product Type*'] = data.get('product_type', '')
-        processor.df.at[product_id, 'Product Strain'] = data.get('product_strain', '')
-        processor.df.at[product_id, 'Lineage'] = data.get('lineage', '')
-        processor.df.at[product_id, 'Ratio_or_THC_CBD'] = data.get('thc_cbd', '')
-        processor.df.at[product_id, 'Price'] = data.get('price', '')
-        processor.df.at[product_id, 'Description'] = data.get('description', '')
+        # Update the product data (category columns gain any new value as a category)
+        processor.set_row_values(product_id, {
+            'ProductName': data.get('product_name', ''),
+            'Product Brand': data.get('product_brand', ''),
+            'Product Type*': data.get('product_type', ''),
+            'Product Strain': data.get('product_strain', ''),
+            'Lineage': data.get('lineage', ''),
+            'Ratio_or_THC_CBD': data.get('thc_cbd', ''),
+            'Price': data.get('price', ''),
+            'Description': data.get('description', ''),
+        })
         
         # Save the updated data
         processor.save_data()
@@ -10021,25 +9509,15 @@ def get_strain_analysis(product_id):
 
 @app.route('/api/library/export', methods=['GET'])
 def export_library_data():
-    """Export library data as CSV."""
+    """Export library data as CSV (or ?format=xlsx / parquet), streamed as it is written."""
     try:
         processor = get_excel_processor()
         if not processor or processor.df is None or processor.df.empty:
             return jsonify({'success': False, 'message': 'No data available'})
         
-        # Create CSV buffer
-        csv_buffer = BytesIO()
-        processor.df.to_csv(csv_buffer, index=False)
-        csv_buffer.seek(0)
-        
-        filename = f"product_library_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-        
-        return send_file(
-            csv_buffer,
-            mimetype='text/csv',
-            as_attachment=True,
-            download_name=filename
-        )
+        fmt = export_format(request.args.get('format'), default='csv')
+        filename_stem = f"product_library_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        return streamed_export_response(processor.df, fmt, filename_stem, columns=display_columns(processor.df))
     except Exception as e:
         logging.error(f"Error exporting library data: {e}")
         return jsonify({'success': False, 'message': str(e)})
@@ -10306,7 +9784,7 @@ def vendor_strain_browser():
         if not all(col in excel_processor.df.columns for col in required_cols):
             return jsonify({'error': 'Required columns not found in Excel data'}), 400
         
-        df = excel_processor.df.copy()
+        df = excel_processor.df  # read-only use; dropna and the masks below build new frames
         
         # Use 'Strain Names' column if available, otherwise fall back to 'Product Strain'
         strain_col = 'Strain Names' if 'Strain Names' in df.columns else 'Product Strain'
@@ -10562,71 +10040,15 @@ def bulk_update_lineage():
         if not product_db:
             return jsonify({'error': 'Product database not available'}), 500
         
-        conn = product_db._get_connection()
-        cursor = conn.cursor()
-        results = []
-        
-        for update in updates:
-            strain_name = update['strain_name']
-            lineage = update['lineage']
-            
-            try:
-                # Check if strain exists
-                cursor.execute('SELECT id FROM strains WHERE strain_name = ?', (strain_name,))
-                strain_row = cursor.fetchone()
-                
-                if not strain_row:
-                    results.append({
-                        'strain_name': strain_name,
-                        'success': False,
-                        'error': f'Strain "{strain_name}" not found'
-                    })
-                    continue
-                
-                strain_id = strain_row[0]
-                
-                # Update strain lineage in database
-                cursor.execute('''
-                    UPDATE strains 
-                    SET sovereign_lineage = ?, updated_at = CURRENT_TIMESTAMP
-                    WHERE id = ?
-                ''', (lineage, strain_id))
-                
-                # Update products in database
-                cursor.execute('''
-                    UPDATE products 
-                    SET lineage = ?, updated_at = CURRENT_TIMESTAMP
-                    WHERE strain_id = ?
-                ''', (lineage, strain_id))
-                
-                # Get product count
-                cursor.execute('SELECT COUNT(*) FROM products WHERE strain_id = ?', (strain_id,))
-                product_count = cursor.fetchone()[0]
-                
-                # Update products in excel data if available
-                if excel_processor.df is not None:
-                    mask = excel_processor.df['Product Strain'].str.strip() == strain_name.strip()
-                    excel_matches = mask.sum()
-                    if excel_matches > 0:
-                        excel_processor.df.loc[mask, 'Lineage'] = lineage
-                
-                results.append({
-                    'strain_name': strain_name,
-                    'success': True,
-                    'lineage': lineage,
-                    'products_affected': int(product_count)
-                })
-                
-                logging.info(f"Bulk update: Updated strain '{strain_name}' to lineage '{lineage}', affected {product_count} products")
-                
-            except Exception as e:
-                results.append({
-                    'strain_name': strain_name,
-                    'success': False,
-                    'error': str(e)
-                })
+        # Existing strains only; one transaction for the whole batch
+        # Like the per-strain editor this sets the sovereign lineage and leaves canonical_lineage alone
+        results = product_db.batch_update_lineages(updates, create_missing=False, sovereign=True,
+                                                   update_canonical=False)
         
-        conn.commit()
+        # Mirror successful changes into the current data with a single mask update
+        excel_updates = {r['strain_name']: r['lineage'] for r in results if r['success']}
+        if excel_updates:
+            excel_processor.apply_lineage_updates(excel_updates, by='strain')
         
         successful_updates = [r for r in results if r['success']]
         failed_updates = [r for r in results if not r['success']]
@@ -10666,7 +10088,8 @@ def generate_matched_excel_file(matched_products, original_df, output_filename=N
         # Create a new DataFrame with the same columns as the original
         if original_df is not None and not original_df.empty:
             # Use the original DataFrame's column structure
-            new_df = pd.DataFrame(columns=original_df.columns)
+            columns = display_columns(original_df)
+            rows = []
             
             # Map matched products to the DataFrame structure
             for product in matched_products:
@@ -10690,20 +10113,19 @@ def generate_matched_excel_file(matched_products, original_df, output_filename=N
                     }
                     
                     # Map each column from the original DataFrame
-                    for col in original_df.columns:
+                    for col in columns:
                         row_data[col] = ''  # Default empty value
                         
                         # Try to find matching data from the product
-                        for field_name, possible_keys in field_mapping.items():
-                            if col == field_name:
-                                for key in possible_keys:
-                                    if key in product and product[key]:
-                                        row_data[col] = str(product[key])
-                                        break
+                        for key in field_mapping.get(col, []):
+                            if key in product and product[key]:
+                                row_data[col] = str(product[key])
                                 break
                     
-                    # Add the row to the DataFrame
-                    new_df = pd.concat([new_df, pd.DataFrame([row_data])], ignore_index=True)
+                    rows.append(row_data)
+            
+            # Build the frame once instead of concatenating a row at a time
+            new_df = pd.DataFrame(rows, columns=columns)
             
             # Generate filename if not provided
             if output_filename is None:
@@ -10716,7 +10138,7 @@ def generate_matched_excel_file(matched_products, original_df, output_filename=N
             
             # Save the file
             file_path = os.path.join(uploads_dir, output_filename)
-            new_df.to_excel(file_path, index=False)
+            write_xlsx(file_path, iter_frame_chunks(new_df), list(new_df.columns))
             
             logging.info(f"Generated matched Excel file: {file_path} with {len(new_df)} rows")
             return file_path, output_filename
@@ -10727,7 +10149,7 @@ def generate_matched_excel_file(matched_products, original_df, output_filename=N
             
             # Create a basic DataFrame structure
             basic_columns = ['Product Name*', 'Product Brand', 'Vendor', 'Product Type*', 'Weight*', 'Units', 'Price*', 'Lineage', 'Strain', 'Quantity*', 'Description']
-            new_df = pd.DataFrame(columns=basic_columns)
+            rows = []
             
             # Add matched products with basic mapping
             for product in matched_products:
@@ -10745,7 +10167,8 @@ def generate_matched_excel_file(matched_products, original_df, output_filename=N
                         'Quantity*': product.get('Quantity*', product.get('quantity', '')),
                         'Description': product.get('Description', product.get('description', ''))
                     }
-                    new_df = pd.concat([new_df, pd.DataFrame([row_data])], ignore_index=True)
+                    rows.append(row_data)
+            new_df = pd.DataFrame(rows, columns=basic_columns)
             
             # Generate filename
             if output_filename is None:
@@ -10756,7 +10179,7 @@ def generate_matched_excel_file(matched_products, original_df, output_filename=N
             uploads_dir = os.path.join(os.getcwd(), 'uploads')
             os.makedirs(uploads_dir, exist_ok=True)
             file_path = os.path.join(uploads_dir, output_filename)
-            new_df.to_excel(file_path, index=False)
+            write_xlsx(file_path, iter_frame_chunks(new_df), list(new_df.columns))
             
             logging.info(f"Generated basic matched Excel file: {file_path} with {len(new_df)} rows")
             return file_path, output_filename
@@ -11087,20 +10510,11 @@ def upload_file_optimized():
             delattr(g, 'excel_processor')
             logging.info("[ULTRA-FAST] Cleared g.excel_processor context")
         
-        # Start background thread with error handling
-        try:
-            logging.info(f"[ULTRA-FAST] Starting background processing thread for {file.filename}")
-            thread = threading.Thread(target=process_excel_background, args=(file.filename, temp_path))
-            thread.daemon = True  # Make thread daemon so it doesn't block app shutdown
-            thread.start()
-            logging.info(f"[ULTRA-FAST] Background processing thread started successfully for {file.filename}")
-            
-            # Log current processing status
-            logging.info(f"[ULTRA-FAST] Current processing status after thread start: {dict(processing_status)}")
-        except Exception as thread_error:
-            logging.error(f"[ULTRA-FAST] Failed to start background thread: {thread_error}")
-            update_processing_status(file.filename, f'error: Failed to start processing')
+        # Queue for the upload process pool
+        logging.info(f"[ULTRA-FAST] Queueing background processing for {file.filename}")
+        if process_excel_background(file.filename, temp_path) is None:
             return jsonify({'error': 'Failed to start file processing'}), 500
+        logging.info(f"[ULTRA-FAST] Current processing status after queueing: {dict(processing_status)}")
         
         upload_time = time.time() - start_time
         logging.info(f"=== ULTRA-FAST UPLOAD REQUEST COMPLETE === Time: {upload_time:.2f}s")
@@ -11847,15 +11261,7 @@ def diagnose_json_matching():
         # Try to fetch and analyze JSON data
         json_analysis = {}
         try:
-            import requests
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-                'Accept': 'application/json'
-            }
-            
-            response = requests.get(url, headers=headers, timeout=30)
-            response.raise_for_status()
-            payload = response.json()
+            payload = fetch_manifest(url)
             
             # Analyze JSON structure
             if isinstance(payload, list):
@@ -12180,7 +11586,9 @@ def performance_status():
         if not PERFORMANCE_ENABLED:
             return jsonify({
                 "status": "disabled",
-                "message": "Performance optimizations not available"
+                "message": "Performance optimizations not available",
+                "template_cache": get_template_cache_stats(),
+                "pdf_converter": get_pdf_converter().stats()
             })
         
         try:
@@ -12208,7 +11616,9 @@ def performance_status():
             "cache_entries": cache_size,
             "is_production": IS_PRODUCTION,
             "chunk_size_limit": CHUNK_SIZE_LIMIT,
-            "max_processing_time": MAX_PROCESSING_TIME_PER_CHUNK
+            "max_processing_time": MAX_PROCESSING_TIME_PER_CHUNK,
+            "template_cache": get_template_cache_stats(),
+            "pdf_converter": get_pdf_converter().stats()
         })
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)})
@@ -12224,6 +11634,23 @@ def clear_performance_cache():
             return jsonify({"status": "disabled", "message": "Performance optimizations not available"})
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)})
+
+@app.route('/api/performance/imports', methods=['GET'])
+def performance_imports():
+    """Worker startup profile: per-module import times and when each lazy subsystem was loaded.
+
+    ?format=text returns the report in the `python -X importtime` layout.
+    """
+    profiler = get_import_profiler()
+    if request.args.get('format') == 'text':
+        return current_app.response_class(profiler.format_importtime(), mimetype='text/plain')
+    report = profiler.report(top=request.args.get('top', default=25, type=int))
+    report['loaded'] = {
+        name: name in sys.modules
+        for name in ('pandas', 'openpyxl', 'docx', 'docxtpl', 'docxcompose', 'PIL',
+                     'src.core.data.json_matcher', 'sklearn', 'psutil')
+    }
+    return jsonify(report)
 # Database Import/Export API endpoints for migration
 @app.route('/api/clear-database', methods=['POST'])
 def clear_database():
@@ -12563,9 +11990,7 @@ def enhanced_json_match():
             logging.info("Using enhanced JSON matching capabilities")
             
             # Fetch JSON data
-            import requests
-            response = requests.get(url, timeout=30)
-            json_data = response.json()
+            json_data = fetch_manifest(url)
             
             if isinstance(json_data, list):
                 products = json_data
@@ -12691,6 +12116,89 @@ def enhanced_json_match():
         traceback.print_exc()
         return jsonify({'error': f'Enhanced JSON matching failed: {str(e)}'}), 500
 
+@app.route('/api/json-match/stream', methods=['POST'])
+def stream_json_match():
+    """Stream enhanced JSON matches as the manifest is parsed (SSE, or NDJSON with format=ndjson)."""
+    try:
+        data = request.get_json() or {}
+        url = data.get('url', '').strip()
+        strategy = data.get('strategy', 'hybrid')
+        output_format = data.get('format', 'sse')
+        batch_size = max(1, min(int(data.get('batch_size', 25)), 500))
+
+        if not url:
+            return jsonify({'error': 'URL is required'}), 400
+        if not (url.lower().startswith('http') or url.lower().startswith('data:')):
+            return jsonify({'error': 'Please provide a valid HTTP URL or data URL'}), 400
+
+        json_matcher = get_json_matcher()
+        if json_matcher is None or not hasattr(json_matcher, 'match_products'):
+            return jsonify({'error': 'Enhanced JSON matcher not available'}), 500
+
+        from src.core.data.enhanced_json_matcher import MatchStrategy
+        from src.core.data.manifest_stream import iter_manifest_products, iter_batches
+        strategy_enum = getattr(MatchStrategy, strategy.upper(), MatchStrategy.HYBRID)
+
+        # Open before streaming so fetch errors still get a normal error response
+        manifest = get_manifest_fetcher().stream(url)
+    except Exception as e:
+        logging.error(f"Error starting streamed JSON matching: {str(e)}")
+        return jsonify({'error': f'Streamed JSON matching failed: {str(e)}'}), 500
+
+    def encode(event, payload):
+        body = json.dumps(json_matcher._to_json_safe(payload), default=str)
+        if output_format == 'ndjson':
+            return json.dumps({'event': event, 'data': json.loads(body)}) + '\n'
+        return f"event: {event}\ndata: {body}\n\n"
+
+    def generate():
+        start_time = time.perf_counter()
+        seen_names = set()
+        matched_count = 0
+        try:
+            yield encode('start', {'strategy': strategy, 'batch_size': batch_size})
+            for batch in iter_batches(iter_manifest_products(manifest), batch_size):
+                matches = json_matcher.match_products(batch, strategy=strategy_enum)
+                matched_products, match_details = [], []
+                for match in matches:
+                    name = match.match_data.get('Product Name*', match.match_data.get('ProductName', ''))
+                    if name in seen_names:
+                        continue
+                    seen_names.add(name)
+                    matched_products.append(match.match_data)
+                    match_details.append({
+                        'score': match.score,
+                        'confidence': match.confidence,
+                        'strategy': match.strategy_used.value,
+                        'factors': match.match_factors
+                    })
+                matched_count += len(matched_products)
+                yield encode('matches', {
+                    'items_processed': manifest.items_seen,
+                    'matched_count': matched_count,
+                    'matched_names': [p.get('Product Name*', p.get('ProductName', '')) for p in matched_products],
+                    'available_tags': matched_products,
+                    'match_details': match_details
+                })
+            yield encode('done', {
+                'success': True,
+                'items_processed': manifest.items_seen,
+                'matched_count': matched_count,
+                'vendor': manifest.header.get('from_license_name'),
+                'total_processing_time': time.perf_counter() - start_time
+            })
+        except Exception as e:
+            logging.error(f"Error in streamed JSON matching: {str(e)}")
+            yield encode('error', {'error': str(e), 'items_processed': manifest.items_seen})
+        finally:
+            manifest.close()
+
+    mimetype = 'application/x-ndjson' if output_format == 'ndjson' else 'text/event-stream'
+    response = app.response_class(stream_with_context(generate()), mimetype=mimetype)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # let nginx pass events through unbuffered
+    return response
+
 @app.route('/api/json-match/ai-enhanced', methods=['POST'])
 def ai_enhanced_json_match():
     """AI-enhanced JSON matching with machine learning."""
@@ -12715,9 +12223,7 @@ def ai_enhanced_json_match():
             return jsonify({'error': 'No database products available for matching'}), 500
             
         # Fetch JSON data
-        import requests
-        response = requests.get(url, timeout=30)
-        json_data = response.json()
+        json_data = fetch_manifest(url)
         
         if isinstance(json_data, list):
             json_products = json_data
@@ -12825,6 +12331,12 @@ def get_matching_performance():
             except Exception as e:
                 logging.warning(f"Error getting AI matcher performance: {e}")
         
+        # Manifest fetch/cache stats
+        performance_data['manifest_fetcher'] = get_manifest_fetcher().get_stats()
+        
+        # Memoized name normalization hit rates
+        performance_data['normalization'] = get_normalization_stats()
+        
         # System stats
         import psutil
         performance_data['system_stats'] = {
@@ -12913,6 +12425,14 @@ def clear_enhanced_matching_cache():
             json_matcher.clear_cache()
             cleared_count += 1
             
+        # Clear cached manifests
+        get_manifest_fetcher().clear()
+        cleared_count += 1
+        
+        # Clear memoized name normalization
+        clear_normalization_caches()
+        cleared_count += 1
+            
         # Clear AI matcher caches
         ai_matcher = get_enhanced_ai_matcher()
         if ai_matcher:
@@ -12944,9 +12464,7 @@ def debug_json_matching():
             return jsonify({'error': 'URL is required'}), 400
             
         # Fetch JSON data
-        import requests
-        response = requests.get(url, timeout=30)
-        json_data = response.json()
+        json_data = fetch_manifest(url)
         
         if isinstance(json_data, list):
             products = json_data
@@ -13301,6 +12819,8 @@ if FAST_DOCX_AVAILABLE and create_fast_docx_routes:
     except Exception as e:
         logging.warning(f"Failed to register fast DOCX routes: {e}")
 
+get_import_profiler().mark('app_imported')
+
 if __name__ == '__main__':
     # Use the global app instance that has all routes registered
     port = int(os.environ.get('FLASK_PORT', 8001))  # Use port 5001 by default
@@ -13322,6 +12842,7 @@ if __name__ == '__main__':
     # Clean up any existing processes on the port
     _kill_listeners_on_port(port)
     
+    start_worker_prewarm()
     print(f"Starting Flask app on port {port}")
     print("App is ready to serve requests...")
     
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Normalization microbenchmark
+============================
+Measures calls per second for each normalizer in src.core.utils.normalization
+with and without memoization, over the product, strain and vendor names of
+the seeded benchmark_suite fixtures. Each name is normalized several times, as
+happens when tags are built and candidates scored.
+
+- uncached: the underlying regex implementation on every call (before)
+- cached:   the public memoized function, starting from an empty cache (after)
+
+Usage:
+    python benchmark_normalization.py
+    python benchmark_normalization.py --rows 10000 --passes 5 --output normalization_results.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+
+# Add the project root to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from benchmark_suite import build_inventory_frame, build_manifest
+from src.core.utils import normalization
+
+BENCHMARKS = [
+    # (name, public function, memoized implementation, corpus)
+    ('normalize_product_name', normalization.normalize_product_name, normalization._product_name, 'products'),
+    ('strip_medically_compliant_prefix', normalization.strip_medically_compliant_prefix, normalization._strip_prefix, 'products'),
+    ('normalize_match_text', normalization.normalize_match_text, normalization._match_text, 'products'),
+    ('extract_key_terms', normalization.extract_key_terms, normalization._key_terms, 'products'),
+    ('normalize_name', normalization.normalize_name, normalization._name, 'products'),
+    ('normalize_text', normalization.normalize_text, normalization._text, 'vendors'),
+    ('normalize_strain_name', normalization.normalize_strain_name, normalization._strain_name, 'strains'),
+]
+
+
+def build_corpora(rows, manifest_items):
+    frame = build_inventory_frame(rows)
+    manifest = build_manifest(manifest_items)['inventory_transfer_items']
+    products = frame['Product Name*'].tolist() + [item['product_name'] for item in manifest]
+    products += [f"Medically Compliant - {name}" for name in products[:rows // 10]]
+    return {
+        'products': products,
+        'vendors': frame['Vendor/Supplier*'].tolist() + frame['Product Brand'].tolist(),
+        'strains': frame['Product Strain'].tolist() + [item['strain_name'] for item in manifest],
+    }
+
+
+def calls_per_second(func, names, passes):
+    start = time.perf_counter()
+    for _ in range(passes):
+        for name in names:
+            func(name)
+    elapsed = time.perf_counter() - start
+    return (len(names) * passes) / elapsed if elapsed else float('inf')
+
+
+def run(rows, manifest_items, passes):
+    corpora = build_corpora(rows, manifest_items)
+    results = {}
+    for name, public, cached, corpus in BENCHMARKS:
+        names = corpora[corpus]
+        uncached = calls_per_second(cached.__wrapped__, names, passes)
+        normalization.clear_normalization_caches()
+        memoized = calls_per_second(public, names, passes)
+        info = cached.cache_info()
+        results[name] = {
+            'calls': len(names) * passes,
+            'distinct_inputs': len(set(names)),
+            'uncached_calls_per_second': round(uncached),
+            'cached_calls_per_second': round(memoized),
+            'speedup': round(memoized / uncached, 2) if uncached else None,
+            'hit_rate': round(info.hits / (info.hits + info.misses), 4) if info.hits + info.misses else 0.0,
+        }
+        print(f"  {name:<34} {uncached:>12,.0f}/s -> {memoized:>12,.0f}/s  ({results[name]['speedup']}x)")
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Normalization microbenchmark")
+    parser.add_argument('--rows', type=int, default=5000, help="Inventory rows in the name corpus")
+    parser.add_argument('--manifest', type=int, default=500, help="Manifest items in the name corpus")
+    parser.add_argument('--passes', type=int, default=5, help="Times each name is normalized")
+    parser.add_argument('--output', help="Optional JSON report path")
+    args = parser.parse_args(argv)
+
+    logging.disable(logging.CRITICAL)
+
+    print("🚀 Normalization Microbenchmark (calls per second, uncached -> memoized)")
+    print("=" * 50)
+    results = run(args.rows, args.manifest, args.passes)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'parameters': vars(args), 'results': results}, f, indent=2)
+        print(f"📄 Report written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,405 @@
+#!/usr/bin/env python3
+"""
+Label generation benchmark suite
+================================
+Repeatable benchmarks for the hot paths of the label pipeline, run against
+synthetic, seeded fixtures so results are comparable between runs:
+
+- ExcelProcessor.load_file           (inventories of 100 / 1k / 10k rows)
+- ExcelProcessor.get_available_tags  (same inventories)
+- ProductDatabase.store_excel_data   (same inventories, fresh temp database)
+- JSONMatcher.fetch_and_match        (data: URL manifests of 50 / 500 items)
+- TemplateProcessor.process_records  (every template type)
+
+Results are written as JSON. Each benchmark is checked against the absolute
+limits in benchmark_thresholds.json and, when --baseline is given, against a
+previous report with a relative tolerance. The exit code is non-zero when any
+benchmark regresses, so the suite can gate a deploy.
+
+Usage:
+    python benchmark_suite.py
+    python benchmark_suite.py --rows 100 1000 --manifests 50 --repeat 1
+    python benchmark_suite.py --baseline benchmark_results.json --tolerance 0.25
+"""
+
+import argparse
+import base64
+import contextlib
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+# Add the project root to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import pandas as pd
+
+DEFAULT_ROWS = (100, 1000, 10000)
+DEFAULT_MANIFEST_ITEMS = (50, 500)
+DEFAULT_TEMPLATE_TYPES = ('vertical', 'horizontal', 'mini', 'double', 'inventory')
+DEFAULT_SELECTION_SIZE = 36
+DEFAULT_THRESHOLDS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_thresholds.json')
+FIXTURE_SEED = 20240601
+
+STRAINS = [
+    'Blue Dream', 'OG Kush', 'Wedding Cake', 'Gelato', 'Sour Diesel', 'Girl Scout Cookies',
+    'Purple Punch', 'Jack Herer', 'Granddaddy Purple', 'Pineapple Express', 'Zkittlez',
+    'Gorilla Glue', 'Durban Poison', 'Ice Cream Cake', 'Runtz', 'Apple Fritter',
+]
+VENDORS = [
+    ('Dcz Holdings Inc', 'Dank Czar'), ('Jsm Llc', 'Hustler\'s Ambition'), ('Omega Labs', 'Omega'),
+    ('Airo Pro', 'Airo'), ('1555 Industrial Llc', 'Harmony Farms'), ('Cloud 9 Farms', 'Cloud 9'),
+]
+PRODUCT_TYPES = [
+    # (product type, lineage pool, weight, unit, name suffix, inventory type)
+    ('flower', ['SATIVA', 'INDICA', 'HYBRID'], 3.5, 'g', 'Flower', 'Usable Marijuana'),
+    ('pre-roll', ['SATIVA', 'INDICA', 'HYBRID'], 1, 'g', 'Pre-Roll', 'Usable Marijuana'),
+    ('concentrate', ['HYBRID/SATIVA', 'HYBRID/INDICA', 'HYBRID'], 1, 'g', 'Wax', 'Marijuana Extract for Inhalation'),
+    ('vape cartridge', ['SATIVA', 'INDICA', 'HYBRID'], 1, 'g', 'Cartridge', 'Marijuana Extract for Inhalation'),
+    ('edible (solid)', ['MIXED'], 100, 'mg', 'Gummies', 'Solid Marijuana Infused Edible'),
+    ('tincture', ['CBD'], 30, 'ml', 'Tincture', 'Tinctures'),
+]
+
+
+def build_inventory_frame(rows, seed=FIXTURE_SEED):
+    """Build a deterministic synthetic inventory export with the given row count."""
+    rng = random.Random(seed + rows)
+    records = []
+    for i in range(rows):
+        strain = STRAINS[i % len(STRAINS)]
+        vendor, brand = VENDORS[rng.randrange(len(VENDORS))]
+        product_type, lineages, weight, unit, suffix, _ = PRODUCT_TYPES[rng.randrange(len(PRODUCT_TYPES))]
+        thc = round(rng.uniform(15, 32), 2)
+        cbd = round(rng.uniform(0, 2), 2)
+        records.append({
+            'Product Name*': f"{brand} {strain} {suffix} - {weight}{unit} #{i:05d}",
+            'Product Type*': product_type,
+            'Product Brand': brand,
+            'Vendor/Supplier*': vendor,
+            'Lineage': rng.choice(lineages),
+            'Product Strain': strain,
+            'Weight*': weight,
+            'Weight Unit* (grams/gm or ounces/oz)': unit,
+            'Price': f"{rng.choice([10, 15, 20, 25, 35, 45, 60])}.00",
+            'THC test result': thc,
+            'CBD test result': cbd,
+            'Total THC': thc,
+            'CBDA': cbd,
+            'DOH': rng.choice(['YES', 'NO']),
+            'Quantity*': rng.randint(1, 120),
+        })
+    return pd.DataFrame.from_records(records)
+
+
+def build_manifest(items, seed=FIXTURE_SEED):
+    """Build a deterministic transfer manifest with embedded lab results."""
+    rng = random.Random(seed + items)
+    transfer_items = []
+    for i in range(items):
+        strain = STRAINS[i % len(STRAINS)]
+        vendor, brand = VENDORS[i % len(VENDORS)]
+        _, _, weight, unit, suffix, inventory_type = PRODUCT_TYPES[rng.randrange(len(PRODUCT_TYPES))]
+        transfer_items.append({
+            'product_name': f"{brand} {strain} {suffix} - {weight}{unit}",
+            'inventory_name': f"{strain} {suffix}",
+            'inventory_type': inventory_type,
+            'strain_name': strain,
+            'vendor': vendor,
+            'qty': rng.randint(1, 60),
+            'unit_price': rng.choice([10, 15, 20, 25, 35]),
+            'lab_result_data': {
+                'lab_result_id': f"LR-{seed}-{i:05d}",
+                'coa': f"https://example.invalid/coa/{i:05d}.pdf",
+                'potency': [
+                    {'type': 'total-thc', 'value': round(rng.uniform(15, 32), 3), 'unit': 'pct'},
+                    {'type': 'total-cbd', 'value': round(rng.uniform(0, 2), 3), 'unit': 'pct'},
+                    {'type': 'thca', 'value': round(rng.uniform(15, 30), 3), 'unit': 'pct'},
+                ],
+            },
+        })
+    return {
+        'from_license_name': VENDORS[0][0],
+        'manifest_number': f"BENCH-{items}",
+        'inventory_transfer_items': transfer_items,
+    }
+
+
+def manifest_data_url(manifest):
+    """Encode a manifest as a base64 data: URL accepted by fetch_and_match."""
+    payload = base64.b64encode(json.dumps(manifest).encode('utf-8')).decode('ascii')
+    return f"data:application/json;base64,{payload}"
+
+
+@contextlib.contextmanager
+def quiet():
+    """Silence the debug prints emitted along the matching/generation paths."""
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+def time_call(func, repeat, setup=None):
+    """Run func `repeat` times and return timing stats plus the last result."""
+    timings = []
+    result = None
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        with quiet():
+            result = func()
+        timings.append(time.perf_counter() - start)
+    return {
+        'median_seconds': round(statistics.median(timings), 6),
+        'min_seconds': round(min(timings), 6),
+        'max_seconds': round(max(timings), 6),
+        'runs': len(timings),
+    }, result
+
+
+class BenchmarkSuite:
+    """Runs the benchmarks and collects a machine-readable report."""
+
+    def __init__(self, rows, manifest_items, template_types, repeat, selection_size, workdir):
+        self.rows = rows
+        self.manifest_items = manifest_items
+        self.template_types = template_types
+        self.repeat = repeat
+        self.selection_size = selection_size
+        self.workdir = workdir
+        self.results = {}
+        self.errors = {}
+
+    def expected_benchmarks(self):
+        """Names of every benchmark this run is configured to measure."""
+        names = []
+        for rows in self.rows:
+            names += [f"excel.load_file[{rows}]", f"excel.get_available_tags[{rows}]", f"db.store_excel_data[{rows}]"]
+        names += [f"json.fetch_and_match[{items}]" for items in self.manifest_items]
+        names += [f"template.process_records[{template_type}]" for template_type in self.template_types]
+        return names
+
+    def record(self, name, stats, **params):
+        stats.update(params)
+        self.results[name] = stats
+        print(f"  {name:<45} median {stats['median_seconds'] * 1000:10.1f} ms")
+
+    def record_error(self, name, error):
+        self.errors[name] = f"{type(error).__name__}: {error}"
+        print(f"  {name:<45} ⚠️  failed: {self.errors[name]}")
+
+    def _fresh_processor(self):
+        from src.core.data.excel_processor import ExcelProcessor
+        processor = ExcelProcessor()
+        # Benchmarks must not write into the real store database
+        processor.enable_product_db_integration(False)
+        return processor
+
+    def run_inventory_benchmarks(self):
+        from src.core.data.product_database import ProductDatabase
+
+        loaded = {}
+        for rows in self.rows:
+            path = os.path.join(self.workdir, f"inventory_{rows}.xlsx")
+            build_inventory_frame(rows).to_excel(path, index=False)
+
+            holder = {}
+
+            def setup():
+                holder['processor'] = self._fresh_processor()
+                # The snapshot cache is process-wide; every run must read and process the file
+                holder['processor'].clear_file_cache()
+
+            name = f"excel.load_file[{rows}]"
+            try:
+                stats, _ = time_call(lambda: holder['processor'].load_file(path), self.repeat, setup)
+            except Exception as e:
+                self.record_error(name, e)
+                for skipped in (f"excel.get_available_tags[{rows}]", f"db.store_excel_data[{rows}]"):
+                    self.errors[skipped] = f"skipped, {name} failed"
+                continue
+            self.record(name, stats, rows=rows)
+            processor = holder['processor']
+            loaded[rows] = processor
+
+            name = f"excel.get_available_tags[{rows}]"
+            try:
+                stats, tags = time_call(processor.get_available_tags, self.repeat)
+            except Exception as e:
+                self.record_error(name, e)
+            else:
+                self.record(name, stats, rows=rows, tags=len(tags or []))
+
+            db_state = {}
+
+            def db_setup():
+                db_state['db'] = ProductDatabase(db_path=os.path.join(self.workdir, f"bench_{rows}_{time.time_ns()}.db"))
+                db_state['db'].init_database()
+
+            name = f"db.store_excel_data[{rows}]"
+            try:
+                stats, _ = time_call(lambda: db_state['db'].store_excel_data(processor.df, path), self.repeat, db_setup)
+            except Exception as e:
+                self.record_error(name, e)
+            else:
+                self.record(name, stats, rows=rows)
+        return loaded
+
+    def run_matching_benchmarks(self, processor):
+        from src.core.data.json_matcher import JSONMatcher
+
+        for items in self.manifest_items:
+            name = f"json.fetch_and_match[{items}]"
+            try:
+                url = manifest_data_url(build_manifest(items))
+                matcher = JSONMatcher(processor)
+                stats, matches = time_call(lambda: matcher.fetch_and_match(url), self.repeat)
+            except Exception as e:
+                self.record_error(name, e)
+                continue
+            self.record(name, stats, items=items, matches=len(matches or []))
+
+    def run_template_benchmarks(self, processor):
+        from src.core.generation.template_processor import TemplateProcessor, get_font_scheme
+
+        tag_names = processor.df['ProductName'].astype(str).tolist()[:self.selection_size] \
+            if 'ProductName' in processor.df.columns else []
+        processor.select_tags(tag_names)
+        for template_type in self.template_types:
+            name = f"template.process_records[{template_type}]"
+            try:
+                with quiet():
+                    records = processor.get_selected_records(template_type)
+                template = TemplateProcessor(template_type, get_font_scheme(template_type))
+                stats, _ = time_call(lambda: template.process_records(records), self.repeat)
+            except Exception as e:
+                self.record_error(name, e)
+                continue
+            self.record(name, stats, template_type=template_type, records=len(records or []))
+
+    def run(self):
+        print("📊 Inventory benchmarks")
+        loaded = self.run_inventory_benchmarks()
+        reference = loaded[min(loaded)] if loaded else None
+        if reference is None:
+            for name in self.expected_benchmarks():
+                if name not in self.errors:
+                    self.errors[name] = "skipped, no inventory loaded"
+            return self.results
+        print("🔍 Matching benchmarks")
+        self.run_matching_benchmarks(loaded[max(loaded)])
+        print("🏷️  Template benchmarks")
+        self.run_template_benchmarks(reference)
+        return self.results
+
+
+def check_regressions(results, thresholds, baseline=None, tolerance=0.25, errors=None, expected=None):
+    """
+    Compare results against absolute thresholds and an optional baseline report.
+
+    A benchmark that raised, or a threshold (of a benchmark in `expected`,
+    when given) without a measured result, is a failure as well.
+    """
+    failures = []
+    for name, message in (errors or {}).items():
+        failures.append({'benchmark': name, 'reason': 'error', 'error': message})
+    for name, limit in thresholds.items():
+        if name in results or name in (errors or {}) or (expected is not None and name not in expected):
+            continue
+        failures.append({'benchmark': name, 'reason': 'missing', 'limit_seconds': limit})
+    for name, stats in results.items():
+        median = stats['median_seconds']
+        limit = thresholds.get(name)
+        if limit is not None and median > limit:
+            failures.append({'benchmark': name, 'reason': 'threshold', 'median_seconds': median, 'limit_seconds': limit})
+        if baseline:
+            previous = baseline.get('results', {}).get(name)
+            if previous:
+                allowed = previous['median_seconds'] * (1 + tolerance)
+                if median > allowed:
+                    failures.append({'benchmark': name, 'reason': 'baseline', 'median_seconds': median,
+                                     'limit_seconds': round(allowed, 6)})
+    return failures
+
+
+def load_json(path):
+    if not path or not os.path.exists(path):
+        return {}
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Label generation benchmark suite")
+    parser.add_argument('--rows', type=int, nargs='+', default=list(DEFAULT_ROWS))
+    parser.add_argument('--manifests', type=int, nargs='+', default=list(DEFAULT_MANIFEST_ITEMS))
+    parser.add_argument('--templates', nargs='+', default=list(DEFAULT_TEMPLATE_TYPES))
+    parser.add_argument('--selection', type=int, default=DEFAULT_SELECTION_SIZE,
+                        help="Number of tags rendered per template benchmark")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--thresholds', default=DEFAULT_THRESHOLDS_FILE)
+    parser.add_argument('--baseline', help="Previous report to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="Allowed slowdown versus the baseline (0.25 = 25%%)")
+    parser.add_argument('--output', default='benchmark_results.json')
+    args = parser.parse_args(argv)
+
+    logging.disable(logging.CRITICAL)
+
+    print("🚀 Label Generation Benchmark Suite")
+    print("=" * 50)
+    with tempfile.TemporaryDirectory(prefix='agt_bench_') as workdir:
+        suite = BenchmarkSuite(args.rows, args.manifests, args.templates, args.repeat, args.selection, workdir)
+        results = suite.run()
+
+    thresholds = load_json(args.thresholds).get('thresholds', {})
+    failures = check_regressions(results, thresholds, load_json(args.baseline), args.tolerance,
+                                 errors=suite.errors, expected=suite.expected_benchmarks())
+
+    report = {
+        'timestamp': datetime.now().isoformat(),
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'pandas': pd.__version__,
+        },
+        'parameters': {
+            'rows': args.rows,
+            'manifest_items': args.manifests,
+            'template_types': args.templates,
+            'selection_size': args.selection,
+            'repeat': args.repeat,
+            'seed': FIXTURE_SEED,
+        },
+        'results': results,
+        'errors': suite.errors,
+        'regressions': failures,
+        'passed': not failures,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    print("=" * 50)
+    print(f"📄 Report written to {args.output}")
+    if failures:
+        for failure in failures:
+            if failure['reason'] == 'error':
+                print(f"❌ {failure['benchmark']}: failed with {failure['error']}")
+            elif failure['reason'] == 'missing':
+                print(f"❌ {failure['benchmark']}: no result for its {failure['limit_seconds']:.3f}s threshold")
+            else:
+                print(f"❌ {failure['benchmark']}: {failure['median_seconds']:.3f}s > "
+                      f"{failure['limit_seconds']:.3f}s ({failure['reason']})")
+        return 1
+    print("✅ No regressions detected")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -8,13 +8,18 @@ import os
 import time
 import logging
 from io import BytesIO
-from docx import Document
-from docx.shared import Inches, Pt
-from docx.enum.text import WD_ALIGN_PARAGRAPH
-from docx.enum.table import WD_TABLE_ALIGNMENT
-import pandas as pd
 from typing import List, Dict, Any
 
+from src.core.utils.lazy_import import lazy_attribute, lazy_module
+
+# python-docx loads on first use; app.py registers these routes at import time
+Document = lazy_attribute('docx', 'Document')
+Inches = lazy_attribute('docx.shared', 'Inches')
+Pt = lazy_attribute('docx.shared', 'Pt')
+WD_ALIGN_PARAGRAPH = lazy_attribute('docx.enum.text', 'WD_ALIGN_PARAGRAPH')
+WD_TABLE_ALIGNMENT = lazy_attribute('docx.enum.table', 'WD_TABLE_ALIGNMENT')
+pd = lazy_module('pandas')
+
 # Performance constants
 MAX_RECORDS_PER_DOCX = 100  # Limit records for web performance
 CHUNK_SIZE = 20  # Process in small chunks
@@ -21,11 +21,14 @@ project_root = Path(__file__).parent
 sys.path.insert(0, str(project_root))
 
 from flask import Flask, request, jsonify, session
-import pandas as pd
+from src.core.utils.lazy_import import lazy_module
 import gc
 from concurrent.futures import ThreadPoolExecutor
 import sqlite3
 
+# pandas loads on first upload; app.py registers these routes at import time
+pd = lazy_module('pandas')
+
 # Performance constants
 MAX_ROWS_FOR_FAST_UPLOAD = 100000  # Increased limit
 CHUNK_SIZE = 5000  # Smaller chunks for better memory management
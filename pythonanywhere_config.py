@@ -3,33 +3,33 @@ PythonAnywhere-specific configuration
 Handles missing dependencies gracefully
 """
 
+import importlib.util
 import os
 import logging
 
 # Check for missing dependencies and provide fallbacks
 MISSING_DEPENDENCIES = []
 
-try:
-    import jellyfish
-    JELLYFISH_AVAILABLE = True
-except ImportError:
-    JELLYFISH_AVAILABLE = False
+# Only look the modules up here; importing them is left to first use so a
+# recycled worker does not pay for psutil and friends at startup.
+def _module_available(name):
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
+
+JELLYFISH_AVAILABLE = _module_available('jellyfish')
+if not JELLYFISH_AVAILABLE:
     MISSING_DEPENDENCIES.append('jellyfish')
     logging.warning("jellyfish not available - using fallback functions")
 
-try:
-    import Levenshtein
-    LEVENSHTEIN_AVAILABLE = True
-except ImportError:
-    LEVENSHTEIN_AVAILABLE = False
+LEVENSHTEIN_AVAILABLE = _module_available('Levenshtein')
+if not LEVENSHTEIN_AVAILABLE:
     MISSING_DEPENDENCIES.append('python-Levenshtein')
     logging.warning("python-Levenshtein not available - using fallback functions")
 
-try:
-    import psutil
-    PSUTIL_AVAILABLE = True
-except ImportError:
-    PSUTIL_AVAILABLE = False
+PSUTIL_AVAILABLE = _module_available('psutil')
+if not PSUTIL_AVAILABLE:
     MISSING_DEPENDENCIES.append('psutil')
     logging.warning("psutil not available - memory monitoring disabled")
 
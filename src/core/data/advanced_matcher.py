@@ -3,13 +3,14 @@ Advanced matching system using multiple algorithms and libraries for improved JS
 Combines fuzzy string matching, semantic similarity, and performance optimizations.
 """
 
-import re
 import logging
 from typing import List, Dict, Tuple, Optional, Set
 from dataclasses import dataclass
 from functools import lru_cache
 import time
 
+from src.core.utils import normalization
+
 # Import all available matching libraries
 try:
     from rapidfuzz import fuzz as rapidfuzz_fuzz, process as rapidfuzz_process
@@ -63,7 +64,6 @@ class AdvancedMatcher:
     
     def __init__(self):
         self.performance_cache = {}
-        self.normalization_cache = {}
         self.key_terms_cache = {}
         self.algorithm_weights = {
             'exact': 1.0,
@@ -99,22 +99,6 @@ class AdvancedMatcher:
             'cartridge': ['cartridge', 'cart', 'vape', 'pen']
         }
     
-    def normalize_text(self, text: str) -> str:
-        """Normalize text for consistent matching."""
-        if not isinstance(text, str):
-            return ""
-        
-        # Convert to lowercase and strip
-        text = text.lower().strip()
-        
-        # Remove special characters but keep spaces and hyphens
-        text = re.sub(r'[^\w\s-]', ' ', text)
-        
-        # Normalize whitespace
-        text = re.sub(r'\s+', ' ', text)
-        
-        return text.strip()
-    
     def _is_vendor_match(self, vendor1: str, vendor2: str) -> bool:
         """Check if two vendor names represent the same vendor using various patterns."""
         if not vendor1 or not vendor2:
@@ -444,12 +428,6 @@ class AdvancedMatcher:
             for key in keys_to_remove:
                 del self.performance_cache[key]
         
-        if len(self.normalization_cache) > self.max_cache_size * self.cache_cleanup_threshold:
-            items_to_remove = int(len(self.normalization_cache) * 0.2)
-            keys_to_remove = list(self.normalization_cache.keys())[:items_to_remove]
-            for key in keys_to_remove:
-                del self.normalization_cache[key]
-        
         if len(self.key_terms_cache) > self.max_cache_size * self.cache_cleanup_threshold:
             items_to_remove = int(len(self.key_terms_cache) * 0.2)
             keys_to_remove = list(self.key_terms_cache.keys())[:items_to_remove]
@@ -457,32 +435,8 @@ class AdvancedMatcher:
                 del self.key_terms_cache[key]
     
     def normalize_text(self, text: str) -> str:
-        """Normalize text for consistent matching with caching."""
-        if not isinstance(text, str):
-            return ""
-        
-        # Check cache first
-        if text in self.normalization_cache:
-            return self.normalization_cache[text]
-        
-        # Convert to lowercase and strip
-        normalized = text.lower().strip()
-        
-        # Remove special characters but keep spaces and hyphens
-        normalized = re.sub(r'[^\w\s-]', ' ', normalized)
-        
-        # Normalize whitespace
-        normalized = re.sub(r'\s+', ' ', normalized)
-        
-        result = normalized.strip()
-        
-        # Cache the result
-        self.normalization_cache[text] = result
-        
-        # Cleanup cache if needed
-        self._cleanup_cache()
-        
-        return result
+        """Normalize text for consistent matching (memoized in src.core.utils.normalization)."""
+        return normalization.normalize_text(text)
     
     def extract_key_terms(self, text: str) -> Set[str]:
         """Extract meaningful key terms from text with caching."""
@@ -1016,6 +970,7 @@ class AdvancedMatcher:
     
     def get_matching_stats(self) -> Dict[str, any]:
         """Get statistics about the matching system."""
+        normalization_size = normalization.get_normalization_stats()['normalize_text']['size']
         return {
             'libraries_available': {
                 'rapidfuzz': RAPIDFUZZ_AVAILABLE,
@@ -1026,16 +981,16 @@ class AdvancedMatcher:
             'algorithm_weights': self.algorithm_weights,
             'cache_sizes': {
                 'performance_cache': len(self.performance_cache),
-                'normalization_cache': len(self.normalization_cache),
+                'normalization_cache': normalization_size,
                 'key_terms_cache': len(self.key_terms_cache)
             },
-            'total_cache_size': len(self.performance_cache) + len(self.normalization_cache) + len(self.key_terms_cache),
+            'total_cache_size': len(self.performance_cache) + normalization_size + len(self.key_terms_cache),
             'max_cache_size': self.max_cache_size
         }
     
     def clear_caches(self):
         """Clear all caches to free memory."""
         self.performance_cache.clear()
-        self.normalization_cache.clear()
+        normalization.clear_normalization_caches()
         self.key_terms_cache.clear()
         logging.info("All matching caches cleared")
@@ -0,0 +1,284 @@
+"""
+Database Backup for Label Maker Application
+Backs up the live product database while requests keep reading and writing it.
+
+- Full backups use SQLite's online backup API. Pages are copied in small
+  steps with a short pause between steps, so other connections are not
+  held up. The result is a consistent snapshot: if another connection
+  writes to the database mid-copy, SQLite restarts the copy. After a few
+  restarts the rest is copied in one step. In WAL mode that step only
+  holds a read snapshot, so writers still go through.
+- Table backups (products / strains / vendors) and incremental backups
+  copy rows inside one read transaction, which WAL mode keeps consistent
+  without blocking writers.
+- Incremental backups only copy rows whose updated_at / last_seen_date
+  (lineage_history: change_date) is later than the start of the previous
+  backup. Deleted rows are not tracked, so a restore replays the
+  incrementals in order on top of the last full backup.
+
+The finished file is compressed with gzip, or with zstd when zstandard is
+installed, in fixed-size blocks. Every backup is recorded in a manifest
+next to the backup files.
+"""
+
+import gzip
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from src.core.utils.metrics import record_stage
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Online backup pacing: pages copied per step and pause between steps
+BACKUP_PAGES_PER_STEP = 256
+BACKUP_STEP_SLEEP = 0.005
+# Restarts caused by concurrent writes before the rest is copied in a single step
+MAX_BACKUP_RESTARTS = 3
+# Rows copied per batch for table and incremental backups
+ROW_BATCH_SIZE = 2000
+COPY_BLOCK_BYTES = 1024 * 1024
+
+BACKUP_TYPES = ('full', 'incremental', 'products', 'strains', 'vendors')
+TABLE_BACKUPS = {
+    'products': ['products'],
+    'strains': ['strains'],
+    'vendors': ['products'],
+}
+INCREMENTAL_TABLES = ('products', 'strains', 'strain_brand_lineage', 'lineage_history')
+# Backups an incremental can build on; table backups leave the other tables out
+INCREMENTAL_BASE_TYPES = ('full', 'incremental')
+CHANGE_COLUMNS = ('updated_at', 'last_seen_date', 'change_date')
+
+COMPRESSIONS = ('none', 'gzip', 'zstd')
+COMPRESSION_SUFFIX = {'none': '', 'gzip': '.gz', 'zstd': '.zst'}
+
+MANIFEST_NAME = 'backup_manifest.json'
+_manifest_lock = threading.Lock()
+
+
+def resolve_compression(compression: Optional[str] = None, compress: bool = True) -> str:
+    """Compression to use: an explicit choice wins, otherwise gzip when compress is set; zstd falls back to gzip."""
+    choice = str(compression or ('gzip' if compress else 'none')).strip().lower()
+    if choice not in COMPRESSIONS:
+        choice = 'gzip'
+    if choice == 'zstd' and not ZSTD_AVAILABLE:
+        logger.warning("zstandard not installed, compressing backup with gzip")
+        choice = 'gzip'
+    return choice
+
+
+def load_manifest(backup_dir) -> List[Dict[str, Any]]:
+    path = Path(backup_dir) / MANIFEST_NAME
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return []
+
+
+def _append_manifest(backup_dir, entry: Dict[str, Any]) -> None:
+    path = Path(backup_dir) / MANIFEST_NAME
+    with _manifest_lock:
+        entries = load_manifest(backup_dir)
+        entries.append(entry)
+        tmp_path = path.with_suffix('.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(entries, f, indent=2)
+        os.replace(tmp_path, path)
+
+
+def last_backup(backup_dir, db_path: Optional[str] = None,
+                types: Optional[Sequence[str]] = None) -> Optional[Dict[str, Any]]:
+    """Most recent successful backup (of db_path and of one of types, when given)."""
+    entries = [e for e in load_manifest(backup_dir)
+               if (db_path is None or e.get('source') == str(db_path)) and (types is None or e.get('type') in types)]
+    return max(entries, key=lambda e: e.get('started_at', '')) if entries else None
+
+
+class _TooManyRestarts(Exception):
+    pass
+
+
+def online_backup(source_path: str, dest_path: str, pages: int = BACKUP_PAGES_PER_STEP,
+                  step_sleep: float = BACKUP_STEP_SLEEP,
+                  progress: Optional[Callable[[int, int], None]] = None) -> Dict[str, int]:
+    """Copy a live database page by page with the online backup API; returns page and restart counts."""
+    stats = {'pages': 0, 'steps': 0, 'restarts': 0}
+    last_remaining = [None]
+
+    def on_step(status, remaining, total):
+        stats['pages'] = total
+        stats['steps'] += 1
+        if last_remaining[0] is not None and remaining > last_remaining[0]:
+            # The source was written by another connection, so SQLite started over
+            stats['restarts'] += 1
+        last_remaining[0] = remaining
+        if stats['restarts'] > MAX_BACKUP_RESTARTS:
+            # Busy writers keep invalidating the copy; stop pacing so it can finish
+            raise _TooManyRestarts()
+        if progress is not None:
+            progress(total - remaining, total)
+        if remaining and step_sleep:
+            # Give writers and other readers the database between steps
+            time.sleep(step_sleep)
+
+    source = sqlite3.connect(source_path, timeout=30.0)
+    try:
+        dest = sqlite3.connect(dest_path)
+        try:
+            source.backup(dest, pages=pages, progress=on_step)
+        except _TooManyRestarts:
+            logger.info(f"Backup of {source_path} restarted {stats['restarts']} times, finishing in one step")
+            source.backup(dest, pages=-1)
+            stats['single_step'] = True
+        finally:
+            dest.close()
+    finally:
+        source.close()
+    return stats
+
+
+def _table_columns(conn: sqlite3.Connection, table: str) -> List[str]:
+    return [row[1] for row in conn.execute(f'PRAGMA table_info("{table}")')]
+
+
+def copy_tables(source_path: str, dest_path: str, tables: List[str], since: Optional[str] = None,
+                batch_size: int = ROW_BATCH_SIZE, batch_sleep: float = BACKUP_STEP_SLEEP) -> Dict[str, int]:
+    """
+    Copy tables (schema and rows) into a new database from one read snapshot.
+    With `since`, only rows changed after that timestamp are copied.
+    """
+    rows_copied: Dict[str, int] = {}
+    source = sqlite3.connect(source_path, timeout=30.0)
+    dest = sqlite3.connect(dest_path)
+    try:
+        # One read transaction, so every table comes from the same snapshot
+        source.execute('BEGIN')
+        for table in tables:
+            found = source.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone()
+            if not found:
+                continue
+            dest.execute(found[0])
+            columns = _table_columns(source, table)
+            query = f'SELECT * FROM "{table}"'
+            params: List[Any] = []
+            if since is not None:
+                change_columns = [c for c in CHANGE_COLUMNS if c in columns]
+                if not change_columns:
+                    continue
+                query += ' WHERE ' + ' OR '.join(f'"{c}" > ?' for c in change_columns)
+                params = [since] * len(change_columns)
+            insert = f'INSERT INTO "{table}" VALUES ({", ".join("?" * len(columns))})'
+            cursor = source.execute(query, params)
+            count = 0
+            while True:
+                batch = cursor.fetchmany(batch_size)
+                if not batch:
+                    break
+                dest.executemany(insert, batch)
+                count += len(batch)
+                if batch_sleep:
+                    time.sleep(batch_sleep)
+            rows_copied[table] = count
+        dest.execute('CREATE TABLE _backup_meta (key TEXT PRIMARY KEY, value TEXT)')
+        dest.executemany('INSERT INTO _backup_meta VALUES (?, ?)', [
+            ('source', str(source_path)),
+            ('since', since or ''),
+            ('tables', ','.join(rows_copied)),
+        ])
+        dest.commit()
+    finally:
+        source.rollback()
+        dest.close()
+        source.close()
+    return rows_copied
+
+
+def compress_file(path: Path, compression: str) -> Path:
+    """Compress a finished backup block by block into path + suffix and remove the original."""
+    if compression == 'none':
+        return path
+    target = path.with_name(path.name + COMPRESSION_SUFFIX[compression])
+    with open(path, 'rb') as f_in, open(target, 'wb') as raw_out:
+        if compression == 'zstd':
+            with zstandard.ZstdCompressor(level=3).stream_writer(raw_out) as f_out:
+                shutil.copyfileobj(f_in, f_out, COPY_BLOCK_BYTES)
+        else:
+            with gzip.GzipFile(fileobj=raw_out, mode='wb', compresslevel=6) as f_out:
+                shutil.copyfileobj(f_in, f_out, COPY_BLOCK_BYTES)
+    path.unlink()
+    return target
+
+
+def create_backup(db_path: str, backup_dir, backup_name: str, backup_type: str = 'full',
+                  compression: str = 'gzip', since: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Back up db_path into backup_dir and record it in the manifest.
+
+    Incremental backups default `since` to the start of the previous full or
+    incremental backup of the same database; without one they fall back to a
+    full backup.
+    """
+    if backup_type not in BACKUP_TYPES:
+        raise ValueError(f"Unknown backup type '{backup_type}'")
+    backup_dir = Path(backup_dir)
+    backup_dir.mkdir(parents=True, exist_ok=True)
+
+    started = time.perf_counter()
+    started_at = datetime.now().isoformat()
+    if backup_type == 'incremental' and since is None:
+        previous = last_backup(backup_dir, db_path, types=INCREMENTAL_BASE_TYPES)
+        since = previous['started_at'] if previous else None
+        if since is None:
+            logger.info("No previous backup to build on, taking a full backup instead")
+            backup_type = 'full'
+
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    suffix = '_incr' if backup_type == 'incremental' else ''
+    backup_path = backup_dir / f"{backup_name}_{timestamp}{suffix}.db"
+    if backup_path.exists():
+        backup_path.unlink()
+
+    result: Dict[str, Any] = {'type': backup_type, 'started_at': started_at}
+    try:
+        if backup_type == 'full':
+            result.update(online_backup(db_path, str(backup_path)))
+        else:
+            tables = list(INCREMENTAL_TABLES) if backup_type == 'incremental' else TABLE_BACKUPS[backup_type]
+            result['rows'] = copy_tables(db_path, str(backup_path), tables,
+                                         since=since if backup_type == 'incremental' else None)
+            if since is not None:
+                result['since'] = since
+        backup_path = compress_file(backup_path, compression)
+    except Exception:
+        if backup_path.exists():
+            backup_path.unlink()
+        raise
+
+    elapsed = time.perf_counter() - started
+    record_stage(f'database_backup_{backup_type}', elapsed)
+    result.update({
+        'path': str(backup_path),
+        'size': backup_path.stat().st_size,
+        'compression': compression,
+        'source': str(db_path),
+        'completed_at': datetime.now().isoformat(),
+        'seconds': round(elapsed, 3),
+    })
+    _append_manifest(backup_dir, result)
+    logger.info(f"Created {backup_type} backup {backup_path} ({result['size'] / 1024:.0f} KB in {elapsed:.2f}s)")
+    return result
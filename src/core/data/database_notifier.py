@@ -4,58 +4,199 @@ Integrates with session manager to ensure immediate propagation of database chan
 """
 
 import logging
+import queue
 import threading
 import time
-from typing import Dict, Any, Optional, Callable
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Callable, Tuple
 from datetime import datetime
 from .session_manager import record_database_change, get_session_manager
 
 logger = logging.getLogger(__name__)
 
+# Dispatcher tuning
+COALESCE_WINDOW_SECONDS = 0.25  # Changes to the same entity within this window are merged
+MAX_PENDING_CHANGES = 1000      # Coalescing buffer size that forces an early flush
+WORK_QUEUE_SIZE = 1000          # Bounded queue between the dispatcher and the workers
+WORKER_COUNT = 2                # Fixed handler worker pool
+
+class _PendingChange:
+    """A coalesced change waiting in the dispatcher buffer."""
+
+    __slots__ = ('change_type', 'entity_id', 'entity_type', 'user_id', 'details',
+                 'handler_args', 'first_seen', 'count')
+
+    def __init__(self, change_type, entity_id, entity_type, user_id, details, handler_args):
+        self.change_type = change_type
+        self.entity_id = entity_id
+        self.entity_type = entity_type
+        self.user_id = user_id
+        self.details = details
+        self.handler_args = handler_args
+        self.first_seen = time.monotonic()
+        self.count = 1
+
 class DatabaseNotifier:
     """
     Notifies all sessions of database changes to ensure immediate availability
     of changes across all browsers while maintaining session isolation.
+
+    notify_* calls only buffer the change. A single dispatcher thread coalesces
+    changes per entity over a short window, records one entry per entity in the
+    session change log and hands registered handlers to a fixed worker pool
+    through a bounded queue.
     """
-    
-    def __init__(self):
+
+    def __init__(self, coalesce_window: float = COALESCE_WINDOW_SECONDS, worker_count: int = WORKER_COUNT):
         self._change_handlers: Dict[str, Callable] = {}
         self._lock = threading.RLock()  # Use RLock for better performance
-        self._notification_timeout = 5.0  # 5 second timeout for notifications
-    
+        self._notification_timeout = 5.0  # Handlers slower than this are logged
+        self._coalesce_window = coalesce_window
+        self._worker_count = worker_count
+        self._pending: "OrderedDict[Tuple[str, str], _PendingChange]" = OrderedDict()
+        self._pending_cond = threading.Condition(threading.Lock())
+        self._work_queue: "queue.Queue" = queue.Queue(maxsize=WORK_QUEUE_SIZE)
+        self._started = False
+        self._start_lock = threading.Lock()
+        self._stats = {'submitted': 0, 'dispatched': 0, 'coalesced': 0, 'handler_errors': 0, 'dropped': 0}
+
     def register_change_handler(self, change_type: str, handler: Callable) -> None:
         """Register a handler for a specific type of database change."""
         with self._lock:
             self._change_handlers[change_type] = handler
             logger.info(f"Registered change handler for: {change_type}")
-    
-    def _notify_with_timeout(self, change_type: str, *args, **kwargs):
-        """Notify with timeout protection."""
-        try:
+
+    def _ensure_started(self) -> None:
+        """Start the dispatcher and worker threads on first use."""
+        if self._started:
+            return
+        with self._start_lock:
+            if self._started:
+                return
+            threading.Thread(target=self._dispatch_loop, name='db-notifier-dispatcher', daemon=True).start()
+            for i in range(self._worker_count):
+                threading.Thread(target=self._worker_loop, name=f'db-notifier-worker-{i}', daemon=True).start()
+            self._started = True
+
+    def _submit(self, change_type: str, entity_id: str, entity_type: str, user_id: Optional[str],
+                details: Optional[Dict[str, Any]], handler_args: tuple) -> None:
+        """Buffer a change, merging it with a pending change for the same entity."""
+        self._ensure_started()
+        key = (change_type, entity_id)
+        with self._pending_cond:
+            self._stats['submitted'] += 1
+            pending = self._pending.get(key)
+            if pending is None:
+                self._pending[key] = _PendingChange(change_type, entity_id, entity_type, user_id, details, handler_args)
+                if len(self._pending) == 1 or len(self._pending) >= MAX_PENDING_CHANGES:
+                    self._pending_cond.notify()
+            else:
+                self._merge(pending, user_id, details, handler_args)
+                self._stats['coalesced'] += 1
+
+    @staticmethod
+    def _merge(pending: _PendingChange, user_id, details, handler_args) -> None:
+        """Fold a newer change into a pending one; the newest values win."""
+        pending.count += 1
+        pending.user_id = user_id or pending.user_id
+        if pending.change_type == 'lineage_batch_update' and pending.details and details:
+            # Keep every strain from both batches, newest lineage per strain
+            merged = {c['strain_name']: c for c in pending.details.get('changes', [])}
+            for change in details.get('changes', []):
+                previous = merged.get(change['strain_name'])
+                merged[change['strain_name']] = {**change, 'old_lineage': previous['old_lineage']} if previous else change
+            changes = list(merged.values())
+            details = {'count': len(changes), 'changes': changes}
+            handler_args = (changes,)
+        if pending.change_type == 'lineage_update' and pending.details and details:
+            # Report the lineage the strain had before the first change in the window
+            details = {**details, 'old_lineage': pending.details.get('old_lineage')}
+            handler_args = (handler_args[0], pending.handler_args[1]) + tuple(handler_args[2:])
+        pending.details = details
+        pending.handler_args = handler_args
+
+    def _dispatch_loop(self) -> None:
+        """Single dispatcher: flush coalesced changes once their window has elapsed."""
+        while True:
+            try:
+                with self._pending_cond:
+                    while not self._pending:
+                        self._pending_cond.wait()
+                    oldest = next(iter(self._pending.values()))
+                    wait = self._coalesce_window - (time.monotonic() - oldest.first_seen)
+                    if wait > 0 and len(self._pending) < MAX_PENDING_CHANGES:
+                        self._pending_cond.wait(timeout=wait)
+                        continue
+                    batch = list(self._pending.values())
+                    self._pending.clear()
+                self._dispatch(batch)
+            except Exception as e:
+                logger.error(f"Error in database notifier dispatcher: {e}")
+
+    def _dispatch(self, batch) -> None:
+        """Record each coalesced change once and queue its handler."""
+        for pending in batch:
+            record_database_change(
+                change_type=pending.change_type,
+                entity_id=pending.entity_id,
+                entity_type=pending.entity_type,
+                user_id=pending.user_id,
+                details=pending.details
+            )
+            self._stats['dispatched'] += 1
             with self._lock:
-                if change_type in self._change_handlers:
-                    # Run handler in a separate thread with timeout
-                    def run_handler():
-                        try:
-                            self._change_handlers[change_type](*args, **kwargs)
-                        except Exception as e:
-                            logger.error(f"Error in {change_type} handler: {e}")
-                    
-                    thread = threading.Thread(target=run_handler, daemon=True)
-                    thread.start()
-                    thread.join(timeout=self._notification_timeout)
-                    
-                    if thread.is_alive():
-                        logger.warning(f"{change_type} handler timed out after {self._notification_timeout}s")
-        except Exception as e:
-            logger.error(f"Error in notification timeout protection: {e}")
-    
-    def notify_lineage_update(self, strain_name: str, old_lineage: str, new_lineage: str, 
+                handler = self._change_handlers.get(pending.change_type)
+            if handler is None:
+                continue
+            try:
+                # Back-pressure lands on the dispatcher, never on the request thread
+                self._work_queue.put((pending.change_type, handler, pending.handler_args),
+                                     timeout=self._notification_timeout)
+            except queue.Full:
+                self._stats['dropped'] += 1
+                logger.warning(f"Notification queue full, dropping {pending.change_type} handler for {pending.entity_id}")
+
+    def _worker_loop(self) -> None:
+        """Fixed worker: run handlers pulled from the bounded work queue."""
+        while True:
+            change_type, handler, args = self._work_queue.get()
+            start = time.monotonic()
+            try:
+                handler(*args)
+            except Exception as e:
+                self._stats['handler_errors'] += 1
+                logger.error(f"Error in {change_type} handler: {e}")
+            finally:
+                elapsed = time.monotonic() - start
+                if elapsed > self._notification_timeout:
+                    logger.warning(f"{change_type} handler took {elapsed:.1f}s (limit {self._notification_timeout}s)")
+                self._work_queue.task_done()
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Dispatch everything buffered now and wait for queued handlers to finish."""
+        with self._pending_cond:
+            batch = list(self._pending.values())
+            self._pending.clear()
+        if batch:
+            self._dispatch(batch)
+        deadline = time.monotonic() + timeout
+        while self._work_queue.unfinished_tasks:
+            if time.monotonic() > deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Dispatcher counters and queue depths."""
+        with self._pending_cond:
+            pending = len(self._pending)
+        return {**self._stats, 'pending': pending, 'queued': self._work_queue.qsize(), 'workers': self._worker_count}
+
+    def notify_lineage_update(self, strain_name: str, old_lineage: str, new_lineage: str,
                             user_id: Optional[str] = None) -> None:
         """Notify all sessions of a lineage update."""
         try:
-            # Record the change for all sessions (non-blocking)
-            record_database_change(
+            self._submit(
                 change_type='lineage_update',
                 entity_id=strain_name,
                 entity_type='strain',
@@ -64,60 +205,73 @@ class DatabaseNotifier:
                     'old_lineage': old_lineage,
                     'new_lineage': new_lineage,
                     'strain_name': strain_name
-                }
+                },
+                handler_args=(strain_name, old_lineage, new_lineage)
             )
-            
-            # Call any registered handlers with timeout protection
-            self._notify_with_timeout('lineage_update', strain_name, old_lineage, new_lineage)
-            
-            logger.info(f"Notified all sessions of lineage update: {strain_name} {old_lineage} -> {new_lineage}")
-            
+            logger.debug(f"Queued lineage update notification: {strain_name} {old_lineage} -> {new_lineage}")
+
         except Exception as e:
             logger.error(f"Error notifying lineage update: {e}")
-    
-    def notify_product_update(self, product_name: str, product_data: Dict[str, Any], 
+
+    def notify_batch_lineage_update(self, changes: List[Dict[str, Any]],
+                                    user_id: Optional[str] = None) -> None:
+        """Notify all sessions of many lineage updates with a single change entry."""
+        try:
+            self._submit(
+                change_type='lineage_batch_update',
+                entity_id='lineages',
+                entity_type='strain',
+                user_id=user_id,
+                details={
+                    'count': len(changes),
+                    'changes': changes
+                },
+                handler_args=(changes,)
+            )
+            logger.debug(f"Queued batch lineage update notification: {len(changes)} strains")
+
+        except Exception as e:
+            logger.error(f"Error notifying batch lineage update: {e}")
+
+    def notify_product_update(self, product_name: str, product_data: Dict[str, Any],
                             user_id: Optional[str] = None) -> None:
         """Notify all sessions of a product update."""
         try:
-            record_database_change(
+            self._submit(
                 change_type='product_update',
                 entity_id=product_name,
                 entity_type='product',
                 user_id=user_id,
-                details=product_data
+                details=product_data,
+                handler_args=(product_name, product_data)
             )
-            
-            self._notify_with_timeout('product_update', product_name, product_data)
-            
-            logger.info(f"Notified all sessions of product update: {product_name}")
-            
+            logger.debug(f"Queued product update notification: {product_name}")
+
         except Exception as e:
             logger.error(f"Error notifying product update: {e}")
-    
-    def notify_strain_add(self, strain_name: str, strain_data: Dict[str, Any], 
+
+    def notify_strain_add(self, strain_name: str, strain_data: Dict[str, Any],
                          user_id: Optional[str] = None) -> None:
         """Notify all sessions of a new strain being added."""
         try:
-            record_database_change(
+            self._submit(
                 change_type='strain_add',
                 entity_id=strain_name,
                 entity_type='strain',
                 user_id=user_id,
-                details=strain_data
+                details=strain_data,
+                handler_args=(strain_name, strain_data)
             )
-            
-            self._notify_with_timeout('strain_add', strain_name, strain_data)
-            
-            logger.info(f"Notified all sessions of new strain: {strain_name}")
-            
+            logger.debug(f"Queued new strain notification: {strain_name}")
+
         except Exception as e:
             logger.error(f"Error notifying strain add: {e}")
-    
-    def notify_sovereign_lineage_set(self, strain_name: str, sovereign_lineage: str, 
+
+    def notify_sovereign_lineage_set(self, strain_name: str, sovereign_lineage: str,
                                    user_id: Optional[str] = None) -> None:
         """Notify all sessions of a sovereign lineage being set."""
         try:
-            record_database_change(
+            self._submit(
                 change_type='sovereign_lineage_set',
                 entity_id=strain_name,
                 entity_type='strain',
@@ -125,64 +279,67 @@ class DatabaseNotifier:
                 details={
                     'sovereign_lineage': sovereign_lineage,
                     'strain_name': strain_name
-                }
+                },
+                handler_args=(strain_name, sovereign_lineage)
             )
-            
-            self._notify_with_timeout('sovereign_lineage_set', strain_name, sovereign_lineage)
-            
-            logger.info(f"Notified all sessions of sovereign lineage set: {strain_name} -> {sovereign_lineage}")
-            
+            logger.debug(f"Queued sovereign lineage notification: {strain_name} -> {sovereign_lineage}")
+
         except Exception as e:
             logger.error(f"Error notifying sovereign lineage set: {e}")
-    
+
     def notify_database_refresh(self, reason: str, user_id: Optional[str] = None) -> None:
         """Notify all sessions that the database has been refreshed."""
         try:
-            record_database_change(
+            self._submit(
                 change_type='database_refresh',
                 entity_id='database',
                 entity_type='system',
                 user_id=user_id,
-                details={'reason': reason}
+                details={'reason': reason},
+                handler_args=(reason,)
             )
-            
-            self._notify_with_timeout('database_refresh', reason)
-            
-            logger.info(f"Notified all sessions of database refresh: {reason}")
-            
+            logger.debug(f"Queued database refresh notification: {reason}")
+
         except Exception as e:
             logger.error(f"Error notifying database refresh: {e}")
 
 # Global database notifier instance
 _database_notifier = None
+_database_notifier_lock = threading.Lock()
 
 def get_database_notifier() -> DatabaseNotifier:
     """Get the global database notifier instance."""
     global _database_notifier
     if _database_notifier is None:
-        _database_notifier = DatabaseNotifier()
+        with _database_notifier_lock:
+            if _database_notifier is None:
+                _database_notifier = DatabaseNotifier()
     return _database_notifier
 
-def notify_lineage_update(strain_name: str, old_lineage: str, new_lineage: str, 
+def notify_lineage_update(strain_name: str, old_lineage: str, new_lineage: str,
                          user_id: Optional[str] = None) -> None:
     """Notify all sessions of a lineage update."""
     get_database_notifier().notify_lineage_update(strain_name, old_lineage, new_lineage, user_id)
 
-def notify_product_update(product_name: str, product_data: Dict[str, Any], 
+def notify_batch_lineage_update(changes: List[Dict[str, Any]], user_id: Optional[str] = None) -> None:
+    """Notify all sessions of many lineage updates with a single change entry."""
+    get_database_notifier().notify_batch_lineage_update(changes, user_id)
+
+def notify_product_update(product_name: str, product_data: Dict[str, Any],
                          user_id: Optional[str] = None) -> None:
     """Notify all sessions of a product update."""
     get_database_notifier().notify_product_update(product_name, product_data, user_id)
 
-def notify_strain_add(strain_name: str, strain_data: Dict[str, Any], 
+def notify_strain_add(strain_name: str, strain_data: Dict[str, Any],
                      user_id: Optional[str] = None) -> None:
     """Notify all sessions of a new strain being added."""
     get_database_notifier().notify_strain_add(strain_name, strain_data, user_id)
 
-def notify_sovereign_lineage_set(strain_name: str, sovereign_lineage: str, 
+def notify_sovereign_lineage_set(strain_name: str, sovereign_lineage: str,
                                user_id: Optional[str] = None) -> None:
     """Notify all sessions of a sovereign lineage being set."""
     get_database_notifier().notify_sovereign_lineage_set(strain_name, sovereign_lineage, user_id)
 
 def notify_database_refresh(reason: str, user_id: Optional[str] = None) -> None:
     """Notify all sessions that the database has been refreshed."""
-    get_database_notifier().notify_database_refresh(reason, user_id) 
\ No newline at end of file
+    get_database_notifier().notify_database_refresh(reason, user_id)
@@ -28,6 +28,14 @@ from fuzzywuzzy import fuzz
 import jellyfish
 from collections import defaultdict
 
+# Batched inference tuning
+DEFAULT_CANDIDATE_K = 200   # DB candidates scored per JSON product in the batched path
+BATCH_CHUNK_ROWS = 64       # JSON products per candidate-selection chunk (bounds dense matrix memory)
+MATCH_THRESHOLD = 0.3
+MAX_MATCHES_PER_PRODUCT = 10
+# idf of an n-gram present in only one document of a two-document TF-IDF fit (smooth_idf=True)
+_SINGLE_DOC_IDF = np.log(3.0 / 2.0) + 1.0
+
 @dataclass
 class MatchFeatures:
     """Features extracted for ML-based matching"""
@@ -136,6 +144,174 @@ class FeatureExtractor:
             phonetic_similarity=phonetic_sim
         )
     
+    def build_profile(self, product: Dict, is_json: bool) -> Dict[str, Any]:
+        """Pre-extract everything the pairwise features need from one product, once."""
+        if is_json:
+            name = str(product.get('inventory_name', ''))
+            vendor = str(product.get('vendor_name', '')).lower().strip()
+            brand = str(product.get('brand_name', '')).lower().strip()
+            product_type = str(product.get('inventory_type', '')).lower()
+        else:
+            name = str(product.get('Product Name*', ''))
+            vendor = str(product.get('Vendor/Supplier*', '') or product.get('Vendor', '')).lower().strip()
+            brand = str(product.get('Product Brand', '')).lower().strip()
+            product_type = str(product.get('Product Type', '') or product.get('Type', '')).lower()
+        try:
+            soundex = jellyfish.soundex(name) if name else None
+        except Exception:
+            soundex = None
+        return {
+            'name': name,
+            'name_lower': name.lower(),
+            'weight': self._extract_weight(name),
+            'price': self._extract_price(product),
+            'vendor': vendor,
+            'brand': brand,
+            'type': product_type,
+            'cannabinoids': self._extract_cannabinoids(product),
+            'soundex': soundex
+        }
+
+    def _pairwise_name_matrices(self, json_names: List[str], db_names: List[str]):
+        """
+        Semantic (two-document TF-IDF cosine) and token-overlap similarity for every name pair.
+
+        The pairwise path fits a fresh TfidfVectorizer on each pair; there an n-gram has idf 1
+        when both names contain it and ln(3/2)+1 otherwise, so the same cosine can be computed
+        for all pairs from shared count matrices with three sparse products.
+        """
+        from scipy import sparse
+
+        counter = CountVectorizer(ngram_range=(1, 2), lowercase=True)
+        try:
+            counter.fit([n for n in json_names + db_names if n])
+            A = counter.transform(json_names).astype(np.float64)
+            B = counter.transform(db_names).astype(np.float64)
+        except ValueError:  # empty vocabulary
+            A = sparse.csr_matrix((len(json_names), 1))
+            B = sparse.csr_matrix((len(db_names), 1))
+
+        c2 = _SINGLE_DOC_IDF ** 2
+        dot = (A @ B.T).toarray()
+        a_shared = (A.multiply(A) @ (B > 0).astype(np.float64).T).toarray()
+        b_shared = ((A > 0).astype(np.float64) @ B.multiply(B).T).toarray()
+        a_sq = np.asarray(A.multiply(A).sum(axis=1)).reshape(-1, 1)
+        b_sq = np.asarray(B.multiply(B).sum(axis=1)).reshape(1, -1)
+        a_norm = c2 * a_sq - (c2 - 1.0) * a_shared
+        b_norm = c2 * b_sq - (c2 - 1.0) * b_shared
+        with np.errstate(divide='ignore', invalid='ignore'):
+            semantic = np.where(dot > 0, dot / np.sqrt(a_norm * b_norm), 0.0)
+
+        vocab: Dict[str, int] = {}
+        def token_matrix(names):
+            rows, cols = [], []
+            for i, name in enumerate(names):
+                for token in set(name.lower().split()):
+                    rows.append(i)
+                    cols.append(vocab.setdefault(token, len(vocab)))
+            return rows, cols
+        j_rows, j_cols = token_matrix(json_names)
+        d_rows, d_cols = token_matrix(db_names)
+        width = max(1, len(vocab))
+        TJ = sparse.csr_matrix((np.ones(len(j_rows)), (j_rows, j_cols)), shape=(len(json_names), width))
+        TD = sparse.csr_matrix((np.ones(len(d_rows)), (d_rows, d_cols)), shape=(len(db_names), width))
+        inter = (TJ @ TD.T).toarray()
+        union = np.asarray(TJ.sum(axis=1)).reshape(-1, 1) + np.asarray(TD.sum(axis=1)).reshape(1, -1) - inter
+        with np.errstate(divide='ignore', invalid='ignore'):
+            overlap = np.where(union > 0, inter / union, 0.0)
+        return semantic, overlap
+
+    def extract_batch_features(self, json_profiles: List[Dict], db_profiles: List[Dict],
+                               candidate_k: Optional[int] = DEFAULT_CANDIDATE_K) -> Tuple[List[Tuple[int, int]], np.ndarray]:
+        """
+        Feature matrix for the top-K candidate DB products of each JSON product.
+
+        Candidates are ranked by semantic similarity plus token overlap, computed for all
+        pairs at once; candidate_k=None scores every pair. Rows follow the column order of
+        the pairwise feature vector, so they can be fed straight to the scaler and models.
+        """
+        pairs: List[Tuple[int, int]] = []
+        rows: List[List[float]] = []
+        if not json_profiles or not db_profiles:
+            return pairs, np.zeros((0, 12))
+
+        db_names = [p['name'] for p in db_profiles]
+        db_lengths = np.array([len(n) for n in db_names], dtype=np.float64)
+        fuzz_cache: Dict[Tuple[str, str], float] = {}
+
+        def cached_ratio(a: str, b: str) -> float:
+            key = (a, b)
+            if key not in fuzz_cache:
+                fuzz_cache[key] = fuzz.ratio(a, b) / 100.0
+            return fuzz_cache[key]
+
+        for start in range(0, len(json_profiles), BATCH_CHUNK_ROWS):
+            chunk = json_profiles[start:start + BATCH_CHUNK_ROWS]
+            semantic, overlap = self._pairwise_name_matrices([p['name'] for p in chunk], db_names)
+            if candidate_k is not None and candidate_k < len(db_profiles):
+                prefilter = semantic + overlap
+                candidates = np.sort(np.argpartition(-prefilter, candidate_k - 1, axis=1)[:, :candidate_k], axis=1)
+            else:
+                candidates = np.tile(np.arange(len(db_profiles)), (len(chunk), 1))
+
+            for offset, jp in enumerate(chunk):
+                i = start + offset
+                json_name = jp['name']
+                for j in candidates[offset]:
+                    dp = db_profiles[j]
+                    db_name = dp['name']
+                    both_names = bool(json_name) and bool(db_name)
+
+                    weight_sim = 0.5
+                    if jp['weight'] and dp['weight']:
+                        weight_sim = min(jp['weight'], dp['weight']) / max(jp['weight'], dp['weight'])
+
+                    price_sim = 0.5
+                    if jp['price'] and dp['price']:
+                        max_price = max(jp['price'], dp['price'])
+                        ratio = min(jp['price'], dp['price']) / max_price
+                        price_sim = 1.0 if ratio > 0.8 else 0.8 if ratio > 0.6 else ratio
+
+                    vendor_sim = cached_ratio(jp['vendor'], dp['vendor']) if jp['vendor'] and dp['vendor'] else 0.5
+                    brand_sim = cached_ratio(jp['brand'], dp['brand']) if jp['brand'] and dp['brand'] else 0.5
+                    if not jp['type'] or not dp['type']:
+                        type_sim = 0.5
+                    elif jp['type'] == dp['type']:
+                        type_sim = 1.0
+                    else:
+                        type_sim = cached_ratio(jp['type'], dp['type'])
+
+                    cannabinoid_sim = 0.5
+                    if jp['cannabinoids'] and dp['cannabinoids']:
+                        sims = []
+                        for cannabinoid in ('thc', 'cbd', 'thca', 'cbda'):
+                            a = jp['cannabinoids'].get(cannabinoid, 0)
+                            b = dp['cannabinoids'].get(cannabinoid, 0)
+                            if a == 0 and b == 0:
+                                sims.append(1.0)
+                            elif a == 0 or b == 0:
+                                sims.append(0.0)
+                            else:
+                                sims.append(min(a, b) / max(a, b))
+                        cannabinoid_sim = float(np.mean(sims))
+
+                    if both_names:
+                        text_sim = self._calculate_text_similarity(json_name, db_name)
+                        length_sim = min(len(json_name), db_lengths[j]) / max(len(json_name), db_lengths[j])
+                        distance = jellyfish.levenshtein_distance(jp['name_lower'], dp['name_lower'])
+                        edit_sim = 1.0 - distance / max(len(json_name), len(db_name))
+                        phonetic = 1.0 if jp['soundex'] is not None and jp['soundex'] == dp['soundex'] else 0.0
+                        semantic_sim = semantic[offset, j]
+                        overlap_sim = overlap[offset, j]
+                    else:
+                        text_sim = length_sim = edit_sim = phonetic = semantic_sim = overlap_sim = 0.0
+
+                    pairs.append((i, int(j)))
+                    rows.append([text_sim, semantic_sim, weight_sim, price_sim, vendor_sim, brand_sim,
+                                 type_sim, cannabinoid_sim, length_sim, overlap_sim, edit_sim, phonetic])
+
+        return pairs, np.array(rows, dtype=np.float64).reshape(-1, 12)
+
     def _calculate_text_similarity(self, text1: str, text2: str) -> float:
         """Calculate comprehensive text similarity"""
         if not text1 or not text2:
@@ -545,6 +721,47 @@ class EnsembleMLMatcher:
             model_versions=self.model_versions.copy()
         )
     
+    def predict_batch(self, X: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Ensemble scores and confidences for a whole feature matrix.
+
+        Equivalent to predict_similarity row by row, but the scaler and each
+        model run once on the matrix instead of once per pair.
+        """
+        if len(X) == 0:
+            return np.zeros(0), np.zeros(0)
+        if not self.is_trained:
+            return self._calculate_simple_scores(X), np.full(len(X), 0.6)
+
+        X_scaled = self.scaler.transform(X)
+        predictions = []
+        for name, model in self.models.items():
+            try:
+                predictions.append(np.clip(model.predict(X_scaled), 0, 1))
+            except Exception as e:
+                logging.warning(f"Model {name} batch prediction failed: {e}")
+
+        if not predictions:
+            return self._calculate_simple_scores(X), np.full(len(X), 0.5)
+
+        P = np.vstack(predictions)
+        weights = [0.4, 0.4, 0.2] if len(predictions) >= 3 else [0.5] * len(predictions)
+        scores = np.average(P, axis=0, weights=weights[:len(predictions)])
+        if len(predictions) > 1:
+            confidences = np.maximum(0.5, 1.0 - (np.std(P, axis=0) * 2))
+        else:
+            confidences = np.full(len(X), 0.7)
+        return scores, confidences
+
+    def _calculate_simple_scores(self, X: np.ndarray) -> np.ndarray:
+        """Vectorized _calculate_simple_score over feature-vector rows."""
+        weights = np.array([0.25, 0.20, 0.15, 0.05, 0.10, 0.10, 0.08, 0.07, 0.0, 0.0, 0.0, 0.0])
+        return np.clip(X @ weights, 0.0, 1.0)
+
+    def _vector_to_features(self, vector: np.ndarray) -> MatchFeatures:
+        """Inverse of _features_to_vector."""
+        return MatchFeatures(*(float(v) for v in vector))
+
     def _features_to_vector(self, features: MatchFeatures) -> np.ndarray:
         """Convert features object to numpy vector"""
         return np.array([
@@ -653,10 +870,24 @@ class EnhancedAIProductMatcher:
         self.performance_stats = defaultdict(list)
         
     def match_products(self, json_products: List[Dict], db_products: List[Dict], 
-                      strategy: str = "ml_enhanced") -> List[EnhancedMatchResult]:
-        """Match products using enhanced AI algorithms"""
+                      strategy: str = "ml_enhanced", batch: bool = True,
+                      candidate_k: Optional[int] = DEFAULT_CANDIDATE_K) -> List[EnhancedMatchResult]:
+        """Match products using enhanced AI algorithms.
+        
+        The batched path scores the top candidate_k DB products per JSON product
+        (all of them when candidate_k is None) with matrix inference; batch=False
+        keeps the original pair-by-pair loop.
+        """
         
         start_time = time.perf_counter()
+        if batch:
+            all_matches = self._match_products_batched(json_products, db_products, strategy, candidate_k)
+            total_time = time.perf_counter() - start_time
+            self.performance_stats['total_processing_time'].append(total_time)
+            self.performance_stats['products_processed'].append(len(json_products))
+            logging.info(f"Enhanced AI matching (batched) completed: {len(all_matches)} matches in {total_time:.3f}s")
+            return all_matches
+        
         all_matches = []
         
         for json_product in json_products:
@@ -669,12 +900,12 @@ class EnhancedAIProductMatcher:
                     # Fallback to feature-based matching
                     match_result = self._feature_based_match(json_product, db_product)
                 
-                if match_result.score > 0.3:  # Minimum threshold
+                if match_result.score > MATCH_THRESHOLD:  # Minimum threshold
                     product_matches.append(match_result)
             
             # Sort by score and keep top matches
             product_matches.sort(key=lambda x: x.score, reverse=True)
-            all_matches.extend(product_matches[:10])  # Top 10 per product
+            all_matches.extend(product_matches[:MAX_MATCHES_PER_PRODUCT])  # Top 10 per product
         
         total_time = time.perf_counter() - start_time
         self.performance_stats['total_processing_time'].append(total_time)
@@ -684,6 +915,48 @@ class EnhancedAIProductMatcher:
         
         return all_matches
     
+    def _match_products_batched(self, json_products: List[Dict], db_products: List[Dict],
+                                strategy: str, candidate_k: Optional[int]) -> List[EnhancedMatchResult]:
+        """Batched equivalent of the pairwise loop in match_products."""
+        extractor = self.ensemble_matcher.feature_extractor
+        start = time.perf_counter()
+        json_profiles = [extractor.build_profile(p, is_json=True) for p in json_products]
+        db_profiles = [extractor.build_profile(p, is_json=False) for p in db_products]
+        pairs, X = extractor.extract_batch_features(json_profiles, db_profiles, candidate_k)
+        
+        if strategy == "ml_enhanced":
+            scores, confidences = self.ensemble_matcher.predict_batch(X)
+            model_versions = self.ensemble_matcher.model_versions
+            per_pair_time = (time.perf_counter() - start) / max(1, len(pairs))
+        else:
+            scores = self.ensemble_matcher._calculate_simple_scores(X)
+            confidences = np.full(len(X), 0.6)
+            model_versions = {"fallback": "v1.0"}
+            per_pair_time = 0.0
+        
+        # Pairs are grouped by JSON product in DB order, so a stable sort matches the pairwise ordering
+        by_product: Dict[int, List[int]] = defaultdict(list)
+        for row, (i, _) in enumerate(pairs):
+            if scores[row] > MATCH_THRESHOLD:
+                by_product[i].append(row)
+        
+        all_matches = []
+        for i in range(len(json_products)):
+            rows = sorted(by_product.get(i, []), key=lambda r: scores[r], reverse=True)[:MAX_MATCHES_PER_PRODUCT]
+            for row in rows:
+                features = self.ensemble_matcher._vector_to_features(X[row])
+                score = float(scores[row])
+                all_matches.append(EnhancedMatchResult(
+                    score=score,
+                    confidence=float(confidences[row]),
+                    match_data=db_products[pairs[row][1]],
+                    features=features,
+                    explanation=self.ensemble_matcher._generate_explanation(features, score),
+                    processing_time=per_pair_time,
+                    model_versions=model_versions.copy()
+                ))
+        return all_matches
+    
     def _feature_based_match(self, json_product: Dict, db_product: Dict) -> EnhancedMatchResult:
         """Fallback feature-based matching"""
         features = self.ensemble_matcher.feature_extractor.extract_comprehensive_features(
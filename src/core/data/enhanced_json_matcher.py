@@ -18,17 +18,16 @@ Key Improvements:
 7. Performance profiling and optimization
 """
 
+import os
 import re
-import json
 import logging
 import time
 import hashlib
+import threading
 import multiprocessing
-import requests
-import base64
 from datetime import datetime, timedelta
 from typing import List, Dict, Set, Optional, Tuple, Any, Union
-from collections import defaultdict, Counter
+from collections import defaultdict, Counter, OrderedDict
 from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
 from functools import lru_cache, wraps
 import pandas as pd
@@ -43,14 +42,17 @@ import jellyfish
 try:
     from sklearn.feature_extraction.text import TfidfVectorizer  # type: ignore
     from sklearn.metrics.pairwise import cosine_similarity  # type: ignore
-    from sklearn.preprocessing import StandardScaler  # type: ignore
+    from sklearn.preprocessing import StandardScaler, normalize  # type: ignore
     from scipy.spatial.distance import euclidean, cosine  # type: ignore
+    import joblib  # type: ignore
     _SKLEARN_AVAILABLE = True
 except Exception as _e:
     logging.warning(f"EnhancedJSONMatcher: scikit-learn not available, disabling semantic/ML features: {_e}")
     TfidfVectorizer = None  # type: ignore
     cosine_similarity = None  # type: ignore
     StandardScaler = None  # type: ignore
+    normalize = None  # type: ignore
+    joblib = None  # type: ignore
     try:
         from scipy.spatial.distance import euclidean, cosine  # type: ignore
     except Exception:
@@ -63,6 +65,17 @@ from .field_mapping import get_canonical_field
 from .product_database import ProductDatabase
 from .ai_product_matcher import AIProductMatcher
 from .advanced_matcher import AdvancedMatcher, MatchResult
+from .manifest_fetcher import get_manifest_fetcher
+from src.core.utils.metrics import get_metrics_registry, timed_stage
+
+# TF-IDF candidate retrieval tuning
+RETRIEVAL_TOP_K = 100          # database candidates passed to the type-specific matchers per JSON item
+RETRIEVAL_CHUNK_ROWS = 256     # JSON items per dense similarity block (bounds memory)
+RETRIEVAL_MEMORY_INDEXES = 4   # fitted indexes kept in memory per process
+RETRIEVAL_DISK_INDEXES = 4     # persisted indexes kept on disk
+RETRIEVAL_CACHE_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))), 'cache')
+TFIDF_PARAMS = {'max_features': 1000, 'ngram_range': (1, 2), 'stop_words': 'english', 'lowercase': True}
 
 class MatchStrategy(Enum):
     """Different matching strategies for different product types"""
@@ -109,6 +122,7 @@ class PerformanceProfiler:
                 
                 execution_time = end_time - start_time
                 self.timing_data[func_name].append(execution_time)
+                get_metrics_registry().observe('matcher_function_duration_seconds', execution_time, {'function': func_name})
                 
                 # Log slow operations
                 if execution_time > 1.0:  # Log operations taking more than 1 second
@@ -165,7 +179,9 @@ class SmartCache:
             del self.cache[key]
             if key in self.access_order:
                 self.access_order.remove(key)
+            get_metrics_registry().cache_miss('smart_cache')
             return None
+        get_metrics_registry().cache_hit('smart_cache')
             
         # Update access tracking
         entry.access_count += 1
@@ -215,6 +231,162 @@ class SmartCache:
                 
         return len(keys_to_remove)
 
+class TfidfRetrievalIndex:
+    """
+    L2-normalized TF-IDF matrix over the database product names.
+
+    Rows align with the product list the index was built from. Answering a
+    whole manifest is one sparse matrix multiply plus an argpartition top-K,
+    so the expensive matchers only see K candidates per item. Fitted indexes
+    are kept in memory and persisted under cache/ keyed by an inventory
+    fingerprint, so warm workers and restarted processes skip refitting.
+    """
+
+    _memory: "OrderedDict[str, TfidfRetrievalIndex]" = OrderedDict()
+    _memory_lock = threading.Lock()
+
+    def __init__(self, vectorizer, matrix, fingerprint: str):
+        self.vectorizer = vectorizer
+        self.matrix = matrix
+        self.fingerprint = fingerprint
+
+    @property
+    def size(self) -> int:
+        return self.matrix.shape[0]
+
+    @staticmethod
+    def inventory_fingerprint(names: List[str]) -> str:
+        """Hash of the normalized names and vectorizer settings."""
+        digest = hashlib.sha1(repr(sorted(TFIDF_PARAMS.items())).encode())
+        digest.update(str(len(names)).encode())
+        for name in names:
+            digest.update(b'\0')
+            digest.update(name.encode('utf-8', 'replace'))
+        return digest.hexdigest()[:20]
+
+    @classmethod
+    def build(cls, names: List[str], cache_dir: Optional[str] = None) -> Optional['TfidfRetrievalIndex']:
+        """Return the index for these names, loading a persisted one when the inventory is unchanged.
+
+        cache_dir defaults to RETRIEVAL_CACHE_DIR; pass '' to skip persistence.
+        """
+        if not _SKLEARN_AVAILABLE or TfidfVectorizer is None or not names:
+            return None
+        cache_dir = RETRIEVAL_CACHE_DIR if cache_dir is None else cache_dir
+        fingerprint = cls.inventory_fingerprint(names)
+        metrics = get_metrics_registry()
+
+        with cls._memory_lock:
+            index = cls._memory.get(fingerprint)
+            if index is not None:
+                cls._memory.move_to_end(fingerprint)
+                metrics.cache_hit('tfidf_index')
+                return index
+
+        index = cls._load(fingerprint, cache_dir) if cache_dir else None
+        if index is not None:
+            metrics.cache_hit('tfidf_index')
+        else:
+            metrics.cache_miss('tfidf_index')
+            start_time = time.perf_counter()
+            vectorizer = TfidfVectorizer(**TFIDF_PARAMS)
+            try:
+                matrix = vectorizer.fit_transform(names)
+            except ValueError as e:  # empty vocabulary
+                logging.warning(f"TF-IDF retrieval index not built: {e}")
+                return None
+            index = cls(vectorizer, normalize(matrix, norm='l2', copy=False).tocsr(), fingerprint)
+            logging.info(f"Fitted TF-IDF retrieval index over {len(names)} products "
+                         f"in {time.perf_counter() - start_time:.3f}s")
+            if cache_dir:
+                index._save(cache_dir)
+
+        with cls._memory_lock:
+            cls._memory[fingerprint] = index
+            while len(cls._memory) > RETRIEVAL_MEMORY_INDEXES:
+                cls._memory.popitem(last=False)
+        return index
+
+    @staticmethod
+    def _path(cache_dir: str, fingerprint: str) -> str:
+        return os.path.join(cache_dir, f'tfidf_index_{fingerprint}.joblib')
+
+    @classmethod
+    def _load(cls, fingerprint: str, cache_dir: str) -> Optional['TfidfRetrievalIndex']:
+        path = cls._path(cache_dir, fingerprint)
+        if not os.path.exists(path):
+            return None
+        try:
+            data = joblib.load(path)
+            if data.get('fingerprint') != fingerprint:
+                return None
+            logging.info(f"Loaded TF-IDF retrieval index {fingerprint} from {path}")
+            return cls(data['vectorizer'], data['matrix'], fingerprint)
+        except Exception as e:
+            logging.warning(f"Could not load TF-IDF retrieval index {path}: {e}")
+            return None
+
+    def _save(self, cache_dir: str) -> None:
+        path = self._path(cache_dir, self.fingerprint)
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            joblib.dump({'fingerprint': self.fingerprint, 'vectorizer': self.vectorizer, 'matrix': self.matrix}, tmp_path)
+            os.replace(tmp_path, path)  # atomic, so concurrent workers never read a partial file
+            persisted = sorted(
+                (os.path.join(cache_dir, f) for f in os.listdir(cache_dir)
+                 if f.startswith('tfidf_index_') and f.endswith('.joblib')),
+                key=os.path.getmtime, reverse=True)
+            for stale in persisted[RETRIEVAL_DISK_INDEXES:]:
+                os.remove(stale)
+        except Exception as e:
+            logging.warning(f"Could not persist TF-IDF retrieval index to {path}: {e}")
+
+    def top_k(self, query_names: List[str], k: int = RETRIEVAL_TOP_K,
+              allowed: Optional[List[Optional[np.ndarray]]] = None) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Top-K rows by cosine similarity for every query at once.
+
+        allowed optionally restricts each query to an array of row indices
+        (queries sharing the same array object are scored together).
+        Returns (row indices, similarities) per query, best first.
+        """
+        results: List[Tuple[np.ndarray, np.ndarray]] = [None] * len(query_names)
+        if not query_names:
+            return results
+        queries = normalize(self.vectorizer.transform(query_names), norm='l2', copy=False)
+        similarities = (queries @ self.matrix.T).tocsr()
+
+        groups: Dict[int, List[int]] = OrderedDict()
+        for row in range(len(query_names)):
+            rows_allowed = allowed[row] if allowed is not None else None
+            groups.setdefault(id(rows_allowed), []).append(row)
+
+        for rows in groups.values():
+            columns = allowed[rows[0]] if allowed is not None else None
+            width = self.size if columns is None else len(columns)
+            kk = min(k, width)
+            for start in range(0, len(rows), RETRIEVAL_CHUNK_ROWS):
+                chunk = rows[start:start + RETRIEVAL_CHUNK_ROWS]
+                if kk <= 0:
+                    for row in chunk:
+                        results[row] = (np.empty(0, dtype=np.intp), np.empty(0))
+                    continue
+                block = similarities[chunk]
+                if columns is not None:
+                    block = block[:, columns]
+                dense = block.toarray()
+                top = np.argpartition(-dense, kk - 1, axis=1)[:, :kk]
+                top_scores = np.take_along_axis(dense, top, axis=1)
+                order = np.argsort(-top_scores, axis=1, kind='stable')
+                top = np.take_along_axis(top, order, axis=1)
+                top_scores = np.take_along_axis(top_scores, order, axis=1)
+                if columns is not None:
+                    top = columns[top]
+                for i, row in enumerate(chunk):
+                    results[row] = (top[i], top_scores[i])
+        return results
+
 class ProductTypeSpecificMatcher:
     """Specialized matching strategies for different product types"""
     
@@ -948,6 +1120,8 @@ class EnhancedJSONMatcher:
         # ML components (only if sklearn is available)
         self.tfidf_vectorizer = None
         self.product_embeddings = None
+        self.retrieval_index = None
+        self._retrieval_products = None  # database product list the index rows align with
         self.scaler = StandardScaler() if _SKLEARN_AVAILABLE and StandardScaler is not None else None
         
         # Threading
@@ -1404,50 +1578,100 @@ class EnhancedJSONMatcher:
                 
         return False
         
-    def _build_ml_models(self):
-        """Build machine learning models for enhanced matching"""
-        if not self.excel_processor or self.excel_processor.df is None or self.excel_processor.df.empty:
-            return
-            
+    def _build_ml_models(self, database_products: Optional[List[Dict]] = None):
+        """Build (or load) the TF-IDF retrieval index over the database products"""
         if not _SKLEARN_AVAILABLE or TfidfVectorizer is None:
             logging.info("Skipping ML model build (scikit-learn unavailable)")
             return
-        logging.info("Building ML models for enhanced matching...")
-        start_time = time.perf_counter()
-        
-        try:
-            df = self.excel_processor.df
-            
-            # Get product names for TF-IDF
-            product_names = []
-            for col in ["Product Name*", "ProductName", "Description"]:
-                if col in df.columns:
-                    names = df[col].dropna().astype(str).tolist()
-                    product_names.extend(names)
-                    break
             
-            if not product_names:
+        try:
+            if database_products is None:
+                database_products = self._get_database_products()
+            if not database_products:
                 logging.warning("No product names found for ML model building")
                 return
+            if database_products is self._retrieval_products and self.retrieval_index is not None:
+                return
                 
-            # Build TF-IDF model
-            self.tfidf_vectorizer = TfidfVectorizer(
-                max_features=1000,
-                ngram_range=(1, 2),
-                stop_words='english',
-                lowercase=True
-            )
-            
-            # Normalize product names
-            normalized_names = [self._normalize_text(name) for name in product_names]
-            self.product_embeddings = self.tfidf_vectorizer.fit_transform(normalized_names)
-            
-            build_time = time.perf_counter() - start_time
-            logging.info(f"ML models built successfully in {build_time:.3f}s")
+            # Index rows must align with database_products so retrieval can map back to products
+            normalized_names = [
+                self._normalize_text(str(product.get('Product Name*') or product.get('ProductName') or product.get('Description') or ''))
+                for product in database_products
+            ]
+            index = TfidfRetrievalIndex.build(normalized_names)
+            if index is None:
+                return
+                
+            self.retrieval_index = index
+            self._retrieval_products = database_products
+            self.tfidf_vectorizer = index.vectorizer
+            self.product_embeddings = index.matrix
+            logging.info(f"ML models ready: TF-IDF index {index.fingerprint} over {index.size} products")
             
         except Exception as e:
             logging.error(f"Error building ML models: {e}")
             
+    def _vendor_filter_indices(self, json_vendor: str, database_products: List[Dict]) -> List[int]:
+        """Indices of database products whose vendor matches the normalized JSON vendor"""
+        indices = []
+        for i, db_product in enumerate(database_products):
+            raw_db_vendor = str(db_product.get('Vendor/Supplier*', '') or db_product.get('Vendor', '') or db_product.get('Product Brand', ''))
+            db_vendor = self._normalize_vendor(raw_db_vendor)
+            
+            # Check for exact vendor match or partial match
+            if (json_vendor == db_vendor or 
+                (json_vendor and db_vendor and (json_vendor in db_vendor or db_vendor in json_vendor)) or
+                self._vendors_match(json_vendor, db_vendor)):
+                indices.append(i)
+        return indices
+        
+    def _ensure_vendor(self, json_product: Dict) -> None:
+        """Extract vendor information from the product name if not present"""
+        if not json_product.get('vendor') or json_product.get('vendor') == 'NO_VENDOR':
+            product_name = self._get_product_name(json_product) or json_product.get('product_name', '')
+            if product_name:
+                extracted_vendor = self._extract_vendor(product_name)
+                if extracted_vendor:
+                    json_product['vendor'] = extracted_vendor
+                    logging.debug(f"🔍 VENDOR EXTRACTION: '{product_name}' -> vendor: '{extracted_vendor}'")
+                    
+    def _retrieve_candidates(self, json_data: List[Dict], database_products: List[Dict],
+                             k: Optional[int] = None) -> List[Optional[Tuple[List[Dict], np.ndarray]]]:
+        """
+        TF-IDF top-K candidates for every JSON item in one pass.
+        
+        Each item is restricted to its vendor's products (or all products when the
+        vendor is unknown), like the per-item vendor filter. Items with no lexical
+        overlap get None and fall back to scanning their vendor-filtered products.
+        """
+        if self.retrieval_index is None or database_products is not self._retrieval_products:
+            return [None] * len(json_data)
+        k = k or RETRIEVAL_TOP_K
+            
+        with get_metrics_registry().timer('matcher_retrieval_seconds'):
+            vendor_rows: Dict[str, Optional[np.ndarray]] = {}
+            allowed = []
+            for json_product in json_data:
+                self._ensure_vendor(json_product)
+                json_vendor = self._normalize_vendor(json_product.get('vendor', ''))
+                if json_vendor not in vendor_rows:
+                    indices = self._vendor_filter_indices(json_vendor, database_products) \
+                        if json_vendor and json_vendor != 'no_vendor' else []
+                    vendor_rows[json_vendor] = np.asarray(indices, dtype=np.intp) if indices else None
+                allowed.append(vendor_rows[json_vendor])
+                
+            names = [self._normalize_text(self._get_product_name(p)) for p in json_data]
+            candidates = []
+            for indices, scores in self.retrieval_index.top_k(names, k, allowed):
+                if scores.size == 0 or scores[0] <= 0:
+                    candidates.append(None)
+                else:
+                    candidates.append(([database_products[i] for i in indices], scores))
+                    
+        hits = sum(1 for c in candidates if c is not None)
+        logging.info(f"TF-IDF retrieval: {hits}/{len(json_data)} items narrowed to top-{k} candidates")
+        return candidates
+        
     def match_products(self, json_data: List[Dict], strategy: MatchStrategy = MatchStrategy.HYBRID) -> List[MatchResult]:
         """
         Enhanced product matching with multiple strategies and parallel processing
@@ -1455,10 +1679,6 @@ class EnhancedJSONMatcher:
         if not json_data:
             return []
             
-        # Build ML models if not already built
-        if self.tfidf_vectorizer is None:
-            self._build_ml_models()
-            
         # Cache key for this matching request
         cache_key = self._generate_match_cache_key(json_data, strategy)
         cached_result = self.cache.get(cache_key)
@@ -1469,14 +1689,21 @@ class EnhancedJSONMatcher:
         start_time = time.perf_counter()
         all_matches = []
         
+        # Build (or reuse) the retrieval index for the current inventory, then
+        # narrow every item to its top-K candidates in one pass
+        database_products = self._get_database_products()
+        self._build_ml_models(database_products)
+        candidates = self._retrieve_candidates(json_data, database_products)
+        
         # Process in parallel batches
         batch_size = max(10, len(json_data) // self.max_workers)
-        batches = [json_data[i:i + batch_size] for i in range(0, len(json_data), batch_size)]
+        batches = [(json_data[i:i + batch_size], candidates[i:i + batch_size])
+                   for i in range(0, len(json_data), batch_size)]
         
         with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
             future_to_batch = {
-                executor.submit(self._process_batch, batch, strategy): batch 
-                for batch in batches
+                executor.submit(self._process_batch, batch, strategy, batch_candidates): batch 
+                for batch, batch_candidates in batches
             }
             
             for future in as_completed(future_to_batch):
@@ -1500,60 +1727,54 @@ class EnhancedJSONMatcher:
         
         return filtered_matches
         
-    def _process_batch(self, json_batch: List[Dict], strategy: MatchStrategy) -> List[MatchResult]:
+    def _process_batch(self, json_batch: List[Dict], strategy: MatchStrategy,
+                       candidates: Optional[List[Optional[Tuple[List[Dict], np.ndarray]]]] = None) -> List[MatchResult]:
         """Process a batch of JSON products"""
         batch_matches = []
         
-        for json_product in json_batch:
+        for i, json_product in enumerate(json_batch):
             try:
-                product_matches = self._match_single_product(json_product, strategy)
+                product_candidates = candidates[i] if candidates else None
+                product_matches = self._match_single_product(json_product, strategy, product_candidates)
                 batch_matches.extend(product_matches)
             except Exception as e:
                 logging.error(f"Error matching product {json_product.get('inventory_name', 'unknown')}: {e}")
                 
         return batch_matches
         
-    def _match_single_product(self, json_product: Dict, strategy: MatchStrategy) -> List[MatchResult]:
-        """Match a single JSON product using the specified strategy"""
+    def _match_single_product(self, json_product: Dict, strategy: MatchStrategy,
+                              candidates: Optional[Tuple[List[Dict], np.ndarray]] = None) -> List[MatchResult]:
+        """Match a single JSON product using the specified strategy.
+        
+        candidates are the (products, similarities) retrieved for this item; without
+        them the item is matched against all of its vendor's products.
+        """
         start_time = time.perf_counter()
         
         # CRITICAL FIX: Extract vendor information from product name if not present
-        if not json_product.get('vendor') or json_product.get('vendor') == 'NO_VENDOR':
-            product_name = self._get_product_name(json_product) or json_product.get('product_name', '')
-            if product_name:
-                extracted_vendor = self._extract_vendor(product_name)
-                if extracted_vendor:
-                    json_product['vendor'] = extracted_vendor
-                    logging.debug(f"🔍 VENDOR EXTRACTION: '{product_name}' -> vendor: '{extracted_vendor}'")
+        self._ensure_vendor(json_product)
         
         # Determine product type for specialized matching
         product_type = self._classify_product_type(json_product)
         
-        # Get database products (with caching)
-        database_products = self._get_database_products()
-        
-        # VENDOR RESTRICTION: Filter database products to match the JSON product's vendor
-        json_vendor = self._normalize_vendor(json_product.get('vendor', ''))
-        if json_vendor and json_vendor != 'no_vendor':
-            # Filter database products to only include those from the same vendor
-            vendor_filtered_products = []
-            for db_product in database_products:
-                raw_db_vendor = str(db_product.get('Vendor/Supplier*', '') or db_product.get('Vendor', '') or db_product.get('Product Brand', ''))
-                db_vendor = self._normalize_vendor(raw_db_vendor)
+        candidate_scores = None
+        if candidates is not None:
+            # Retrieval already applied the vendor restriction
+            database_products, candidate_scores = candidates
+        else:
+            # Get database products (with caching)
+            database_products = self._get_database_products()
+            
+            # VENDOR RESTRICTION: Filter database products to match the JSON product's vendor
+            json_vendor = self._normalize_vendor(json_product.get('vendor', ''))
+            if json_vendor and json_vendor != 'no_vendor':
+                vendor_filtered_products = [database_products[i] for i in self._vendor_filter_indices(json_vendor, database_products)]
                 
-                # Check for exact vendor match or partial match
-                if (json_vendor == db_vendor or 
-                    (json_vendor and db_vendor and (json_vendor in db_vendor or db_vendor in json_vendor)) or
-                    self._vendors_match(json_vendor, db_vendor)):
-                    vendor_filtered_products.append(db_product)
-            
-            if vendor_filtered_products:
-                database_products = vendor_filtered_products
-                logging.debug(f"🏢 VENDOR FILTER: Restricted to {len(database_products)} products from vendor '{json_vendor}'")
-            else:
-                logging.warning(f"⚠️ VENDOR FILTER: No products found for vendor '{json_vendor}', using all products")
-        
-        database_products = database_products
+                if vendor_filtered_products:
+                    database_products = vendor_filtered_products
+                    logging.debug(f"🏢 VENDOR FILTER: Restricted to {len(database_products)} products from vendor '{json_vendor}'")
+                else:
+                    logging.warning(f"⚠️ VENDOR FILTER: No products found for vendor '{json_vendor}', using all products")
         
         matches = []
         
@@ -1562,11 +1783,11 @@ class EnhancedJSONMatcher:
         elif strategy == MatchStrategy.FUZZY:
             matches = self._fuzzy_match(json_product, database_products)
         elif strategy == MatchStrategy.SEMANTIC:
-            matches = self._semantic_match(json_product, database_products)
+            matches = self._semantic_match(json_product, database_products, candidate_scores)
         elif strategy == MatchStrategy.ML_ENHANCED:
-            matches = self._ml_enhanced_match(json_product, database_products)
+            matches = self._ml_enhanced_match(json_product, database_products, candidate_scores)
         else:  # HYBRID
-            matches = self._hybrid_match(json_product, database_products, product_type)
+            matches = self._hybrid_match(json_product, database_products, product_type, candidate_scores)
             
         # Set processing time for all matches
         processing_time = time.perf_counter() - start_time
@@ -1575,7 +1796,8 @@ class EnhancedJSONMatcher:
             
         return matches[:50]  # Return top 50 matches per product for maximum results
         
-    def _hybrid_match(self, json_product: Dict, database_products: List[Dict], product_type: str) -> List[MatchResult]:
+    def _hybrid_match(self, json_product: Dict, database_products: List[Dict], product_type: str,
+                      candidate_scores: Optional[np.ndarray] = None) -> List[MatchResult]:
         """Hybrid matching combining multiple strategies"""
         
         # Start with product-type specific matching
@@ -1583,7 +1805,7 @@ class EnhancedJSONMatcher:
         
         # Enhance with semantic similarity if we have ML models
         if self.tfidf_vectorizer and self.product_embeddings is not None:
-            semantic_matches = self._semantic_match(json_product, database_products)
+            semantic_matches = self._semantic_match(json_product, database_products, candidate_scores)
             
             # Combine scores using weighted average
             combined_matches = self._combine_match_results(type_matches, semantic_matches)
@@ -1624,16 +1846,15 @@ class EnhancedJSONMatcher:
         matches = []
         json_name = self._get_product_name(json_product)
         
-        # Get all database product names
-        db_names = [str(db.get('Product Name*', '')) for db in database_products]
+        # Get all database product names, keyed by position so results map straight back
+        db_names = {i: str(db.get('Product Name*', '')) for i, db in enumerate(database_products)}
         
         # Use fuzzywuzzy's process.extract for efficient fuzzy matching
         fuzzy_results = process.extract(json_name, db_names, limit=50, scorer=fuzz.token_sort_ratio)
         
-        for db_name, score in fuzzy_results:
+        for db_name, score, db_index in fuzzy_results:
             if score >= 30:  # Ultra-low fuzzy score threshold for more matches
-                # Find the corresponding database product
-                db_product = next((db for db in database_products if str(db.get('Product Name*', '')) == db_name), None)
+                db_product = database_products[db_index]
                 
                 if db_product:
                     # Calculate additional similarity metrics
@@ -1665,8 +1886,13 @@ class EnhancedJSONMatcher:
                     
         return sorted(matches, key=lambda x: x.score, reverse=True)
         
-    def _semantic_match(self, json_product: Dict, database_products: List[Dict]) -> List[MatchResult]:
-        """Semantic similarity matching using TF-IDF and cosine similarity"""
+    def _semantic_match(self, json_product: Dict, database_products: List[Dict],
+                        candidate_scores: Optional[np.ndarray] = None) -> List[MatchResult]:
+        """Semantic similarity matching using TF-IDF and cosine similarity.
+        
+        candidate_scores are retrieval similarities aligned with database_products;
+        when given they are reused instead of recomputed.
+        """
         if not self.tfidf_vectorizer or self.product_embeddings is None:
             return []
             
@@ -1674,11 +1900,21 @@ class EnhancedJSONMatcher:
         json_name = self._normalize_text(self._get_product_name(json_product))
         
         try:
-            # Transform the JSON product name
-            json_vector = self.tfidf_vectorizer.transform([json_name])
-            
-            # Calculate cosine similarities
-            similarities = cosine_similarity(json_vector, self.product_embeddings).flatten()
+            if candidate_scores is not None:
+                similarities = np.asarray(candidate_scores)
+            else:
+                # Transform the JSON product name
+                json_vector = self.tfidf_vectorizer.transform([json_name])
+                
+                # Embeddings only align with the full indexed list; vectorize a filtered list on the fly
+                if database_products is self._retrieval_products:
+                    embeddings = self.product_embeddings
+                else:
+                    embeddings = self.tfidf_vectorizer.transform(
+                        [self._normalize_text(str(db.get('Product Name*', '') or '')) for db in database_products])
+                
+                # Calculate cosine similarities
+                similarities = cosine_similarity(json_vector, embeddings).flatten()
             
             # Get top similar products
             top_indices = similarities.argsort()[-20:][::-1]  # Top 20
@@ -1701,7 +1937,8 @@ class EnhancedJSONMatcher:
             
         return sorted(matches, key=lambda x: x.score, reverse=True)
         
-    def _ml_enhanced_match(self, json_product: Dict, database_products: List[Dict]) -> List[MatchResult]:
+    def _ml_enhanced_match(self, json_product: Dict, database_products: List[Dict],
+                           candidate_scores: Optional[np.ndarray] = None) -> List[MatchResult]:
         """ML-enhanced matching with feature engineering"""
         # This could include more sophisticated ML models like:
         # - Neural networks for similarity learning
@@ -1709,7 +1946,7 @@ class EnhancedJSONMatcher:
         # - Clustering-based similarity
         
         # For now, combine semantic and fuzzy matching with learned weights
-        semantic_matches = self._semantic_match(json_product, database_products)
+        semantic_matches = self._semantic_match(json_product, database_products, candidate_scores)
         fuzzy_matches = self._fuzzy_match(json_product, database_products)
         
         # Use learned weights (could be trained on historical data)
@@ -1963,6 +2200,7 @@ class EnhancedJSONMatcher:
             logging.warning(f"Error in _extract_vendor: {e}")
             return ""
         
+    @timed_stage('matching')
     def fetch_and_match(self, url: str) -> List[Dict]:
         """
         Fetch JSON from URL and match products using enhanced matching.
@@ -1977,28 +2215,8 @@ class EnhancedJSONMatcher:
         try:
             logging.info(f"EnhancedJSONMatcher: Fetching and matching from URL: {url[:100]}...")
             
-            # Handle data URLs
-            if url.lower().startswith("data:"):
-                if ',' in url:
-                    header, data_part = url.split(',', 1)
-                    if 'base64' in header:
-                        decoded_data = base64.b64decode(data_part).decode('utf-8')
-                        payload = json.loads(decoded_data)
-                    else:
-                        payload = json.loads(data_part)
-                else:
-                    raise ValueError("Invalid data URL format")
-                    
-            else:
-                # Handle HTTP URLs
-                headers = {
-                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-                    'Accept': 'application/json',
-                }
-                
-                response = requests.get(url, headers=headers, timeout=30)
-                response.raise_for_status()
-                payload = response.json()
+            # Data and HTTP URLs both go through the shared fetcher (pooled session, conditional GET, parsed cache)
+            payload = get_manifest_fetcher().fetch_json(url)
                 
             # Extract items from payload
             document_vendor = None  # Extract document-level vendor information
@@ -21,6 +21,15 @@ from src.core.generation.text_processing import (
 from collections import OrderedDict
 from src.core.constants import CLASSIC_TYPES, VALID_CLASSIC_LINEAGES, EXCLUDED_PRODUCT_TYPES, EXCLUDED_PRODUCT_PATTERNS, TYPE_OVERRIDES
 from src.core.utils.common import calculate_text_complexity
+from src.core.utils.normalization import normalize_name, normalize_strain_name
+from src.core.utils.metrics import get_metrics_registry, timed_stage
+from src.core.data.tag_index import PRODUCT_NAME_COLUMNS, TagIdRegistry, TagIndex
+from src.core.data.facet_index import FacetIndex
+from src.core.data.frame_snapshot import FrameSnapshot, get_snapshot_cache
+from src.core.data.inventory_schema import (
+    apply_inventory_schema, display_columns, distinct_values, ensure_categories,
+    numeric_column_name, numeric_values, parse_numeric,
+)
 
 # Configure logging
 logging.basicConfig(
@@ -72,6 +81,9 @@ MAX_STRAINS_FOR_SIMILARITY = 50  # Limit strain similarity processing
 CACHE_SIZE = 128  # Standard cache size
 LINEAGE_BATCH_SIZE = 100  # Batch size for lineage database operations
 
+# Name columns matched by the name-based lineage/DOH edits, in lookup order
+EXACT_NAME_COLUMNS = ('ProductName', 'Product Name*', 'Product Name')
+
 # Optimized helper functions for performance
 def vectorized_string_operations(series, operations):
     """Apply multiple string operations efficiently using vectorized operations."""
@@ -462,18 +474,6 @@ def safe_product_type(product_type):
     return type_str
 
 
-def normalize_name(name):
-    """Normalize product names for robust matching."""
-    if not isinstance(name, str):
-        return ""
-    # Lowercase, strip, replace multiple spaces/hyphens, remove non-breaking hyphens, etc.
-    name = name.lower().strip()
-    name = name.replace('\u2011', '-')  # non-breaking hyphen to normal
-    name = re.sub(r'[-\s]+', ' ', name)  # collapse hyphens and spaces
-    name = re.sub(r'[^\w\s-]', '', name)  # remove non-alphanumeric except hyphen/space
-    return name
-
-
 def is_real_ratio(text: str) -> bool:
     """Check if a string represents a valid ratio format."""
     if not text or not isinstance(text, str):
@@ -530,44 +530,6 @@ def is_weight_with_unit(text: str) -> bool:
     return False
 
 
-def normalize_strain_name(strain):
-    """Normalize strain names for accurate matching."""
-    if not isinstance(strain, str):
-        return ""
-    
-    # Convert to string and clean
-    strain = str(strain).strip()
-    
-    # Skip invalid strains
-    if not strain or strain.lower() in ['mixed', 'unknown', 'n/a', 'none', '']:
-        return ""
-    
-    # Normalize the strain name
-    strain = strain.lower()
-    
-    # Remove common prefixes/suffixes that don't affect strain identity
-    strain = re.sub(r'^(strain|variety|cultivar)\s+', '', strain)
-    strain = re.sub(r'\s+(strain|variety|cultivar)$', '', strain)
-    
-    # Normalize common abbreviations and variations
-    strain = re.sub(r'\bog\b', 'og kush', strain)  # "OG" -> "OG Kush"
-    strain = re.sub(r'\bblue\s*dream\b', 'blue dream', strain)
-    strain = re.sub(r'\bwhite\s*widow\b', 'white widow', strain)
-    strain = re.sub(r'\bpurple\s*haze\b', 'purple haze', strain)
-    strain = re.sub(r'\bjack\s*herer\b', 'jack herer', strain)
-    strain = re.sub(r'\bnorthern\s*lights\b', 'northern lights', strain)
-    strain = re.sub(r'\bsour\s*diesel\b', 'sour diesel', strain)
-    strain = re.sub(r'\bafghan\s*kush\b', 'afghan kush', strain)
-    strain = re.sub(r'\bcheese\b', 'uk cheese', strain)
-    strain = re.sub(r'\bamnesia\s*haze\b', 'amnesia haze', strain)
-    
-    # Remove extra spaces and normalize punctuation
-    strain = re.sub(r'\s+', ' ', strain)
-    strain = re.sub(r'[^\w\s-]', '', strain)  # Keep only alphanumeric, spaces, and hyphens
-    
-    return strain.strip()
-
-
 def get_strain_similarity(strain1, strain2):
     """Calculate similarity between two strain names. Optimized for performance."""
     if not strain1 or not strain2:
@@ -655,16 +617,50 @@ class ExcelProcessor:
     """Processes Excel files containing product data."""
 
     def __init__(self, store_name='AGT_Bothell'):
+        # Bumped by every assignment of self.df and by in-place edits, so payloads and
+        # indexes built from the data can be invalidated (DataFrame ids get reused)
+        self.data_version = 0
+        # Bumped by assignments and by in-place edits of product names; keys the tag index
+        self._names_version = 0
         self.df = None
         self.dropdown_cache = {}
         self.selected_tags = []
         self.logger = logger
         self._last_loaded_file = None
-        self._file_cache = {}
+        # Process-wide snapshots of processed files, shared with every other processor
+        self._file_cache = get_snapshot_cache()
         self._max_cache_size = 5  # Keep only 5 files in cache
         self._product_db_enabled = True  # Enable product database integration by default
         self._debug_count = 0  # Initialize debug count
         self._store_name = store_name  # Store name for database operations
+        # Tag ids persist for the processor's lifetime; the index is rebuilt when names change
+        self._tag_registry = TagIdRegistry()
+        self._tag_index = None
+        self._tag_index_signature = None
+        # Filter masks and dropdown option counts; rebuilt when data_version changes
+        self._facet_index = None
+        self._facet_index_signature = None
+        # Memory report from the typed schema stage of the last full load
+        self.schema_report = None
+
+    @property
+    def df(self):
+        return self._df
+
+    @df.setter
+    def df(self, value):
+        self._df = value
+        self._names_version += 1
+        self.data_version += 1
+
+    def mark_data_changed(self) -> None:
+        """Record an in-place edit of self.df (assigning self.df is recorded by the setter)."""
+        self.data_version += 1
+
+    def mark_names_changed(self) -> None:
+        """Record an in-place edit of a product name column of self.df."""
+        self._names_version += 1
+        self.mark_data_changed()
 
     def clear_file_cache(self):
         """Clear the file cache to free memory."""
@@ -851,6 +847,7 @@ class ExcelProcessor:
                         # Update lineage in the dataframe for this strain
                         strain_mask = self.df['Product Strain'] == strain_name
                         if strain_mask.any():
+                            ensure_categories(self.df, 'Lineage', [strain_info['sovereign_lineage']])
                             self.df.loc[strain_mask, 'Lineage'] = strain_info['sovereign_lineage']
                             lineage_updates += strain_mask.sum()
                             self.logger.debug(f"[ProductDB] Loaded lineage for '{strain_name}': {strain_info['sovereign_lineage']}")
@@ -885,12 +882,17 @@ class ExcelProcessor:
         
         # Only perform essential processing
         try:
-            # 1. Basic column cleaning
-            self.df = self.df.fillna('')
+            # 1. Basic column cleaning; only columns with gaps, since filling a
+            # gap-free categorical still raises when Copy-on-Write is off
+            gaps = self.df.columns[self.df.isna().any().to_numpy()].unique().tolist()
+            for column in gaps:
+                ensure_categories(self.df, column, [''])
+            self.df = self.df.fillna({column: '' for column in gaps})
             
             # 2. Essential column processing only
             if 'Product Name*' in self.df.columns:
                 self.df['Product Name*'] = self.df['Product Name*'].astype(str).apply(safe_product_name)
+                self.mark_names_changed()
             
             if 'Product Type*' in self.df.columns:
                 self.df['Product Type*'] = self.df['Product Type*'].astype(str).apply(safe_product_type)
@@ -1334,6 +1336,7 @@ class ExcelProcessor:
             self.logger.error(f"Minimal load failed: {e}")
             return False
 
+    @timed_stage('upload_parse')
     def load_file(self, file_path: str) -> bool:
         """Load Excel file and prepare data exactly like MAIN.py. STANDARDIZED for both local and PythonAnywhere."""
         try:
@@ -1371,9 +1374,12 @@ class ExcelProcessor:
             
             if cache_key in self._file_cache:
                 self.logger.debug(f"Using cached data for {file_path}")
-                self.df = self._file_cache[cache_key].copy()
+                get_metrics_registry().cache_hit('excel_file')
+                self.df = self._file_cache[cache_key].view()
                 self._last_loaded_file = file_path
+                self.get_tag_index()
                 return True
+            get_metrics_registry().cache_miss('excel_file')
             
             # Clear previous data to free memory
             if hasattr(self, 'df') and self.df is not None:
@@ -1493,6 +1499,7 @@ class ExcelProcessor:
             else:
                 self.logger.error("No product name column found")
                 self.df["Product Name*"] = "Unknown"
+            self.mark_names_changed()
 
             # 3) Ensure required columns exist
             for col in ["Product Type*", "Lineage", "Product Brand"]:
@@ -1556,6 +1563,7 @@ class ExcelProcessor:
             
             if rename_mapping:
                 self.df.rename(columns=rename_mapping, inplace=True)
+                self.mark_names_changed()
 
             # Handle duplicate columns after renaming
             self.df = handle_duplicate_columns(self.df)
@@ -1760,6 +1768,7 @@ class ExcelProcessor:
                     
                     # Reset index again after operations to prevent duplicate labels
                     self.df.reset_index(drop=True, inplace=True)
+                    self.mark_names_changed()
                 
                 mask_para = self.df["Product Type*"].str.strip().str.lower() == "paraphernalia"
                 self.df.loc[mask_para, "Description"] = (
@@ -2454,19 +2463,6 @@ class ExcelProcessor:
             else:
                 self.logger.debug("Lineage persistence disabled")
 
-            # Optimize memory usage for PythonAnywhere
-            self.logger.debug("Optimizing memory usage for PythonAnywhere")
-            
-            # Convert string columns to categorical where appropriate to save memory
-            categorical_columns = ['Product Type*', 'Lineage', 'Product Brand', 'Vendor', 'Product Strain']
-            for col in categorical_columns:
-                if col in self.df.columns:
-                    # Only convert if the column has reasonable number of unique values
-                    unique_count = self.df[col].nunique()
-                    if unique_count < len(self.df) * 0.5:  # Less than 50% unique values
-                        self.df[col] = self.df[col].astype('category')
-                        self.logger.debug(f"Converted {col} to categorical (unique values: {unique_count})")
-            
             # Final cleanup: remove any remaining duplicate columns
             cols = self.df.columns.tolist()
             unique_cols = []
@@ -2482,6 +2478,9 @@ class ExcelProcessor:
                 self.df = self.df[unique_cols]
                 self.logger.info(f"Final cleanup: removed {len(cols) - len(unique_cols)} duplicate columns")
             
+            # Typed schema: category columns, parsed numeric companions, no empty unused columns
+            self.df, self.schema_report = apply_inventory_schema(self.df)
+            
             # Cache dropdown values
             self._cache_dropdown_values()
             self.logger.debug(f"Final columns after all processing: {self.df.columns.tolist()}")
@@ -2503,8 +2502,11 @@ class ExcelProcessor:
             # Load lineage data from database to ensure changes persist
             self._load_lineage_from_database()
             
-            # Cache the processed file
-            self._file_cache[cache_key] = self.df.copy()
+            # Assign tag ids and build the name index for the loaded data
+            self.get_tag_index()
+            
+            # Cache the processed file as a shared snapshot; self.df keeps writing to its own columns
+            self._file_cache[cache_key] = FrameSnapshot(self.df, file_path)
             self._last_loaded_file = file_path
             
             # Manage cache size
@@ -2626,37 +2628,16 @@ class ExcelProcessor:
             return self.df
 
         self.logger.debug(f"apply_filters received filters: {filters}")
-        filtered_df = self.df.copy()
-        column_mapping = {
-            'vendor': 'Vendor',
-            'brand': 'Product Brand',
-            'productType': 'Product Type*',
-            'lineage': 'Lineage',
-            'weight': 'Weight*',
-            'strain': 'Product Strain',
-            'doh': 'DOH',
-            'highCbd': 'Product Type*'  # Will be processed specially
-        }
-        for filter_key, value in filters.items():
-            if value and value != 'All':
-                if filter_key == 'highCbd':
-                    # Special handling for High CBD filter
-                    if value == 'High CBD Products':
-                        filtered_df = filtered_df[
-                            filtered_df['Product Type*'].astype(str).str.lower().str.strip().str.startswith('high cbd')
-                        ]
-                    elif value == 'Non-High CBD Products':
-                        filtered_df = filtered_df[
-                            ~filtered_df['Product Type*'].astype(str).str.lower().str.strip().str.startswith('high cbd')
-                        ]
-                else:
-                    column = column_mapping.get(filter_key)
-                    if column and column in filtered_df.columns:
-                        # Convert both the column and the filter value to lowercase for case-insensitive comparison
-                        filtered_df = filtered_df[
-                            filtered_df[column].astype(str).str.lower().str.strip() == value.lower().strip()
-                        ]
-        return filtered_df
+        # Take the matching rows once instead of copying the frame and masking it per filter
+        return self.df.take(self.filter_positions(filters))
+
+    def filter_positions(self, filters: Optional[Dict[str, str]] = None):
+        """Row positions of self.df matching every filter (case-insensitive), as an index array."""
+        import numpy as np
+        if self.df is None:
+            return np.empty(0, dtype=np.intp)
+        # AND of the facet index's per-value masks (highCbd matches Product Type* starting with "high cbd")
+        return self.get_facet_index().positions(filters)
 
     def _cache_dropdown_values(self):
         """Cache unique values for dropdown filters."""
@@ -2677,7 +2658,7 @@ class ExcelProcessor:
         self.dropdown_cache = {}
         for filter_id, column in filter_columns.items():
             if column in self.df.columns:
-                values = self.df[column].dropna().unique().tolist()
+                values = distinct_values(self.df[column])
                 values = [str(v) for v in values if str(v).strip()]
                 # Exclude unwanted product types from dropdown
                 if filter_id == 'productType':
@@ -2932,6 +2913,138 @@ class ExcelProcessor:
         """Return the list of selected tag names in order."""
         return self.selected_tags if self.selected_tags else []
 
+    def get_tag_index(self) -> TagIndex:
+        """
+        Tag ids and name -> row positions for the current DataFrame.
+
+        Rebuilt when self.df is assigned or its product names are edited in
+        place; other in-place edits such as lineage or DOH updates keep the index.
+        """
+        df = self.df
+        signature = self._names_version
+        if self._tag_index is None or self._tag_index_signature != signature:
+            self._tag_index = self._build_tag_index(df)
+            self._tag_index_signature = signature
+        return self._tag_index
+
+    @timed_stage('tag_index_build')
+    def _build_tag_index(self, df) -> TagIndex:
+        index = TagIndex(df, self._tag_registry)
+        self.logger.debug(f"Built tag index: {len(index)} tags over {0 if df is None else len(df)} rows")
+        return index
+
+    def get_facet_index(self) -> FacetIndex:
+        """
+        Filter facets for the current DataFrame.
+
+        Rebuilt when data_version changes (every assignment of self.df and every
+        in-place edit); columns whose content is unchanged keep their facet from
+        the previous index.
+        """
+        df = self.df
+        signature = self.data_version
+        if self._facet_index is None or self._facet_index_signature != signature:
+            self._facet_index = self._build_facet_index(df, self._facet_index)
+            self._facet_index_signature = signature
+        return self._facet_index
+
+    @timed_stage('facet_index_build')
+    def _build_facet_index(self, df, previous: Optional[FacetIndex] = None) -> FacetIndex:
+        return FacetIndex(df, lambda record: self._format_weight_units(record, excel_priority=True), previous)
+
+    def get_tag_ids(self, tag_names: List[str]) -> List[int]:
+        """Tag ids for product names (names not in the current data are skipped)."""
+        return self.get_tag_index().ids_for(tag_names)[0]
+
+    def get_records_by_tag_ids(self, tag_ids: List[int]) -> List[Dict[str, Any]]:
+        """Rows of the given tags, in the order given, by direct iloc lookup."""
+        if self.df is None:
+            return []
+        positions = self.get_tag_index().positions_for_ids(tag_ids)
+        return self.df.iloc[positions].to_dict('records') if positions else []
+
+    def _set_rows_value(self, positions: List[int], column: str, value: Any) -> None:
+        """Write one value into a column for the given row positions, extending categoricals as needed."""
+        ensure_categories(self.df, column, [value])
+        self.df.iloc[positions, self.df.columns.get_loc(column)] = value
+        companion = numeric_column_name(column)
+        if companion in self.df.columns:
+            self.df.iloc[positions, self.df.columns.get_loc(companion)] = parse_numeric(pd.Series([value]))[0]
+        if column in PRODUCT_NAME_COLUMNS:
+            self.mark_names_changed()
+        else:
+            self.mark_data_changed()
+
+    def set_row_values(self, position: int, values: Dict[str, Any]) -> None:
+        """Write several columns of one row (by position), adding missing columns and categories."""
+        for column, value in values.items():
+            if column not in self.df.columns:
+                self.df[column] = ''
+            self._set_rows_value([position], column, value)
+
+    def update_lineage_by_tag_id(self, tag_id: int, new_lineage: str) -> bool:
+        """Update lineage for every row of a tag; paraphernalia always gets PARAPHERNALIA."""
+        if self.df is None or 'Lineage' not in self.df.columns:
+            self.logger.error("No data loaded")
+            return False
+        positions = self.get_tag_index().positions.get(tag_id)
+        if not positions:
+            self.logger.error(f"Tag id {tag_id} not found in current data")
+            return False
+        self._set_lineage_rows(positions, new_lineage, f"tag {tag_id}")
+        return True
+
+    def _set_lineage_rows(self, positions: List[int], new_lineage: str, label: str) -> None:
+        if 'Product Type*' in self.df.columns:
+            product_type = self.df.iloc[positions[0], self.df.columns.get_loc('Product Type*')]
+            if str(product_type).strip().lower() == 'paraphernalia':
+                new_lineage = 'PARAPHERNALIA'
+        original_lineage = self.df.iloc[positions[0], self.df.columns.get_loc('Lineage')]
+        self._set_rows_value(positions, 'Lineage', new_lineage)
+        self.logger.info(f"Updated lineage for {label} from '{original_lineage}' to '{new_lineage}' ({len(positions)} rows)")
+
+    def update_doh_by_tag_id(self, tag_id: int, new_doh: str) -> bool:
+        """Update DOH status (both DOH column variants) for every row of a tag."""
+        if self.df is None:
+            self.logger.error("No data loaded")
+            return False
+        positions = self.get_tag_index().positions.get(tag_id)
+        if not positions:
+            self.logger.error(f"Tag id {tag_id} not found in current data")
+            return False
+        return self._set_doh_rows(positions, new_doh, f"tag {tag_id}")
+
+    def _set_doh_rows(self, positions: List[int], new_doh: str, label: str) -> bool:
+        columns = [col for col in ('DOH', 'DOH Compliant (Yes/No)') if col in self.df.columns]
+        if not columns:
+            self.logger.error(f"No DOH columns found to update for {label}")
+            return False
+        for column in columns:
+            self._set_rows_value(positions, column, new_doh)
+        self.logger.info(f"Updated DOH for {label} to '{new_doh}' ({len(positions)} rows, {len(columns)} columns)")
+        return True
+
+    def _exact_name_positions(self, tag_name: str) -> List[int]:
+        """
+        Row positions whose product name is exactly tag_name, from the first of
+        ProductName / Product Name* / Product Name with a match. Unlike the tag
+        ids, spelling variants of the name are not included.
+        """
+        index = self.get_tag_index()
+        tag_id = index.id_for_name(tag_name)
+        if tag_id is not None and index.name_column in EXACT_NAME_COLUMNS:
+            candidates = index.positions[tag_id]
+            names = self.df[index.name_column].iloc[candidates].tolist()
+            positions = [position for position, name in zip(candidates, names) if name == tag_name]
+            if positions:
+                return positions
+        for column in EXACT_NAME_COLUMNS:
+            if column in self.df.columns:
+                matches = [position for position, hit in enumerate((self.df[column] == tag_name).tolist()) if hit]
+                if matches:
+                    return matches
+        return []
+
     def get_selected_records(self, template_type: str = 'vertical') -> List[Dict[str, Any]]:
         """Get selected records from the DataFrame, ordered by lineage."""
         try:
@@ -2991,37 +3104,27 @@ class ExcelProcessor:
                 json_matched_count = (self.df['Source'] == 'JSON Match').sum()
                 logger.info(f"CRITICAL FIX: Found {json_matched_count} JSON matched products in DataFrame")
             
-            canonical_map = {normalize_name(name): name for name in self.df[product_name_col]}
-            logger.debug(f"Canonical map sample: {dict(list(canonical_map.items())[:5])}")
-            
-            # Map incoming selected tags to canonical names
-            # CRITICAL FIX: Preserve all selected tags, not just the first match
-            canonical_selected = []
-            for tag in selected_tag_names:
-                normalized_tag = normalize_name(tag)
-                if normalized_tag in canonical_map:
-                    canonical_selected.append(canonical_map[normalized_tag])
-                    logger.debug(f"CRITICAL FIX: Mapped '{tag}' -> '{canonical_map[normalized_tag]}'")
-                else:
-                    logger.warning(f"CRITICAL FIX: No canonical match for '{tag}' (normalized: '{normalized_tag}')")
-            
-            logger.debug(f"Selected tag names: {selected_tag_names}")
-            logger.debug(f"Canonical selected tags: {canonical_selected}")
-            
-            # CRITICAL FIX: Log which tags were matched and which were not
+            # Resolve names to tag ids through the maintained index instead of rebuilding a name map
+            tag_index = self.get_tag_index()
+            if tag_index.name_column != product_name_col:
+                logger.warning(f"Tag index uses column '{tag_index.name_column}', records use '{product_name_col}'")
+            selected_ids = []
             matched_tags = []
             unmatched_tags = []
             for tag in selected_tag_names:
-                normalized_tag = normalize_name(tag)
-                if normalized_tag in canonical_map:
-                    matched_tags.append(tag)
-                else:
+                tag_id = tag_index.id_for_name(tag)
+                if tag_id is None:
                     unmatched_tags.append(tag)
+                else:
+                    selected_ids.append(tag_id)
+                    matched_tags.append(tag)
+            canonical_selected = tag_index.names_for(selected_ids)
+            logger.debug(f"Canonical selected tags: {canonical_selected}")
             
             logger.info(f"CRITICAL FIX: Matched {len(matched_tags)} tags: {matched_tags}")
             if unmatched_tags:
                 logger.warning(f"CRITICAL FIX: Unmatched {len(unmatched_tags)} tags: {unmatched_tags}")
-                logger.warning(f"CRITICAL FIX: Available product names (sample): {list(self.df[product_name_col])[:10]}")
+                logger.warning(f"CRITICAL FIX: Available product names (sample): {list(tag_index.names.values())[:10]}")
             
             # Fallback: try case-insensitive and whitespace-insensitive matching if no canonical matches
             if not canonical_selected:
@@ -3122,7 +3225,6 @@ class ExcelProcessor:
             
             if not canonical_selected:
                 logger.warning("No canonical matches for selected tags after fallback")
-                logger.warning(f"Available canonical keys (sample): {list(canonical_map.keys())[:10]}")
                 normalized_selected = [normalize_name(tag) for tag in selected_tag_names]
                 logger.warning(f"Normalized selected tags: {normalized_selected}")
                 logger.warning(f"Available product names: {list(self.df[product_name_col])[:10]}")
@@ -3130,8 +3232,11 @@ class ExcelProcessor:
             
             logger.debug(f"Canonical selected tags: {canonical_selected}")
             
-            # Filter DataFrame to only include selected records by canonical ProductName
-            filtered_df = self.df[self.df[product_name_col].isin(canonical_selected)]
+            # Selected rows by direct iloc lookup; the name fallbacks above still filter by name
+            if selected_ids and tag_index.name_column == product_name_col:
+                filtered_df = self.df.iloc[tag_index.positions_for_ids(selected_ids)]
+            else:
+                filtered_df = self.df[self.df[product_name_col].isin(canonical_selected)]
             logger.debug(f"Found {len(filtered_df)} matching records")
             
             # Convert to list of dictionaries
@@ -3148,18 +3253,19 @@ class ExcelProcessor:
                 lineage = str(rec.get('Lineage', '')).upper()
                 return lineage if lineage in lineage_order else 'MIXED'
             
+            # First position of each selected name, exact and case-insensitive
+            selected_order = {}
+            selected_order_lower = {}
+            for i, tag in enumerate(selected_tag_names):
+                selected_order.setdefault(tag, i)
+                selected_order_lower.setdefault(tag.lower(), i)
+            
             def get_selected_order(rec):
-                product_name = rec.get(product_name_col, '').strip()
-                # Try exact match first
-                try:
-                    return selected_tag_names.index(product_name)
-                except ValueError:
-                    # Try case-insensitive match
-                    product_name_lower = product_name.lower()
-                    for i, tag in enumerate(selected_tag_names):
-                        if tag.lower() == product_name_lower:
-                            return i
-                    return len(selected_tag_names)  # Put unknown tags at the end
+                product_name = str(rec.get(product_name_col, '')).strip()
+                position = selected_order.get(product_name)
+                if position is None:
+                    position = selected_order_lower.get(product_name.lower(), len(selected_tag_names))  # Put unknown tags at the end
+                return position
             
             # Sort by selected order only (respecting user's drag-and-drop order)
             records_sorted = sorted(records, key=lambda r: get_selected_order(r))
@@ -3341,11 +3447,16 @@ class ExcelProcessor:
                             return float(value)
                         except (ValueError, TypeError):
                             return 0.0
+
+                    # Prefer the float the schema stage parsed at load time
+                    def record_float(column, value):
+                        parsed = record.get(numeric_column_name(column))
+                        return parsed if isinstance(parsed, float) else safe_float(value)
                     
                     # Compare Total THC vs THC test result, use highest
-                    total_thc_float = safe_float(total_thc_value)
-                    thc_test_float = safe_float(thc_test_result)
-                    thc_content_float = safe_float(thc_content_value)
+                    total_thc_float = record_float('Total THC', total_thc_value)
+                    thc_test_float = record_float('THCA', thc_test_result)
+                    thc_content_float = record_float('THCA', thc_content_value)
                     
                     # For THC: Use the highest value among Total THC, THC Content, and THC test result
                     # But if Total THC is 0 or empty, prefer THC Content over THC test result
@@ -3377,9 +3488,9 @@ class ExcelProcessor:
                         cbd_content_value = ''
                     
                     # Compare Total CBD vs CBD test result vs CBD Content, use highest
-                    total_cbd_float = safe_float(total_cbd_value)
-                    cbd_test_result_float = safe_float(cbd_test_result_value)
-                    cbd_content_float = safe_float(cbd_content_value)
+                    total_cbd_float = record_float('Total CBD', total_cbd_value)
+                    cbd_test_result_float = record_float('CBDA', cbd_test_result_value)
+                    cbd_content_float = record_float('CBDA', cbd_content_value)
                     
                     # Use the highest CBD value from all sources
                     if cbd_test_result_float > 0 and cbd_test_result_float >= total_cbd_float and cbd_test_result_float >= cbd_content_float:
@@ -3779,102 +3890,15 @@ class ExcelProcessor:
                 "doh": [],
                 "highCbd": []
             }
-        df = self.df.copy()
-        filter_map = {
-            "vendor": "Vendor",
-            "brand": "Product Brand",
-            "productType": "Product Type*",
-            "lineage": "Lineage",
-            "weight": "CombinedWeight",  # Reverted back to "CombinedWeight" as requested
-            "strain": "Product Strain",
-            "doh": "DOH",
-            "highCbd": "Product Type*"  # Will be processed specially for high CBD detection
-        }
-        options = {}
         import math
         def clean_list(lst):
             return ['' if (v is None or (isinstance(v, float) and math.isnan(v))) else v for v in lst]
-        # For each filter type, generate options by applying all other filters except itself
-        for filter_key, col in filter_map.items():
-            temp_df = df.copy()
-            # Apply all other filters except the current one
-            for key, value in current_filters.items():
-                if key == filter_key:
-                    continue  # Skip filtering by itself
-                if value and value != "All":
-                    filter_col = filter_map.get(key)
-                    if filter_col and filter_col in temp_df.columns:
-                        temp_df = temp_df[
-                            temp_df[filter_col].astype(str).str.lower().str.strip() == value.lower().strip()
-                        ]
-            # Get unique values for this filter type
-            if col in temp_df.columns:
-                if filter_key == "weight":
-                    # For weight, use the properly formatted weight with units
-                    values = []
-                    for _, row in temp_df.iterrows():
-                        # Convert row to dict for _format_weight_units
-                        row_dict = row.to_dict()
-                        weight_with_units = self._format_weight_units(row_dict, excel_priority=True)
-                        if weight_with_units and weight_with_units.strip():
-                            weight_str = weight_with_units.strip()
-                            
-                            # Only include values that look like actual weights (with units like g, oz, mg)
-                            # Exclude THC/CBD content, ratios, and other non-weight content
-                            import re
-                            weight_pattern = re.compile(r'^\d+\.?\d*\s*(g|oz|mg|grams?|ounces?)$', re.IGNORECASE)
-                            
-                            if weight_pattern.match(weight_str):
-                                values.append(weight_str)
-                            elif not any(keyword in weight_str.lower() for keyword in ['thc', 'cbd', 'ratio', '|br|', ':']):
-                                # If it doesn't match weight pattern but also doesn't contain THC/CBD keywords, include it
-                                values.append(weight_str)
-                    
-                    # Debug: Log what weight values are being generated
-                    if values:
-                        self.logger.info(f"Weight filter values generated: {values[:5]}...")  # Log first 5 values
-                    else:
-                        self.logger.warning("No weight values generated for filter dropdown")
-                else:
-                    values = temp_df[col].dropna().unique().tolist()
-                    values = [str(v) for v in values if str(v).strip()]
-                
-                # Exclude unwanted product types from dropdown and apply product type normalization
-                if filter_key == "productType":
-                    filtered_values = []
-                    for v in values:
-                        v_lower = v.strip().lower()
-                        if ("trade sample" in v_lower or "deactivated" in v_lower):
-                            continue
-                        # Apply product type normalization (same as TYPE_OVERRIDES)
-                        normalized_v = TYPE_OVERRIDES.get(v_lower, v)
-                        filtered_values.append(normalized_v)
-                    values = filtered_values
-                
-                # Special processing for DOH filter
-                elif filter_key == "doh":
-                    # Only include "YES" and "NO" values, normalize case
-                    filtered_values = []
-                    for v in values:
-                        v_upper = v.strip().upper()
-                        if v_upper in ["YES", "NO"]:
-                            filtered_values.append(v_upper)
-                    values = filtered_values
-                
-                # Special processing for High CBD filter
-                elif filter_key == "highCbd":
-                    # Check if any product types start with "high cbd"
-                    has_high_cbd = any(v.strip().lower().startswith('high cbd') for v in values)
-                    values = ["High CBD Products", "Non-High CBD Products"] if has_high_cbd else ["Non-High CBD Products"]
-                
-                # Remove duplicates and sort
-                values = list(set(values))
-                values.sort()
-                options[filter_key] = clean_list(values)
-            else:
-                options[filter_key] = []
-        
-        return options
+        # Each dropdown lists the values present under all other filters; the facet
+        # index ANDs the cached per-value masks and counts codes instead of re-filtering
+        options = self.get_facet_index().options(current_filters, TYPE_OVERRIDES)
+        if not options.get("weight") and len(self.df):
+            self.logger.warning("No weight values generated for filter dropdown")
+        return {filter_key: clean_list(values) for filter_key, values in options.items()}
 
     @staticmethod
     def parse_weight_str(w, u=None):
@@ -3931,21 +3955,13 @@ class ExcelProcessor:
             from .product_database import ProductDatabase
             product_db = ProductDatabase(store_name=self._store_name)
             
-            success_count = 0
+            results = product_db.batch_update_lineages(
+                [{'strain_name': strain_name, 'lineage': new_lineage} for strain_name, new_lineage in lineage_updates.items()],
+                sovereign=True
+            )
+            success_count = sum(1 for r in results if r['success'])
             total_count = len(lineage_updates)
             
-            for strain_name, new_lineage in lineage_updates.items():
-                try:
-                    strain_id = product_db.add_or_update_strain(strain_name, new_lineage, sovereign=True)
-                    if strain_id:
-                        success_count += 1
-                        
-                        # Note: Only updating database, not Excel file (for performance)
-                        # Excel file is source data, database is authoritative for lineage
-                                
-                except Exception as e:
-                    self.logger.error(f"Error updating lineage for strain '{strain_name}': {e}")
-            
             self.logger.info(f"Batch lineage update complete: {success_count}/{total_count} successful")
             return success_count == total_count
             
@@ -4078,8 +4094,8 @@ class ExcelProcessor:
                 self.logger.error("No file path specified for saving")
                 return False
             
-            # Save to Excel file
-            self.df.to_excel(file_path, index=False, engine='openpyxl')
+            # Save to Excel file (without the schema stage's numeric companion columns)
+            self.df[display_columns(self.df)].to_excel(file_path, index=False, engine='openpyxl')
             self.logger.info(f"Data saved successfully to {file_path}")
             return True
             
@@ -4095,55 +4111,93 @@ class ExcelProcessor:
                 self.logger.error("No data loaded")
                 return False
             
-            # Find the tag in the DataFrame and update its lineage
-            self.logger.info(f"Looking for tag: '{tag_name}'")
-            
-            # Try different column names for product names
-            product_name_columns = ['ProductName', 'Product Name*', 'Product Name']
-            mask = None
-            
-            for col in product_name_columns:
-                if col in self.df.columns:
-                    mask = self.df[col] == tag_name
-                    if mask.any():
-                        break
-            
-            if mask is None or not mask.any():
+            positions = self._exact_name_positions(tag_name)
+            if not positions:
                 self.logger.error(f"Tag '{tag_name}' not found in any product name column")
                 return False
-            
-            # Get the original lineage for logging
-            original_lineage = 'Unknown'
-            try:
-                original_lineage = self.df.loc[mask, 'Lineage'].iloc[0]
-            except (IndexError, KeyError):
-                original_lineage = 'Unknown'
-            
-            # Check if this is a paraphernalia product and enforce PARAPHERNALIA lineage
-            try:
-                product_type = self.df.loc[mask, 'Product Type*'].iloc[0]
-                if str(product_type).strip().lower() == 'paraphernalia':
-                    new_lineage = 'PARAPHERNALIA'
-                    self.logger.info(f"Enforcing PARAPHERNALIA lineage for paraphernalia product: {tag_name}")
-                    
-                    # Ensure PARAPHERNALIA is in the categorical categories
-                    if 'Lineage' in self.df.columns and hasattr(self.df['Lineage'], 'cat'):
-                        current_categories = list(self.df['Lineage'].cat.categories)
-                        if 'PARAPHERNALIA' not in current_categories:
-                            self.df['Lineage'] = self.df['Lineage'].cat.add_categories(['PARAPHERNALIA'])
-            except (IndexError, KeyError):
-                pass  # If we can't determine product type, proceed with user's choice
-            
-            # Update the lineage in the DataFrame
-            self.df.loc[mask, 'Lineage'] = new_lineage
-            
-            self.logger.info(f"Updated lineage for tag '{tag_name}' from '{original_lineage}' to '{new_lineage}'")
+            self._set_lineage_rows(positions, new_lineage, f"'{tag_name}'")
             return True
             
         except Exception as e:
             self.logger.error(f"Error updating lineage in current data: {e}")
             return False
 
+    def apply_lineage_updates(self, lineage_updates: Dict[str, str], by: str = 'product') -> List[Dict[str, Any]]:
+        """
+        Apply many lineage changes to the current data with a single mask update.
+
+        Args:
+            lineage_updates: Mapping of product name (or strain name when by='strain') to new lineage
+            by: 'product' to match on ProductName/Product Name*, 'strain' to match on Product Strain
+
+        Returns:
+            One result per requested key with success, original/new lineage, strain name and rows affected
+        """
+        results = []
+        if self.df is None or not lineage_updates:
+            return [{'key': key, 'success': False, 'error': 'No data loaded'} for key in lineage_updates or {}]
+
+        df = self.df
+        if by == 'strain':
+            if 'Product Strain' not in df.columns:
+                return [{'key': key, 'success': False, 'error': 'No Product Strain column'} for key in lineage_updates]
+            keys = {str(k).strip(): v for k, v in lineage_updates.items()}
+            key_series = df['Product Strain'].astype(str).str.strip()
+            matched = key_series.isin(keys.keys())
+        else:
+            keys = dict(lineage_updates)
+            key_series = None
+            matched = pd.Series(False, index=df.index)
+            # ProductName wins over Product Name* for the same row, as in update_lineage_in_current_data
+            for col in ('Product Name', 'Product Name*', 'ProductName'):
+                if col in df.columns:
+                    col_values = df[col].astype(str)
+                    col_matched = col_values.isin(keys.keys())
+                    key_series = col_values.where(col_matched, key_series) if key_series is not None else col_values.where(col_matched)
+                    matched |= col_matched
+            if key_series is None:
+                return [{'key': key, 'success': False, 'error': 'No product name column'} for key in lineage_updates]
+
+        if matched.any():
+            matched_keys = key_series[matched]
+            new_values = matched_keys.map(keys)
+            if 'Product Type*' in df.columns:
+                paraphernalia = df.loc[matched, 'Product Type*'].astype(str).str.strip().str.lower() == 'paraphernalia'
+                new_values = new_values.mask(paraphernalia, 'PARAPHERNALIA')
+
+            # Capture originals before the write so results report what changed
+            first_rows = matched_keys.drop_duplicates().index
+            originals = df.loc[first_rows, 'Lineage'] if 'Lineage' in df.columns else pd.Series(None, index=first_rows)
+            strains = df.loc[first_rows, 'Product Strain'] if 'Product Strain' in df.columns else pd.Series(None, index=first_rows)
+            counts = matched_keys.value_counts()
+
+            if 'Lineage' in df.columns and isinstance(df['Lineage'].dtype, pd.CategoricalDtype):
+                missing = [v for v in new_values.unique() if v not in df['Lineage'].cat.categories]
+                if missing:
+                    df['Lineage'] = df['Lineage'].cat.add_categories(missing)
+            df.loc[matched, 'Lineage'] = new_values
+            self.mark_data_changed()
+
+            found = {}
+            for idx in first_rows:
+                key = matched_keys[idx]
+                strain = strains[idx]
+                found[key] = {
+                    'key': key,
+                    'success': True,
+                    'original': originals[idx],
+                    'new': new_values[idx],
+                    'strain_name': str(strain).strip() if pd.notna(strain) and str(strain).strip() else None,
+                    'rows_affected': int(counts[key])
+                }
+        else:
+            found = {}
+
+        for key in keys:
+            results.append(found.get(key, {'key': key, 'success': False, 'error': f"'{key}' not found in current data"}))
+        self.logger.info(f"Applied {len(found)}/{len(keys)} lineage updates to current data ({int(matched.sum())} rows)")
+        return results
+
     def get_strain_name_for_product(self, tag_name: str) -> Optional[str]:
         """Get the strain name for a specific product."""
         try:
@@ -4181,50 +4235,11 @@ class ExcelProcessor:
                 self.logger.error("No data loaded")
                 return False
             
-            # Find the tag in the DataFrame and update its DOH status
-            self.logger.info(f"Looking for tag: '{tag_name}' to update DOH to: '{new_doh}'")
-            
-            # Try different column names for product names
-            product_name_columns = ['ProductName', 'Product Name*', 'Product Name']
-            mask = None
-            
-            for col in product_name_columns:
-                if col in self.df.columns:
-                    mask = self.df[col] == tag_name
-                    if mask.any():
-                        break
-            
-            if mask is None or not mask.any():
+            positions = self._exact_name_positions(tag_name)
+            if not positions:
                 self.logger.error(f"Tag '{tag_name}' not found in any product name column")
                 return False
-            
-            # Get the original DOH status for logging
-            original_doh = 'Unknown'
-            try:
-                # Check both DOH column variants
-                if 'DOH' in self.df.columns:
-                    original_doh = self.df.loc[mask, 'DOH'].iloc[0]
-                elif 'DOH Compliant (Yes/No)' in self.df.columns:
-                    original_doh = self.df.loc[mask, 'DOH Compliant (Yes/No)'].iloc[0]
-            except (IndexError, KeyError):
-                original_doh = 'Unknown'
-            
-            # Update DOH status in both possible columns
-            updated_count = 0
-            if 'DOH' in self.df.columns:
-                self.df.loc[mask, 'DOH'] = new_doh
-                updated_count += 1
-                
-            if 'DOH Compliant (Yes/No)' in self.df.columns:
-                self.df.loc[mask, 'DOH Compliant (Yes/No)'] = new_doh
-                updated_count += 1
-            
-            if updated_count > 0:
-                self.logger.info(f"Successfully updated DOH for '{tag_name}' from '{original_doh}' to '{new_doh}' ({updated_count} columns updated)")
-                return True
-            else:
-                self.logger.error(f"No DOH columns found to update for '{tag_name}'")
-                return False
+            return self._set_doh_rows(positions, new_doh, f"'{tag_name}'")
                 
         except Exception as e:
             self.logger.error(f"Error updating DOH for '{tag_name}': {e}")
@@ -4378,7 +4393,7 @@ class ExcelProcessor:
                 oldest_key = next(iter(self._file_cache))
                 del self._file_cache[oldest_key]
             
-            self._file_cache[cache_key] = df.copy()
+            self._file_cache[cache_key] = FrameSnapshot(df, file_path)
             self.logger.info(f"[PYTHONANYWHERE-FAST] Cached file result for {file_path}")
             
         except Exception as e:
@@ -6240,7 +6255,13 @@ class ExcelProcessor:
         tags = []
         seen_product_names = set()  # Track seen product names to prevent duplicates
         
-        for _, row in filtered_df.iterrows():
+        # Parsed once per frame by the schema stage (or here, vectorised) instead of safe_float per row
+        total_thc_floats = numeric_values(filtered_df, 'Total THC')
+        thc_content_floats = numeric_values(filtered_df, 'THC Content')
+        total_cbd_floats = numeric_values(filtered_df, 'Total CBD')
+        cbd_content_floats = numeric_values(filtered_df, 'CBD Content')
+        
+        for position, (_, row) in enumerate(filtered_df.iterrows()):
             # Get quantity from various possible column names
             quantity = row.get('Quantity*', '') or row.get('Quantity Received*', '') or row.get('Quantity', '') or row.get('qty', '') or ''
             
@@ -6312,19 +6333,10 @@ class ExcelProcessor:
             total_cbd_value = safe_get_value(row.get('Total CBD', ''))  # Use Total CBD
             cbd_content_value = safe_get_value(row.get('CBD Content', ''))  # Use CBD Content
             
-            # Helper function to safely convert to float for comparison
-            def safe_float(value):
-                if not value or value in ['nan', 'NaN', '']:
-                    return 0.0
-                try:
-                    return float(value)
-                except (ValueError, TypeError):
-                    return 0.0
-            
             # For THC: Use the highest value among Total THC, THC test result, and THCA
-            total_thc_float = safe_float(total_thc_value)
-            thc_test_float = safe_float(thc_test_result)
-            thc_content_float = safe_float(thc_content_value)
+            total_thc_float = total_thc_floats[position]
+            thc_test_float = thc_content_floats[position]  # THC test result is read from THC Content
+            thc_content_float = thc_content_floats[position]
             
             if total_thc_float > 0:
                 if thc_test_float > total_thc_float:
@@ -6341,8 +6353,8 @@ class ExcelProcessor:
                     ai_value = ''
             
             # For CBD: merge CBDA with CBD test result, use highest value
-            total_cbd_float = safe_float(total_cbd_value)
-            cbd_content_float = safe_float(cbd_content_value)
+            total_cbd_float = total_cbd_floats[position]
+            cbd_content_float = cbd_content_floats[position]
             
             if cbd_content_float > total_cbd_float:
                 ak_value = cbd_content_value
@@ -6645,6 +6657,7 @@ class ExcelProcessor:
                 self.df.loc[mask_weight_dash, "Description"] = df_temp
                 self.logger.debug(f"Removed weight information from {mask_weight_dash.sum()} Description values")
             
+            self.mark_names_changed()
             self.logger.info(f"Successfully processed Description values using Product Name formula")
             
         except Exception as e:
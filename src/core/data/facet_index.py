@@ -0,0 +1,206 @@
+"""
+Facet Index for Label Maker Application
+Filter masks and cascaded dropdown options for the loaded DataFrame without
+re-filtering the frame. Each filterable column is factorised once into
+integer codes. A filter value becomes a boolean row mask (built on first use
+and kept), so a filter combination is a bitwise AND. The options of one
+dropdown under the other filters are the codes with a non-zero count under
+that AND.
+
+The weight dropdown lists each row's formatted weight (_format_weight_units).
+That is still a per-row call, but it runs once per change of the weight
+input columns rather than on every filter change.
+"""
+
+import hashlib
+import logging
+import re
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Filter key -> column for the cascaded dropdowns (get_dynamic_filter_options)
+OPTION_COLUMNS = {
+    'vendor': 'Vendor',
+    'brand': 'Product Brand',
+    'productType': 'Product Type*',
+    'lineage': 'Lineage',
+    'weight': 'CombinedWeight',
+    'strain': 'Product Strain',
+    'doh': 'DOH',
+    'highCbd': 'Product Type*',
+}
+
+# Filter key -> column for row filtering (apply_filters)
+FILTER_COLUMNS = dict(OPTION_COLUMNS, weight='Weight*')
+
+HIGH_CBD_OPTIONS = ('High CBD Products', 'Non-High CBD Products')
+
+# Columns _format_weight_units reads
+WEIGHT_INPUT_COLUMNS = ('Weight*', 'Units', 'Product Type*', 'Product Name*', 'db_weight', 'db_units', 'JointRatio')
+
+WEIGHT_PATTERN = re.compile(r'^\d+\.?\d*\s*(g|oz|mg|grams?|ounces?)$', re.IGNORECASE)
+
+# Masks kept per column before the oldest are dropped (strain can have thousands of values)
+MAX_MASKS_PER_COLUMN = 256
+
+
+def fingerprint(df: pd.DataFrame, columns: Iterable[str]) -> bytes:
+    """Content hash of some columns (missing ones included by name), to tell whether a facet is stale."""
+    digest = hashlib.blake2b(digest_size=16)
+    for column in columns:
+        digest.update(str(column).encode())
+        if column in df.columns:
+            digest.update(pd.util.hash_pandas_object(df[column], index=False).to_numpy().tobytes())
+    return digest.digest()
+
+
+def _normalize(value) -> str:
+    # Same text as .astype(str).str.lower().str.strip() on the column
+    return str(value).lower().strip()
+
+
+class ColumnFacet:
+    """One column as codes into its distinct raw values (-1 for missing)."""
+
+    def __init__(self, series: pd.Series, key: bytes = b''):
+        codes, uniques = pd.factorize(series, use_na_sentinel=True)
+        self.key = key
+        self.values: List[Any] = list(uniques)
+        self.codes = codes.astype(np.int32, copy=False)
+        # Slot 0 is the missing value, slot i + 1 is code i
+        self._slot_text = np.array(['nan'] + [_normalize(v) for v in self.values], dtype=object)
+        self._masks: Dict[str, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def mask(self, value) -> np.ndarray:
+        """Rows whose value equals `value` ignoring case and surrounding whitespace."""
+        target = _normalize(value)
+        mask = self._masks.get(target)
+        if mask is None:
+            mask = (self._slot_text == target)[self.codes + 1]
+            if len(self._masks) >= MAX_MASKS_PER_COLUMN:
+                self._masks.pop(next(iter(self._masks)))
+            self._masks[target] = mask
+        return mask
+
+    def startswith_mask(self, prefix: str) -> np.ndarray:
+        """Rows whose normalised value starts with `prefix` (missing values never match)."""
+        slots = np.array([False] + [text.startswith(prefix) for text in self._slot_text[1:]], dtype=bool)
+        return slots[self.codes + 1]
+
+    def counts(self, mask: Optional[np.ndarray] = None) -> np.ndarray:
+        """Rows per code under the mask."""
+        codes = self.codes if mask is None else self.codes[mask]
+        return np.bincount(codes[codes >= 0], minlength=len(self.values))
+
+    def present(self, mask: Optional[np.ndarray] = None) -> List[Any]:
+        """Distinct non-missing values with at least one row under the mask."""
+        return [self.values[i] for i in np.flatnonzero(self.counts(mask))]
+
+
+class FacetIndex:
+    """
+    Column facets of one DataFrame. Facets whose content has not changed are
+    carried over from the previous index, so an in-place lineage edit only
+    refactorises the Lineage column.
+    """
+
+    def __init__(self, df: pd.DataFrame, weight_formatter: Optional[Callable[[Dict[str, Any]], str]] = None,
+                 previous: Optional['FacetIndex'] = None):
+        self._df = df
+        self.rows = len(df)
+        self._weight_formatter = weight_formatter
+        # Only the previous weight facet is kept, so indexes do not chain
+        self._previous_weights = previous._weights if previous is not None else None
+        self.facets: Dict[str, ColumnFacet] = {}
+        previous_facets = previous.facets if previous is not None and previous.rows == self.rows else {}
+        for column in set(OPTION_COLUMNS.values()) | set(FILTER_COLUMNS.values()):
+            if column not in df.columns:
+                continue
+            key = fingerprint(df, [column])
+            facet = previous_facets.get(column)
+            self.facets[column] = facet if facet is not None and facet.key == key else ColumnFacet(df[column], key)
+        self.high_cbd = np.zeros(self.rows, dtype=bool)
+        if 'Product Type*' in self.facets:
+            self.high_cbd = self.facets['Product Type*'].startswith_mask('high cbd')
+        self._weights: Optional[ColumnFacet] = None
+
+    def filter_mask(self, filters: Optional[Dict[str, Any]], columns: Dict[str, str] = FILTER_COLUMNS,
+                    exclude: Optional[str] = None) -> np.ndarray:
+        """AND of every active filter's mask (missing columns and 'All' are ignored)."""
+        mask = np.ones(self.rows, dtype=bool)
+        for key, value in (filters or {}).items():
+            if key == exclude or not value or value == 'All':
+                continue
+            if key == 'highCbd':
+                if value in HIGH_CBD_OPTIONS:
+                    mask &= self.high_cbd if value == HIGH_CBD_OPTIONS[0] else ~self.high_cbd
+                continue
+            facet = self.facets.get(columns.get(key))
+            if facet is not None:
+                mask &= facet.mask(value)
+        return mask
+
+    def positions(self, filters: Optional[Dict[str, Any]]) -> np.ndarray:
+        return np.flatnonzero(self.filter_mask(filters))
+
+    @property
+    def weights(self) -> ColumnFacet:
+        """Formatted weight per row (only values that look like weights), built on first use."""
+        if self._weights is None:
+            key = fingerprint(self._df, WEIGHT_INPUT_COLUMNS)
+            previous = self._previous_weights
+            if previous is not None and previous.key == key and len(previous) == self.rows:
+                self._weights = previous
+            else:
+                self._weights = ColumnFacet(pd.Series(self._format_weights(), dtype=object), key)
+            self._previous_weights = None
+        return self._weights
+
+    def _format_weights(self) -> List[Optional[str]]:
+        inputs = [column for column in WEIGHT_INPUT_COLUMNS if column in self._df.columns]
+        if self._weight_formatter is None or not inputs:
+            return [None] * self.rows
+        weights = []
+        for record in self._df[inputs].to_dict('records'):
+            weight = (self._weight_formatter(record) or '').strip()
+            # Only values that look like weights; THC/CBD content and ratios are left out
+            if weight and (WEIGHT_PATTERN.match(weight) or
+                           not any(keyword in weight.lower() for keyword in ['thc', 'cbd', 'ratio', '|br|', ':'])):
+                weights.append(weight)
+            else:
+                weights.append(None)
+        return weights
+
+    def options(self, current_filters: Optional[Dict[str, Any]], type_overrides: Optional[Dict[str, str]] = None) -> Dict[str, list]:
+        """Cascaded dropdown options: each dropdown under every filter but its own."""
+        type_overrides = type_overrides or {}
+        options = {}
+        for filter_key, column in OPTION_COLUMNS.items():
+            if column not in self.facets:
+                options[filter_key] = []
+                continue
+            mask = self.filter_mask(current_filters, OPTION_COLUMNS, exclude=filter_key)
+            if filter_key == 'weight':
+                values = self.weights.present(mask)
+            else:
+                values = [str(v) for v in self.facets[column].present(mask) if str(v).strip()]
+
+            if filter_key == 'productType':
+                # Exclude unwanted product types and apply product type normalization (TYPE_OVERRIDES)
+                values = [type_overrides.get(v.strip().lower(), v) for v in values
+                          if 'trade sample' not in v.strip().lower() and 'deactivated' not in v.strip().lower()]
+            elif filter_key == 'doh':
+                # Only YES and NO, upper-cased
+                values = [v.strip().upper() for v in values if v.strip().upper() in ('YES', 'NO')]
+            elif filter_key == 'highCbd':
+                has_high_cbd = any(v.strip().lower().startswith('high cbd') for v in values)
+                values = list(HIGH_CBD_OPTIONS) if has_high_cbd else [HIGH_CBD_OPTIONS[1]]
+            options[filter_key] = sorted(set(values))
+        return options
@@ -0,0 +1,213 @@
+"""
+Streaming Export for Label Maker Application
+Writes inventory DataFrames as XLSX, CSV or Parquet in row chunks instead of
+building a filtered copy and a complete workbook in memory first.
+
+Rows are selected by position from the shared frame, one chunk at a time,
+and only the exported columns are converted. XLSX goes through openpyxl's
+write-only workbook, which keeps a constant amount of memory however many
+rows are written. CSV chunks are yielded as soon as they are encoded.
+Parquet is written as one row group per chunk.
+
+An XLSX or Parquet file only becomes valid when its footer is written, so
+those two are spooled to a temporary file and then streamed out. The spool
+stays in memory up to SPOOL_MAX_BYTES and moves to disk after that.
+
+open_export() is what responses use. It exports a Copy-on-Write snapshot,
+so edits made to the shared frame while the download runs do not reach it.
+It also produces the first block before returning, which for XLSX and
+Parquet means the whole spool. A failing export then raises while the
+request can still answer with an error status, not in the middle of a 200.
+"""
+
+import logging
+import tempfile
+import time
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from src.core.data.frame_snapshot import lazy_copy
+from src.core.utils.metrics import record_stage
+
+logger = logging.getLogger(__name__)
+
+# Format -> (mimetype, file extension)
+EXPORT_FORMATS = {
+    'xlsx': ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'xlsx'),
+    'csv': ('text/csv', 'csv'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+DEFAULT_FORMAT = 'xlsx'
+
+CHUNK_ROWS = 2000
+STREAM_CHUNK_BYTES = 64 * 1024
+SPOOL_MAX_BYTES = 8 * 1024 * 1024
+
+
+def export_format(value: Optional[str], default: str = DEFAULT_FORMAT) -> str:
+    """Normalise a requested format ('excel' and '.xlsx' style values included); unknown values give the default."""
+    fmt = str(value or '').strip().lower().lstrip('.')
+    fmt = {'excel': 'xlsx', 'xls': 'xlsx', 'pq': 'parquet'}.get(fmt, fmt)
+    return fmt if fmt in EXPORT_FORMATS else default
+
+
+def export_mimetype(fmt: str) -> str:
+    return EXPORT_FORMATS[fmt][0]
+
+
+def export_filename(stem: str, fmt: str) -> str:
+    return f"{stem}.{EXPORT_FORMATS[fmt][1]}"
+
+
+def iter_frame_chunks(df: pd.DataFrame, columns: Optional[Sequence[str]] = None,
+                      positions: Optional[np.ndarray] = None, chunk_rows: int = CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    """Yield the selected rows and columns of df in chunks, without copying the rest of the frame."""
+    columns = list(df.columns) if columns is None else [c for c in columns if c in df.columns]
+    col_positions = [df.columns.get_loc(c) for c in columns]
+    total = len(df) if positions is None else len(positions)
+    for start in range(0, total, chunk_rows):
+        stop = min(start + chunk_rows, total)
+        rows = np.arange(start, stop) if positions is None else positions[start:stop]
+        yield df.iloc[rows, col_positions]
+
+
+def _cell_rows(chunk: pd.DataFrame) -> Iterator[tuple]:
+    # Missing values become empty cells, as to_excel writes them
+    values = chunk.astype(object)
+    return values.where(chunk.notna(), None).itertuples(index=False, name=None)
+
+
+def _spooled_chunks(spool) -> Iterator[bytes]:
+    spool.seek(0)
+    while True:
+        block = spool.read(STREAM_CHUNK_BYTES)
+        if not block:
+            break
+        yield block
+
+
+def write_xlsx(target, chunks: Iterator[pd.DataFrame], columns: Sequence[str], sheet_name: str = 'Sheet1') -> int:
+    """Write chunks to an xlsx path or binary file with a write-only workbook; returns the row count."""
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(sheet_name)
+    header = []
+    for column in columns:
+        cell = WriteOnlyCell(sheet, value=str(column))
+        cell.font = Font(bold=True)
+        header.append(cell)
+    sheet.append(header)
+    rows = 0
+    for chunk in chunks:
+        for row in _cell_rows(chunk):
+            sheet.append(row)
+        rows += len(chunk)
+    workbook.save(target)
+    return rows
+
+
+def _is_text_column(series: pd.Series) -> bool:
+    return isinstance(series.dtype, pd.CategoricalDtype) or series.dtype == object
+
+
+def _arrow_schema(df: pd.DataFrame, columns: Sequence[str]):
+    """One schema for every row group: text columns as strings, the rest as pandas would convert them."""
+    import pyarrow as pa
+
+    fields = []
+    for column in columns:
+        if _is_text_column(df[column]):
+            fields.append(pa.field(str(column), pa.string()))
+        else:
+            fields.append(pa.Schema.from_pandas(df[[column]].iloc[:0], preserve_index=False).field(str(column)))
+    return pa.schema(fields)
+
+
+def _arrow_ready(chunk: pd.DataFrame) -> pd.DataFrame:
+    # Text columns can mix str, numbers and NaN; Arrow needs strings with nulls
+    chunk = chunk.copy()
+    for column in chunk.columns:
+        series = chunk[column]
+        if _is_text_column(series):
+            values = series.astype(object)
+            chunk[column] = values.where(values.isna(), values.astype(str))
+    return chunk
+
+
+def _xlsx_stream(df: pd.DataFrame, columns: Sequence[str], chunks: Iterator[pd.DataFrame],
+                 stats: Dict[str, Any]) -> Iterator[bytes]:
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES) as spool:
+        stats['rows'] = write_xlsx(spool, chunks, columns)
+        yield from _spooled_chunks(spool)
+
+
+def _csv_stream(df: pd.DataFrame, columns: Sequence[str], chunks: Iterator[pd.DataFrame],
+                stats: Dict[str, Any]) -> Iterator[bytes]:
+    header = True
+    for chunk in chunks:
+        yield chunk.to_csv(index=False, header=header).encode('utf-8')
+        header = False
+        stats['rows'] += len(chunk)
+    if header:
+        yield pd.DataFrame(columns=list(columns)).to_csv(index=False).encode('utf-8')
+
+
+def _parquet_stream(df: pd.DataFrame, columns: Sequence[str], chunks: Iterator[pd.DataFrame],
+                    stats: Dict[str, Any]) -> Iterator[bytes]:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = _arrow_schema(df, columns)
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES) as spool:
+        with pq.ParquetWriter(spool, schema) as writer:
+            for chunk in chunks:
+                writer.write_table(pa.Table.from_pandas(_arrow_ready(chunk), schema=schema, preserve_index=False))
+                stats['rows'] += len(chunk)
+        yield from _spooled_chunks(spool)
+
+
+_WRITERS = {'xlsx': _xlsx_stream, 'csv': _csv_stream, 'parquet': _parquet_stream}
+
+
+def stream_frame(df: pd.DataFrame, fmt: str = DEFAULT_FORMAT, columns: Optional[Sequence[str]] = None,
+                 positions: Optional[np.ndarray] = None, chunk_rows: int = CHUNK_ROWS) -> Iterator[bytes]:
+    """Yield the encoded export of df (optionally only some columns and row positions) in blocks."""
+    fmt = export_format(fmt)
+    columns: List[str] = list(df.columns) if columns is None else [c for c in columns if c in df.columns]
+    stats = {'rows': 0}
+    started = time.perf_counter()
+    written = 0
+    for block in _WRITERS[fmt](df, columns, iter_frame_chunks(df, columns, positions, chunk_rows), stats):
+        written += len(block)
+        yield block
+    elapsed = time.perf_counter() - started
+    record_stage(f'export_{fmt}', elapsed)
+    logger.info(f"Streamed {fmt} export: {stats['rows']} rows x {len(columns)} columns, "
+                f"{written / 1024:.0f} KB in {elapsed * 1000:.0f}ms")
+
+
+def _resume(first: Optional[bytes], blocks: Iterator[bytes]) -> Iterator[bytes]:
+    try:
+        if first is not None:
+            yield first
+        yield from blocks
+    finally:
+        blocks.close()
+
+
+def open_export(df: pd.DataFrame, fmt: str = DEFAULT_FORMAT, columns: Optional[Sequence[str]] = None,
+                positions: Optional[np.ndarray] = None, chunk_rows: int = CHUNK_ROWS) -> Iterator[bytes]:
+    """
+    stream_frame over a snapshot of df, started: encoding errors (for XLSX
+    and Parquet, any error) raise here rather than from the returned iterator.
+    """
+    if positions is not None:
+        positions = np.array(positions, copy=True)
+    blocks = stream_frame(lazy_copy(df), fmt, columns=columns, positions=positions, chunk_rows=chunk_rows)
+    first = next(blocks, None)
+    return _resume(first, blocks)
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Shared, immutable DataFrame snapshots for loaded inventory files.
+
+A processed inventory frame is wide and string-heavy. ExcelProcessor used to
+keep one deep copy in its file cache, hand out another on every cache hit,
+and endpoints copied again before filtering. With pandas Copy-on-Write
+enabled, a FrameSnapshot holds the processed frame once per process. Each
+processor gets a lazy view of it: the view shares every column until it is
+written, and an in-place edit (a lineage or DOH change, a library edit)
+copies only the column it touches. Rows appended from JSON matches build a
+new frame for that processor and leave the snapshot alone.
+
+Filtered results are built as positional index arrays and materialised
+once with take(), rather than copying the frame and then masking it.
+
+Copy-on-Write is a process-wide pandas option, so importing this module does
+not change it: the application turns it on once at worker startup
+(start_worker_prewarm in app.py), before requests run pandas code. Without
+it, or with AGT_PANDAS_COW=0, snapshots fall back to the old deep copies.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+COW_ENV_VAR = 'AGT_PANDAS_COW'
+
+# Snapshots kept per process; processors share them by file path and mtime
+MAX_SHARED_SNAPSHOTS = 5
+
+
+def enable_copy_on_write() -> bool:
+    """
+    Switch pandas to Copy-on-Write mode for the whole process unless
+    AGT_PANDAS_COW=0; returns whether it is on. Call once at startup.
+    """
+    if os.environ.get(COW_ENV_VAR, '1') == '0':
+        return copy_on_write_enabled()
+    if not copy_on_write_enabled():
+        pd.set_option('mode.copy_on_write', True)
+        logger.debug("pandas Copy-on-Write enabled")
+    return True
+
+
+def copy_on_write_enabled() -> bool:
+    return pd.get_option('mode.copy_on_write') is True
+
+
+def lazy_copy(df: pd.DataFrame) -> pd.DataFrame:
+    """A copy that shares memory until written under Copy-on-Write, a deep copy otherwise."""
+    return df.copy(deep=not copy_on_write_enabled())
+
+
+class FrameSnapshot:
+    """Read-only base frame of one processed file, shared by every processor view."""
+
+    def __init__(self, df: pd.DataFrame, source: Optional[str] = None):
+        # Detach from the caller's frame so its later edits never reach the snapshot
+        self._df = lazy_copy(df)
+        self.source = source
+        self.created_at = time.time()
+        self.views = 0
+
+    def __len__(self) -> int:
+        return len(self._df)
+
+    @property
+    def columns(self) -> pd.Index:
+        return self._df.columns
+
+    def view(self) -> pd.DataFrame:
+        """A processor-owned frame over the snapshot; writes to it copy only the touched columns."""
+        self.views += 1
+        return lazy_copy(self._df)
+
+    def take(self, positions: Iterable[int], columns: Optional[list] = None) -> pd.DataFrame:
+        """Materialise only the given row positions (and columns)."""
+        df = self._df if columns is None else self._df[columns]
+        return df.take(np.asarray(positions, dtype=np.intp))
+
+    def shares_column(self, df: pd.DataFrame, column: str) -> bool:
+        """Whether a view's column is still backed by the snapshot's memory."""
+        if column not in df.columns or column not in self._df.columns:
+            return False
+        return np.shares_memory(_backing_array(df[column]), _backing_array(self._df[column]))
+
+    @property
+    def nbytes(self) -> int:
+        return int(self._df.memory_usage(index=True, deep=False).sum())
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            'source': self.source,
+            'rows': len(self._df),
+            'columns': len(self._df.columns),
+            'nbytes': self.nbytes,
+            'views': self.views,
+            'age_seconds': round(time.time() - self.created_at, 1),
+        }
+
+
+def _backing_array(series: pd.Series) -> np.ndarray:
+    values = series.array
+    for attr in ('_ndarray', '_codes', '_data'):
+        backing = getattr(values, attr, None)
+        if isinstance(backing, np.ndarray):
+            return backing
+    return series.to_numpy()
+
+
+def positions_of(mask) -> np.ndarray:
+    """Row positions where a boolean mask (Series or array) is true."""
+    return np.flatnonzero(np.asarray(mask, dtype=bool))
+
+
+class SnapshotCache:
+    """
+    Process-wide FIFO of FrameSnapshots keyed by "<path>_<mtime>", so a
+    reload of an unchanged file in any processor reuses the parsed frame.
+    Supports the dict operations ExcelProcessor used on its own file cache.
+    """
+
+    def __init__(self, max_size: int = MAX_SHARED_SNAPSHOTS):
+        self.max_size = max_size
+        self._items: 'OrderedDict[str, FrameSnapshot]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, key) -> bool:
+        return key in self._items
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __getitem__(self, key) -> FrameSnapshot:
+        return self._items[key]
+
+    def __setitem__(self, key, value) -> None:
+        snapshot = value if isinstance(value, FrameSnapshot) else FrameSnapshot(value, str(key))
+        with self._lock:
+            self._items[key] = snapshot
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def __delitem__(self, key) -> None:
+        with self._lock:
+            self._items.pop(key, None)
+
+    def __iter__(self):
+        return iter(list(self._items))
+
+    def keys(self):
+        return list(self._items)
+
+    def get(self, key, default=None):
+        return self._items.get(key, default)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+    def discard_source(self, source: str) -> int:
+        """Drop every snapshot of one file, so its next load is processed from disk."""
+        with self._lock:
+            keys = [key for key, snapshot in self._items.items() if snapshot.source == source]
+            for key in keys:
+                del self._items[key]
+        return len(keys)
+
+    def stats(self) -> Dict[str, Any]:
+        snapshots = list(self._items.values())
+        return {
+            'copy_on_write': copy_on_write_enabled(),
+            'snapshots': len(snapshots),
+            'nbytes': sum(s.nbytes for s in snapshots),
+            'entries': [s.info() for s in snapshots],
+        }
+
+
+_snapshot_cache: Optional[SnapshotCache] = None
+_snapshot_cache_lock = threading.Lock()
+
+
+def get_snapshot_cache() -> SnapshotCache:
+    """Return the process-wide snapshot cache."""
+    global _snapshot_cache
+    if _snapshot_cache is None:
+        with _snapshot_cache_lock:
+            if _snapshot_cache is None:
+                _snapshot_cache = SnapshotCache()
+    return _snapshot_cache
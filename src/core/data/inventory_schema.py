@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Typed schema stage for the processed inventory DataFrame.
+
+load_file leaves most columns as Python strings. Many of them hold only a
+handful of distinct values, such as vendor, brand, product type, lineage,
+units, DOH and room. The THC, CBD and price fields stay as text and were
+re-parsed row by row with safe_float whenever tags or labels were built.
+The schema stage runs once after processing and does three things:
+
+- stores low-cardinality columns as `category`, keeping '' as a category
+  so blank fills and writes of known values stay valid;
+- adds a float companion column next to each numeric display column
+  (e.g. "Total THC [num]"). Values that do not parse become 0.0, matching
+  safe_float;
+- drops columns that are entirely empty and that nothing reads.
+
+It returns a report of the frame's memory before and after. Filters and
+dropdown caches use the helpers below, which work on category codes
+instead of comparing every row's string.
+"""
+
+import logging
+from typing import Any, Dict, Iterable, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Columns stored as category when at most this share of their values is distinct
+CATEGORY_MAX_UNIQUE_RATIO = 0.5
+
+CATEGORY_COLUMNS = (
+    'Product Type*', 'Lineage', 'Product Brand', 'Vendor', 'Vendor/Supplier*', 'Product Strain',
+    'Units', 'DOH', 'DOH Compliant (Yes/No)', 'State', 'Room*', 'Room', 'CombinedWeight',
+    'Test result unit (% or mg)', 'Source', 'Medical Only (Yes/No)', 'Is Sample? (yes/no)',
+    'Is MJ product?(yes/no)', 'Concentrate Type',
+)
+
+NUMERIC_COLUMNS = (
+    'Total THC', 'THCA', 'THC Content', 'THC test result',
+    'Total CBD', 'CBDA', 'CBD Content', 'CBD test result',
+    'Price', 'Price*',
+)
+
+NUMERIC_SUFFIX = ' [num]'
+
+# Read by name somewhere in the app, so kept even when the upload leaves them empty
+PROTECTED_COLUMNS = frozenset(CATEGORY_COLUMNS + NUMERIC_COLUMNS + (
+    'Product Name*', 'ProductName', 'Product Name', 'Description', 'DescAndWeight', 'Weight*', 'Weight',
+    'WeightUnits', 'Quantity*', 'Quantity Received*', 'Quantity', 'Ratio', 'Ratio_or_THC_CBD', 'JointRatio',
+    'Strain Names', 'Price* (Tier Name for Bulk)', 'Barcode*', 'Internal Product Identifier',
+    'CBN', 'CBG', 'CBC', 'THC', 'CBD', 'AI', 'AJ', 'AK',
+))
+
+
+def numeric_column_name(column: str) -> str:
+    return f"{column}{NUMERIC_SUFFIX}"
+
+
+def is_numeric_companion(column) -> bool:
+    return isinstance(column, str) and column.endswith(NUMERIC_SUFFIX)
+
+
+def display_columns(df: pd.DataFrame) -> List[str]:
+    """Columns meant for people (exports, previews): everything but the numeric companions."""
+    return [column for column in df.columns if not is_numeric_companion(column)]
+
+
+def parse_numeric(series: pd.Series) -> np.ndarray:
+    """Vectorised safe_float: float values, with 0.0 wherever the text does not parse."""
+    if pd.api.types.is_numeric_dtype(series.dtype) and not isinstance(series.dtype, pd.CategoricalDtype):
+        values = series.to_numpy(dtype=float, na_value=np.nan)
+    else:
+        text = series.astype(str).str.strip()
+        values = pd.to_numeric(text, errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+    return np.nan_to_num(values, nan=0.0, posinf=0.0, neginf=0.0)
+
+
+def numeric_values(df: pd.DataFrame, column: str) -> np.ndarray:
+    """Parsed floats for a display column, aligned with df's rows (zeros when it is missing)."""
+    companion = numeric_column_name(column)
+    if companion in df.columns and df[companion].dtype == np.float64:
+        return df[companion].to_numpy()
+    if column in df.columns:
+        return parse_numeric(df[column])
+    return np.zeros(len(df))
+
+
+def _frame_nbytes(df: pd.DataFrame) -> int:
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+def _is_empty_column(series: pd.Series) -> bool:
+    if series.isna().all():
+        return True
+    if series.dtype == object or isinstance(series.dtype, pd.StringDtype):
+        return bool((series.dropna().astype(str).str.strip() == '').all())
+    return False
+
+
+def apply_inventory_schema(df: pd.DataFrame) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """Compact a processed inventory frame; returns the new frame and a memory report."""
+    before = _frame_nbytes(df)
+
+    dropped = [
+        column for column in df.columns
+        if column not in PROTECTED_COLUMNS and not is_numeric_companion(column) and _is_empty_column(df[column])
+    ]
+    if dropped:
+        df = df.drop(columns=dropped)
+
+    categorized = []
+    rows = len(df)
+    for column in CATEGORY_COLUMNS:
+        if column not in df.columns:
+            continue
+        series = df[column]
+        if not isinstance(series.dtype, pd.CategoricalDtype):
+            if rows and series.nunique(dropna=True) > rows * CATEGORY_MAX_UNIQUE_RATIO:
+                continue
+            series = series.astype('category')
+            categorized.append(column)
+        if '' not in series.cat.categories:
+            series = series.cat.add_categories([''])
+        df[column] = series
+
+    numeric = []
+    for column in NUMERIC_COLUMNS:
+        if column in df.columns:
+            df[numeric_column_name(column)] = parse_numeric(df[column])
+            numeric.append(column)
+
+    after = _frame_nbytes(df)
+    report = {
+        'bytes_before': before,
+        'bytes_after': after,
+        'saved_percent': round(100.0 * (before - after) / before, 1) if before else 0.0,
+        'categorized': categorized,
+        'numeric': numeric,
+        'dropped': dropped,
+    }
+    logger.info(f"Inventory schema: {before / 1048576:.2f} MB -> {after / 1048576:.2f} MB "
+                f"({len(categorized)} category, {len(numeric)} numeric, {len(dropped)} dropped columns)")
+    return df, report
+
+
+def equals_mask(series: pd.Series, value: str) -> np.ndarray:
+    """Case/whitespace-insensitive equality; categoricals compare their categories once, then codes."""
+    target = str(value).lower().strip()
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        categories = series.cat.categories.astype(str).str.lower().str.strip()
+        matching = np.flatnonzero(categories == target)
+        return np.isin(series.cat.codes.to_numpy(), matching)
+    return (series.astype(str).str.lower().str.strip() == target).to_numpy(dtype=bool)
+
+
+def distinct_values(series: pd.Series) -> list:
+    """Non-null distinct values; for categoricals, the categories actually in use."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes = series.cat.codes.to_numpy()
+        used = np.unique(codes[codes >= 0])
+        return series.cat.categories[used].tolist()
+    return series.dropna().unique().tolist()
+
+
+def ensure_categories(df: pd.DataFrame, column: str, values: Iterable[Any]) -> None:
+    """Add any new values to a categorical column's categories before they are written."""
+    if column in df.columns and isinstance(df[column].dtype, pd.CategoricalDtype):
+        missing = [v for v in dict.fromkeys(values) if v not in df[column].cat.categories and not pd.isna(v)]
+        if missing:
+            df[column] = df[column].cat.add_categories(missing)
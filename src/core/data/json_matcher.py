@@ -11,16 +11,48 @@ import pandas as pd
 from .product_database import ProductDatabase
 from .ai_product_matcher import AIProductMatcher
 from .advanced_matcher import AdvancedMatcher, MatchResult
+from src.core.utils.metrics import timed_stage
+from .manifest_fetcher import get_manifest_fetcher, bamboo_auth_headers
+from .strain_lexicon import StrainAutomaton
+from src.core.utils.normalization import (
+    canonical_strain_alias, extract_key_terms, normalize_match_text,
+    normalize_product_name, normalize_text, strip_medically_compliant_prefix
+)
 from collections import defaultdict
 from fuzzywuzzy import fuzz
 from fuzzywuzzy import process
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import multiprocessing
 
-# Compile regex patterns once for performance
-_DIGIT_UNIT_RE = re.compile(r"\b\d+(?:g|mg)\b")
-_NON_WORD_RE = re.compile(r"[^\w\s-]")
-_SPLIT_RE = re.compile(r"[-\s]+")
+# Strain keywords for _extract_strain_from_product_name, checked in list order
+STRAIN_NAME_KEYWORDS = [
+    # Popular strains
+    "blue dream", "green crack", "maui wowie", "granddaddy purple", "bubba kush",
+    "master kush", "hindu kush", "afghan kush", "sour diesel", "nyc diesel",
+    "girl scout cookies", "gsc", "thin mint", "forum cut", "animal cookies",
+    "white runtz", "pink runtz", "zombie runtz", "rainbow runtz", "trophy runtz",
+    "gelato", "gelato 33", "gelato 41", "gelato 47", "sunset sherbet", "sherbet",
+    "wedding cake", "wedding crasher", "wedding pie", "wedding mint",
+    "blueberry", "strawberry", "banana", "mango", "pineapple", "lemon", "lime",
+    "cherry", "grape", "apple", "orange", "guava", "dragon", "fruit", "passion",
+    "peach", "apricot", "watermelon", "cantaloupe", "honeydew", "kiwi", "plum",
+    "raspberry", "blackberry", "yoda", "amnesia", "afghani", "hashplant", "super",
+    "boof", "grandy", "candy", "tricho", "jordan", "cosmic", "combo", "honey",
+    "bread", "mintz", "grinch", "ak-47", "white widow", "northern lights", "skunk",
+    "jack herer", "durban poison", "trainwreck", "chemdawg", "sour", "cheese",
+    "dream", "crack", "maui", "granddaddy", "grand daddy", "bubba", "master",
+    "hindu", "afghan", "master", "sour", "cheese", "dream", "high life", "white gummie",
+    "seattle trophy wife", "tangerine queen", "cenex", "triangle kush", "red velvet cake",
+    "grape goji", "watermelon mojito", "candy pound cake", "truffle cake", "emerald apricot",
+    "bollywood runtz", "mango punch", "raspberry lemonade", "strawberry burst", "watermelon wave",
+    "grape soda", "strawberry bliss", "25 eyes", "cherry ztripez", "metaverse", "galactic jack",
+    "gdpunch", "grape ape", "rainbow cake", "strawberry mimosa", "yoda og", "goji og",
+    "cookies and cream", "grape gas gelatti", "maui wowie", "strawberry shortcake", "grapefruit",
+    "purple rain", "crepe ape", "trunk funk", "sub woofer", "golden pineapple", "chicken & waffles"
+]
+_STRAIN_NAME_KEYWORD_AUTOMATON = StrainAutomaton(STRAIN_NAME_KEYWORDS)
+# Keywords that are really product type words
+_KEYWORD_PRODUCT_TYPE_WORDS = {'honey', 'crystal', 'live', 'liquid', 'diamond', 'resin', 'disposable', 'vape', 'cartridge'}
 
 # Type override lookup
 TYPE_OVERRIDES = {
@@ -395,13 +427,6 @@ def map_json_to_db_fields(json_item):
         mapped[db_key] = v
     return mapped
 
-MEDICALLY_COMPLIANT_PREFIXES = [
-    'medically compliant -',
-    'med compliant -',
-    'med compliant-',
-    'medically compliant-',
-]
-
 def infer_product_type_from_name(product_name: str) -> str:
     """
     Infer product type from product name using pattern matching and TYPE_OVERRIDES.
@@ -437,58 +462,6 @@ def infer_product_type_from_name(product_name: str) -> str:
         # Default to Vape Cartridge for any remaining unknown types since most products are concentrates
         return "Vape Cartridge"
 
-def strip_medically_compliant_prefix(name):
-    # Safety check: ensure name is a string
-    if not isinstance(name, str):
-        if isinstance(name, list):
-            logging.warning(f"strip_medically_compliant_prefix received a list instead of string: {name}")
-            # If it's a list, try to join it or take the first element
-            if name:
-                name = str(name[0]) if isinstance(name[0], str) else str(name[0])
-            else:
-                name = ""
-        else:
-            logging.warning(f"strip_medically_compliant_prefix received non-string type: {type(name)} - {name}")
-            name = str(name) if name is not None else ""
-    
-    name = name.strip()
-    for prefix in MEDICALLY_COMPLIANT_PREFIXES:
-        if name.lower().startswith(prefix):
-            return name[len(prefix):].strip()
-    return name
-
-def normalize_product_name(name):
-    # Safety check: ensure name is a string
-    if not isinstance(name, str):
-        if isinstance(name, list):
-            logging.warning(f"normalize_product_name received a list instead of string: {name}")
-            # If it's a list, try to join it or take the first element
-            if name:
-                name = str(name[0]) if isinstance(name[0], str) else str(name[0])
-            else:
-                name = ""
-        else:
-            logging.warning(f"normalize_product_name received non-string type: {type(name)} - {name}")
-            name = str(name) if name is not None else ""
-    
-    name = strip_medically_compliant_prefix(name)
-    name = name.lower().strip()
-    
-    # Remove weight/measurement suffixes (e.g., " - 1g", " - 3.5g", " - 7g", etc.)
-    weight_patterns = [
-        r'\s*-\s*\d+(?:\.\d+)?\s*(?:g|gram|grams|mg|oz|ounce|ounces|pk|pack|packs|piece|pieces|roll|rolls|stix|stick|sticks)\b',
-        r'\s*\d+(?:\.\d+)?\s*(?:g|gram|grams|mg|oz|ounce|ounces|pk|pack|packs|piece|pieces|roll|rolls|stix|stick|sticks)\b',
-        r'\s*-\s*\d+(?:\.\d+)?\s*$',  # Just numbers at the end
-        r'\s+\d+(?:\.\d+)?\s*$',  # Numbers at the end without dash
-    ]
-    
-    for pattern in weight_patterns:
-        name = re.sub(pattern, '', name, flags=re.IGNORECASE)
-    
-    name = re.sub(r'[^\w\s-]', '', name)  # remove non-alphanumeric except hyphen/space
-    name = re.sub(r'[-\s]+', ' ', name)  # collapse hyphens and spaces
-    return name.strip()
-
 class JSONMatcher:
     """Handles JSON URL fetching and product matching functionality."""
     
@@ -498,6 +471,7 @@ class JSONMatcher:
         self._indexed_cache = None  # New indexed cache for O(1) lookups
         self.json_matched_names = None
         self._strain_cache = None
+        self._strain_db = None
         self._lineage_cache = None
         self.advanced_matcher = AdvancedMatcher()  # Initialize advanced matching system
         
@@ -673,91 +647,8 @@ class JSONMatcher:
         
     def _normalize(self, s: str) -> str:
         """Normalize text for matching by removing digits, units, and special characters."""
-        # Ensure input is a string
-        s = str(s or "")
-        s = s.lower()
-        s = _DIGIT_UNIT_RE.sub("", s)
-        s = _NON_WORD_RE.sub(" ", s)
-        return _SPLIT_RE.sub(" ", s).strip()
+        return normalize_match_text(s)
         
-    def _extract_key_terms(self, name: str) -> Set[str]:
-        """Extract meaningful product terms, excluding common prefixes/suffixes."""
-        try:
-            # Debug logging to see what type of input we're getting
-            if not isinstance(name, str):
-                logging.warning(f"_extract_key_terms received non-string input: {type(name)} - {name}")
-                if isinstance(name, list):
-                    logging.warning(f"_extract_key_terms received a list: {name}")
-                    # If it's a list, try to join it or take the first element
-                    if name:
-                        name = str(name[0]) if isinstance(name[0], str) else str(name[0])
-                    else:
-                        name = ""
-                else:
-                    name = str(name) if name is not None else ""
-            
-            # Ensure input is a string
-            name = str(name or "")
-            name_lower = name.lower()
-            
-            # Split on both spaces and hyphens to break compound terms
-            words = set()
-            for part in name_lower.replace('_', ' ').split():
-                # Split each part on hyphens as well
-                sub_parts = part.split('-')
-                for sub_part in sub_parts:
-                    if sub_part.strip():  # Only add non-empty parts
-                        words.add(sub_part.strip())
-            
-            # Common words to exclude
-            common_words = {
-                'medically', 'compliant', '1g', '2g', '3.5g', '7g', '14g', '28g', 'oz', 'gram', 'grams',
-                'pk', 'pack', 'packs', 'piece', 'pieces', 'roll', 'rolls', 'stix', 'stick', 'sticks', 'brand', 'vendor', 'product',
-                'the', 'and', 'or', 'with', 'for', 'of', 'by', 'from', 'to', 'in', 'on', 'at', 'a', 'an', 'mg', 'thc', 'cbd'
-            }
-            
-            # Filter out common words and short words (less than 2 characters for words like "all", "in", "one")
-            key_terms = {word for word in words if word not in common_words and len(word) >= 2}
-            
-            # Add product type indicators for better matching
-            product_types = {
-                'rosin', 'wax', 'shatter', 'live', 'resin', 'distillate', 'cartridge', 'pre-roll', 'pre-rolls',
-                'blunt', 'blunts', 'edible', 'edibles', 'tincture', 'tinctures', 'topical', 'topicals',
-                'concentrate', 'concentrates', 'flower', 'buds', 'infused', 'flavour', 'flavor'
-            }
-            
-            # Add product type terms if found
-            for word in words:
-                if word in product_types:
-                    key_terms.add(word)
-            
-            # Add strain names (common cannabis strain words)
-            strain_indicators = {
-                'gmo', 'runtz', 'cookies', 'cream', 'wedding', 'cake', 'blueberry', 'banana', 'strawberry',
-                'grape', 'lemon', 'lime', 'orange', 'cherry', 'apple', 'mango', 'pineapple', 'passion',
-                'dragon', 'fruit', 'guava', 'pink', 'lemonade', 'haze', 'kush', 'diesel', 'og', 'sherbet',
-                'gelato', 'mintz', 'grinch', 'cosmic', 'combo', 'honey', 'bread', 'tricho', 'jordan',
-                'super', 'boof', 'grandy', 'candy', 'afghani', 'hashplant', 'yoda', 'amnesia'
-            }
-            
-            # Add strain terms if found
-            for word in words:
-                if word in strain_indicators:
-                    key_terms.add(word)
-            
-            # Add vendor/brand terms (but exclude common prefixes)
-            vendor_prefixes = {'medically', 'compliant', 'by'}
-            name_parts = name_lower.split()
-            for i, part in enumerate(name_parts):
-                if part not in vendor_prefixes and len(part) >= 3:
-                    # Add single vendor words only
-                    key_terms.add(part)
-                  
-            return key_terms
-        except Exception as e:
-            logging.warning(f"Error in _extract_key_terms: {e}")
-            return set()
-    
     def _clean_product_name_for_display(self, product_name: str, strain: str = None, weight: str = None, units: str = None) -> str:
         """
         Clean up product name for better display when no database match is found.
@@ -1406,7 +1297,27 @@ class JSONMatcher:
             logging.error(f"json_item: {json_item}")
             logging.error(f"cache_item: {cache_item}")
             return 0.05  # Return very low score instead of 0
-        
+
+    def _fetch_manifest_payload(self, url: str) -> Any:
+        """Fetch a manifest with the shared fetcher, falling back to the proxy endpoint."""
+        import requests
+        import os
+
+        fetcher = get_manifest_fetcher()
+        # Server credentials go to the Bamboo API only, never to other hosts a caller names
+        headers = bamboo_auth_headers(url)
+        try:
+            return fetcher.fetch_json(url, headers=headers)
+        except (requests.exceptions.RequestException, ValueError) as direct_error:
+            logging.info(f"Direct request failed, trying proxy: {direct_error}")
+            # Fallback to proxy endpoint if direct request fails
+            base_url = os.environ.get('FLASK_BASE_URL', 'http://127.0.0.1:5001')
+            proxy_data = {'url': url, 'headers': headers}
+            response = fetcher.session.post(f'{base_url}/api/proxy-json', json=proxy_data, timeout=60)
+            response.raise_for_status()
+            return response.json()
+
+    @timed_stage('matching')
     def fetch_and_match(self, url: str) -> List[Dict]:
         """
         Fetch JSON from URL and match products against the loaded Excel data.
@@ -1494,45 +1405,8 @@ class JSONMatcher:
                     logging.error(f"Error parsing data URL: {data_error}")
                     raise ValueError(f"Failed to parse data URL: {data_error}")
             else:
-                # Handle HTTP URLs
-                import requests
-                
-                # Prepare headers for the request
-                headers = {
-                        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-                        'Accept': 'application/json',
-                        'Accept-Language': 'en-US,en;q=0.9',
-                        'Accept-Encoding': 'gzip, deflate, br',
-                        'Connection': 'keep-alive',
-                        'Upgrade-Insecure-Requests': '1'
-                }
-                
-                # Add authentication headers if available
-                # These can be set via environment variables or configuration
-                import os
-                if os.environ.get('BAMBOO_API_KEY'):
-                    headers['X-API-Key'] = os.environ.get('BAMBOO_API_KEY')
-                if os.environ.get('BAMBOO_AUTH_TOKEN'):
-                    headers['Authorization'] = f"Bearer {os.environ.get('BAMBOO_AUTH_TOKEN')}"
-                if os.environ.get('BAMBOO_SESSION_TOKEN'):
-                    headers['X-Session-Token'] = os.environ.get('BAMBOO_SESSION_TOKEN')
-                
-                # Try to make the request directly first
-                try:
-                    response = requests.get(url, headers=headers, timeout=60)
-                    response.raise_for_status()
-                    payload = response.json()
-                except (requests.exceptions.RequestException, ValueError) as direct_error:
-                    logging.info(f"Direct request failed, trying proxy: {direct_error}")
-                    # Fallback to proxy endpoint if direct request fails
-                    import os
-                    base_url = os.environ.get('FLASK_BASE_URL', 'http://127.0.0.1:5001')
-                    proxy_data = {'url': url, 'headers': headers}
-                    response = requests.post(f'{base_url}/api/proxy-json', 
-                                           json=proxy_data, 
-                                           timeout=60)
-                    response.raise_for_status()
-                    payload = response.json()
+                # Handle HTTP URLs through the shared fetcher (pooled session, conditional GET, parsed cache)
+                payload = self._fetch_manifest_payload(url)
                 
             # Handle both list and dictionary payloads
             if isinstance(payload, list):
@@ -3628,6 +3502,7 @@ class JSONMatcher:
             logging.warning(f"Error estimating price by type and weight: {e}")
             return 25.0  # Default fallback price
             
+    @timed_stage('matching')
     def fetch_and_match_with_product_db(self, url: str) -> List[Dict]:
         """
         Fetch JSON from URL and create product tags, prioritizing Product Database lookups
@@ -3654,48 +3529,8 @@ class JSONMatcher:
                 logging.warning(f"Could not initialize Product Database: {e}")
                 product_db = None
             
-            # Use the proxy endpoint to handle authentication and CORS
-            import requests
-            
-            # Prepare headers for the request
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-                'Accept': 'application/json',
-                'Accept-Language': 'en-US,en;q=0.9',
-                'Accept-Encoding': 'gzip, deflate, br',
-                'Connection': 'keep-alive',
-                'Upgrade-Insecure-Requests': '1'
-            }
-            
-            # Add authentication headers if available
-            import os
-            if os.environ.get('BAMBOO_API_KEY'):
-                headers['X-API-Key'] = os.environ.get('BAMBOO_API_KEY')
-            if os.environ.get('BAMBOO_AUTH_TOKEN'):
-                headers['Authorization'] = f"Bearer {os.environ.get('BAMBOO_AUTH_TOKEN')}"
-            if os.environ.get('BAMBOO_SESSION_TOKEN'):
-                headers['X-Session-Token'] = os.environ.get('BAMBOO_SESSION_TOKEN')
-            
-            proxy_data = {
-                'url': url,
-                'headers': headers
-            }
-            
-            # Try to make the request directly first (for external URLs)
-            try:
-                response = requests.get(url, headers=headers, timeout=60)
-                response.raise_for_status()
-                payload = response.json()
-            except (requests.exceptions.RequestException, ValueError) as direct_error:
-                logging.info(f"Direct request failed, trying proxy: {direct_error}")
-                # Fallback to proxy endpoint if direct request fails
-                import os
-                base_url = os.environ.get('FLASK_BASE_URL', 'http://127.0.0.1:5001')
-                response = requests.post(f'{base_url}/api/proxy-json', 
-                                       json=proxy_data, 
-                                       timeout=60)
-                response.raise_for_status()
-                payload = response.json()
+            # Fetch through the shared fetcher, falling back to the proxy endpoint
+            payload = self._fetch_manifest_payload(url)
                 
             # Handle both list and dictionary payloads
             if isinstance(payload, list):
@@ -4503,6 +4338,8 @@ class JSONMatcher:
         
     def rebuild_strain_cache(self):
         """Force rebuild the strain cache."""
+        if self._strain_db is not None:
+            self._strain_db._invalidate_strain_lexicon()
         self._strain_cache = None
         self._lineage_cache = None
         self._build_strain_cache()
@@ -4544,48 +4381,8 @@ class JSONMatcher:
             DataFrame with processed inventory data
         """
         try:
-            # Use the proxy endpoint to handle authentication and CORS
-            import requests
-            
-            # Prepare headers for the request
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-                'Accept': 'application/json',
-                'Accept-Language': 'en-US,en;q=0.9',
-                'Accept-Encoding': 'gzip, deflate, br',
-                'Connection': 'keep-alive',
-                'Upgrade-Insecure-Requests': '1'
-            }
-            
-            # Add authentication headers if available
-            import os
-            if os.environ.get('BAMBOO_API_KEY'):
-                headers['X-API-Key'] = os.environ.get('BAMBOO_API_KEY')
-            if os.environ.get('BAMBOO_AUTH_TOKEN'):
-                headers['Authorization'] = f"Bearer {os.environ.get('BAMBOO_AUTH_TOKEN')}"
-            if os.environ.get('BAMBOO_SESSION_TOKEN'):
-                headers['X-Session-Token'] = os.environ.get('BAMBOO_SESSION_TOKEN')
-            
-            proxy_data = {
-                'url': url,
-                'headers': headers
-            }
-            
-            # Try to make the request directly first (for external URLs)
-            try:
-                response = requests.get(url, headers=headers, timeout=30)
-                response.raise_for_status()
-                payload = response.json()
-            except (requests.exceptions.RequestException, ValueError) as direct_error:
-                logging.info(f"Direct request failed, trying proxy: {direct_error}")
-                # Fallback to proxy endpoint if direct request fails
-                import os
-                base_url = os.environ.get('FLASK_BASE_URL', 'http://127.0.0.1:5001')
-                response = requests.post(f'{base_url}/api/proxy-json', 
-                                       json=proxy_data, 
-                                       timeout=30)
-                response.raise_for_status()
-                payload = response.json()
+            # Fetch through the shared fetcher, falling back to the proxy endpoint
+            payload = self._fetch_manifest_payload(url)
                 
             # Handle both list and dictionary payloads
             if isinstance(payload, list):
@@ -4627,6 +4424,7 @@ class JSONMatcher:
         """Build a cache of strain data from the product database for fast matching."""
         try:
             product_db = ProductDatabase()
+            self._strain_db = product_db
             self._strain_cache = product_db.get_all_strains()
             self._lineage_cache = product_db.get_strain_lineage_map()
             
@@ -4641,6 +4439,7 @@ class JSONMatcher:
             logging.info(f"Built strain cache with {len(self._strain_cache)} strains and {len(self._lineage_cache)} lineages")
         except Exception as e:
             logging.warning(f"Could not build strain cache: {e}")
+            self._strain_db = None
             self._strain_cache = set()
             self._lineage_cache = {}
         
@@ -4651,27 +4450,13 @@ class JSONMatcher:
             
         # Ensure input is a string
         text = str(text or "")
-        if not text:
+        if not text or self._strain_db is None:
             return []
-            
-        text_lower = text.lower()
-        found_strains = []
         
-        # Check for exact strain matches
-        for strain in self._strain_cache:
-            # Ensure strain is a string before calling .lower()
-            if isinstance(strain, str):
-                if strain.lower() in text_lower:
-                    lineage = self._lineage_cache.get(strain, "HYBRID")
-                    found_strains.append((strain, lineage))
-            else:
-                # Skip non-string strains and log for debugging
-                logging.warning(f"Skipping non-string strain in cache: {type(strain)} - {strain}")
-                
-        # Sort by length (longer strains first) to prioritize more specific matches
-        found_strains.sort(key=lambda x: len(x[0]), reverse=True)
-        
-        return found_strains 
+        # One pass over the text; the automaton is shared per database and rebuilt after strain adds.
+        # Longer strains come first to prioritize more specific matches.
+        automaton = self._strain_db.get_strain_automaton()
+        return [(strain, self._lineage_cache.get(strain, "HYBRID")) for strain in automaton.find_strains(text)]
 
     def _find_strict_fuzzy_vendor_matches(self, json_vendor: str) -> List[dict]:
         """Find vendor matches using strict fuzzy matching - only very similar vendor names."""
@@ -6067,29 +5852,7 @@ class JSONMatcher:
     
     def _normalize_strain_name(self, strain: str) -> Optional[str]:
         """Normalize strain name for better matching."""
-        if not strain:
-            return None
-        
-        # Common strain name variations and abbreviations
-        strain_variations = {
-            'og': 'og kush',
-            'kush': 'og kush',
-            'blue': 'blue dream',
-            'dream': 'blue dream',
-            'sour': 'sour diesel',
-            'diesel': 'sour diesel',
-            'wedding': 'wedding cake',
-            'cake': 'wedding cake',
-            'runtz': 'runtz',
-            'gelato': 'gelato',
-            'cookies': 'girl scout cookies',
-            'gsc': 'girl scout cookies',
-            'mac': 'mac 1',
-            'mac1': 'mac 1'
-        }
-        
-        strain_lower = strain.lower().strip()
-        return strain_variations.get(strain_lower, strain_lower)
+        return canonical_strain_alias(strain)
     
     def _partial_strain_match(self, json_strain: str, cache_name: str) -> bool:
         """Check for partial strain matches in compound names."""
@@ -7978,33 +7741,6 @@ class JSONMatcher:
         try:
             if not product_name:
                 return None
-                
-            # Common strain keywords to look for
-            strain_keywords = [
-                # Popular strains
-                "blue dream", "green crack", "maui wowie", "granddaddy purple", "bubba kush",
-                "master kush", "hindu kush", "afghan kush", "sour diesel", "nyc diesel",
-                "girl scout cookies", "gsc", "thin mint", "forum cut", "animal cookies",
-                "white runtz", "pink runtz", "zombie runtz", "rainbow runtz", "trophy runtz",
-                "gelato", "gelato 33", "gelato 41", "gelato 47", "sunset sherbet", "sherbet",
-                "wedding cake", "wedding crasher", "wedding pie", "wedding mint",
-                "blueberry", "strawberry", "banana", "mango", "pineapple", "lemon", "lime", 
-                "cherry", "grape", "apple", "orange", "guava", "dragon", "fruit", "passion", 
-                "peach", "apricot", "watermelon", "cantaloupe", "honeydew", "kiwi", "plum", 
-                "raspberry", "blackberry", "yoda", "amnesia", "afghani", "hashplant", "super", 
-                "boof", "grandy", "candy", "tricho", "jordan", "cosmic", "combo", "honey", 
-                "bread", "mintz", "grinch", "ak-47", "white widow", "northern lights", "skunk", 
-                "jack herer", "durban poison", "trainwreck", "chemdawg", "sour", "cheese", 
-                "dream", "crack", "maui", "granddaddy", "grand daddy", "bubba", "master", 
-                "hindu", "afghan", "master", "sour", "cheese", "dream", "high life", "white gummie",
-                "seattle trophy wife", "tangerine queen", "cenex", "triangle kush", "red velvet cake",
-                "grape goji", "watermelon mojito", "candy pound cake", "truffle cake", "emerald apricot",
-                "bollywood runtz", "mango punch", "raspberry lemonade", "strawberry burst", "watermelon wave",
-                "grape soda", "strawberry bliss", "25 eyes", "cherry ztripez", "metaverse", "galactic jack",
-                "gdpunch", "grape ape", "rainbow cake", "strawberry mimosa", "yoda og", "goji og",
-                "cookies and cream", "grape gas gelatti", "maui wowie", "strawberry shortcake", "grapefruit",
-                "purple rain", "crepe ape", "trunk funk", "sub woofer", "golden pineapple", "chicken & waffles"
-            ]
             
             product_lower = product_name.lower()
             
@@ -8075,13 +7811,10 @@ class JSONMatcher:
             
             # Look for exact strain matches in keywords list (fallback)
             # But only if we haven't already found a strain from first word patterns
-            for strain in strain_keywords:
-                if strain in product_lower:
-                    # Skip if this is just a product type word
-                    if strain.lower() in ['honey', 'crystal', 'live', 'liquid', 'diamond', 'resin', 'disposable', 'vape', 'cartridge']:
-                        continue
-                    logging.debug(f"Found strain '{strain}' in product name '{product_name}'")
-                    return strain.title()
+            strain = _STRAIN_NAME_KEYWORD_AUTOMATON.first_listed(product_lower, exclude=_KEYWORD_PRODUCT_TYPE_WORDS)
+            if strain:
+                logging.debug(f"Found strain '{strain}' in product name '{product_name}'")
+                return strain.title()
             
             # Look for "Strain Name LR" pattern (Live Resin)
             lr_match = re.search(r'^([A-Za-z\s]+)\s+LR', product_name, re.IGNORECASE)
@@ -8153,81 +7886,7 @@ class JSONMatcher:
 
     def _extract_key_terms(self, name: str) -> Set[str]:
         """Extract meaningful product terms, excluding common prefixes/suffixes."""
-        try:
-            # Debug logging to see what type of input we're getting
-            if not isinstance(name, str):
-                logging.warning(f"_extract_key_terms received non-string input: {type(name)} - {name}")
-                if isinstance(name, list):
-                    logging.warning(f"_extract_key_terms received a list: {name}")
-                    # If it's a list, try to join it or take the first element
-                    if name:
-                        name = str(name[0]) if isinstance(name[0], str) else str(name[0])
-                    else:
-                        name = ""
-                else:
-                    name = str(name) if name is not None else ""
-            
-            # Ensure input is a string
-            name = str(name or "")
-            name_lower = name.lower()
-            
-            # Split on both spaces and hyphens to break compound terms
-            words = set()
-            for part in name_lower.replace('_', ' ').split():
-                # Split each part on hyphens as well
-                sub_parts = part.split('-')
-                for sub_part in sub_parts:
-                    if sub_part.strip():  # Only add non-empty parts
-                        words.add(sub_part.strip())
-            
-            # Common words to exclude
-            common_words = {
-                'medically', 'compliant', '1g', '2g', '3.5g', '7g', '14g', '28g', 'oz', 'gram', 'grams',
-                'pk', 'pack', 'packs', 'piece', 'pieces', 'roll', 'rolls', 'stix', 'stick', 'sticks', 'brand', 'vendor', 'product',
-                'the', 'and', 'or', 'with', 'for', 'of', 'by', 'from', 'to', 'in', 'on', 'at', 'a', 'an', 'mg', 'thc', 'cbd'
-            }
-            
-            # Filter out common words and short words (less than 2 characters for words like "all", "in", "one")
-            key_terms = {word for word in words if word not in common_words and len(word) >= 2}
-            
-            # Add product type indicators for better matching
-            product_types = {
-                'rosin', 'wax', 'shatter', 'live', 'resin', 'distillate', 'cartridge', 'pre-roll', 'pre-rolls',
-                'blunt', 'blunts', 'edible', 'edibles', 'tincture', 'tinctures', 'topical', 'topicals',
-                'concentrate', 'concentrates', 'flower', 'buds', 'infused', 'flavour', 'flavor'
-            }
-            
-            # Add product type terms if found
-            for word in words:
-                if word in product_types:
-                    key_terms.add(word)
-            
-            # Add strain names (common cannabis strain words)
-            strain_indicators = {
-                'gmo', 'runtz', 'cookies', 'cream', 'wedding', 'cake', 'blueberry', 'banana', 'strawberry',
-                'grape', 'lemon', 'lime', 'orange', 'cherry', 'apple', 'mango', 'pineapple', 'passion',
-                'dragon', 'fruit', 'guava', 'pink', 'lemonade', 'haze', 'kush', 'diesel', 'og', 'sherbet',
-                'gelato', 'mintz', 'grinch', 'cosmic', 'combo', 'honey', 'bread', 'tricho', 'jordan',
-                'super', 'boof', 'grandy', 'candy', 'afghani', 'hashplant', 'yoda', 'amnesia'
-            }
-            
-            # Add strain terms if found
-            for word in words:
-                if word in strain_indicators:
-                    key_terms.add(word)
-            
-            # Add vendor/brand terms (but exclude common prefixes)
-            vendor_prefixes = {'medically', 'compliant', 'by'}
-            name_parts = name_lower.split()
-            for i, part in enumerate(name_parts):
-                if part not in vendor_prefixes and len(part) >= 3:
-                    # Add single vendor words only
-                    key_terms.add(part)
-                  
-            return key_terms
-        except Exception as e:
-            logging.warning(f"Error in _extract_key_terms: {e}")
-            return set()
+        return extract_key_terms(name)
 
     def _create_synthetic_match(self, product_name: str, vendor: str, brand: str, product_type: str, strain: str, weight: str) -> Optional[str]:
         """Create a synthetic match when no real match can be found to ensure 100% coverage."""
@@ -8529,18 +8188,7 @@ class JSONMatcher:
         """Normalize vendor name for comparison."""
         if not vendor_name:
             return ""
-        
-        # Convert to lowercase and strip
-        vendor_name = vendor_name.lower().strip()
-        
-        # Remove special characters but keep spaces and hyphens
-        import re
-        vendor_name = re.sub(r'[^\w\s-]', ' ', vendor_name)
-        
-        # Normalize whitespace
-        vendor_name = re.sub(r'\s+', ' ', vendor_name)
-        
-        return vendor_name.strip()
+        return normalize_text(vendor_name)
 
     def _translate_ceres_code_to_name(self, product_name: str) -> str:
         """Translate CERES product codes to human-readable names for better matching."""
@@ -0,0 +1,410 @@
+"""
+Manifest Fetcher for Label Maker Application
+Shared HTTP fetching of JSON transfer manifests: one pooled requests.Session,
+conditional GETs (ETag/Last-Modified) and a content-addressed on-disk cache of
+parsed manifests, so re-matching the same URL skips both transfer and parse.
+"""
+
+import base64
+import hashlib
+import json
+import logging
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from src.core.utils.metrics import get_metrics_registry
+
+try:
+    import brotli  # noqa: F401  (lets urllib3 decode Content-Encoding: br)
+    BROTLI_AVAILABLE = True
+except ImportError:
+    try:
+        import brotlicffi  # noqa: F401
+        BROTLI_AVAILABLE = True
+    except ImportError:
+        BROTLI_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Fetcher tuning
+DEFAULT_TIMEOUT = (10, 60)          # (connect, read) seconds
+POOL_MAXSIZE = 16
+MAX_MEMORY_BYTES = 64 * 1024 * 1024  # pickled manifests kept in memory
+MAX_DISK_ENTRIES = 64
+MANIFEST_CACHE_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))), 'cache', 'manifests')
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept': 'application/json',
+    'Accept-Language': 'en-US,en;q=0.9',
+    # Only advertise br when it can actually be decoded
+    'Accept-Encoding': 'gzip, deflate, br' if BROTLI_AVAILABLE else 'gzip, deflate',
+    'Connection': 'keep-alive',
+}
+
+# Hosts (and their subdomains) that may receive the Bamboo credentials; BAMBOO_API_HOSTS
+# (comma separated) replaces the list
+DEFAULT_BAMBOO_HOSTS = ('getbamboo.com',)
+
+# Headers that change what a URL returns, so they are part of the cache key
+_IDENTITY_HEADERS = ('Authorization', 'X-API-Key', 'X-Auth-Token', 'X-Session-Token')
+
+# How a manifest was obtained
+SOURCE_NETWORK = 'network'            # downloaded and parsed
+SOURCE_NOT_MODIFIED = 'not_modified'  # 304 from the server, parsed copy reused
+SOURCE_CONTENT = 'content'            # downloaded, but identical bytes were already parsed
+SOURCE_DATA_URL = 'data_url'
+
+
+def bamboo_hosts() -> Tuple[str, ...]:
+    configured = os.environ.get('BAMBOO_API_HOSTS')
+    if not configured:
+        return DEFAULT_BAMBOO_HOSTS
+    return tuple(host.strip().lower() for host in configured.split(',') if host.strip())
+
+
+def is_bamboo_url(url: str) -> bool:
+    """Whether url is an HTTPS URL on a Bamboo host, the only place the credentials may go."""
+    parts = urlsplit(url)
+    host = (parts.hostname or '').lower()
+    return parts.scheme == 'https' and any(host == known or host.endswith('.' + known) for known in bamboo_hosts())
+
+
+def bamboo_auth_headers(url: str) -> Dict[str, str]:
+    """The Bamboo credentials for a Bamboo URL, no headers for any other URL."""
+    return auth_headers_from_env() if is_bamboo_url(url) else {}
+
+
+def auth_headers_from_env() -> Dict[str, str]:
+    """Bamboo authentication headers configured through the environment."""
+    headers = {}
+    if os.environ.get('BAMBOO_API_KEY'):
+        headers['X-API-Key'] = os.environ.get('BAMBOO_API_KEY')
+    if os.environ.get('BAMBOO_AUTH_TOKEN'):
+        headers['Authorization'] = f"Bearer {os.environ.get('BAMBOO_AUTH_TOKEN')}"
+    if os.environ.get('BAMBOO_SESSION_TOKEN'):
+        headers['X-Session-Token'] = os.environ.get('BAMBOO_SESSION_TOKEN')
+    return headers
+
+
+def decode_data_url(url: str) -> bytes:
+    """Raw bytes of a data: URL (base64 or plain)."""
+    if ',' not in url:
+        raise ValueError("Invalid data URL format")
+    header, data_part = url.split(',', 1)
+    if 'base64' in header:
+        return base64.b64decode(data_part)
+    return data_part.encode('utf-8')
+
+
+@dataclass
+class ManifestResult:
+    """A fetched manifest and where it came from."""
+    payload: Any
+    digest: str
+    source: str
+    url: str
+    seconds: float
+
+
+class ManifestFetcher:
+    """
+    Fetches JSON manifests through one pooled session.
+
+    Parsed manifests are stored pickled, addressed by the SHA-256 of the raw
+    body, in memory and under cache_dir; an index maps each URL to its last
+    validators and digest. Every caller gets a fresh copy of the payload, so
+    callers may mutate items (vendor propagation does).
+    """
+
+    def __init__(self, cache_dir: Optional[str] = MANIFEST_CACHE_DIR, session: Optional[requests.Session] = None,
+                 timeout=DEFAULT_TIMEOUT, max_memory_bytes: int = MAX_MEMORY_BYTES,
+                 max_disk_entries: int = MAX_DISK_ENTRIES):
+        self.cache_dir = cache_dir
+        self.timeout = timeout
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_entries = max_disk_entries
+        self.session = session or self._create_session()
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_bytes = 0
+        self._index: Dict[str, Dict[str, Any]] = {}
+        self._stats = {source: 0 for source in (SOURCE_NETWORK, SOURCE_NOT_MODIFIED, SOURCE_CONTENT, SOURCE_DATA_URL)}
+        self._stats['streamed'] = 0
+        self._stats['bytes_downloaded'] = 0
+        self._stats['errors'] = 0
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            self._index = self._load_index()
+
+    @staticmethod
+    def _create_session() -> requests.Session:
+        session = requests.Session()
+        retry = Retry(total=2, backoff_factor=0.3, status_forcelist=(502, 503, 504), allowed_methods=frozenset(['GET']))
+        adapter = HTTPAdapter(pool_connections=POOL_MAXSIZE, pool_maxsize=POOL_MAXSIZE, max_retries=retry)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        session.headers.update(DEFAULT_HEADERS)
+        return session
+
+    def _index_path(self) -> str:
+        return os.path.join(self.cache_dir, 'index.json')
+
+    def _load_index(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self._index_path(), 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable manifest cache index: {e}")
+            return {}
+
+    def _save_index(self) -> None:
+        if not self.cache_dir:
+            return
+        tmp_path = f"{self._index_path()}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with self._lock:
+                snapshot = dict(self._index)
+            with open(tmp_path, 'w') as f:
+                json.dump(snapshot, f)
+            os.replace(tmp_path, self._index_path())
+        except Exception as e:
+            logger.warning(f"Could not save manifest cache index: {e}")
+
+    @staticmethod
+    def _cache_key(url: str, headers: Dict[str, str]) -> str:
+        identity = [f"{name}={headers[name]}" for name in _IDENTITY_HEADERS if headers.get(name)]
+        return hashlib.sha256('\n'.join([url] + identity).encode('utf-8')).hexdigest()
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self.cache_dir, f'{digest}.pickle')
+
+    def _get_blob(self, digest: str) -> Optional[bytes]:
+        with self._lock:
+            blob = self._memory.get(digest)
+            if blob is not None:
+                self._memory.move_to_end(digest)
+                return blob
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self._blob_path(digest), 'rb') as f:
+                blob = f.read()
+        except OSError:
+            return None
+        self._remember(digest, blob)
+        return blob
+
+    def _remember(self, digest: str, blob: bytes) -> None:
+        with self._lock:
+            if digest in self._memory:
+                return
+            self._memory[digest] = blob
+            self._memory_bytes += len(blob)
+            while self._memory_bytes > self.max_memory_bytes and len(self._memory) > 1:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_bytes -= len(evicted)
+
+    def _store(self, digest: str, payload: Any) -> None:
+        blob = pickle.dumps(payload, protocol=pickle.HIGHEST_PROTOCOL)
+        self._remember(digest, blob)
+        if not self.cache_dir:
+            return
+        path = self._blob_path(digest)
+        try:
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(blob)
+            os.replace(tmp_path, path)
+            blobs = sorted((os.path.join(self.cache_dir, name) for name in os.listdir(self.cache_dir)
+                            if name.endswith('.pickle')), key=os.path.getmtime, reverse=True)
+            for stale in blobs[self.max_disk_entries:]:
+                os.remove(stale)
+        except Exception as e:
+            logger.warning(f"Could not persist manifest {digest[:12]}: {e}")
+
+    def _parse(self, body: bytes) -> Tuple[Any, str, bool]:
+        """Parsed payload for a raw body, reusing an earlier parse of identical bytes."""
+        digest = hashlib.sha256(body).hexdigest()
+        blob = self._get_blob(digest)
+        if blob is not None:
+            return pickle.loads(blob), digest, True
+        payload = json.loads(body)
+        self._store(digest, payload)
+        return payload, digest, False
+
+    def fetch(self, url: str, headers: Optional[Dict[str, str]] = None, timeout=None) -> ManifestResult:
+        """
+        Fetch and parse a manifest from an HTTP(S) or data: URL.
+
+        Raises requests exceptions for transport/HTTP errors and ValueError
+        for bodies that are not JSON, like requests.get(...).json() did.
+        """
+        start = time.perf_counter()
+        metrics = get_metrics_registry()
+
+        if url.lower().startswith('data:'):
+            payload, digest, reused = self._parse(decode_data_url(url))
+            source = SOURCE_DATA_URL
+        else:
+            # Only headers the caller passes are sent; credentials are never added here
+            request_headers = dict(headers or {})
+            key = self._cache_key(url, request_headers)
+            with self._lock:
+                entry = self._index.get(key)
+            if entry and self._get_blob(entry['digest']) is not None:
+                if entry.get('etag'):
+                    request_headers['If-None-Match'] = entry['etag']
+                if entry.get('last_modified'):
+                    request_headers['If-Modified-Since'] = entry['last_modified']
+            else:
+                entry = None
+
+            try:
+                response = self.session.get(url, headers=request_headers, timeout=timeout or self.timeout)
+                if response.status_code == 304 and entry:
+                    payload = pickle.loads(self._get_blob(entry['digest']))
+                    digest, source = entry['digest'], SOURCE_NOT_MODIFIED
+                else:
+                    response.raise_for_status()
+                    body = response.content  # gzip/deflate/br already decoded by urllib3
+                    with self._lock:
+                        self._stats['bytes_downloaded'] += len(body)
+                    payload, digest, reused = self._parse(body)
+                    source = SOURCE_CONTENT if reused else SOURCE_NETWORK
+                    with self._lock:
+                        self._index[key] = {
+                            'url': url[:500],
+                            'digest': digest,
+                            'etag': response.headers.get('ETag'),
+                            'last_modified': response.headers.get('Last-Modified'),
+                            'fetched_at': time.time(),
+                        }
+                    self._save_index()
+            except Exception:
+                with self._lock:
+                    self._stats['errors'] += 1
+                raise
+
+        if source == SOURCE_NETWORK:
+            metrics.cache_miss('manifest')
+        else:
+            metrics.cache_hit('manifest')
+        seconds = time.perf_counter() - start
+        metrics.observe('manifest_fetch_seconds', seconds, {'source': source})
+        with self._lock:
+            self._stats[source] += 1
+        logger.info(f"Manifest {digest[:12]} from {source} in {seconds:.3f}s: {url[:80]}")
+        return ManifestResult(payload=payload, digest=digest, source=source, url=url, seconds=seconds)
+
+    def stream(self, url: str, headers: Optional[Dict[str, str]] = None, timeout=None):
+        """
+        Open a manifest as a ManifestStream that yields items as they arrive.
+
+        A cached manifest the server confirms unchanged (304) is replayed from
+        the parsed cache; otherwise the body is parsed incrementally while it
+        downloads. Streamed bodies are not added to the parsed cache, since
+        caching them would mean holding the whole document again.
+        """
+        from .manifest_stream import ManifestStream, STREAM_CHUNK_BYTES
+
+        if url.lower().startswith('data:'):
+            with self._lock:
+                self._stats[SOURCE_DATA_URL] += 1
+            return ManifestStream.from_bytes(decode_data_url(url))
+
+        request_headers = dict(headers or {})
+        with self._lock:
+            entry = self._index.get(self._cache_key(url, request_headers))
+        blob = self._get_blob(entry['digest']) if entry else None
+        if blob is not None:
+            if entry.get('etag'):
+                request_headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                request_headers['If-Modified-Since'] = entry['last_modified']
+
+        try:
+            response = self.session.get(url, headers=request_headers, timeout=timeout or self.timeout, stream=True)
+            if response.status_code == 304 and blob is not None:
+                response.close()
+                get_metrics_registry().cache_hit('manifest')
+                with self._lock:
+                    self._stats[SOURCE_NOT_MODIFIED] += 1
+                return ManifestStream.from_payload(pickle.loads(blob))
+            response.raise_for_status()
+        except Exception:
+            with self._lock:
+                self._stats['errors'] += 1
+            raise
+
+        get_metrics_registry().cache_miss('manifest')
+        with self._lock:
+            self._stats['streamed'] += 1
+
+        def chunks():
+            for chunk in response.iter_content(chunk_size=STREAM_CHUNK_BYTES):  # decoded gzip/br
+                with self._lock:
+                    self._stats['bytes_downloaded'] += len(chunk)
+                yield chunk
+
+        return ManifestStream(chunks(), on_close=response.close)
+
+    def fetch_json(self, url: str, headers: Optional[Dict[str, str]] = None, timeout=None) -> Any:
+        """Parsed manifest payload (a fresh copy the caller may mutate)."""
+        return self.fetch(url, headers=headers, timeout=timeout).payload
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self._stats,
+                'memory_entries': len(self._memory),
+                'memory_bytes': self._memory_bytes,
+                'indexed_urls': len(self._index),
+                'brotli': BROTLI_AVAILABLE,
+            }
+
+    def clear(self) -> None:
+        """Forget cached manifests in memory and on disk."""
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+            self._index = {}
+        if self.cache_dir and os.path.isdir(self.cache_dir):
+            for name in os.listdir(self.cache_dir):
+                try:
+                    os.remove(os.path.join(self.cache_dir, name))
+                except OSError:
+                    pass
+
+
+# Global manifest fetcher instance
+_manifest_fetcher = None
+_manifest_fetcher_lock = threading.Lock()
+
+
+def get_manifest_fetcher() -> ManifestFetcher:
+    """Get the global manifest fetcher (one pooled session per process)."""
+    global _manifest_fetcher
+    if _manifest_fetcher is None:
+        with _manifest_fetcher_lock:
+            if _manifest_fetcher is None:
+                _manifest_fetcher = ManifestFetcher()
+    return _manifest_fetcher
+
+
+def fetch_manifest(url: str, headers: Optional[Dict[str, str]] = None, timeout=None) -> Any:
+    """Parsed JSON manifest for url through the shared fetcher."""
+    return get_manifest_fetcher().fetch_json(url, headers=headers, timeout=timeout)
@@ -0,0 +1,251 @@
+"""
+Streaming Manifest Parser for Label Maker Application
+Yields inventory_transfer_items one at a time from a byte stream, so large
+transfer manifests (thousands of items with embedded lab results) are matched
+as they arrive instead of after the whole document is parsed.
+"""
+
+import codecs
+import json
+import logging
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List
+
+try:
+    import ijson  # type: ignore
+    from ijson.common import ObjectBuilder  # type: ignore
+    IJSON_AVAILABLE = True
+except ImportError:
+    IJSON_AVAILABLE = False
+    logging.warning("ijson not available, manifest streaming will use the pure-Python parser")
+
+from .json_matcher import extract_cannabinoids, extract_vendor_info
+
+logger = logging.getLogger(__name__)
+
+ITEMS_KEY = 'inventory_transfer_items'
+STREAM_CHUNK_BYTES = 64 * 1024
+DEFAULT_STREAM_BATCH = 25
+
+_SCALAR_EVENTS = ('string', 'number', 'boolean', 'null')
+
+
+class _ChunkReader:
+    """File-like adapter over an iterable of byte chunks (what ijson reads from)."""
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = iter(chunks)
+        self._pending = b''
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            data = self._pending + b''.join(self._chunks)
+            self._pending = b''
+            return data
+        while len(self._pending) < size:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            self._pending += chunk
+        data, self._pending = self._pending[:size], self._pending[size:]
+        return data
+
+
+class ManifestStream:
+    """
+    Iterates the items of a manifest one at a time.
+
+    Accepts a Cultivera-style document ({..., "inventory_transfer_items": [...]})
+    or a bare list of items. Document-level scalar fields (from_license_name,
+    est_arrival_at, ...) collect in .header as they are parsed; in Cultivera
+    manifests they precede the items, so they are available to the first item.
+    """
+
+    def __init__(self, chunks: Iterable[bytes], use_ijson: bool = IJSON_AVAILABLE, on_close=None):
+        self.header: Dict[str, Any] = {}
+        self.items_seen = 0
+        self._chunks = chunks
+        self._use_ijson = use_ijson and IJSON_AVAILABLE
+        self._payload = None
+        self._on_close = on_close
+
+    @classmethod
+    def from_payload(cls, payload: Any) -> 'ManifestStream':
+        """Stream over an already-parsed manifest (e.g. one served from cache)."""
+        stream = cls(())
+        stream._payload = payload
+        if isinstance(payload, dict):
+            stream.header = {k: v for k, v in payload.items() if k != ITEMS_KEY and not isinstance(v, (dict, list))}
+        return stream
+
+    @classmethod
+    def from_bytes(cls, data: bytes, chunk_size: int = STREAM_CHUNK_BYTES, **kwargs) -> 'ManifestStream':
+        view = memoryview(data)
+        return cls((bytes(view[i:i + chunk_size]) for i in range(0, len(data), chunk_size)), **kwargs)
+
+    def __iter__(self) -> Iterator[Any]:
+        try:
+            if self._payload is not None:
+                source = self._iter_payload()
+            elif self._use_ijson:
+                source = self._iter_ijson()
+            else:
+                source = self._iter_raw()
+            for item in source:
+                self.items_seen += 1
+                yield item
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        if self._on_close is not None:
+            on_close, self._on_close = self._on_close, None
+            on_close()
+
+    def _iter_payload(self) -> Iterator[Any]:
+        if isinstance(self._payload, list):
+            return iter(self._payload)
+        if isinstance(self._payload, dict):
+            return iter(self._payload.get(ITEMS_KEY, []))
+        return iter(())
+
+    def _iter_ijson(self) -> Iterator[Any]:
+        item_prefix = None
+        builder, depth = None, 0
+        for prefix, event, value in ijson.parse(_ChunkReader(self._chunks), use_float=True):
+            if builder is not None:
+                builder.event(event, value)
+                if event in ('start_map', 'start_array'):
+                    depth += 1
+                elif event in ('end_map', 'end_array'):
+                    depth -= 1
+                    if depth == 0:
+                        yield builder.value
+                        builder = None
+                continue
+            if item_prefix is None:
+                # First event decides the document shape
+                item_prefix = 'item' if event == 'start_array' else f'{ITEMS_KEY}.item'
+                continue
+            if prefix == item_prefix:
+                if event in ('start_map', 'start_array'):
+                    builder, depth = ObjectBuilder(), 1
+                    builder.event(event, value)
+                elif event in _SCALAR_EVENTS:
+                    yield value
+            elif event in _SCALAR_EVENTS and prefix and '.' not in prefix:
+                self.header[prefix] = value
+
+    def _iter_raw(self) -> Iterator[Any]:
+        """Incremental parser built on JSONDecoder.raw_decode, used when ijson is missing."""
+        decoder = json.JSONDecoder()
+        text_decoder = codecs.getincrementaldecoder('utf-8')()
+        chunks = iter(self._chunks)
+        state = {'buffer': '', 'pos': 0, 'eof': False}
+
+        def fill() -> bool:
+            chunk = next(chunks, None)
+            if chunk is None:
+                if not state['eof']:
+                    state['buffer'] += text_decoder.decode(b'', final=True)
+                    state['eof'] = True
+                return False
+            # Drop consumed text so memory stays bounded by the largest item
+            state['buffer'] = state['buffer'][state['pos']:] + text_decoder.decode(chunk)
+            state['pos'] = 0
+            return True
+
+        def peek() -> str:
+            while True:
+                buffer, pos = state['buffer'], state['pos']
+                while pos < len(buffer) and buffer[pos] in ' \t\r\n':
+                    pos += 1
+                state['pos'] = pos
+                if pos < len(buffer):
+                    return buffer[pos]
+                if not fill():
+                    raise ValueError('Unexpected end of manifest')
+
+        def expect(chars: str) -> str:
+            char = peek()
+            if char not in chars:
+                raise ValueError(f"Malformed manifest: expected one of {chars!r}, got {char!r}")
+            state['pos'] += 1
+            return char
+
+        def value() -> Any:
+            peek()
+            while True:
+                try:
+                    parsed, end = decoder.raw_decode(state['buffer'], state['pos'])
+                    # A number or literal ending at the buffer edge may continue in the next chunk
+                    if end < len(state['buffer']) or state['eof']:
+                        state['pos'] = end
+                        return parsed
+                except json.JSONDecodeError:
+                    if state['eof']:
+                        raise
+                fill()
+
+        def array_items() -> Iterator[Any]:
+            expect('[')
+            if peek() == ']':
+                state['pos'] += 1
+                return
+            while True:
+                yield value()
+                if expect(',]') == ']':
+                    return
+
+        if peek() == '[':
+            yield from array_items()
+            return
+        expect('{')
+        if peek() == '}':
+            return
+        while True:
+            key = value()
+            expect(':')
+            if key == ITEMS_KEY and peek() == '[':
+                yield from array_items()
+            else:
+                field = value()
+                if not isinstance(field, (dict, list)):
+                    self.header[key] = field
+            if expect(',}') == '}':
+                return
+
+
+def prepare_stream_item(item: Dict[str, Any], header: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Enrich one manifest item for matching, in place.
+
+    Applies the document vendor (or extract_vendor_info) and flattens the
+    extract_cannabinoids fields, dropping the bulky raw lab_result_data.
+    """
+    if not str(item.get('vendor', '') or '').strip():
+        vendor = str(header.get('from_license_name', '') or '').strip() or extract_vendor_info(item)
+        if vendor:
+            item['vendor'] = vendor
+    lab_result_data = item.pop('lab_result_data', None)
+    if isinstance(lab_result_data, dict):
+        for key, value in extract_cannabinoids(lab_result_data).items():
+            item.setdefault(key, value)
+    return item
+
+
+def iter_manifest_products(stream: ManifestStream) -> Iterator[Dict[str, Any]]:
+    """Prepared product dicts from a manifest stream, skipping non-object items."""
+    for item in stream:
+        if isinstance(item, dict):
+            yield prepare_stream_item(item, stream.header)
+
+
+def iter_batches(items: Iterable[Any], size: int = DEFAULT_STREAM_BATCH) -> Iterator[List[Any]]:
+    """Consecutive lists of up to size items."""
+    iterator = iter(items)
+    while True:
+        batch = list(islice(iterator, max(1, size)))
+        if not batch:
+            return
+        yield batch
@@ -9,7 +9,12 @@ import pandas as pd
 from pathlib import Path
 from functools import lru_cache
 import threading
+import itertools
 import os
+from src.core.utils.metrics import get_metrics_registry, timed_stage
+from src.core.utils.normalization import normalize_name, normalize_strain_name
+from .strain_lexicon import StrainAutomaton, get_strain_automaton, invalidate_strain_automaton
+from .stats_tables import get_stats_tables
 
 def get_database_path(store_name=None):
     """Get the correct database path for ProductDatabase instances."""
@@ -33,6 +38,37 @@ logger = logging.getLogger(__name__)
 # Performance optimization: disable debug logging in production
 DEBUG_ENABLED = False
 
+# One in this many SQL statements is counted (as this many) in db_queries_total,
+# so the trace callback takes the metrics registry lock once per sample
+DB_QUERY_SAMPLE_EVERY = 64
+
+# Common strain keywords
+STRAIN_KEYWORDS = frozenset([
+    'og', 'kush', 'haze', 'diesel', 'cookies', 'runtz', 'gelato', 'wedding', 'cake',
+    'blueberry', 'strawberry', 'banana', 'mango', 'pineapple', 'lemon', 'lime', 'cherry',
+    'grape', 'apple', 'orange', 'guava', 'dragon', 'fruit', 'passion', 'peach', 'apricot',
+    'watermelon', 'cantaloupe', 'honeydew', 'kiwi', 'plum', 'raspberry', 'blackberry',
+    'yoda', 'amnesia', 'afghani', 'hashplant', 'super', 'boof', 'grandy', 'candy',
+    'tricho', 'jordan', 'cosmic', 'combo', 'honey', 'bread', 'mintz', 'grinch'
+])
+
+# Multi-word strain names, checked in list order
+MULTI_WORD_STRAINS = [
+    'wedding cake', 'sour diesel', 'blueberry kush', 'lemon haze', 'strawberry cough',
+    'granddaddy purple', 'northern lights', 'white widow', 'jack herer', 'durban poison',
+    'trainwreck', 'chemdawg', 'sour cheese', 'dream crack', 'maui wowie', 'bubba kush',
+    'master kush', 'hindu kush', 'afghan kush', 'master og', 'sour og', 'cheese og',
+    'dream og', 'high life', 'white gummie', 'seattle trophy wife', 'tangerine queen',
+    'triangle kush', 'red velvet cake', 'grape goji', 'watermelon mojito', 'candy pound cake',
+    'truffle cake', 'emerald apricot', 'bollywood runtz', 'mango punch', 'raspberry lemonade',
+    'strawberry burst', 'watermelon wave', 'grape soda', 'strawberry bliss', 'cherry ztripez',
+    'metaverse', 'galactic jack', 'gdpunch', 'grape ape', 'rainbow cake', 'strawberry mimosa',
+    'yoda og', 'goji og', 'cookies and cream', 'grape gas gelatti', 'maui wowie',
+    'strawberry shortcake', 'grapefruit', 'purple rain', 'crepe ape', 'trunk funk',
+    'sub woofer', 'golden pineapple', 'chicken & waffles'
+]
+_MULTI_WORD_STRAIN_AUTOMATON = StrainAutomaton(MULTI_WORD_STRAINS)
+
 def timed_operation(operation_name):
     def decorator(func):
         def wrapper(self, *args, **kwargs):
@@ -108,6 +144,14 @@ class ProductDatabase:
             conn.execute("PRAGMA synchronous=NORMAL")
             conn.execute("PRAGMA cache_size=10000")
             conn.execute("PRAGMA temp_store=MEMORY")
+            # Count the statements executed on this connection, sampled
+            metrics = get_metrics_registry()
+            statements = itertools.count(1)
+
+            def count_statement(_sql):
+                if next(statements) % DB_QUERY_SAMPLE_EVERY == 0:
+                    metrics.inc('db_queries_total', DB_QUERY_SAMPLE_EVERY)
+            conn.set_trace_callback(count_statement)
             self._connection_pool[thread_id] = conn
         return self._connection_pool[thread_id]
     
@@ -690,10 +734,13 @@ class ProductDatabase:
                 if cached_data['expires'] < time.time():
                     del self._cache[cache_key]
                     self._timing_stats['cache_misses'] += 1
+                    get_metrics_registry().cache_miss('product_db')
                     return None
                 self._timing_stats['cache_hits'] += 1
+                get_metrics_registry().cache_hit('product_db')
                 return cached_data['value']
             self._timing_stats['cache_misses'] += 1
+            get_metrics_registry().cache_miss('product_db')
             return None
     
     def _set_cache(self, cache_key: str, value: Any, ttl: int = 300):
@@ -849,6 +896,7 @@ class ProductDatabase:
                     ''', (strain_name, normalized_name, lineage, current_date, current_date, current_date, current_date, lineage if sovereign else None))
                     strain_id = cursor.lastrowid
                     conn.commit()
+                    self._invalidate_strain_lexicon()
                     
                     # Notify all sessions of the new strain (non-blocking)
                     try:
@@ -1048,6 +1096,7 @@ class ProductDatabase:
             logger.error(f"Error adding/updating product '{product_name}': {e}")
             raise
     
+    @timed_stage('db_upsert')
     def store_excel_data(self, df: pd.DataFrame, source_file: str = None) -> Dict[str, Any]:
         """Store Excel data in the database. New data replaces existing data when duplicates are found."""
         try:
@@ -1747,96 +1796,43 @@ class ProductDatabase:
         try:
             self.init_database()  # Ensure DB is initialized
             
-            conn = self._get_connection()
-            cursor = conn.cursor()
-            
-            # Total strains
-            cursor.execute('SELECT COUNT(*) FROM strains')
-            total_strains = cursor.fetchone()[0]
-            
-            # Strains by lineage (exclude unwanted)
-            cursor.execute('''
-                SELECT canonical_lineage, COUNT(*) 
-                FROM strains 
-                WHERE canonical_lineage IS NOT NULL 
-                GROUP BY canonical_lineage
-            ''')
-            lineage_counts = dict(cursor.fetchall())
-            # Exclude unwanted
-            exclude_keys = {k.lower() for k in ['MIXED', 'CBD Blend', 'Paraphernalia']}
-            lineage_counts = {k: v for k, v in lineage_counts.items() if k and k.strip().lower() not in exclude_keys}
-            
-            # Most common strains (exclude unwanted)
-            cursor.execute('''
-                SELECT strain_name, total_occurrences, canonical_lineage
-                FROM strains 
-                ORDER BY total_occurrences DESC 
-                LIMIT 50
-            ''')
-            top_strains_raw = cursor.fetchall()
-            top_strains = [
-                {'name': name, 'occurrences': count}
-                for name, count, lineage in top_strains_raw
-                if lineage and lineage.strip().lower() not in exclude_keys and name and name.strip().lower() not in exclude_keys
-            ][:10]
-            
-            # Total products
-            cursor.execute('SELECT COUNT(*) FROM products')
-            total_products = cursor.fetchone()[0]
-            
-            # Vendor statistics - use correct Excel column names
-            cursor.execute('''
-                SELECT "Vendor/Supplier*", COUNT(*) as count
-                FROM products 
-                WHERE "Vendor/Supplier*" IS NOT NULL AND "Vendor/Supplier*" != ''
-                GROUP BY "Vendor/Supplier*"
-                ORDER BY count DESC
-                LIMIT 20
-            ''')
-            vendor_stats = [{'vendor': vendor, 'count': count} for vendor, count in cursor.fetchall()]
-            
-            # Brand statistics - use correct Excel column names
-            cursor.execute('''
-                SELECT "Product Brand", COUNT(*) as count
-                FROM products 
-                WHERE "Product Brand" IS NOT NULL AND "Product Brand" != ''
-                GROUP BY "Product Brand"
-                ORDER BY count DESC
-                LIMIT 20
-            ''')
-            brand_stats = [{'brand': brand, 'count': count} for brand, count in cursor.fetchall()]
-            
-            # Product type statistics - use correct Excel column names
-            cursor.execute('''
-                SELECT "Product Type*", COUNT(*) as count
-                FROM products 
-                WHERE "Product Type*" IS NOT NULL AND "Product Type*" != ''
-                GROUP BY "Product Type*"
-                ORDER BY count DESC
-                LIMIT 20
-            ''')
-            product_type_stats = [{'product_type': product_type, 'count': count} for product_type, count in cursor.fetchall()]
-            
-            # Vendor-Brand combinations - use correct Excel column names
-            cursor.execute('''
-                SELECT "Vendor/Supplier*", "Product Brand", COUNT(*) as count
-                FROM products 
-                WHERE "Vendor/Supplier*" IS NOT NULL AND "Vendor/Supplier*" != '' AND "Product Brand" IS NOT NULL AND "Product Brand" != ''
-                GROUP BY "Vendor/Supplier*", "Product Brand"
-                ORDER BY count DESC
-                LIMIT 15
-            ''')
-            vendor_brand_stats = [{'vendor': vendor, 'brand': brand, 'count': count} for vendor, brand, count in cursor.fetchall()]
+            # Read the precomputed summary tables instead of grouping products and strains
+            with get_stats_tables(self.db_path).snapshot() as snapshot:
+                totals = snapshot.totals()
+                
+                # Strains by lineage (exclude unwanted)
+                exclude_keys = {k.lower() for k in ['MIXED', 'CBD Blend', 'Paraphernalia']}
+                lineage_counts = {row['canonical_lineage']: row['count'] for row in snapshot.rows('stats_lineages')
+                                  if row['canonical_lineage'].strip().lower() not in exclude_keys}
+                
+                # Most common strains (exclude unwanted)
+                top_strains = [
+                    {'name': row['strain_name'], 'occurrences': row['total_occurrences']}
+                    for row in snapshot.rows('stats_top_strains', order_by='total_occurrences DESC')
+                    if row['canonical_lineage'] and row['canonical_lineage'].strip().lower() not in exclude_keys
+                    and row['strain_name'] and row['strain_name'].strip().lower() not in exclude_keys
+                ][:10]
+                
+                vendor_stats = [{'vendor': row['vendor'], 'count': row['product_count']}
+                                for row in snapshot.rows('stats_vendors', order_by='product_count DESC', limit=20)]
+                brand_stats = [{'brand': row['brand'], 'count': row['product_count']}
+                               for row in snapshot.rows('stats_brands', order_by='product_count DESC', limit=20)]
+                product_type_stats = [{'product_type': row['product_type'], 'count': row['product_count']}
+                                      for row in snapshot.rows('stats_product_types', order_by='product_count DESC', limit=20)]
+                vendor_brand_stats = [{'vendor': row['vendor'], 'brand': row['brand'], 'count': row['product_count']}
+                                      for row in snapshot.rows('stats_vendor_brands', order_by='product_count DESC', limit=15)]
+                staleness = snapshot.staleness
             
             return {
-                'total_strains': total_strains,
-                'total_products': total_products,
+                'total_strains': totals.get('total_strains', 0),
+                'total_products': totals.get('total_products', 0),
                 'lineage_distribution': lineage_counts,
                 'top_strains': top_strains,
                 'vendor_statistics': vendor_stats,
                 'brand_statistics': brand_stats,
                 'product_type_statistics': product_type_stats,
-                'vendor_brand_combinations': vendor_brand_stats
+                'vendor_brand_combinations': vendor_brand_stats,
+                'staleness': staleness
             }
             
         except Exception as e:
@@ -2372,8 +2368,6 @@ class ProductDatabase:
         if not isinstance(strain_name, str):
             return ""
         
-        # Use the existing normalization function
-        from .excel_processor import normalize_strain_name
         return normalize_strain_name(strain_name)
     
     def _normalize_product_name(self, product_name: str) -> str:
@@ -2381,8 +2375,6 @@ class ProductDatabase:
         if not isinstance(product_name, str):
             return ""
         
-        # Use the existing normalization function
-        from .excel_processor import normalize_name
         return normalize_name(product_name)
     
     def _normalize_lineage(self, lineage: str) -> str:
@@ -3268,6 +3260,23 @@ class ProductDatabase:
             logger.error(f"Error getting strain lineage map: {e}")
             return {}
     
+    def get_strain_automaton(self) -> StrainAutomaton:
+        """Aho–Corasick automaton over all normalized strain names, shared per database file."""
+        return get_strain_automaton(self.db_path, self._load_strain_patterns)
+    
+    def _load_strain_patterns(self) -> Set[str]:
+        # Rebuilds follow strain adds, so skip a possibly stale cached strain set
+        with self._cache_lock:
+            self._cache.pop(self._get_cache_key("all_strains"), None)
+        return self.get_all_strains()
+    
+    def _invalidate_strain_lexicon(self):
+        """Forget cached strain sets after strains are added or removed."""
+        with self._cache_lock:
+            self._cache.pop(self._get_cache_key("all_strains"), None)
+            self._cache.pop(self._get_cache_key("strain_lineage_map"), None)
+        invalidate_strain_automaton(self.db_path)
+    
     def upsert_strain_brand_lineage(self, strain_name: str, brand: str, lineage: str):
         """Insert or update lineage for a (strain_name, brand) pair."""
         try:
@@ -3318,7 +3327,212 @@ class ProductDatabase:
             return rows_updated > 0
         except Exception as e:
             logger.error(f"Error updating product lineage for '{product_name}': {e}")
-            return False 
+            return False
+
+    @timed_operation("batch_update_lineages")
+    @retry_on_lock(max_retries=3, delay=0.5)
+    def batch_update_lineages(self, updates: List[Dict[str, Any]], create_missing: bool = True,
+                              sovereign: bool = True, reason: str = 'Batch lineage update',
+                              update_canonical: bool = True) -> List[Dict[str, Any]]:
+        """
+        Apply many strain lineage changes in one transaction.
+
+        Each update is a dict with 'strain_name' and 'lineage' and an optional 'product_name'.
+        Updates are loaded into a temp table and applied to strains, products and
+        lineage_history with set-based statements instead of one round trip per strain.
+        With update_canonical=False only sovereign_lineage and the products change
+        (the bulk strain editor), and no lineage_history rows are written for existing strains.
+
+        Returns:
+            One result per update with success, strain_id, old_lineage and products_affected
+        """
+        if not updates:
+            return []
+        self.init_database()
+        now = datetime.now().isoformat()
+
+        rows = []
+        for position, update in enumerate(updates):
+            strain_name = str(update.get('strain_name') or '').strip()
+            product_name = update.get('product_name')
+            rows.append((
+                position,
+                strain_name,
+                self._normalize_strain_name(strain_name),
+                self._normalize_product_name(product_name) if product_name else None,
+                update.get('lineage')
+            ))
+
+        strains_added = 0
+        with self._write_lock:
+            conn = self._get_connection()
+            cursor = conn.cursor()
+            try:
+                cursor.execute("BEGIN IMMEDIATE")
+            except sqlite3.OperationalError as e:
+                if "cannot start a transaction within a transaction" not in str(e):
+                    raise
+            try:
+                cursor.execute('''
+                    CREATE TEMP TABLE IF NOT EXISTS batch_lineage_updates (
+                        position INTEGER PRIMARY KEY,
+                        strain_name TEXT,
+                        normalized_name TEXT,
+                        product_normalized_name TEXT,
+                        new_lineage TEXT
+                    )
+                ''')
+                cursor.execute("DELETE FROM batch_lineage_updates")
+                cursor.executemany(
+                    "INSERT INTO batch_lineage_updates VALUES (?, ?, ?, ?, ?)", rows
+                )
+                cursor.execute("CREATE INDEX IF NOT EXISTS temp.idx_batch_lineage_norm ON batch_lineage_updates(normalized_name)")
+
+                # Later updates for the same strain win, so only the last position per name is applied
+                cursor.execute('''
+                    CREATE TEMP TABLE IF NOT EXISTS batch_lineage_effective (
+                        normalized_name TEXT PRIMARY KEY,
+                        strain_name TEXT,
+                        new_lineage TEXT
+                    )
+                ''')
+                cursor.execute("DELETE FROM batch_lineage_effective")
+                cursor.execute('''
+                    INSERT INTO batch_lineage_effective (normalized_name, strain_name, new_lineage)
+                    SELECT u.normalized_name, u.strain_name, u.new_lineage
+                    FROM batch_lineage_updates u
+                    WHERE u.normalized_name != '' AND u.new_lineage IS NOT NULL AND u.new_lineage != ''
+                      AND u.position = (SELECT MAX(position) FROM batch_lineage_updates x
+                                        WHERE x.normalized_name = u.normalized_name)
+                ''')
+
+                # Snapshot the pre-update state for per-item results, before missing strains are created
+                old_lineage_column = 's.canonical_lineage' if update_canonical else \
+                    'COALESCE(s.sovereign_lineage, s.canonical_lineage)'
+                cursor.execute(f'''
+                    SELECT u.position, s.id, {old_lineage_column}, e.new_lineage,
+                           (SELECT COUNT(*) FROM products p WHERE p.strain_id = s.id)
+                    FROM batch_lineage_updates u
+                    LEFT JOIN batch_lineage_effective e ON e.normalized_name = u.normalized_name
+                    LEFT JOIN strains s ON s.id = (SELECT MIN(id) FROM strains WHERE normalized_name = u.normalized_name)
+                ''')
+                snapshot = {row[0]: row[1:] for row in cursor.fetchall()}
+
+                if update_canonical:
+                    cursor.execute('''
+                        INSERT INTO lineage_history (strain_id, old_lineage, new_lineage, change_date, change_reason)
+                        SELECT s.id, s.canonical_lineage, e.new_lineage, ?, ?
+                        FROM strains s JOIN batch_lineage_effective e ON s.normalized_name = e.normalized_name
+                        WHERE s.canonical_lineage IS NULL OR s.canonical_lineage != e.new_lineage
+                    ''', (now, reason))
+
+                if create_missing:
+                    last_strain_id = cursor.execute("SELECT COALESCE(MAX(id), 0) FROM strains").fetchone()[0]
+                    cursor.execute('''
+                        INSERT OR IGNORE INTO strains (strain_name, normalized_name, canonical_lineage, first_seen_date,
+                                                       last_seen_date, created_at, updated_at, sovereign_lineage)
+                        SELECT e.strain_name, e.normalized_name, e.new_lineage, ?, ?, ?, ?, CASE WHEN ? THEN e.new_lineage END
+                        FROM batch_lineage_effective e
+                        WHERE NOT EXISTS (SELECT 1 FROM strains s WHERE s.normalized_name = e.normalized_name)
+                    ''', (now, now, now, now, int(sovereign)))
+                    strains_added = cursor.rowcount
+                    if strains_added:
+                        # New strains start from no lineage
+                        cursor.execute('''
+                            INSERT INTO lineage_history (strain_id, old_lineage, new_lineage, change_date, change_reason)
+                            SELECT id, NULL, canonical_lineage, ?, ? FROM strains WHERE id > ?
+                        ''', (now, reason, last_strain_id))
+                        cursor.execute('''
+                            SELECT u.position, s.id, e.new_lineage
+                            FROM batch_lineage_updates u
+                            JOIN batch_lineage_effective e ON e.normalized_name = u.normalized_name
+                            JOIN strains s ON s.normalized_name = u.normalized_name
+                            WHERE s.id > ?
+                        ''', (last_strain_id,))
+                        for position, strain_id, applied in cursor.fetchall():
+                            snapshot[position] = (strain_id, None, applied, 0)
+
+                cursor.execute('''
+                    UPDATE strains
+                    SET canonical_lineage = CASE WHEN ? THEN (SELECT e.new_lineage FROM batch_lineage_effective e
+                                                              WHERE e.normalized_name = strains.normalized_name)
+                                                 ELSE canonical_lineage END,
+                        sovereign_lineage = CASE WHEN ? THEN (SELECT e.new_lineage FROM batch_lineage_effective e
+                                                              WHERE e.normalized_name = strains.normalized_name)
+                                                 ELSE sovereign_lineage END,
+                        last_seen_date = ?, updated_at = ?
+                    WHERE normalized_name IN (SELECT normalized_name FROM batch_lineage_effective)
+                ''', (int(update_canonical), int(sovereign), now, now))
+
+                cursor.execute('''
+                    UPDATE products
+                    SET "Lineage" = (SELECT e.new_lineage FROM strains s
+                                     JOIN batch_lineage_effective e ON e.normalized_name = s.normalized_name
+                                     WHERE s.id = products.strain_id),
+                        updated_at = ?
+                    WHERE strain_id IN (SELECT s.id FROM strains s
+                                        JOIN batch_lineage_effective e ON e.normalized_name = s.normalized_name)
+                ''', (now,))
+
+                # Products named explicitly but not linked to the strain row
+                cursor.execute('''
+                    UPDATE products
+                    SET "Lineage" = (SELECT u.new_lineage FROM batch_lineage_updates u
+                                     WHERE u.product_normalized_name = products.normalized_name
+                                     ORDER BY u.position DESC LIMIT 1),
+                        updated_at = ?
+                    WHERE normalized_name IN (SELECT product_normalized_name FROM batch_lineage_updates
+                                              WHERE product_normalized_name IS NOT NULL
+                                                AND new_lineage IS NOT NULL AND new_lineage != '')
+                ''', (now,))
+
+                cursor.execute("DELETE FROM batch_lineage_updates")
+                cursor.execute("DELETE FROM batch_lineage_effective")
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+
+        with self._cache_lock:
+            self._cache.clear()
+        if strains_added:
+            invalidate_strain_automaton(self.db_path)
+
+        results = []
+        for position, strain_name, normalized_name, _, lineage in rows:
+            strain_id, old_lineage, applied, product_count = snapshot.get(position, (None, None, None, 0))
+            if not normalized_name or not lineage:
+                error = 'Missing strain_name or lineage'
+            elif strain_id is None:
+                error = f'Strain "{strain_name}" not found'
+            else:
+                error = None
+            result = {
+                'strain_name': strain_name,
+                'success': error is None,
+                'strain_id': strain_id,
+                'old_lineage': old_lineage,
+                'lineage': applied if error is None else lineage,
+                'products_affected': int(product_count or 0)
+            }
+            if error:
+                result['error'] = error
+            results.append(result)
+
+        changed = [r for r in results if r['success'] and r['old_lineage'] != r['lineage']]
+        if changed:
+            try:
+                from .database_notifier import notify_batch_lineage_update
+                notify_batch_lineage_update([
+                    {'strain_name': r['strain_name'], 'old_lineage': r['old_lineage'], 'new_lineage': r['lineage']}
+                    for r in changed
+                ])
+            except Exception as notify_error:
+                logger.warning(f"Failed to notify batch lineage update: {notify_error}")
+
+        logger.info(f"Batch lineage update: {sum(r['success'] for r in results)}/{len(results)} applied, "
+                    f"{len(changed)} changed")
+        return results
 
     def get_vendor_strain_lineage(self, strain_name: str, vendor: str = None, brand: str = None) -> Optional[str]:
         """Get vendor-specific lineage for a strain, with fallback to canonical lineage."""
@@ -3372,45 +3586,28 @@ class ProductDatabase:
         """Get statistics about vendor-specific strain lineages."""
         try:
             self.init_database()
-            conn = self._get_connection()
-            cursor = conn.cursor()
-            
-            # Get vendor-specific lineage counts
-            cursor.execute('''
-                SELECT brand, COUNT(*) as count, 
-                       GROUP_CONCAT(DISTINCT lineage) as lineages
-                FROM strain_brand_lineage 
-                GROUP BY brand
-                ORDER BY count DESC
-            ''')
-            
-            vendor_stats = []
-            for row in cursor.fetchall():
-                brand, count, lineages = row
-                vendor_stats.append({
-                    'brand': brand,
-                    'strain_count': count,
-                    'lineages': lineages.split(',') if lineages else []
-                })
-            
-            # Get strain diversity by vendor
-            cursor.execute('''
-                SELECT p.vendor, p.brand, s.strain_name, p.lineage
-                FROM products p
-                JOIN strains s ON p.strain_id = s.id
-                WHERE p.lineage IS NOT NULL AND p.lineage != ''
-                ORDER BY p.vendor, p.brand, s.strain_name
-            ''')
             
-            vendor_strains = {}
-            for row in cursor.fetchall():
-                vendor, brand, strain, lineage = row
-                key = f"{vendor} - {brand}" if vendor and brand else (vendor or brand or "Unknown")
-                if key not in vendor_strains:
-                    vendor_strains[key] = {}
-                if strain not in vendor_strains[key]:
-                    vendor_strains[key][strain] = set()
-                vendor_strains[key][strain].add(lineage)
+            with get_stats_tables(self.db_path).snapshot() as snapshot:
+                # Vendor-specific lineage counts
+                vendor_stats = []
+                for row in snapshot.rows('stats_brand_lineages', order_by='strain_count DESC'):
+                    vendor_stats.append({
+                        'brand': row['brand'],
+                        'strain_count': row['strain_count'],
+                        'lineages': row['lineages'].split(',') if row['lineages'] else []
+                    })
+                
+                # Strain diversity by vendor
+                vendor_strains = {}
+                for row in snapshot.rows('stats_vendor_strain_lineages', order_by='vendor, brand, strain_name'):
+                    vendor, brand, strain, lineage = row['vendor'], row['brand'], row['strain_name'], row['lineage']
+                    key = f"{vendor} - {brand}" if vendor and brand else (vendor or brand or "Unknown")
+                    if key not in vendor_strains:
+                        vendor_strains[key] = {}
+                    if strain not in vendor_strains[key]:
+                        vendor_strains[key][strain] = set()
+                    vendor_strains[key][strain].add(lineage)
+                staleness = snapshot.staleness
             
             # Find strains with different lineages across vendors
             strain_vendor_conflicts = {}
@@ -3426,7 +3623,8 @@ class ProductDatabase:
                 'vendor_strains': vendor_strains,
                 'strain_vendor_conflicts': strain_vendor_conflicts,
                 'total_vendors': len(vendor_stats),
-                'conflicting_strains': len(strain_vendor_conflicts)
+                'conflicting_strains': len(strain_vendor_conflicts),
+                'staleness': staleness
             }
             
         except Exception as e:
@@ -4937,45 +5135,18 @@ class ProductDatabase:
     
     def _extract_strain_from_name(self, product_name: str) -> Optional[str]:
         """Extract strain name from product name."""
-        import re
-        
-        # Common strain keywords
-        strain_keywords = [
-            'og', 'kush', 'haze', 'diesel', 'cookies', 'runtz', 'gelato', 'wedding', 'cake',
-            'blueberry', 'strawberry', 'banana', 'mango', 'pineapple', 'lemon', 'lime', 'cherry',
-            'grape', 'apple', 'orange', 'guava', 'dragon', 'fruit', 'passion', 'peach', 'apricot',
-            'watermelon', 'cantaloupe', 'honeydew', 'kiwi', 'plum', 'raspberry', 'blackberry',
-            'yoda', 'amnesia', 'afghani', 'hashplant', 'super', 'boof', 'grandy', 'candy',
-            'tricho', 'jordan', 'cosmic', 'combo', 'honey', 'bread', 'mintz', 'grinch'
-        ]
-        
         name_lower = product_name.lower()
         words = name_lower.split()
         
         # Look for multi-word strain names first (e.g., "Wedding Cake", "Sour Diesel")
-        multi_word_strains = [
-            'wedding cake', 'sour diesel', 'blueberry kush', 'lemon haze', 'strawberry cough',
-            'granddaddy purple', 'northern lights', 'white widow', 'jack herer', 'durban poison',
-            'trainwreck', 'chemdawg', 'sour cheese', 'dream crack', 'maui wowie', 'bubba kush',
-            'master kush', 'hindu kush', 'afghan kush', 'master og', 'sour og', 'cheese og',
-            'dream og', 'high life', 'white gummie', 'seattle trophy wife', 'tangerine queen',
-            'triangle kush', 'red velvet cake', 'grape goji', 'watermelon mojito', 'candy pound cake',
-            'truffle cake', 'emerald apricot', 'bollywood runtz', 'mango punch', 'raspberry lemonade',
-            'strawberry burst', 'watermelon wave', 'grape soda', 'strawberry bliss', 'cherry ztripez',
-            'metaverse', 'galactic jack', 'gdpunch', 'grape ape', 'rainbow cake', 'strawberry mimosa',
-            'yoda og', 'goji og', 'cookies and cream', 'grape gas gelatti', 'maui wowie', 
-            'strawberry shortcake', 'grapefruit', 'purple rain', 'crepe ape', 'trunk funk', 
-            'sub woofer', 'golden pineapple', 'chicken & waffles'
-        ]
-        
-        for strain in multi_word_strains:
-            if strain in name_lower:
-                # Return the proper case version
-                return strain.title()
+        strain = _MULTI_WORD_STRAIN_AUTOMATON.first_listed(name_lower)
+        if strain:
+            # Return the proper case version
+            return strain.title()
         
         # Look for single word strain keywords
         for word in words:
-            if word in strain_keywords:
+            if word in STRAIN_KEYWORDS:
                 return word.title()
         
         # Look for capitalized words that might be strain names (but exclude common product words)
@@ -5326,6 +5497,7 @@ class ProductDatabase:
             cursor.execute("DELETE FROM sqlite_sequence WHERE name='strains'")
             
             conn.commit()
+            self._invalidate_strain_lexicon()
             logging.info("All database data cleared successfully")
             
         except Exception as e:
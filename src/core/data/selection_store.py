@@ -0,0 +1,393 @@
+"""
+Selection Store for Label Maker Application
+Keeps each session's selected tags on the server as an ordered set of the
+stable tag ids from ExcelProcessor's tag index. Undo/redo history stores only
+what changed, so moves, selections and undo cost O(changed tags) and never
+touch the DataFrame. Selected names that are not in the current data (product
+database matches from JSON matching) are kept in order beside the ids.
+
+The store is per process. Every change is also written to the user's session
+by name (to_state), and a worker whose copy is older than the session's
+reloads it (load_state), so undo works whichever worker serves the request.
+"""
+
+import logging
+import threading
+import uuid
+import weakref
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from src.core.data.tag_index import TagIdRegistry, TagIndex
+
+logger = logging.getLogger(__name__)
+
+MAX_SESSIONS = 500        # least recently used session selections are dropped past this
+MAX_HISTORY = 50          # undo entries kept per session
+PERSISTED_HISTORY = 10    # undo/redo entries written to the session
+
+
+def get_tag_name_index(processor) -> TagIndex:
+    """The tag index of a processor's current DataFrame (ExcelProcessor maintains its own)."""
+    if hasattr(processor, 'get_tag_index'):
+        return processor.get_tag_index()
+    df = getattr(processor, 'df', None)
+    cached = getattr(processor, '_selection_tag_index', None)
+    # Compared by a weak reference: the id of a freed frame can be reused by the next one
+    if cached is not None and cached[0]() is df:
+        return cached[1]
+    registry = getattr(processor, '_selection_tag_registry', None)
+    if registry is None:
+        registry = processor._selection_tag_registry = TagIdRegistry()
+    index = TagIndex(df, registry)
+    processor._selection_tag_index = (weakref.ref(df) if df is not None else lambda: None, index)
+    return index
+
+
+class SelectionChange(NamedTuple):
+    """
+    One undoable change. Moves keep only the ids added and the (position, id)
+    pairs removed; reorders keep the order before and after.
+    """
+    added: Tuple[int, ...] = ()
+    removed: Tuple[Tuple[int, int], ...] = ()
+    previous_order: Optional[Tuple[int, ...]] = None
+    new_order: Optional[Tuple[int, ...]] = None
+    action_type: str = 'move'
+    # Selected names outside the index, before and after (None when unchanged)
+    extras_before: Optional[Tuple[str, ...]] = None
+    extras_after: Optional[Tuple[str, ...]] = None
+
+
+class SessionSelection:
+    """Ordered set of selected tag ids for one session, with undo/redo history."""
+
+    def __init__(self, index: TagIndex):
+        self.index = index
+        self._selected: Dict[int, None] = {}  # dicts keep insertion order
+        self._extras: Dict[str, None] = {}    # selected names not in the index, listed after the ids
+        self._undo: List[SelectionChange] = []
+        self._redo: List[SelectionChange] = []
+        self.lock = threading.RLock()
+        # The list last handed to ExcelProcessor.selected_tags, to notice edits made elsewhere
+        self.synced_list: Optional[List[str]] = None
+        self.synced_length = 0
+        # Token of the session state this copy matches (see to_state/load_state)
+        self.state_token: Optional[str] = None
+
+    @property
+    def selected_ids(self) -> List[int]:
+        return list(self._selected)
+
+    @property
+    def extras(self) -> List[str]:
+        return list(self._extras)
+
+    def selected_names(self) -> List[str]:
+        return self.index.names_for(self._selected) + list(self._extras)
+
+    def available_names(self) -> List[str]:
+        return [name for row_id, name in self.index.names.items() if row_id not in self._selected]
+
+    def __len__(self) -> int:
+        return len(self._selected) + len(self._extras)
+
+    @property
+    def undo_depth(self) -> int:
+        return len(self._undo)
+
+    @property
+    def redo_depth(self) -> int:
+        return len(self._redo)
+
+    def _set_extras(self, names: Iterable[str]) -> Dict[str, Any]:
+        """Replace the extra names; returns the change fields to record (empty when unchanged)."""
+        before = tuple(self._extras)
+        self._extras = dict.fromkeys(names)
+        after = tuple(self._extras)
+        return {} if after == before else {'extras_before': before, 'extras_after': after}
+
+    def select(self, ids: Iterable[int], action_type: str = 'move', extras: Iterable[str] = ()) -> List[int]:
+        added = tuple(row_id for row_id in dict.fromkeys(ids) if row_id not in self._selected)
+        for row_id in added:
+            self._selected[row_id] = None
+        extras_change = self._set_extras([*self._extras, *extras])
+        self._record(SelectionChange(added=added, action_type=action_type, **extras_change))
+        return list(added)
+
+    def deselect(self, ids: Iterable[int], action_type: str = 'move', extras: Iterable[str] = ()) -> List[int]:
+        targets = {row_id for row_id in ids if row_id in self._selected}
+        dropped = set(extras)
+        extras_change = self._set_extras(name for name in self._extras if name not in dropped)
+        if not targets:
+            self._record(SelectionChange(action_type=action_type, **extras_change))
+            return []
+        # Positions let undo put the tags back where they were
+        removed = tuple((position, row_id) for position, row_id in enumerate(self._selected) if row_id in targets)
+        for row_id in targets:
+            del self._selected[row_id]
+        self._record(SelectionChange(removed=removed, action_type=action_type, **extras_change))
+        return [row_id for _, row_id in removed]
+
+    def select_all(self, action_type: str = 'select_all') -> List[int]:
+        return self.select(self.index.names, action_type)
+
+    def clear(self, action_type: str = 'clear') -> List[int]:
+        return self.deselect(list(self._selected), action_type, extras=list(self._extras))
+
+    def reorder(self, ids: Sequence[int], action_type: str = 'reorder', extras: Sequence[str] = ()) -> None:
+        """
+        Put the given ids first in that order; selected ids not listed follow
+        in their current order. Extra names are reordered the same way.
+        """
+        new_order = dict.fromkeys(row_id for row_id in ids if row_id in self._selected)
+        new_extras = dict.fromkeys(name for name in extras if name in self._extras)
+        if not new_order and not new_extras:
+            return
+        new_order.update(self._selected)
+        new_extras.update(self._extras)
+        self.replace(list(new_order), action_type, extras=list(new_extras))
+
+    def replace(self, ids: Sequence[int], action_type: str = 'replace',
+                extras: Optional[Sequence[str]] = None) -> None:
+        """
+        Make the selection equal to ids (and the extra names, when given),
+        recording the difference as one undoable change.
+        """
+        target = dict.fromkeys(ids)
+        previous = tuple(self._selected)
+        extras_change = {} if extras is None else self._set_extras(extras)
+        if tuple(target) == previous:
+            self._record(SelectionChange(action_type=action_type, **extras_change))
+            return
+        added = tuple(row_id for row_id in target if row_id not in self._selected)
+        removed = tuple((position, row_id) for position, row_id in enumerate(previous) if row_id not in target)
+        kept_before = [row_id for row_id in previous if row_id in target]
+        kept_after = [row_id for row_id in target if row_id in self._selected]
+        appended = list(target)[len(kept_after):] == list(added)
+        self._selected = target
+        if kept_before == kept_after and appended:
+            change = SelectionChange(added=added, removed=removed, action_type=action_type, **extras_change)
+        else:
+            change = SelectionChange(previous_order=previous, new_order=tuple(target), action_type=action_type,
+                                     **extras_change)
+        self._record(change)
+
+    def undo(self) -> Optional[SelectionChange]:
+        if not self._undo:
+            return None
+        change = self._undo.pop()
+        self._revert(change)
+        self._redo.append(change)
+        return change
+
+    def redo(self) -> Optional[SelectionChange]:
+        if not self._redo:
+            return None
+        change = self._redo.pop()
+        self._apply(change)
+        self._undo.append(change)
+        return change
+
+    def _record(self, change: SelectionChange) -> None:
+        if not (change.added or change.removed or change.new_order is not None or change.extras_after is not None):
+            return
+        self._undo.append(change)
+        if len(self._undo) > MAX_HISTORY:
+            del self._undo[0]
+        self._redo.clear()
+
+    def _revert(self, change: SelectionChange) -> None:
+        if change.extras_before is not None:
+            self._extras = dict.fromkeys(change.extras_before)
+        if change.previous_order is not None:
+            self._selected = dict.fromkeys(change.previous_order)
+            return
+        for row_id in change.added:
+            self._selected.pop(row_id, None)
+        if change.removed:
+            # Merge the removed ids back in at their original positions (O(selected))
+            remaining = iter(self._selected)
+            restored: List[int] = []
+            for position, row_id in change.removed:
+                if row_id in self._selected:
+                    continue
+                while len(restored) < position:
+                    next_id = next(remaining, None)
+                    if next_id is None:
+                        break
+                    restored.append(next_id)
+                restored.append(row_id)
+            restored.extend(remaining)
+            self._selected = dict.fromkeys(restored)
+
+    def _apply(self, change: SelectionChange) -> None:
+        if change.extras_after is not None:
+            self._extras = dict.fromkeys(change.extras_after)
+        if change.new_order is not None:
+            self._selected = dict.fromkeys(change.new_order)
+            return
+        for _, row_id in change.removed:
+            self._selected.pop(row_id, None)
+        for row_id in change.added:
+            self._selected[row_id] = None
+
+    def reset(self, ids: Iterable[int], extras: Iterable[str] = ()) -> None:
+        """Set the selection without recording history."""
+        self._selected = dict.fromkeys(ids)
+        self._extras = dict.fromkeys(extras)
+
+    def rebind(self, index: TagIndex) -> None:
+        """
+        Move to a newer index. Tag ids are stable; tags no longer present are
+        kept as extra names, and extra names now present become ids again.
+        """
+        previous = self.index
+        kept = {tag_id: None for tag_id in self._selected if tag_id in index.names}
+        gone = [previous.names[tag_id] for tag_id in self._selected if tag_id not in kept and tag_id in previous.names]
+        resolved, extras = index.ids_for([*self._extras, *gone])
+        self.index = index
+        self._selected = kept
+        self._selected.update(dict.fromkeys(resolved))
+        self._extras = dict.fromkeys(extras)
+
+    def _change_to_state(self, change: SelectionChange) -> Dict[str, Any]:
+        names = self.index.names
+        order = lambda ids: None if ids is None else [names[i] for i in ids if i in names]
+        return {
+            'action_type': change.action_type,
+            'added': [names[i] for i in change.added if i in names],
+            'removed': [[position, names[i]] for position, i in change.removed if i in names],
+            'previous_order': order(change.previous_order),
+            'new_order': order(change.new_order),
+            'extras_before': None if change.extras_before is None else list(change.extras_before),
+            'extras_after': None if change.extras_after is None else list(change.extras_after),
+        }
+
+    def _change_from_state(self, state: Dict[str, Any]) -> SelectionChange:
+        ids = lambda names: tuple(self.index.ids_for(names)[0])
+        removed = []
+        for position, name in state.get('removed', ()):
+            tag_id = self.index.id_for_name(name)
+            if tag_id is not None:
+                removed.append((position, tag_id))
+        extras_before, extras_after = state.get('extras_before'), state.get('extras_after')
+        return SelectionChange(
+            added=ids(state.get('added', ())),
+            removed=tuple(removed),
+            previous_order=None if state.get('previous_order') is None else ids(state['previous_order']),
+            new_order=None if state.get('new_order') is None else ids(state['new_order']),
+            action_type=state.get('action_type', 'move'),
+            extras_before=None if extras_before is None else tuple(extras_before),
+            extras_after=None if extras_after is None else tuple(extras_after),
+        )
+
+    def to_state(self) -> Dict[str, Any]:
+        """The selection and recent history by name, for the user's session; stamps a new state token."""
+        self.state_token = uuid.uuid4().hex
+        return {
+            'token': self.state_token,
+            'selected': self.index.names_for(self._selected),
+            'extras': list(self._extras),
+            'undo': [self._change_to_state(change) for change in self._undo[-PERSISTED_HISTORY:]],
+            'redo': [self._change_to_state(change) for change in self._redo[-PERSISTED_HISTORY:]],
+        }
+
+    def load_state(self, state: Dict[str, Any]) -> None:
+        """Replace the selection and history with a session state written by to_state (in any worker)."""
+        ids, unknown = self.index.ids_for(state.get('selected', ()))
+        self.reset(ids, [*unknown, *state.get('extras', ())])
+        self._undo = [self._change_from_state(change) for change in state.get('undo', ())]
+        self._redo = [self._change_from_state(change) for change in state.get('redo', ())]
+        self.state_token = state.get('token')
+
+
+class SelectionStore:
+    """Per-session selections, least recently used sessions evicted past max_sessions."""
+
+    def __init__(self, max_sessions: int = MAX_SESSIONS):
+        self._sessions: 'OrderedDict[str, SessionSelection]' = OrderedDict()
+        self._max_sessions = max_sessions
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str, index: TagIndex) -> SessionSelection:
+        """Selection for a session, bound to the given name index."""
+        with self._lock:
+            selection = self._sessions.get(session_id)
+            if selection is None:
+                selection = SessionSelection(index)
+                self._sessions[session_id] = selection
+                while len(self._sessions) > self._max_sessions:
+                    self._sessions.popitem(last=False)
+            else:
+                self._sessions.move_to_end(session_id)
+        if selection.index is not index:
+            with selection.lock:
+                if selection.index is not index:
+                    selection.rebind(index)
+        return selection
+
+    def discard(self, session_id: str) -> None:
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            selections = list(self._sessions.values())
+        return {
+            'sessions': len(selections),
+            'selected_tags': sum(len(selection) for selection in selections),
+            'extra_names': sum(len(selection.extras) for selection in selections),
+            'undo_entries': sum(selection.undo_depth for selection in selections),
+        }
+
+
+_selection_store: Optional[SelectionStore] = None
+_selection_store_lock = threading.Lock()
+
+
+def get_selection_store() -> SelectionStore:
+    """Return the process-wide selection store."""
+    global _selection_store
+    if _selection_store is None:
+        with _selection_store_lock:
+            if _selection_store is None:
+                _selection_store = SelectionStore()
+    return _selection_store
+
+
+def _tag_name(tag: Any) -> str:
+    if isinstance(tag, dict):
+        return tag.get('Product Name*', '')
+    return tag if isinstance(tag, str) else str(tag)
+
+
+def sync_from_processor(selection: SessionSelection, selected_tags: List[Any]) -> None:
+    """
+    Pick up selection edits made outside the store (other endpoints assign or
+    mutate ExcelProcessor.selected_tags). The list the store last handed out
+    is recognized by identity and length, so the common case costs nothing;
+    a foreign list is diffed once and recorded as an undoable change. Names
+    not in the current data (product database matches) are kept as extras.
+    Must be called with selection.lock held.
+    """
+    if selected_tags is selection.synced_list and len(selected_tags) == selection.synced_length:
+        return
+    ids, unknown = selection.index.ids_for(_tag_name(tag) for tag in selected_tags)
+    extras = [name for name in unknown if name]
+    if selection.synced_list is None:
+        # First sight of this session: adopt the current selection without an undo entry
+        selection.reset(ids, extras)
+    else:
+        selection.replace(ids, action_type='external', extras=extras)
+    selection.synced_list = selected_tags
+    selection.synced_length = len(selected_tags)
+
+
+def publish_to_processor(selection: SessionSelection, processor) -> List[str]:
+    """Hand the selection to ExcelProcessor.selected_tags (names, as the rest of the app expects)."""
+    names = selection.selected_names()
+    processor.selected_tags = names
+    selection.synced_list = names
+    selection.synced_length = len(names)
+    return names
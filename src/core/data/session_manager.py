@@ -7,11 +7,11 @@ import threading
 import time
 import logging
 import hashlib
-from typing import Dict, Set, Optional, Any, List
+from typing import Dict, Optional, Any, List
 from datetime import datetime, timedelta
 from flask import session, g, current_app
 from dataclasses import dataclass
-from collections import defaultdict
+from collections import deque
 import queue
 
 logger = logging.getLogger(__name__)
@@ -25,6 +25,7 @@ class DatabaseChange:
     timestamp: datetime
     user_id: Optional[str] = None  # User who made the change
     details: Optional[Dict[str, Any]] = None
+    version: int = 0  # Position in the change log, assigned when recorded
 
 class SessionManager:
     """
@@ -32,11 +33,17 @@ class SessionManager:
     to all users while maintaining session isolation.
     """
     
+    CHANGE_LOG_SIZE = 1000  # Changes retained for cursor reads
+    
     def __init__(self):
         self._sessions: Dict[str, Dict[str, Any]] = {}
         self._session_locks: Dict[str, threading.Lock] = {}
-        self._database_changes: List[DatabaseChange] = []
-        self._change_notifications: Dict[str, Set[str]] = defaultdict(set)  # session_id -> set of change_ids
+        # Versioned change log; sessions keep a cursor (last version read) instead of
+        # per-session notification sets, so recording a change is O(1)
+        self._database_changes = deque(maxlen=self.CHANGE_LOG_SIZE)
+        self._change_version = 0
+        self._change_log_lock = threading.Lock()
+        self._session_cursors: Dict[str, int] = {}
         self._global_lock = threading.RLock()  # Use RLock for better performance
         self._last_cleanup = time.time()
         self._cleanup_interval = 300  # 5 minutes
@@ -70,23 +77,41 @@ class SessionManager:
                 logger.error(f"Error processing operation queue: {e}")
     
     def _record_change_sync(self, change: DatabaseChange):
-        """Synchronous version of record_database_change."""
+        """Synchronous version of record_database_change: append to the versioned change log."""
         try:
-            with self._global_lock:
+            with self._change_log_lock:
+                self._change_version += 1
+                change.version = self._change_version
                 self._database_changes.append(change)
-                
-                # Mark all active sessions as needing notification
-                for session_id in self._sessions.keys():
-                    self._change_notifications[session_id].add(change.entity_id)
-                
-                # Keep only recent changes (last 100)
-                if len(self._database_changes) > 100:
-                    self._database_changes = self._database_changes[-100:]
-                
-                logger.info(f"Recorded database change: {change.change_type} for {change.entity_type} {change.entity_id}")
+            
+            logger.info(f"Recorded database change v{change.version}: {change.change_type} for {change.entity_type} {change.entity_id}")
         except Exception as e:
             logger.error(f"Error recording database change: {e}")
     
+    @property
+    def change_version(self) -> int:
+        """Version of the most recently recorded change."""
+        return self._change_version
+    
+    def get_changes_since(self, cursor: int) -> List[DatabaseChange]:
+        """Return logged changes with a version greater than cursor, oldest first."""
+        with self._change_log_lock:
+            if cursor >= self._change_version:
+                return []
+            # The log is ordered by version, so walk back from the newest entry
+            changes = []
+            for change in reversed(self._database_changes):
+                if change.version <= cursor:
+                    break
+                changes.append(change)
+        changes.reverse()
+        return changes
+    
+    def _get_cursor(self, session_id: str) -> int:
+        """Cursor for a session; sessions first seen start at the current version."""
+        with self._global_lock:
+            return self._session_cursors.setdefault(session_id, self._change_version)
+    
     def _update_session_sync(self, session_id: str, key: str, value: Any):
         """Synchronous version of set_session_data."""
         try:
@@ -122,6 +147,7 @@ class SessionManager:
                             'database_version': 0
                         }
                         self._session_locks[session_hash] = threading.Lock()
+                        self._session_cursors[session_hash] = self._change_version
                 except Exception as e:
                     logger.error(f"Error initializing session: {e}")
             
@@ -157,11 +183,16 @@ class SessionManager:
                             'database_version': 0
                         }
                         self._session_locks[test_session_hash] = threading.Lock()
+                        self._session_cursors[test_session_hash] = self._change_version
             except Exception as e:
                 logger.error(f"Error initializing test session: {e}")
             
             return test_session_hash
     
+    def get_current_session_id(self) -> str:
+        """Alias of get_session_id used by the status endpoints."""
+        return self.get_session_id()
+    
     def get_session_data(self, key: str, default: Any = None) -> Any:
         """Get session data for the current session."""
         try:
@@ -195,22 +226,16 @@ class SessionManager:
             logger.error(f"Error recording database change: {e}")
     
     def get_pending_changes(self, session_id: str) -> List[DatabaseChange]:
-        """Get pending database changes for a specific session."""
+        """Get pending database changes for a specific session and advance its cursor."""
         try:
+            # Read and advance the cursor together, so concurrent requests of one session
+            # neither receive the same change twice nor move the cursor backwards
             with self._global_lock:
-                if session_id not in self._change_notifications:
-                    return []
-                
-                pending_change_ids = self._change_notifications[session_id]
-                pending_changes = [
-                    change for change in self._database_changes
-                    if change.entity_id in pending_change_ids
-                ]
-                
-                # Clear notifications for this session
-                self._change_notifications[session_id].clear()
-                
-                return pending_changes
+                cursor = self._get_cursor(session_id)
+                pending_changes = self.get_changes_since(cursor)
+                if pending_changes:
+                    self._session_cursors[session_id] = pending_changes[-1].version
+            return pending_changes
         except Exception as e:
             logger.error(f"Error getting pending changes: {e}")
             return []
@@ -218,8 +243,7 @@ class SessionManager:
     def has_pending_changes(self, session_id: str) -> bool:
         """Check if a session has pending database changes."""
         try:
-            with self._global_lock:
-                return bool(self._change_notifications.get(session_id, set()))
+            return self._get_cursor(session_id) < self._change_version
         except Exception as e:
             logger.error(f"Error checking pending changes: {e}")
             return False
@@ -230,11 +254,14 @@ class SessionManager:
             with self._global_lock:
                 active_sessions = len(self._sessions)
                 total_changes = len(self._database_changes)
-                pending_notifications = sum(len(notifications) for notifications in self._change_notifications.values())
+                pending_notifications = sum(
+                    self._change_version - cursor for cursor in self._session_cursors.values()
+                )
                 
                 return {
                     'active_sessions': active_sessions,
                     'total_database_changes': total_changes,
+                    'change_version': self._change_version,
                     'pending_notifications': pending_notifications,
                     'last_cleanup': datetime.fromtimestamp(self._last_cleanup).isoformat(),
                     'queue_size': self._operation_queue.qsize()
@@ -267,15 +294,13 @@ class SessionManager:
                         del self._sessions[session_id]
                         if session_id in self._session_locks:
                             del self._session_locks[session_id]
-                        if session_id in self._change_notifications:
-                            del self._change_notifications[session_id]
+                        self._session_cursors.pop(session_id, None)
                     
-                    # Remove database changes older than 1 hour
+                    # Remove database changes older than 1 hour (the log is in time order)
                     cutoff_time = datetime.now() - timedelta(hours=1)
-                    self._database_changes = [
-                        change for change in self._database_changes
-                        if change.timestamp > cutoff_time
-                    ]
+                    with self._change_log_lock:
+                        while self._database_changes and self._database_changes[0].timestamp <= cutoff_time:
+                            self._database_changes.popleft()
                     
                     self._last_cleanup = current_time
                     
@@ -293,8 +318,7 @@ class SessionManager:
                     del self._sessions[session_id]
                 if session_id in self._session_locks:
                     del self._session_locks[session_id]
-                if session_id in self._change_notifications:
-                    del self._change_notifications[session_id]
+                self._session_cursors.pop(session_id, None)
         except Exception as e:
             logger.error(f"Error clearing session: {e}")
 
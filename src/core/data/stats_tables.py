@@ -0,0 +1,322 @@
+"""
+Dashboard Statistics for Label Maker Application
+Keeps the aggregates behind the database dashboard (counts per vendor, brand,
+product type and lineage, top strains, recent products) in small summary
+tables inside the product database, so dashboard requests read a few
+precomputed rows instead of grouping the whole products table every time.
+
+Every write path has to be covered: uploads, upserts, lineage edits and
+cleanups. Rather than touching each of them, triggers on the source tables
+(products, strains, strain_brand_lineage) bump a counter in stats_changes.
+The counters add up to a data version. Each refresh records the version it
+was built from, so a reader can see whether the summaries are behind:
+
+- Nothing materialized yet: the summaries are built before answering.
+- Version moved on: the current summaries are served marked stale, and a
+  background refresh starts. It waits REFRESH_DEBOUNCE_SECONDS first, so a
+  burst of writes (an upload) leads to one rebuild.
+
+A refresh runs its aggregate queries in one read transaction (WAL keeps
+writers going) and only takes the write lock to swap in the new rows.
+"""
+
+import logging
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from src.core.utils.metrics import record_stage
+
+logger = logging.getLogger(__name__)
+
+# Wait after the first change before rebuilding, so bursts of writes share one refresh
+REFRESH_DEBOUNCE_SECONDS = 2.0
+
+SOURCE_TABLES = ('products', 'strains', 'strain_brand_lineage')
+TRIGGER_EVENTS = ('INSERT', 'UPDATE', 'DELETE')
+TRIGGER_PREFIX = 'stats_track_'
+
+# Summary table -> (columns, query over the source tables)
+STATS_TABLES: Dict[str, Tuple[Tuple[str, ...], str]] = {
+    'stats_totals': (('name', 'value'), '''
+        SELECT 'total_products', COUNT(*) FROM products
+        UNION ALL SELECT 'total_strains', COUNT(*) FROM strains
+        UNION ALL SELECT 'recent_products', COUNT(*) FROM products WHERE id > (SELECT MAX(id) - 100 FROM products)
+    '''),
+    'stats_vendors': (('vendor', 'product_count', 'unique_brands', 'unique_product_types'), '''
+        SELECT "Vendor/Supplier*", COUNT(*), COUNT(DISTINCT "Product Brand"), COUNT(DISTINCT "Product Type*")
+        FROM products
+        WHERE "Vendor/Supplier*" IS NOT NULL AND "Vendor/Supplier*" != ''
+        GROUP BY "Vendor/Supplier*"
+    '''),
+    'stats_brands': (('brand', 'product_count', 'unique_vendors', 'unique_product_types'), '''
+        SELECT "Product Brand", COUNT(*), COUNT(DISTINCT "Vendor/Supplier*"), COUNT(DISTINCT "Product Type*")
+        FROM products
+        WHERE "Product Brand" IS NOT NULL AND "Product Brand" != ''
+        GROUP BY "Product Brand"
+    '''),
+    'stats_product_types': (('product_type', 'product_count', 'unique_vendors', 'unique_brands'), '''
+        SELECT "Product Type*", COUNT(*), COUNT(DISTINCT "Vendor/Supplier*"), COUNT(DISTINCT "Product Brand")
+        FROM products
+        WHERE "Product Type*" IS NOT NULL AND "Product Type*" != ''
+        GROUP BY "Product Type*"
+    '''),
+    'stats_vendor_brands': (('vendor', 'brand', 'product_count', 'unique_product_types'), '''
+        SELECT "Vendor/Supplier*", "Product Brand", COUNT(*), COUNT(DISTINCT "Product Type*")
+        FROM products
+        WHERE "Vendor/Supplier*" IS NOT NULL AND "Vendor/Supplier*" != ''
+          AND "Product Brand" IS NOT NULL AND "Product Brand" != ''
+        GROUP BY "Vendor/Supplier*", "Product Brand"
+    '''),
+    'stats_lineages': (('canonical_lineage', 'count'), '''
+        SELECT canonical_lineage, COUNT(*)
+        FROM strains
+        WHERE canonical_lineage IS NOT NULL AND canonical_lineage != ''
+        GROUP BY canonical_lineage
+    '''),
+    'stats_top_strains': (('strain_name', 'total_occurrences', 'canonical_lineage'), '''
+        SELECT strain_name, total_occurrences, canonical_lineage
+        FROM strains
+        ORDER BY total_occurrences DESC
+        LIMIT 50
+    '''),
+    'stats_recent_products': (('product_name', 'canonical_lineage', 'occurrence_count'), '''
+        SELECT "Product Name*", "Lineage", COUNT(*) AS occurrence_count
+        FROM products
+        WHERE id > (SELECT MAX(id) - 50 FROM products)
+        GROUP BY "Product Name*"
+        ORDER BY occurrence_count DESC
+        LIMIT 20
+    '''),
+    'stats_brand_lineages': (('brand', 'strain_count', 'lineages'), '''
+        SELECT brand, COUNT(*), GROUP_CONCAT(DISTINCT lineage)
+        FROM strain_brand_lineage
+        GROUP BY brand
+    '''),
+    'stats_vendor_strain_lineages': (('vendor', 'brand', 'strain_name', 'lineage'), '''
+        SELECT DISTINCT p."Vendor/Supplier*", p."Product Brand", s.strain_name, p."Lineage"
+        FROM products p
+        JOIN strains s ON p.strain_id = s.id
+        WHERE p."Lineage" IS NOT NULL AND p."Lineage" != ''
+    '''),
+}
+
+
+def _connect(db_path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(db_path, timeout=30.0)
+    conn.execute("PRAGMA busy_timeout=30000")
+    return conn
+
+
+def _table_exists(conn: sqlite3.Connection, table: str) -> bool:
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone() is not None
+
+
+class StatsSnapshot:
+    """Summary rows and staleness read from one transaction."""
+
+    def __init__(self, conn: sqlite3.Connection, staleness: Dict[str, Any]):
+        self.conn = conn
+        self.staleness = staleness
+
+    def rows(self, table: str, order_by: Optional[str] = None, limit: Optional[int] = None,
+             exclude: Optional[Dict[str, str]] = None) -> List[Dict[str, Any]]:
+        """Rows of a summary table as dicts; `exclude` drops rows whose column equals the value."""
+        columns, _ = STATS_TABLES[table]
+        query = f'SELECT {", ".join(columns)} FROM {table}'
+        params: List[Any] = []
+        if exclude:
+            query += ' WHERE ' + ' AND '.join(f'{column} IS NOT ?' for column in exclude)
+            params.extend(exclude.values())
+        if order_by:
+            query += f' ORDER BY {order_by}, rowid'
+        if limit is not None:
+            query += ' LIMIT ?'
+            params.append(limit)
+        return [dict(zip(columns, row)) for row in self.conn.execute(query, params)]
+
+    def count(self, table: str, exclude: Optional[Dict[str, str]] = None) -> int:
+        query = f'SELECT COUNT(*) FROM {table}'
+        if exclude:
+            query += ' WHERE ' + ' AND '.join(f'{column} IS NOT ?' for column in exclude)
+        return self.conn.execute(query, list((exclude or {}).values())).fetchone()[0]
+
+    def totals(self) -> Dict[str, int]:
+        return dict(self.conn.execute('SELECT name, value FROM stats_totals'))
+
+
+class StatsTables:
+    """Summary tables of one product database and their background refresh."""
+
+    def __init__(self, db_path: str, debounce: float = REFRESH_DEBOUNCE_SECONDS):
+        self.db_path = db_path
+        self.debounce = debounce
+        self._refresh_lock = threading.Lock()
+        self._state_lock = threading.Lock()
+        self._refresh_thread: Optional[threading.Thread] = None
+
+    def _install_tracking(self, conn: sqlite3.Connection) -> None:
+        """Create the change counters and the triggers on every source table that exists."""
+        sources = [table for table in SOURCE_TABLES if _table_exists(conn, table)]
+        expected = {f'{TRIGGER_PREFIX}{table}_{event.lower()}' for table in sources for event in TRIGGER_EVENTS}
+        found = {row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE ?", (TRIGGER_PREFIX + '%',))}
+        if expected <= found and _table_exists(conn, 'stats_meta'):
+            return
+
+        conn.execute('CREATE TABLE IF NOT EXISTS stats_changes (source TEXT PRIMARY KEY, version INTEGER NOT NULL DEFAULT 0)')
+        conn.execute('''CREATE TABLE IF NOT EXISTS stats_meta (
+                            name TEXT PRIMARY KEY, source_version INTEGER, refreshed_at TEXT,
+                            refreshed_ts REAL, seconds REAL)''')
+        for table in sources:
+            conn.execute('INSERT OR IGNORE INTO stats_changes (source, version) VALUES (?, 0)', (table,))
+            # Triggers may have been dropped with their table; count that as a change
+            conn.execute('UPDATE stats_changes SET version = version + 1 WHERE source = ?', (table,))
+            for event in TRIGGER_EVENTS:
+                conn.execute(f'''
+                    CREATE TRIGGER IF NOT EXISTS {TRIGGER_PREFIX}{table}_{event.lower()}
+                    AFTER {event} ON {table}
+                    BEGIN
+                        UPDATE stats_changes SET version = version + 1 WHERE source = '{table}';
+                    END
+                ''')
+        conn.commit()
+        logger.info(f"Installed statistics change tracking on {', '.join(sources)} in {self.db_path}")
+
+    @staticmethod
+    def _version(conn: sqlite3.Connection) -> int:
+        return conn.execute('SELECT COALESCE(SUM(version), 0) FROM stats_changes').fetchone()[0]
+
+    @staticmethod
+    def _meta(conn: sqlite3.Connection) -> Optional[Tuple[int, str, float]]:
+        return conn.execute(
+            "SELECT source_version, refreshed_at, refreshed_ts FROM stats_meta WHERE name = 'dashboard'").fetchone()
+
+    def refresh(self) -> Dict[str, Any]:
+        """Rebuild every summary table from one snapshot of the source tables."""
+        with self._refresh_lock:
+            started = time.perf_counter()
+            conn = _connect(self.db_path)
+            try:
+                self._install_tracking(conn)
+                results: Dict[str, List[tuple]] = {}
+                conn.execute('BEGIN')
+                version = self._version(conn)
+                for table, (_, query) in STATS_TABLES.items():
+                    try:
+                        results[table] = conn.execute(query).fetchall()
+                    except sqlite3.OperationalError as e:
+                        logger.warning(f"Statistics table {table} left empty: {e}")
+                        results[table] = []
+                conn.rollback()
+
+                # Only the swap holds the write lock
+                conn.execute('BEGIN IMMEDIATE')
+                for table, rows in results.items():
+                    columns, _ = STATS_TABLES[table]
+                    conn.execute(f'DROP TABLE IF EXISTS {table}')
+                    conn.execute(f'CREATE TABLE {table} ({", ".join(columns)})')
+                    conn.executemany(f'INSERT INTO {table} VALUES ({", ".join("?" * len(columns))})', rows)
+                elapsed = time.perf_counter() - started
+                conn.execute('INSERT OR REPLACE INTO stats_meta VALUES (?, ?, ?, ?, ?)',
+                             ('dashboard', version, datetime.now().isoformat(), time.time(), elapsed))
+                conn.commit()
+            finally:
+                conn.close()
+        record_stage('stats_refresh', elapsed)
+        logger.info(f"Refreshed dashboard statistics at data version {version} in {elapsed * 1000:.0f}ms")
+        return {'data_version': version, 'seconds': round(elapsed, 3), 'rows': {t: len(r) for t, r in results.items()}}
+
+    def schedule_refresh(self) -> bool:
+        """Start a background refresh unless one is already pending; returns whether one was started."""
+        with self._state_lock:
+            if self._refresh_thread is not None and self._refresh_thread.is_alive():
+                return False
+            self._refresh_thread = threading.Thread(target=self._background_refresh, name='stats-refresh', daemon=True)
+            self._refresh_thread.start()
+            return True
+
+    def _background_refresh(self) -> None:
+        if self.debounce:
+            time.sleep(self.debounce)
+        try:
+            self.refresh()
+        except Exception as e:
+            logger.error(f"Background statistics refresh failed: {e}")
+
+    def wait_for_refresh(self, timeout: Optional[float] = None) -> None:
+        thread = self._refresh_thread
+        if thread is not None:
+            thread.join(timeout)
+
+    @property
+    def refreshing(self) -> bool:
+        thread = self._refresh_thread
+        return thread is not None and thread.is_alive()
+
+    def is_current(self) -> bool:
+        """Whether the summaries exist and were built from the current data version."""
+        conn = _connect(self.db_path)
+        try:
+            self._install_tracking(conn)
+            meta = self._meta(conn)
+            return meta is not None and meta[0] == self._version(conn)
+        finally:
+            conn.close()
+
+    def prepare(self) -> None:
+        """Materialize the summaries on first use; start a background refresh when they are behind."""
+        conn = _connect(self.db_path)
+        try:
+            self._install_tracking(conn)
+            meta = self._meta(conn)
+            behind = meta is not None and meta[0] != self._version(conn)
+        finally:
+            conn.close()
+        if meta is None:
+            self.refresh()
+        elif behind:
+            self.schedule_refresh()
+
+    def _staleness(self, conn: sqlite3.Connection) -> Dict[str, Any]:
+        source_version, refreshed_at, refreshed_ts = self._meta(conn)
+        current_version = self._version(conn)
+        return {
+            'refreshed_at': refreshed_at,
+            'age_seconds': round(max(time.time() - refreshed_ts, 0.0), 3),
+            'data_version': source_version,
+            'current_version': current_version,
+            'stale': source_version != current_version,
+            'refreshing': self.refreshing,
+        }
+
+    @contextmanager
+    def snapshot(self) -> Iterator[StatsSnapshot]:
+        """Read the summaries (and how far behind they are) from one consistent view."""
+        self.prepare()
+        conn = _connect(self.db_path)
+        try:
+            conn.execute('BEGIN')
+            yield StatsSnapshot(conn, self._staleness(conn))
+        finally:
+            conn.rollback()
+            conn.close()
+
+
+_stats_tables: Dict[str, StatsTables] = {}
+_stats_tables_lock = threading.Lock()
+
+
+def get_stats_tables(db_path: str) -> StatsTables:
+    """Shared StatsTables for a database path, so refreshes are not run twice."""
+    stats_tables = _stats_tables.get(db_path)
+    if stats_tables is None:
+        with _stats_tables_lock:
+            stats_tables = _stats_tables.get(db_path)
+            if stats_tables is None:
+                stats_tables = StatsTables(db_path)
+                _stats_tables[db_path] = stats_tables
+    return stats_tables
@@ -0,0 +1,143 @@
+"""
+Strain Lexicon for Label Maker Application
+Aho–Corasick automaton over strain names. Finds every known strain occurring
+in a product name, with positions, in one pass over the text instead of one
+substring scan per strain.
+"""
+
+import logging
+import os
+import threading
+from collections import deque
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class StrainHit(NamedTuple):
+    """One occurrence of a pattern; start/end index into text.lower()."""
+    start: int
+    end: int
+    strain: str
+    index: int  # Position of the pattern in the list the automaton was built from
+
+
+class StrainAutomaton:
+    """
+    Multi-pattern matcher built once from a strain list.
+
+    Patterns are matched case-insensitively. Lookups cost O(len(text) + hits)
+    regardless of how many strains the automaton holds.
+    """
+
+    def __init__(self, patterns: Iterable[str]):
+        self.patterns: List[str] = []
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[Tuple[int, ...]] = [()]
+        seen = set()
+        for pattern in patterns:
+            if not isinstance(pattern, str):
+                logger.warning(f"Skipping non-string strain pattern: {type(pattern)} - {pattern}")
+                continue
+            key = pattern.lower()
+            if not key.strip() or key in seen:
+                continue
+            seen.add(key)
+            self._add(key, len(self.patterns))
+            self.patterns.append(key)
+        self._link()
+
+    def __len__(self) -> int:
+        return len(self.patterns)
+
+    def _add(self, key: str, index: int) -> None:
+        node = 0
+        for char in key:
+            child = self._goto[node].get(char)
+            if child is None:
+                child = len(self._goto)
+                self._goto[node][char] = child
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(())
+            node = child
+        self._out[node] = self._out[node] + (index,)
+
+    def _link(self) -> None:
+        """Breadth-first failure links; each node also reports its suffix matches."""
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[child] = target if target != child else 0
+                if self._out[self._fail[child]]:
+                    self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def find_all(self, text: str, whole_words: bool = False) -> List[StrainHit]:
+        """Every pattern occurrence in text, ordered by end position."""
+        text = str(text or "").lower()
+        goto, fail, out, patterns = self._goto, self._fail, self._out, self.patterns
+        hits = []
+        node = 0
+        for position, char in enumerate(text):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            for index in out[node]:
+                pattern = patterns[index]
+                start = position + 1 - len(pattern)
+                if whole_words and not _on_word_boundaries(text, start, position + 1):
+                    continue
+                hits.append(StrainHit(start, position + 1, pattern, index))
+        return hits
+
+    def find_strains(self, text: str, whole_words: bool = False) -> List[str]:
+        """Distinct patterns found in text, longest first."""
+        found = {hit.strain for hit in self.find_all(text, whole_words)}
+        return sorted(found, key=lambda strain: (-len(strain), strain))
+
+    def first_listed(self, text: str, whole_words: bool = False,
+                     exclude: Optional[Iterable[str]] = None) -> Optional[str]:
+        """The found pattern that comes earliest in the original list (list order is priority order)."""
+        excluded = set(exclude or ())
+        indexes = [hit.index for hit in self.find_all(text, whole_words) if hit.strain not in excluded]
+        return self.patterns[min(indexes)] if indexes else None
+
+
+def _on_word_boundaries(text: str, start: int, end: int) -> bool:
+    return (start == 0 or not text[start - 1].isalnum()) and (end == len(text) or not text[end].isalnum())
+
+
+# Automata over the strains table, shared by every ProductDatabase instance on the same file
+_automata: Dict[str, Tuple[int, StrainAutomaton]] = {}
+_versions: Dict[str, int] = {}
+_automata_lock = threading.Lock()
+
+
+def get_strain_automaton(db_path: str, loader: Callable[[], Iterable[str]]) -> StrainAutomaton:
+    """Return the automaton for db_path, building it from loader() on first use or after invalidation."""
+    key = os.path.abspath(db_path)
+    with _automata_lock:
+        version = _versions.get(key, 0)
+        cached = _automata.get(key)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        automaton = StrainAutomaton(loader())
+        _automata[key] = (version, automaton)
+        logger.info(f"Built strain automaton with {len(automaton)} strains for {key}")
+        return automaton
+
+
+def invalidate_strain_automaton(db_path: Optional[str] = None) -> None:
+    """Drop the automaton for db_path (or all of them) so the next lookup rebuilds it."""
+    with _automata_lock:
+        keys = [os.path.abspath(db_path)] if db_path else list(set(_versions) | set(_automata))
+        for key in keys:
+            _versions[key] = _versions.get(key, 0) + 1
+            _automata.pop(key, None)
@@ -0,0 +1,134 @@
+"""
+Tag Index for Label Maker Application
+Stable integer tag ids and name -> row position lookups for the loaded
+DataFrame. Ids come from a registry keyed by the normalized product name, so
+a product keeps its id across reloads and filtering. The index over one
+DataFrame is built once and resolves names or ids to iloc positions without
+scanning or masking the frame.
+"""
+
+import logging
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from src.core.utils.normalization import normalize_name
+
+logger = logging.getLogger(__name__)
+
+# Product name columns in the order ExcelProcessor lookups prefer them
+PRODUCT_NAME_COLUMNS = ('ProductName', 'Product Name*', 'Product Name', 'Description')
+
+
+def product_name_column(df) -> Optional[str]:
+    if df is None:
+        return None
+    return next((col for col in PRODUCT_NAME_COLUMNS if col in df.columns), None)
+
+
+class TagIdRegistry:
+    """Hands out tag ids per normalized product name; an id is never reused for another name."""
+
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def id_for(self, key: str) -> int:
+        tag_id = self._ids.get(key)
+        if tag_id is None:
+            with self._lock:
+                tag_id = self._ids.setdefault(key, len(self._ids))
+        return tag_id
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+
+class TagIndex:
+    """
+    Tag ids and row positions of one DataFrame.
+
+    Rows whose names normalize the same share a tag id (the same product
+    listed more than once); `names` keeps the first spelling of each, in row
+    order, as the display name.
+    """
+
+    def __init__(self, df, registry: Optional[TagIdRegistry] = None):
+        registry = registry if registry is not None else TagIdRegistry()
+        self.name_column = product_name_column(df)
+        self.names: Dict[int, str] = {}
+        self.positions: Dict[int, List[int]] = {}
+        self.row_tag_ids: List[Optional[int]] = []
+        self._ids_by_name: Dict[str, int] = {}
+        self._ids_by_key: Dict[str, int] = {}
+        self._ids_by_lower: Optional[Dict[str, List[int]]] = None
+        if self.name_column is None:
+            return
+
+        values = df[self.name_column]
+        if getattr(values, 'ndim', 1) > 1:  # duplicate column labels
+            values = values.iloc[:, 0]
+        for position, value in enumerate(values.tolist()):
+            name = value.strip() if isinstance(value, str) else ''
+            key = normalize_name(name) if name else ''
+            if not key:
+                self.row_tag_ids.append(None)
+                continue
+            tag_id = self._ids_by_key.get(key)
+            if tag_id is None:
+                tag_id = registry.id_for(key)
+                self._ids_by_key[key] = tag_id
+                self.names[tag_id] = name
+                self.positions[tag_id] = []
+            self._ids_by_name.setdefault(name, tag_id)
+            self.positions[tag_id].append(position)
+            self.row_tag_ids.append(tag_id)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __contains__(self, name: Any) -> bool:
+        return self.id_for_name(name) is not None
+
+    def id_for_name(self, name: Any) -> Optional[int]:
+        """Tag id by exact (stripped) name, falling back to the normalized name."""
+        if not isinstance(name, str):
+            return None
+        name = name.strip()
+        tag_id = self._ids_by_name.get(name)
+        if tag_id is None and name:
+            tag_id = self._ids_by_key.get(normalize_name(name))
+        return tag_id
+
+    def ids_for(self, names: Iterable[Any]) -> Tuple[List[int], List[Any]]:
+        """Tag ids for the given names, and the names that are not in the index."""
+        ids, unknown = [], []
+        for name in names:
+            tag_id = self.id_for_name(name)
+            if tag_id is None:
+                unknown.append(name)
+            else:
+                ids.append(tag_id)
+        return ids, unknown
+
+    def names_for(self, ids: Iterable[int]) -> List[str]:
+        return [self.names[tag_id] for tag_id in ids if tag_id in self.names]
+
+    def positions_for_ids(self, ids: Iterable[int]) -> List[int]:
+        """iloc positions of every row of the given tags, grouped by tag in the order given."""
+        rows = []
+        for tag_id in dict.fromkeys(ids):
+            rows.extend(self.positions.get(tag_id, ()))
+        return rows
+
+    def positions_for_name(self, name: Any) -> List[int]:
+        tag_id = self.id_for_name(name)
+        return list(self.positions.get(tag_id, ())) if tag_id is not None else []
+
+    def ids_by_lowercase_name(self) -> Dict[str, List[int]]:
+        """Lowercased display name -> tag ids, built on first use for case-insensitive and partial matching."""
+        if self._ids_by_lower is None:
+            by_lower: Dict[str, List[int]] = {}
+            for tag_id, name in self.names.items():
+                by_lower.setdefault(name.lower(), []).append(tag_id)
+            self._ids_by_lower = by_lower
+        return self._ids_by_lower
@@ -0,0 +1,386 @@
+"""
+Upload Job Executor for Label Maker Application
+Runs CPU-heavy upload parsing in a bounded process pool so pandas/openpyxl work
+does not compete with request threads for the GIL.
+"""
+
+import io
+import itertools
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401  (parquet engine)
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+    logging.warning("pyarrow not available, upload parsing will run in threads")
+
+logger = logging.getLogger(__name__)
+
+# Executor tuning
+MAX_UPLOAD_WORKERS = int(os.environ.get('AGT_UPLOAD_WORKERS', '2'))
+MAX_QUEUED_PER_STORE = 4
+
+# Job stages reported to the status callback
+STAGE_QUEUED = 'queued'
+STAGE_PARSING = 'parsing'
+STAGE_LOADING = 'loading'
+STAGE_READY = 'ready'
+STAGE_CANCELLED = 'cancelled'
+STAGE_FAILED = 'failed'
+ACTIVE_STAGES = (STAGE_QUEUED, STAGE_PARSING, STAGE_LOADING)
+
+
+def _stringify_rejected_columns(df: pd.DataFrame) -> pd.DataFrame:
+    # Object columns Arrow rejects (ints and strings mixed) become strings with nulls kept
+    import pyarrow as pa
+
+    df = df.copy()
+    for position in range(df.shape[1]):
+        values = df.iloc[:, position]
+        if values.dtype != object:
+            continue
+        try:
+            pa.array(values, from_pandas=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+            df.isetitem(position, values.where(values.isna(), values.astype(str)))
+    return df
+
+
+def dataframe_to_parquet_bytes(df: pd.DataFrame) -> bytes:
+    """
+    Serialize a DataFrame to Parquet bytes.
+
+    Mixed-type object columns Arrow rejects are written as strings; a frame
+    that still cannot be written raises.
+    """
+    buffer = io.BytesIO()
+    try:
+        df.to_parquet(buffer, engine='pyarrow', index=True)
+    except Exception as e:
+        logger.debug(f"Direct parquet write failed ({e}), stringifying mixed columns")
+        buffer = io.BytesIO()
+        _stringify_rejected_columns(df).to_parquet(buffer, engine='pyarrow', index=True)
+    return buffer.getvalue()
+
+
+def parquet_bytes_to_dataframe(data: bytes) -> pd.DataFrame:
+    """Load a DataFrame written by dataframe_to_parquet_bytes."""
+    return pd.read_parquet(io.BytesIO(data), engine='pyarrow')
+
+
+def parse_upload(file_path: str, serialize: bool = True) -> Dict[str, Any]:
+    """
+    Parse an uploaded Excel file with the full ExcelProcessor pipeline.
+
+    Runs inside a worker process. The DataFrame is returned as Parquet bytes
+    when serialize is True, otherwise as the DataFrame itself (thread mode).
+    """
+    from .excel_processor import ExcelProcessor
+
+    start = time.time()
+    processor = ExcelProcessor()
+    processor._last_loaded_file = file_path
+    if hasattr(processor, 'enable_product_db_integration'):
+        # Database storage happens in the parent once the result is accepted
+        processor.enable_product_db_integration(False)
+    if not processor.load_file(file_path) or processor.df is None or processor.df.empty:
+        raise ValueError('Failed to load file or file is empty')
+
+    result = {'rows': len(processor.df), 'parse_seconds': time.time() - start, 'pid': os.getpid()}
+    if serialize:
+        result['parquet'] = dataframe_to_parquet_bytes(processor.df)
+    else:
+        result['df'] = processor.df
+    return result
+
+
+@dataclass
+class UploadJob:
+    """A single upload waiting for, or running in, the executor."""
+    job_id: int
+    store: str
+    filename: str
+    file_path: str
+    stage: str = STAGE_QUEUED
+    error: Optional[str] = None
+    superseded: bool = False
+    submitted_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    rows: Optional[int] = None
+    done: threading.Event = field(default_factory=threading.Event, repr=False)
+
+    def to_dict(self) -> Dict[str, Any]:
+        now = time.time()
+        return {
+            'job_id': self.job_id,
+            'store': self.store,
+            'filename': self.filename,
+            'stage': self.stage,
+            'error': self.error,
+            'rows': self.rows,
+            'queued_seconds': round((self.started_at or now) - self.submitted_at, 3),
+            'run_seconds': round((self.finished_at or now) - self.started_at, 3) if self.started_at else None
+        }
+
+
+class UploadExecutor:
+    """
+    Bounded upload executor with per-store fairness.
+
+    Jobs wait in one queue per store; a free worker slot goes to the store
+    with the fewest running jobs (least recently served on ties), so one
+    store's backlog cannot starve another store.
+    If the process pool cannot start or breaks, the executor switches to
+    threads and runs the affected jobs there.
+    A new upload for a store supersedes that store's queued and running jobs:
+    queued ones are cancelled, running ones have their result discarded.
+    """
+
+    def __init__(self, max_workers: int = MAX_UPLOAD_WORKERS,
+                 status_callback: Optional[Callable[[str, str, str], None]] = None,
+                 result_callback: Optional[Callable[[UploadJob, pd.DataFrame], None]] = None,
+                 worker: Callable[..., Dict[str, Any]] = parse_upload,
+                 use_processes: bool = PARQUET_AVAILABLE):
+        self._max_workers = max(1, max_workers)
+        self._status_callback = status_callback
+        self._result_callback = result_callback
+        self._worker = worker
+        self._use_processes = use_processes
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._queues: "OrderedDict[str, Deque[UploadJob]]" = OrderedDict()
+        self._running: Dict[int, UploadJob] = {}
+        self._jobs: "OrderedDict[str, UploadJob]" = OrderedDict()  # latest job per filename
+        self._ids = itertools.count(1)
+        self._serve_order = itertools.count(1)
+        self._last_served: Dict[str, int] = {}
+        self._stats = {'submitted': 0, 'completed': 0, 'failed': 0, 'cancelled': 0, 'rejected': 0,
+                       'pool_failures': 0}
+
+    def _get_pool(self):
+        with self._pool_lock:
+            if self._pool is None:
+                if self._use_processes:
+                    # spawn avoids forking a process that holds request-thread locks
+                    self._pool = ProcessPoolExecutor(max_workers=self._max_workers,
+                                                     mp_context=multiprocessing.get_context('spawn'))
+                else:
+                    self._pool = ThreadPoolExecutor(max_workers=self._max_workers, thread_name_prefix='upload-worker')
+            return self._pool
+
+    def _fall_back_to_threads(self, error: BaseException) -> None:
+        """Drop a process pool that could not start or broke; later jobs run in threads."""
+        with self._pool_lock:
+            if not self._use_processes:
+                return
+            logger.warning(f"Upload process pool failed ({type(error).__name__}: {error}), using threads")
+            self._use_processes = False
+            self._stats['pool_failures'] += 1
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            # Jobs already handed to it finish there, or come back as BrokenProcessPool
+            pool.shutdown(wait=False)
+
+    def _set_stage(self, job: UploadJob, stage: str, error: Optional[str] = None) -> None:
+        job.stage = stage
+        job.error = error
+        if self._status_callback is None:
+            return
+        if stage in ACTIVE_STAGES:
+            status = 'processing'
+        elif stage == STAGE_READY:
+            status = 'ready'
+        elif stage == STAGE_CANCELLED:
+            status = 'cancelled: superseded by a newer upload'
+        else:
+            status = f'error: {error}'
+        try:
+            self._status_callback(job.filename, status, stage)
+        except Exception as e:
+            logger.warning(f"Upload status callback failed for {job.filename}: {e}")
+
+    def submit(self, store: str, filename: str, file_path: str, supersede: bool = True) -> UploadJob:
+        """Queue an upload for parsing; returns the job immediately."""
+        store = store or 'default'
+        job = UploadJob(job_id=next(self._ids), store=store, filename=filename, file_path=file_path)
+        cancelled: List[UploadJob] = []
+        with self._lock:
+            queue = self._queues.setdefault(store, deque())
+            if supersede:
+                cancelled.extend(queue)
+                queue.clear()
+                for running in self._running.values():
+                    if running.store == store and not running.superseded:
+                        running.superseded = True
+                        cancelled.append(running)
+            elif len(queue) >= MAX_QUEUED_PER_STORE:
+                self._stats['rejected'] += 1
+                raise RuntimeError(f"Upload queue for store '{store}' is full")
+            queue.append(job)
+            self._jobs[filename] = job
+            self._jobs.move_to_end(filename)
+            while len(self._jobs) > 200:
+                self._jobs.popitem(last=False)
+            self._stats['submitted'] += 1
+            self._stats['cancelled'] += len(cancelled)
+
+        for old in cancelled:
+            logger.info(f"Upload {old.filename} for store '{store}' superseded by {filename}")
+            self._set_stage(old, STAGE_CANCELLED)
+            if old.started_at is None:
+                old.done.set()
+        self._set_stage(job, STAGE_QUEUED)
+        self._pump()
+        return job
+
+    def _next_job(self) -> Optional[UploadJob]:
+        """Pick from the store with the fewest running jobs, least recently served first."""
+        running_per_store: Dict[str, int] = {}
+        for job in self._running.values():
+            running_per_store[job.store] = running_per_store.get(job.store, 0) + 1
+        candidates = [store for store, queue in self._queues.items() if queue]
+        for store in [store for store, queue in self._queues.items() if not queue]:
+            del self._queues[store]
+        if not candidates:
+            return None
+        store = min(candidates, key=lambda s: (running_per_store.get(s, 0), self._last_served.get(s, 0)))
+        self._last_served[store] = next(self._serve_order)
+        return self._queues[store].popleft()
+
+    def _pump(self) -> None:
+        """Start queued jobs while worker slots are free."""
+        to_start = []
+        with self._lock:
+            while len(self._running) < self._max_workers:
+                job = self._next_job()
+                if job is None:
+                    break
+                job.started_at = time.time()
+                self._running[job.job_id] = job
+                to_start.append(job)
+        for job in to_start:
+            self._set_stage(job, STAGE_PARSING)
+            self._start(job)
+
+    def _start(self, job: UploadJob) -> None:
+        in_process = self._use_processes
+        try:
+            future = self._get_pool().submit(self._worker, job.file_path, in_process)
+        except (BrokenProcessPool, OSError) as e:
+            if not in_process:
+                self._finish(job, None, e)
+                return
+            self._fall_back_to_threads(e)
+            self._start(job)
+            return
+        except Exception as e:
+            self._finish(job, None, e)
+            return
+        future.add_done_callback(lambda f, job=job: self._on_done(job, f, in_process))
+
+    def _on_done(self, job: UploadJob, future, in_process: bool) -> None:
+        # Runs on the pool's management thread; do the heavy part elsewhere
+        threading.Thread(target=self._complete, args=(job, future, in_process),
+                         name='upload-finisher', daemon=True).start()
+
+    def _complete(self, job: UploadJob, future, in_process: bool) -> None:
+        try:
+            result, error = future.result(), None
+        except BrokenProcessPool as e:
+            # A worker process died (or the pool was dropped); parse the upload again in a thread.
+            # An OSError raised by the worker itself, such as a missing file, is the job's own failure.
+            if in_process and not job.superseded:
+                self._fall_back_to_threads(e)
+                self._start(job)
+                return
+            result, error = None, e
+        except Exception as e:
+            result, error = None, e
+        self._finish(job, result, error)
+
+    def _finish(self, job: UploadJob, result: Optional[Dict[str, Any]], error: Optional[BaseException]) -> None:
+        try:
+            if job.superseded:
+                logger.info(f"Discarding result of superseded upload {job.filename}")
+            elif error is not None:
+                logger.error(f"Upload {job.filename} failed: {error}")
+                self._stats['failed'] += 1
+                self._set_stage(job, STAGE_FAILED, str(error))
+            else:
+                self._set_stage(job, STAGE_LOADING)
+                df = parquet_bytes_to_dataframe(result['parquet']) if 'parquet' in result else result['df']
+                job.rows = len(df)
+                # A newer upload may have arrived while the result was being decoded
+                if not job.superseded:
+                    if self._result_callback is not None:
+                        self._result_callback(job, df)
+                    self._stats['completed'] += 1
+                    self._set_stage(job, STAGE_READY)
+                    logger.info(f"Upload {job.filename} ready: {job.rows} rows, parsed in "
+                                f"{result.get('parse_seconds', 0):.2f}s (pid {result.get('pid')})")
+        except Exception as e:
+            logger.error(f"Error finishing upload {job.filename}: {e}")
+            self._stats['failed'] += 1
+            self._set_stage(job, STAGE_FAILED, str(e))
+        finally:
+            job.finished_at = time.time()
+            with self._lock:
+                self._running.pop(job.job_id, None)
+            job.done.set()
+            self._pump()
+
+    def wait(self, job: UploadJob, timeout: Optional[float] = None) -> bool:
+        """Block until the job finishes or is cancelled; returns True if it became ready."""
+        job.done.wait(timeout)
+        return job.stage == STAGE_READY
+
+    def get_job(self, filename: str) -> Optional[UploadJob]:
+        """Latest job submitted for a filename."""
+        with self._lock:
+            return self._jobs.get(filename)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Executor counters, queue depth per store and running jobs."""
+        with self._lock:
+            return {
+                **self._stats,
+                'workers': self._max_workers,
+                'mode': 'process' if self._use_processes else 'thread',
+                'queued': {store: len(queue) for store, queue in self._queues.items() if queue},
+                'running': [job.to_dict() for job in self._running.values()]
+            }
+
+    def shutdown(self, wait: bool = False) -> None:
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=wait, cancel_futures=True)
+
+
+# Global upload executor instance
+_upload_executor = None
+_upload_executor_lock = threading.Lock()
+
+
+def get_upload_executor(**kwargs) -> UploadExecutor:
+    """Get the global upload executor, creating it with kwargs on first use."""
+    global _upload_executor
+    if _upload_executor is None:
+        with _upload_executor_lock:
+            if _upload_executor is None:
+                _upload_executor = UploadExecutor(**kwargs)
+    return _upload_executor
@@ -0,0 +1,257 @@
+"""
+PDF Converter for Label Maker Application
+Converts generated label documents to PDF with a locally installed headless
+LibreOffice. A warm unoserver listener is kept running when unoserver is
+installed, so conversions skip the office startup; otherwise each conversion
+runs ``soffice --convert-to pdf`` against a persistent profile. LibreOffice
+cannot share a profile between running instances, so every process and pool
+thread gets its own profile, and each process's listener its own ports.
+Results are cached by the SHA-256 of the .docx bytes and conversions run on a
+small background pool.
+"""
+
+import hashlib
+import logging
+import os
+import shutil
+import socket
+import subprocess
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+from src.core.utils.metrics import get_metrics_registry
+
+logger = logging.getLogger(__name__)
+
+SOFFICE_BINARY = os.environ.get('AGT_SOFFICE_PATH') or shutil.which('soffice') or shutil.which('libreoffice')
+UNOSERVER_BINARY = shutil.which('unoserver')
+UNOCONVERT_BINARY = shutil.which('unoconvert')
+PDF_AVAILABLE = bool(SOFFICE_BINARY)
+LISTENER_AVAILABLE = bool(SOFFICE_BINARY and UNOSERVER_BINARY and UNOCONVERT_BINARY)
+if not PDF_AVAILABLE:
+    logging.warning("LibreOffice not found, PDF output will not be available")
+
+# Converter tuning
+PDF_WORKERS = int(os.environ.get('AGT_PDF_WORKERS', '2'))
+PDF_CONVERT_TIMEOUT = 180           # seconds for one document
+LISTENER_STARTUP_TIMEOUT = 30
+PDF_CACHE_MAX_BYTES = 128 * 1024 * 1024
+PDF_PROFILE_DIR = os.path.join(tempfile.gettempdir(), 'agt_libreoffice_profile')   # one subdirectory per instance
+
+OUTPUT_FORMATS = ('docx', 'pdf', 'both')
+PDF_MIMETYPE = 'application/pdf'
+
+
+def document_hash(docx_bytes: bytes) -> str:
+    return hashlib.sha256(docx_bytes).hexdigest()
+
+
+def profile_dir(name: str) -> str:
+    """LibreOffice profile directory for one soffice instance, under PDF_PROFILE_DIR."""
+    return os.path.join(PDF_PROFILE_DIR, name)
+
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class PdfConverter:
+    """
+    DOCX to PDF conversion through headless LibreOffice.
+
+    Identical documents (same bytes) are converted once; later requests for
+    the same hash are served from an in-memory LRU bounded by total bytes.
+    """
+
+    def __init__(self, max_workers: int = PDF_WORKERS, cache_max_bytes: int = PDF_CACHE_MAX_BYTES):
+        self._pool = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix='pdf-convert')
+        self._cache: 'OrderedDict[str, bytes]' = OrderedDict()
+        self._cache_bytes = 0
+        self._cache_max_bytes = cache_max_bytes
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._listener: Optional[subprocess.Popen] = None
+        self._listener_port: Optional[int] = None
+        self._listener_lock = threading.Lock()
+        self._stats = {'converted': 0, 'failed': 0, 'cache_hits': 0, 'convert_seconds': 0.0}
+
+    @property
+    def available(self) -> bool:
+        return PDF_AVAILABLE
+
+    def warm(self) -> bool:
+        """Start the persistent listener ahead of the first conversion (no-op without unoserver)."""
+        return LISTENER_AVAILABLE and self._ensure_listener()
+
+    def submit(self, docx_bytes: bytes) -> Future:
+        """Queue a conversion; returns a Future resolving to PDF bytes (shared by identical documents)."""
+        key = document_hash(docx_bytes)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self._stats['cache_hits'] += 1
+                get_metrics_registry().cache_hit('pdf')
+                future = Future()
+                future.set_result(cached)
+                return future
+            future = self._inflight.get(key)
+            if future is None:
+                get_metrics_registry().cache_miss('pdf')
+                future = self._pool.submit(self._convert_and_store, key, docx_bytes)
+                self._inflight[key] = future
+            return future
+
+    def convert(self, docx_bytes: bytes, timeout: float = PDF_CONVERT_TIMEOUT) -> bytes:
+        """Convert and wait for the result."""
+        return self.submit(docx_bytes).result(timeout=timeout)
+
+    def _convert_and_store(self, key: str, docx_bytes: bytes) -> bytes:
+        start = time.perf_counter()
+        try:
+            pdf_bytes = self._convert(docx_bytes)
+        except Exception:
+            with self._lock:
+                self._stats['failed'] += 1
+                self._inflight.pop(key, None)
+            raise
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self._stats['converted'] += 1
+            self._stats['convert_seconds'] += elapsed
+            self._inflight.pop(key, None)
+            if len(pdf_bytes) <= self._cache_max_bytes:
+                self._cache[key] = pdf_bytes
+                self._cache_bytes += len(pdf_bytes)
+                while self._cache_bytes > self._cache_max_bytes:
+                    _, evicted = self._cache.popitem(last=False)
+                    self._cache_bytes -= len(evicted)
+        logger.info(f"Converted document {key[:12]} to PDF in {elapsed:.2f}s ({len(pdf_bytes)} bytes)")
+        return pdf_bytes
+
+    def _convert(self, docx_bytes: bytes) -> bytes:
+        if not PDF_AVAILABLE:
+            raise RuntimeError("PDF output requires LibreOffice (soffice) to be installed on the server")
+        if LISTENER_AVAILABLE and self._ensure_listener():
+            try:
+                return self._convert_with_listener(docx_bytes)
+            except Exception as e:
+                logger.warning(f"unoserver conversion failed, falling back to soffice: {e}")
+        return self._convert_with_soffice(docx_bytes)
+
+    def _ensure_listener(self) -> bool:
+        """Start the persistent unoserver process once; restart it if it has exited."""
+        with self._listener_lock:
+            if self._listener is not None and self._listener.poll() is None:
+                return True
+            # Every gunicorn worker runs its own listener: own XML-RPC port, UNO port and profile
+            port, uno_port = _free_port(), _free_port()
+            while uno_port == port:
+                uno_port = _free_port()
+            try:
+                self._listener = subprocess.Popen(
+                    [UNOSERVER_BINARY, '--interface', '127.0.0.1', '--port', str(port),
+                     '--uno-port', str(uno_port), '--executable', SOFFICE_BINARY,
+                     '--user-installation', profile_dir(f'listener-{os.getpid()}')],
+                    stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+                )
+            except OSError as e:
+                logger.warning(f"Could not start unoserver: {e}")
+                self._listener = None
+                return False
+            self._listener_port = port
+            deadline = time.time() + LISTENER_STARTUP_TIMEOUT
+            while time.time() < deadline:
+                if self._listener.poll() is not None:
+                    logger.warning("unoserver exited during startup")
+                    self._listener = None
+                    return False
+                if self._listener_ready(port):
+                    logger.info(f"unoserver listening on port {port}")
+                    return True
+                time.sleep(0.5)
+            logger.warning("unoserver did not become ready in time")
+            # A listener left running would pass the poll() check above on the next call
+            self._listener.terminate()
+            try:
+                self._listener.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self._listener.kill()
+            self._listener = None
+            self._listener_port = None
+            return False
+
+    @staticmethod
+    def _listener_ready(port: int) -> bool:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=1):
+                return True
+        except OSError:
+            return False
+
+    def _convert_with_listener(self, docx_bytes: bytes) -> bytes:
+        result = subprocess.run(
+            [UNOCONVERT_BINARY, '--host', '127.0.0.1', '--port', str(self._listener_port),
+             '--convert-to', 'pdf', '-', '-'],
+            input=docx_bytes, capture_output=True, timeout=PDF_CONVERT_TIMEOUT
+        )
+        if result.returncode != 0 or not result.stdout:
+            raise RuntimeError(result.stderr.decode(errors='replace').strip() or 'unoconvert produced no output')
+        return result.stdout
+
+    def _convert_with_soffice(self, docx_bytes: bytes) -> bytes:
+        # Pool threads keep their profile between runs, so it is built once per thread
+        profile_url = 'file://' + profile_dir(f'soffice-{os.getpid()}-{threading.get_ident()}')
+        with tempfile.TemporaryDirectory(prefix='agt_pdf_') as tmp:
+            source = os.path.join(tmp, 'labels.docx')
+            with open(source, 'wb') as f:
+                f.write(docx_bytes)
+            result = subprocess.run(
+                [SOFFICE_BINARY, f'-env:UserInstallation={profile_url}', '--headless', '--norestore',
+                 '--nologo', '--convert-to', 'pdf', '--outdir', tmp, source],
+                capture_output=True, timeout=PDF_CONVERT_TIMEOUT
+            )
+            target = os.path.join(tmp, 'labels.pdf')
+            if result.returncode != 0 or not os.path.exists(target):
+                raise RuntimeError(result.stderr.decode(errors='replace').strip() or 'soffice produced no PDF')
+            with open(target, 'rb') as f:
+                return f.read()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'available': PDF_AVAILABLE,
+                'listener': LISTENER_AVAILABLE and self._listener is not None and self._listener.poll() is None,
+                'cached_documents': len(self._cache),
+                'cache_bytes': self._cache_bytes,
+                'in_flight': len(self._inflight),
+                **{k: round(v, 3) if isinstance(v, float) else v for k, v in self._stats.items()},
+            }
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False)
+        with self._listener_lock:
+            if self._listener is not None and self._listener.poll() is None:
+                self._listener.terminate()
+            self._listener = None
+            self._listener_port = None
+
+
+_pdf_converter: Optional[PdfConverter] = None
+_pdf_converter_lock = threading.Lock()
+
+
+def get_pdf_converter() -> PdfConverter:
+    """Return the process-wide PDF converter."""
+    global _pdf_converter
+    if _pdf_converter is None:
+        with _pdf_converter_lock:
+            if _pdf_converter is None:
+                _pdf_converter = PdfConverter()
+    return _pdf_converter
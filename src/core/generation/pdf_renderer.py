@@ -0,0 +1,321 @@
+"""
+Direct PDF Renderer for Label Maker Application
+Draws label sheets straight onto PDF pages with reportlab, skipping the Word
+document pipeline. Uses the same records as the .docx path
+(get_selected_records / database records), the unified_font_sizing rules,
+the grid geometry of the expanded templates (CELL_DIMENSIONS, GRID_LAYOUTS
+and the page setup of each base template) and LINEAGE_COLOR_MAP. DOH images
+and QR codes are drawn once per document as form XObjects (QR codes at one
+pixel per module, encoded with qrcode) and referenced from every label that
+shows them.
+"""
+
+import logging
+import os
+import re
+from functools import lru_cache
+from io import BytesIO
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from src.core.constants import CELL_DIMENSIONS, CLASSIC_TYPES, GRID_LAYOUTS, LINEAGE_COLOR_MAP
+from src.core.generation.text_processing import process_doh_image
+from src.core.generation.unified_font_sizing import get_font_size_by_marker
+
+try:
+    from reportlab.lib.utils import ImageReader, simpleSplit
+    from reportlab.pdfbase.pdfmetrics import stringWidth
+    from reportlab.pdfgen import canvas
+    REPORTLAB_AVAILABLE = True
+except ImportError:
+    REPORTLAB_AVAILABLE = False
+    logging.warning("reportlab not available, direct PDF rendering will be disabled")
+
+try:
+    import qrcode
+    QRCODE_AVAILABLE = True
+except ImportError:
+    QRCODE_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+POINTS_PER_INCH = 72
+FONT_NAME = 'Helvetica-Bold'  # Metric-compatible with the Arial Bold used in the .docx output
+TEXT_COLOR = (1, 1, 1)
+CELL_PADDING = 4          # points
+LINE_GAP = 1.15           # line height as a multiple of the font size
+MIN_FONT_SIZE = 5
+IMAGE_ROW_FRACTION = 0.22  # share of the label height given to DOH/QR images
+FORM_SIZE = 100           # side of the square each DOH/QR form XObject is drawn in
+QR_BORDER = 1             # quiet zone in modules; the label color around it is light enough
+QR_MASK_PATTERN = 0       # any mask decodes; a fixed one skips qrcode's eight-mask penalty scoring
+QR_CACHE_SIZE = 4096
+_QR_PIXELS = bytes.maketrans(b'\x00\x01', b'\xff\x00')  # module (False/True) -> gray pixel
+
+# Fields drawn on each template, top to bottom, in the order of the base .docx templates.
+# Each row is (marker used for font sizing, record fields joined on one line).
+LABEL_ROWS: Dict[str, Tuple[Tuple[str, Tuple[str, ...]], ...]] = {
+    'horizontal': (('DESC', ('DescAndWeight',)), ('LINEAGE', ('Lineage',)),
+                   ('PRODUCTSTRAIN', ('ProductVendor', 'ProductStrain')), ('PRICE', ('Price',)), ('IMAGES', ())),
+    'vertical': (('DESC', ('DescAndWeight',)), ('PRICE', ('Price',)), ('IMAGES', ()),
+                 ('LINEAGE', ('Lineage', 'ProductVendor', 'ProductStrain'))),
+    'mini': (('DESC', ('DescAndWeight',)), ('PRICE', ('Price',)), ('IMAGES', ()), ('PRODUCTBRAND', ('ProductBrand',))),
+    'double': (('DESC', ('DescAndWeight',)), ('PRICE', ('Price',)), ('IMAGES', ()),
+               ('LINEAGE', ('Lineage', 'ProductVendor')), ('PRODUCTSTRAIN', ('ProductStrain',))),
+}
+SUPPORTED_TEMPLATES = tuple(LABEL_ROWS)
+
+_MARKER_RE = re.compile(r'[A-Z_]+_(?:START|END)')
+
+
+class CellBox(NamedTuple):
+    """One label position on a page, in PDF points from the bottom-left corner."""
+    x: float
+    y: float
+    width: float
+    height: float
+
+
+class PageGeometry(NamedTuple):
+    width: float
+    height: float
+    cells: Tuple[CellBox, ...]
+
+
+@lru_cache(maxsize=None)
+def page_geometry(template_type: str) -> PageGeometry:
+    """
+    Page size and label cells for a template type.
+
+    The page size and top margin come from the base .docx template; cells use
+    the fixed CELL_DIMENSIONS x GRID_LAYOUTS grid that enforce_fixed_cell_dimensions
+    applies, centered horizontally like the expanded Word tables.
+    """
+    from docx import Document
+    from src.core.generation.tag_generator import get_template_path
+
+    section = Document(get_template_path(template_type)).sections[0]
+    page_width = section.page_width.pt
+    page_height = section.page_height.pt
+    top_margin = section.top_margin.pt
+
+    dims, grid = CELL_DIMENSIONS[template_type], GRID_LAYOUTS[template_type]
+    cell_width, cell_height = dims['width'] * POINTS_PER_INCH, dims['height'] * POINTS_PER_INCH
+    left = (page_width - cell_width * grid['cols']) / 2
+    cells = tuple(
+        CellBox(left + col * cell_width, page_height - top_margin - (row + 1) * cell_height, cell_width, cell_height)
+        for row in range(grid['rows'])
+        for col in range(grid['cols'])
+    )
+    return PageGeometry(page_width, page_height, cells)
+
+
+def _clean(value: Any) -> str:
+    if value is None:
+        return ''
+    text = _MARKER_RE.sub('', str(value)).replace('\u00ad', '').strip()
+    return '' if text.lower() in ('nan', 'none', 'null') else text
+
+
+def label_fields(record: Dict[str, Any]) -> Dict[str, str]:
+    """The display values of one record, as the docx context builder would fill them."""
+    product_type = _clean(record.get('ProductType') or record.get('Product Type*')).lower()
+    lineage = _clean(record.get('Lineage')).upper() or 'MIXED'
+    if product_type not in CLASSIC_TYPES and lineage not in ('CBD', 'PARAPHERNALIA'):
+        lineage = 'MIXED'
+    weight = _clean(record.get('WeightUnits') or record.get('CombinedWeight'))
+    desc = _clean(record.get('DescAndWeight'))
+    if not desc:
+        name = _clean(record.get('Description') or record.get('ProductName') or record.get('Product Name*'))
+        desc = f"{name} - {weight}" if name and weight else name
+    price = _clean(record.get('Price'))
+    if price and not price.startswith('$'):
+        price = f"${price}"
+    return {
+        'DescAndWeight': desc,
+        'Price': price,
+        'Lineage': lineage if product_type in CLASSIC_TYPES else '',
+        'ProductBrand': _clean(record.get('ProductBrand') or record.get('Product Brand')),
+        'ProductVendor': _clean(record.get('ProductVendor') or record.get('Vendor')),
+        'ProductStrain': _clean(record.get('ProductStrain') or record.get('Product Strain')) if product_type in CLASSIC_TYPES else '',
+        'ProductName': _clean(record.get('ProductName') or record.get('Product Name*')),
+        'ProductType': product_type,
+        'LineageKey': lineage,
+        'DOH': _clean(record.get('DOH')).upper(),
+    }
+
+
+@lru_cache(maxsize=QR_CACHE_SIZE)
+def qr_pixels(text: str) -> Tuple[int, bytes]:
+    """Side length and 8-bit grayscale pixels (one per module, QR_BORDER included) of the QR code for text."""
+    qr = qrcode.QRCode(error_correction=qrcode.constants.ERROR_CORRECT_L, border=QR_BORDER,
+                       mask_pattern=QR_MASK_PATTERN)
+    qr.add_data(text)
+    matrix = qr.get_matrix()
+    return len(matrix), b''.join(bytes(row) for row in matrix).translate(_QR_PIXELS)
+
+
+def lineage_color(lineage: str) -> Tuple[float, float, float]:
+    """LINEAGE_COLOR_MAP color as reportlab RGB floats; unknown lineages use MIXED."""
+    hex_color = LINEAGE_COLOR_MAP.get(lineage, LINEAGE_COLOR_MAP['MIXED']).lstrip('#')
+    return tuple(int(hex_color[i:i + 2], 16) / 255 for i in (0, 2, 4))
+
+
+class DirectPdfRenderer:
+    """Renders records onto label sheets for one template type."""
+
+    def __init__(self, template_type: str, scale_factor: float = 1.0, include_qr: bool = True):
+        if not REPORTLAB_AVAILABLE:
+            raise RuntimeError("Direct PDF rendering requires reportlab to be installed")
+        if template_type not in LABEL_ROWS:
+            raise ValueError(f"Direct PDF rendering does not support template type: {template_type}")
+        self.template_type = template_type
+        self.scale_factor = scale_factor
+        self.include_qr = include_qr
+        self.geometry = page_geometry(template_type)
+        self._forms: Dict[str, Optional[str]] = {}
+        self._font_sizes: Dict[Tuple[str, str], float] = {}
+        self._lines: Dict[Tuple[str, float, float], List[str]] = {}
+
+    def render(self, records: Iterable[Dict[str, Any]]) -> bytes:
+        """Draw every record and return the PDF bytes."""
+        buffer = BytesIO()
+        self._forms = {}  # form XObjects belong to one document
+        pdf = canvas.Canvas(buffer, pagesize=(self.geometry.width, self.geometry.height), pageCompression=1)
+        pdf.setTitle(f"{self.template_type} labels")
+        per_page = len(self.geometry.cells)
+        seen = set()
+        index = 0
+        for record in records:
+            fields = label_fields(record)
+            # Same de-duplication by product name as TemplateProcessor.process_records
+            if fields['ProductName'] in seen:
+                continue
+            seen.add(fields['ProductName'])
+            if index and index % per_page == 0:
+                pdf.showPage()
+            self._draw_label(pdf, self.geometry.cells[index % per_page], fields)
+            index += 1
+        pdf.showPage()
+        pdf.save()
+        return buffer.getvalue()
+
+    def _font_size(self, text: str, marker: str) -> float:
+        key = (text, marker)
+        size = self._font_sizes.get(key)
+        if size is None:
+            size = get_font_size_by_marker(text, marker, self.template_type, self.scale_factor).pt
+            self._font_sizes[key] = size
+        return size
+
+    def _form(self, pdf, key: str, draw) -> Optional[str]:
+        """
+        Name of a form XObject drawn once per document in a FORM_SIZE square;
+        every label that shows the same image references it instead of
+        embedding the image again.
+        """
+        if key not in self._forms:
+            name = f"img{len(self._forms)}"
+            try:
+                pdf.beginForm(name, 0, 0, FORM_SIZE, FORM_SIZE)
+                draw(pdf)
+                pdf.endForm()
+                self._forms[key] = name
+            except Exception as e:
+                logger.warning(f"Could not draw label image {key}: {e}")
+                self._forms[key] = None
+        return self._forms[key]
+
+    def _doh_form(self, pdf, fields: Dict[str, str]) -> Optional[str]:
+        path = process_doh_image(fields['DOH'], fields['ProductType']) if fields['DOH'] == 'YES' else ''
+        if not path or not os.path.exists(path):
+            return None
+        return self._form(pdf, path, lambda form: form.drawImage(
+            ImageReader(path), 0, 0, width=FORM_SIZE, height=FORM_SIZE, preserveAspectRatio=True, mask='auto'))
+
+    def _qr_form(self, pdf, product_name: str) -> Optional[str]:
+        if not self.include_qr or not product_name or not QRCODE_AVAILABLE:
+            return None
+
+        def draw(form):
+            from PIL import Image
+            # One grayscale pixel per module keeps the embedded image tiny; viewers scale it up unsmoothed
+            side, pixels = qr_pixels(product_name)
+            image = Image.frombytes('L', (side, side), pixels)
+            form.drawImage(ImageReader(image), 0, 0, width=FORM_SIZE, height=FORM_SIZE)
+        return self._form(pdf, f"qr:{product_name}", draw)
+
+    def _wrap(self, text: str, font_size: float, width: float) -> List[str]:
+        key = (text, font_size, width)
+        lines = self._lines.get(key)
+        if lines is None:
+            lines = self._lines[key] = simpleSplit(text, FONT_NAME, font_size, width) or ['']
+        return lines
+
+    def _layout(self, blocks, scale: float, width: float):
+        """Wrap text blocks at the given font scale; returns the blocks and their total height."""
+        laid_out, total = [], 0.0
+        for kind, content, size in blocks:
+            if kind == 'images':
+                laid_out.append((kind, content, size))
+                total += size
+                continue
+            font_size = max(MIN_FONT_SIZE, size * scale)
+            lines = self._wrap(content, font_size, width)
+            laid_out.append((kind, lines, font_size))
+            total += len(lines) * font_size * LINE_GAP
+        return laid_out, total
+
+    def _draw_label(self, pdf, cell: CellBox, fields: Dict[str, str]) -> None:
+        pdf.setFillColorRGB(*lineage_color(fields['LineageKey']))
+        pdf.rect(cell.x, cell.y, cell.width, cell.height, stroke=0, fill=1)
+
+        inner_width = cell.width - 2 * CELL_PADDING
+        image_height = cell.height * IMAGE_ROW_FRACTION
+        blocks = []
+        for marker, keys in LABEL_ROWS[self.template_type]:
+            if marker == 'IMAGES':
+                images = [name for name in (self._doh_form(pdf, fields), self._qr_form(pdf, fields['ProductName'])) if name]
+                if images:
+                    blocks.append(('images', images, image_height))
+                continue
+            text = ' '.join(fields[key] for key in keys if fields[key])
+            if text:
+                size = self._font_size(text, marker)
+                blocks.append(('text', text, size))
+
+        # Shrink text uniformly until every block fits in the label
+        available = cell.height - 2 * CELL_PADDING
+        text_sizes = [size for kind, _, size in blocks if kind == 'text']
+        min_scale = MIN_FONT_SIZE / max(text_sizes) if text_sizes else 1.0
+        scale = 1.0
+        while True:
+            laid_out, total = self._layout(blocks, scale, inner_width)
+            if total <= available or scale <= min_scale:
+                break
+            scale *= 0.9
+
+        # Vertically center the stack, then draw each block centered horizontally
+        y = cell.y + cell.height - CELL_PADDING - max(0.0, (available - total) / 2)
+        pdf.setFillColorRGB(*TEXT_COLOR)
+        for kind, content, size in laid_out:
+            if kind == 'images':
+                side = size
+                x = cell.x + (cell.width - side * len(content) - CELL_PADDING * (len(content) - 1)) / 2
+                for name in content:
+                    pdf.saveState()
+                    pdf.transform(side / FORM_SIZE, 0, 0, side / FORM_SIZE, x, y - side)
+                    pdf.doForm(name)
+                    pdf.restoreState()
+                    x += side + CELL_PADDING
+                y -= side
+                continue
+            pdf.setFont(FONT_NAME, size)
+            for line in content:
+                y -= size * LINE_GAP
+                line_width = stringWidth(line, FONT_NAME, size)
+                pdf.drawString(cell.x + (cell.width - line_width) / 2, y + size * (LINE_GAP - 1), line)
+
+
+def render_labels_pdf(records: List[Dict[str, Any]], template_type: str, scale_factor: float = 1.0) -> bytes:
+    """Render records as a label sheet PDF without building a Word document."""
+    return DirectPdfRenderer(template_type, scale_factor).render(records)
@@ -33,6 +33,7 @@ from src.core.formatting.markers import (
     FIELD_MARKERS
 )
 from src.core.utils.resource_utils import resource_path
+from src.core.generation.template_cache import get_template_cache
 from src.core.constants import (
     FONT_SCHEME_HORIZONTAL,
     FONT_SCHEME_VERTICAL,
@@ -305,7 +306,14 @@ def process_chunk(args):
     chunk, base_template, font_scheme, orientation, scale_factor = args
     # Mini template expands to 4x5 grid
     if orientation == "mini":
-        local_template_buffer = expand_template_to_4x5_fixed_scaled(base_template, scale_factor=scale_factor)
+        if isinstance(base_template, (str, os.PathLike)):
+            local_template_buffer = get_template_cache().get_buffer(
+                base_template, orientation, scale_factor,
+                lambda: expand_template_to_4x5_fixed_scaled(base_template, scale_factor=scale_factor),
+                variant='tag_generator',
+            )
+        else:
+            local_template_buffer = expand_template_to_4x5_fixed_scaled(base_template, scale_factor=scale_factor)
         num_labels = 20  # Fixed: 4x5 grid = 20 labels per page
     else:
         local_template_buffer = base_template
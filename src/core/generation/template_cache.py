@@ -0,0 +1,158 @@
+"""
+Template Buffer Cache for Label Maker Application
+Process-wide cache of expanded label templates. Expanding a base .docx into
+its 3x3/4x3/4x5/2x2 grid is identical for every request, so the expanded
+bytes are kept per (template path, template mtime, template type,
+scale_factor) and each caller gets its own BytesIO over them.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from io import BytesIO
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+from src.core.utils.metrics import get_metrics_registry
+
+logger = logging.getLogger(__name__)
+
+# Expanded templates kept before the least recently used is evicted
+TEMPLATE_CACHE_MAX_ENTRIES = 32
+PREWARM_TEMPLATE_TYPES = ('horizontal', 'vertical', 'mini', 'double', 'inventory')
+
+CacheKey = Tuple[str, int, str, float, str]
+
+
+class TemplateBufferCache:
+    """
+    LRU cache of expanded template bytes.
+
+    The template mtime is part of the key, so editing a template on disk is
+    picked up on the next lookup without an explicit clear. ``variant``
+    separates different expansions of the same template (e.g. a forced
+    re-expansion, or the tag generator's own mini grid).
+    """
+
+    def __init__(self, max_entries: int = TEMPLATE_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[CacheKey, bytes]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._build_locks: Dict[CacheKey, threading.Lock] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.build_seconds = 0.0
+
+    @staticmethod
+    def make_key(template_path, template_type: str, scale_factor: float = 1.0, variant: str = 'default') -> CacheKey:
+        path = os.path.abspath(str(template_path))
+        return (path, os.stat(path).st_mtime_ns, str(template_type), float(scale_factor), variant)
+
+    def get_buffer(self, template_path, template_type: str, scale_factor: float,
+                   builder: Callable[[], Any], variant: str = 'default') -> BytesIO:
+        """Return a fresh BytesIO over the expanded template, building it with builder() on a miss."""
+        key = self.make_key(template_path, template_type, scale_factor, variant)
+        metrics = get_metrics_registry()
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                metrics.cache_hit('template')
+                return BytesIO(data)
+            build_lock = self._build_locks.setdefault(key, threading.Lock())
+
+        # One build per key; concurrent callers for the same template wait for it
+        with build_lock:
+            with self._lock:
+                data = self._entries.get(key)
+                if data is not None:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    metrics.cache_hit('template')
+                    return BytesIO(data)
+            start = time.perf_counter()
+            built = builder()
+            data = built.getvalue() if hasattr(built, 'getvalue') else bytes(built)
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.misses += 1
+                self.build_seconds += elapsed
+                self._entries[key] = data
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+                self._build_locks.pop(key, None)
+            metrics.cache_miss('template')
+            logger.info(f"Expanded {template_type} template ({variant}) in {elapsed:.3f}s")
+            return BytesIO(data)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'evictions': self.evictions,
+                'bytes': sum(len(data) for data in self._entries.values()),
+                'build_seconds': round(self.build_seconds, 4),
+                'templates': sorted({f"{key[2]}@{key[3]:g}:{key[4]}" for key in self._entries}),
+            }
+
+
+_template_cache: Optional[TemplateBufferCache] = None
+_template_cache_lock = threading.Lock()
+
+
+def get_template_cache() -> TemplateBufferCache:
+    """Return the process-wide template buffer cache."""
+    global _template_cache
+    if _template_cache is None:
+        with _template_cache_lock:
+            if _template_cache is None:
+                _template_cache = TemplateBufferCache()
+    return _template_cache
+
+
+def get_template_cache_stats() -> Dict[str, Any]:
+    return get_template_cache().stats()
+
+
+def clear_template_cache() -> None:
+    get_template_cache().clear()
+
+
+def prewarm_template_cache(template_types: Iterable[str] = PREWARM_TEMPLATE_TYPES,
+                           scale_factors: Iterable[float] = (1.0,)) -> Dict[str, Any]:
+    """
+    Expand every template the way label generation will ask for it, so the
+    first request on a fresh worker is served from the cache.
+    """
+    from src.core.generation.template_processor import TemplateProcessor, get_font_scheme
+
+    start = time.perf_counter()
+    warmed, failed = [], {}
+    for template_type in template_types:
+        for scale_factor in scale_factors:
+            try:
+                processor = TemplateProcessor(template_type, get_font_scheme(template_type), scale_factor)
+                if template_type != 'mini':
+                    # /api/generate forces re-expansion for every non-mini template
+                    processor._expand_template_if_needed(force_expand=True)
+                warmed.append(template_type)
+            except Exception as e:
+                failed[template_type] = str(e)
+                logger.warning(f"Could not prewarm {template_type} template: {e}")
+    elapsed = time.perf_counter() - start
+    logger.info(f"Prewarmed {len(warmed)} templates in {elapsed:.2f}s")
+    return {'warmed': warmed, 'failed': failed, 'seconds': round(elapsed, 3)}
@@ -23,6 +23,8 @@ import qrcode
 
 # Local imports
 from src.core.utils.common import safe_get
+from src.core.utils.metrics import record_stage, stage_timer
+from src.core.generation.template_cache import get_template_cache
 from src.core.generation.docx_formatting import (
     apply_lineage_colors,
     enforce_fixed_cell_dimensions,
@@ -144,7 +146,17 @@ class TemplateProcessor:
             raise
 
     def _expand_template_if_needed(self, force_expand=False):
-        """Expand template if needed and return buffer."""
+        """Expand template if needed and return buffer (shared across requests via the template cache)."""
+        return get_template_cache().get_buffer(
+            self._template_path,
+            self.template_type,
+            self.scale_factor,
+            lambda: self._build_expanded_template(force_expand),
+            variant='forced' if force_expand else 'default',
+        )
+
+    def _build_expanded_template(self, force_expand=False):
+        """Expand the base template into its label grid and return the buffer."""
         try:
             with open(self._template_path, 'rb') as f:
                 buffer = BytesIO(f.read())
@@ -373,9 +385,8 @@ class TemplateProcessor:
                 tc_xml_str = new_tc.xml.decode('utf-8') if isinstance(new_tc.xml, bytes) else str(new_tc.xml)
                 tc_xml_str = tc_xml_str.replace('Label1', f'Label{label_num}')
                 
-                # Parse the updated XML and replace the cell
-                from lxml import etree
-                new_tc_element = etree.fromstring(tc_xml_str.encode('utf-8'))
+                # Parse the updated XML as a docx cell element (row.cells needs CT_Tc, not a plain lxml element)
+                new_tc_element = parse_xml(tc_xml_str.encode('utf-8'))
                 cell._tc.getparent().replace(cell._tc, new_tc_element)
                 label_num += 1
 
@@ -981,13 +992,14 @@ class TemplateProcessor:
             
             # Combine documents
             self.logger.info(f"Combining {len(documents)} documents")
-            composer = Composer(documents[0])
-            for doc in documents[1:]:
-                composer.append(doc)
-            
-            final_doc_buffer = BytesIO()
-            composer.save(final_doc_buffer)
-            final_doc_buffer.seek(0)
+            with stage_timer('compose'):
+                composer = Composer(documents[0])
+                for doc in documents[1:]:
+                    composer.append(doc)
+                
+                final_doc_buffer = BytesIO()
+                composer.save(final_doc_buffer)
+                final_doc_buffer.seek(0)
             
             # CRITICAL: Remove ALL headers and footers from the final combined document
             final_doc = Document(final_doc_buffer)
@@ -1062,6 +1074,8 @@ class TemplateProcessor:
             # since DocxTemplate was not working reliably
             self.logger.info(f"Using manual placeholder replacement for {self.template_type} template")
             self._manual_replace_placeholders(rendered_doc, context)
+            post_process_start = time.perf_counter()
+            record_stage('template_render', time.time() - chunk_start_time)
             
             # Check timeout before post-processing
             if time.time() - chunk_start_time > MAX_PROCESSING_TIME_PER_CHUNK:
@@ -1201,6 +1215,7 @@ class TemplateProcessor:
             except Exception as e:
                 self.logger.warning(f"Final lineage centering fix failed: {e}")
             
+            record_stage('post_process', time.perf_counter() - post_process_start)
             return rendered_doc
             
         except Exception as e:
@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+Lazy imports and import-time profiling for worker startup.
+
+PythonAnywhere recycles web workers often, so every module app.py imports
+at the top is paid for by the first request after a restart. Heavy
+subsystems (pandas, python-docx/docxtpl, openpyxl, the JSON matcher and its
+AI matchers) are bound through lightweight facades instead: a LazyModule
+stands in for a module and a LazyAttribute for a function or class, and the
+real import happens on first use.
+
+The ImportProfiler is a meta path hook that times every module load the way
+`python -X importtime` does (self and cumulative microseconds, nesting
+depth), plus when each lazy facade was resolved, so /api/performance/imports
+can show what a cold worker actually spent its startup on.
+"""
+
+import importlib
+import logging
+import os
+import sys
+import threading
+import time
+import types
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Set AGT_IMPORT_PROFILE=0 to skip installing the profiler
+PROFILE_ENV_VAR = 'AGT_IMPORT_PROFILE'
+
+
+class _TimedLoader:
+    """Wraps a module's loader so its create/exec time is charged to that module."""
+
+    def __init__(self, loader, profiler: 'ImportProfiler'):
+        self._loader = loader
+        self._profiler = profiler
+
+    def create_module(self, spec):
+        self._profiler._enter(spec.name)
+        try:
+            create = getattr(self._loader, 'create_module', None)
+            return create(spec) if create is not None else None
+        except BaseException:
+            self._profiler._exit(spec.name, failed=True)
+            raise
+
+    def exec_module(self, module):
+        # The module keeps the real loader; only this call goes through the wrapper
+        spec = getattr(module, '__spec__', None)
+        name = spec.name if spec is not None else module.__name__
+        if spec is not None and spec.loader is self:
+            spec.loader = self._loader
+        if getattr(module, '__loader__', None) is self:
+            module.__loader__ = self._loader
+        failed = True
+        try:
+            self._loader.exec_module(module)
+            failed = False
+        finally:
+            self._profiler._exit(name, failed=failed)
+
+    def __getattr__(self, name):
+        return getattr(self._loader, name)
+
+
+class ImportProfiler:
+    """
+    Meta path hook recording the load time of each module imported after it
+    is installed. Records are kept in completion order (children before
+    their parent), matching the `-X importtime` report layout.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.records: List[Dict[str, Any]] = []
+        self.lazy_loads: List[Dict[str, Any]] = []
+        self.installed_at: Optional[float] = None
+        self.milestones: Dict[str, float] = {}
+
+    @property
+    def installed(self) -> bool:
+        return self in sys.meta_path
+
+    def install(self) -> None:
+        if not self.installed:
+            sys.meta_path.insert(0, self)
+            self.installed_at = time.perf_counter()
+
+    def uninstall(self) -> None:
+        if self.installed:
+            sys.meta_path.remove(self)
+
+    def find_spec(self, fullname, path=None, target=None):
+        # Another hook that also walks sys.meta_path would call back in here
+        searching = getattr(self._local, 'searching', None)
+        if searching is None:
+            searching = self._local.searching = set()
+        if fullname in searching:
+            return None
+        searching.add(fullname)
+        try:
+            for finder in sys.meta_path:
+                if finder is self:
+                    continue
+                find_spec = getattr(finder, 'find_spec', None)
+                if find_spec is None:
+                    continue
+                spec = find_spec(fullname, path, target)
+                if spec is None:
+                    continue
+                if spec.loader is not None and hasattr(spec.loader, 'exec_module'):
+                    spec.loader = _TimedLoader(spec.loader, self)
+                return spec
+            return None
+        finally:
+            searching.discard(fullname)
+
+    def _stack(self) -> list:
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _enter(self, name: str) -> None:
+        # [name, start, time spent in nested imports]
+        self._stack().append([name, time.perf_counter(), 0.0])
+
+    def _exit(self, name: str, failed: bool = False) -> None:
+        stack = self._stack()
+        if not stack or stack[-1][0] != name:
+            return
+        _, started, children = stack.pop()
+        cumulative = time.perf_counter() - started
+        if stack:
+            stack[-1][2] += cumulative
+        record = {
+            'module': name,
+            'self_us': int((cumulative - children) * 1e6),
+            'cumulative_us': int(cumulative * 1e6),
+            'depth': len(stack),
+            'thread': threading.current_thread().name,
+        }
+        if failed:
+            record['failed'] = True
+        with self._lock:
+            self.records.append(record)
+
+    def record_lazy_load(self, target: str, seconds: float) -> None:
+        since_install = time.perf_counter() - self.installed_at if self.installed_at else None
+        with self._lock:
+            self.lazy_loads.append({
+                'target': target,
+                'seconds': round(seconds, 6),
+                'after_startup_seconds': round(since_install, 3) if since_install is not None else None,
+            })
+
+    def mark(self, milestone: str) -> None:
+        """Note the seconds since install at a named point (e.g. app import finished)."""
+        if self.installed_at is not None:
+            self.milestones[milestone] = round(time.perf_counter() - self.installed_at, 6)
+
+    def report(self, top: int = 25) -> Dict[str, Any]:
+        with self._lock:
+            records = list(self.records)
+            lazy_loads = list(self.lazy_loads)
+        roots = [r for r in records if r['depth'] == 0]
+        return {
+            'installed': self.installed,
+            'modules': len(records),
+            'total_ms': round(sum(r['cumulative_us'] for r in roots) / 1000, 1),
+            'milestones': dict(self.milestones),
+            'slowest_cumulative': sorted(records, key=lambda r: r['cumulative_us'], reverse=True)[:top],
+            'slowest_self': sorted(records, key=lambda r: r['self_us'], reverse=True)[:top],
+            'lazy_loads': lazy_loads,
+        }
+
+    def format_importtime(self) -> str:
+        """Plain-text report in the `python -X importtime` layout."""
+        with self._lock:
+            records = list(self.records)
+        lines = ['import time: self [us] | cumulative | imported package']
+        for r in records:
+            lines.append(f"import time: {r['self_us']:>9} | {r['cumulative_us']:>10} | {'  ' * r['depth']}{r['module']}")
+        return '\n'.join(lines) + '\n'
+
+
+_profiler: Optional[ImportProfiler] = None
+_profiler_lock = threading.Lock()
+
+
+def get_import_profiler() -> ImportProfiler:
+    """Return the process-wide import profiler (created but not installed)."""
+    global _profiler
+    if _profiler is None:
+        with _profiler_lock:
+            if _profiler is None:
+                _profiler = ImportProfiler()
+    return _profiler
+
+
+def install_import_profiler() -> ImportProfiler:
+    """Install the profiler on sys.meta_path unless AGT_IMPORT_PROFILE=0."""
+    profiler = get_import_profiler()
+    if os.environ.get(PROFILE_ENV_VAR, '1') != '0':
+        profiler.install()
+    return profiler
+
+
+def _import_timed(module_name: str):
+    module = sys.modules.get(module_name)
+    if module is not None:
+        # Another thread may still be executing it; import_module waits on its lock
+        spec = getattr(module, '__spec__', None)
+        if getattr(spec, '_initializing', False):
+            return importlib.import_module(module_name)
+        return module
+    started = time.perf_counter()
+    module = importlib.import_module(module_name)
+    elapsed = time.perf_counter() - started
+    get_import_profiler().record_lazy_load(module_name, elapsed)
+    logger.debug(f"Lazy import of {module_name} took {elapsed * 1000:.1f}ms")
+    return module
+
+
+class LazyModule(types.ModuleType):
+    """Stand-in for a module that imports it on first attribute access."""
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.__dict__['_lazy_module'] = None
+
+    def _load(self):
+        module = self.__dict__['_lazy_module']
+        if module is None:
+            module = self.__dict__['_lazy_module'] = _import_timed(self.__name__)
+        return module
+
+    @property
+    def is_loaded(self) -> bool:
+        return self.__dict__['_lazy_module'] is not None
+
+    def __getattr__(self, name):
+        return getattr(self._load(), name)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        state = 'loaded' if self.is_loaded else 'not loaded'
+        return f"<lazy module '{self.__name__}' ({state})>"
+
+
+class LazyAttribute:
+    """Stand-in for a function or class of a module, imported on first call or attribute access."""
+
+    __slots__ = ('_module_name', '_attr', '_target')
+
+    def __init__(self, module_name: str, attr: str):
+        self._module_name = module_name
+        self._attr = attr
+        self._target = None
+
+    def resolve(self):
+        target = self._target
+        if target is None:
+            target = self._target = getattr(_import_timed(self._module_name), self._attr)
+        return target
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._target is not None
+
+    def __call__(self, *args, **kwargs):
+        return self.resolve()(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.resolve(), name)
+
+    def __repr__(self):
+        state = 'loaded' if self._target is not None else 'not loaded'
+        return f"<lazy {self._module_name}.{self._attr} ({state})>"
+
+
+def lazy_module(name: str) -> LazyModule:
+    """Return the module itself if already imported, otherwise a LazyModule for it."""
+    return sys.modules.get(name) or LazyModule(name)
+
+
+def lazy_attribute(module_name: str, attr: str):
+    """Return the attribute itself if its module is already imported, otherwise a LazyAttribute."""
+    module = sys.modules.get(module_name)
+    if module is not None and hasattr(module, attr):
+        return getattr(module, attr)
+    return LazyAttribute(module_name, attr)
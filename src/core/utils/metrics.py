@@ -0,0 +1,401 @@
+#!/usr/bin/env python3
+"""
+In-process metrics registry for request and pipeline telemetry.
+
+Collects per-route latency histograms, per-stage timers for the label
+pipeline (upload parsing, matching, DB upsert, template render, post-process,
+compose) and simple counters (cache hits, DB queries). Periodic rollups are
+persisted to a small ring-buffer file so /api/performance can report real
+history across worker restarts. Each worker process writes its own file
+(metrics_rollups.<pid>.jsonl) and history is merged from all of them, so
+workers never overwrite each other's rollups.
+"""
+
+import glob
+import json
+import logging
+import math
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Pipeline stages timed by the generation/upload paths
+STAGES = (
+    'upload_parse',
+    'matching',
+    'db_upsert',
+    'template_render',
+    'post_process',
+    'compose',
+)
+
+# Prometheus-style latency buckets (seconds)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Recent samples kept per histogram for percentile estimation
+RESERVOIR_SIZE = 1024
+
+# Rollup cadence and how many rollups the ring-buffer file retains
+ROLLUP_INTERVAL_SECONDS = 60
+RING_BUFFER_CAPACITY = 1440  # 24 hours of one-minute rollups
+# Rollup files of workers that stopped writing are removed after this long
+WORKER_FILE_RETENTION_SECONDS = RING_BUFFER_CAPACITY * ROLLUP_INTERVAL_SECONDS
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Optional[Dict[str, Any]]) -> LabelKey:
+    """Convert a label dict to a hashable, order-independent key."""
+    if not labels:
+        return ()
+    return tuple(sorted((str(k), str(v)) for k, v in labels.items()))
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, math.ceil(pct / 100.0 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+class Histogram:
+    """Latency histogram with cumulative buckets and a bounded sample reservoir."""
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS, reservoir_size: int = RESERVOIR_SIZE):
+        self.buckets = buckets
+        self.bucket_counts = [0] * len(buckets)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples = deque(maxlen=reservoir_size)
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+        self.samples.append(value)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.bucket_counts[i] += 1
+
+    def summary(self) -> Dict[str, float]:
+        ordered = sorted(self.samples)
+        return {
+            'count': self.count,
+            'sum': round(self.total, 6),
+            'avg': round(self.total / self.count, 6) if self.count else 0.0,
+            'max': round(self.max, 6),
+            'p50': round(_percentile(ordered, 50), 6),
+            'p95': round(_percentile(ordered, 95), 6),
+            'p99': round(_percentile(ordered, 99), 6),
+        }
+
+
+class RingBufferFile:
+    """
+    Fixed-capacity list of JSON records persisted atomically to disk.
+
+    With per_worker, `path` is a template: each process writes
+    <stem>.<pid><ext> and tail() merges the files of every worker.
+    """
+
+    def __init__(self, path: Optional[str], capacity: int = RING_BUFFER_CAPACITY, per_worker: bool = False):
+        self.path = path
+        self.capacity = capacity
+        self.per_worker = bool(path) and per_worker
+        self.records = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+        if not self.per_worker:
+            self.records.extend(self._read(self.path))
+
+    def _read(self, path: Optional[str]) -> List[Dict[str, Any]]:
+        if not path or not os.path.exists(path):
+            return []
+        records = []
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if line:
+                        records.append(json.loads(line))
+        except Exception as e:
+            logger.warning(f"Could not load metrics ring buffer {path}: {e}")
+        return records
+
+    def _file_path(self) -> str:
+        # Resolved on every write, so a registry created before a fork still gets one file per worker
+        if not self.per_worker:
+            return self.path
+        root, ext = os.path.splitext(self.path)
+        return f"{root}.{os.getpid()}{ext}"
+
+    def _worker_paths(self) -> List[str]:
+        root, ext = os.path.splitext(self.path)
+        return glob.glob(f"{glob.escape(root)}.*{ext}")
+
+    def _remove_stale_worker_files(self, own_path: str) -> None:
+        cutoff = time.time() - WORKER_FILE_RETENTION_SECONDS
+        for path in self._worker_paths():
+            try:
+                if path != own_path and os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+            except OSError:
+                pass
+
+    def append(self, record: Dict[str, Any]) -> None:
+        with self._lock:
+            self.records.append(record)
+            if not self.path:
+                return
+            path = self._file_path()
+            try:
+                os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+                tmp_path = f"{path}.tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    for item in self.records:
+                        f.write(json.dumps(item, separators=(',', ':')))
+                        f.write('\n')
+                os.replace(tmp_path, path)
+                if self.per_worker:
+                    self._remove_stale_worker_files(path)
+            except Exception as e:
+                logger.warning(f"Could not persist metrics ring buffer {path}: {e}")
+
+    def tail(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        if limit is not None and limit <= 0:
+            return []
+        if self.per_worker:
+            items = []
+            for path in self._worker_paths():
+                items.extend(self._read(path))
+            items.sort(key=lambda item: item.get('timestamp', 0))
+            items = items[-self.capacity:]
+        else:
+            with self._lock:
+                items = list(self.records)
+        return items[-limit:] if limit else items
+
+
+class MetricsRegistry:
+    """Thread-safe registry of histograms and counters with periodic rollups."""
+
+    def __init__(self, ring_path: Optional[str] = None,
+                 rollup_interval: float = ROLLUP_INTERVAL_SECONDS,
+                 ring_capacity: int = RING_BUFFER_CAPACITY, per_worker_ring: bool = False):
+        self._lock = threading.Lock()
+        self._histograms: Dict[str, Dict[LabelKey, Histogram]] = defaultdict(dict)
+        self._counters: Dict[str, Dict[LabelKey, float]] = defaultdict(lambda: defaultdict(float))
+        self._started = time.time()
+        self.rollup_interval = rollup_interval
+        self._last_rollup = time.time()
+        self._window_counts: Dict[str, float] = defaultdict(float)
+        self.ring = RingBufferFile(ring_path, ring_capacity, per_worker=per_worker_ring)
+
+    # -- recording ---------------------------------------------------------
+
+    def observe(self, name: str, value: float, labels: Optional[Dict[str, Any]] = None) -> None:
+        """Record a value (normally seconds) in the named histogram."""
+        key = _label_key(labels)
+        with self._lock:
+            hist = self._histograms[name].get(key)
+            if hist is None:
+                hist = self._histograms[name][key] = Histogram()
+            hist.observe(value)
+            self._window_counts[name] += 1
+        self._maybe_rollup()
+
+    def inc(self, name: str, amount: float = 1, labels: Optional[Dict[str, Any]] = None) -> None:
+        """Increment a counter."""
+        key = _label_key(labels)
+        with self._lock:
+            self._counters[name][key] += amount
+            self._window_counts[name] += amount
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        """Context manager timing a block into the named histogram."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, labels)
+
+    def stage(self, stage_name: str):
+        """Time one of the pipeline STAGES."""
+        return self.timer('stage_duration_seconds', stage=stage_name)
+
+    def observe_request(self, route: str, method: str, status: int, seconds: float) -> None:
+        """Record a finished HTTP request."""
+        self.observe('http_request_duration_seconds', seconds, {'route': route, 'method': method})
+        self.inc('http_requests_total', 1, {'route': route, 'method': method, 'status': status})
+
+    def cache_hit(self, cache_name: str) -> None:
+        self.inc('cache_hits_total', 1, {'cache': cache_name})
+
+    def cache_miss(self, cache_name: str) -> None:
+        self.inc('cache_misses_total', 1, {'cache': cache_name})
+
+    # -- reporting ---------------------------------------------------------
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return current histogram summaries and counter values."""
+        with self._lock:
+            histograms = {
+                name: [{'labels': dict(key), **hist.summary()} for key, hist in series.items()]
+                for name, series in self._histograms.items()
+            }
+            counters = {
+                name: [{'labels': dict(key), 'value': value} for key, value in series.items()]
+                for name, series in self._counters.items()
+            }
+        return {
+            'uptime_seconds': round(time.time() - self._started, 1),
+            'histograms': histograms,
+            'counters': counters,
+        }
+
+    def route_latency(self) -> Dict[str, Dict[str, float]]:
+        """Per-route latency summary keyed by 'METHOD route'."""
+        result = {}
+        with self._lock:
+            for key, hist in self._histograms.get('http_request_duration_seconds', {}).items():
+                labels = dict(key)
+                result[f"{labels.get('method', '')} {labels.get('route', '')}".strip()] = hist.summary()
+        return result
+
+    def stage_latency(self) -> Dict[str, Dict[str, float]]:
+        """Per-stage timing summary keyed by stage name."""
+        result = {}
+        with self._lock:
+            for key, hist in self._histograms.get('stage_duration_seconds', {}).items():
+                result[dict(key).get('stage', '')] = hist.summary()
+        return result
+
+    def counter_totals(self, name: str, label: Optional[str] = None) -> Dict[str, float]:
+        """Sum a counter, optionally grouped by one label."""
+        totals: Dict[str, float] = defaultdict(float)
+        with self._lock:
+            for key, value in self._counters.get(name, {}).items():
+                group = dict(key).get(label, 'total') if label else 'total'
+                totals[group] += value
+        return dict(totals)
+
+    def history(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Persisted rollups, oldest first."""
+        return self.ring.tail(limit)
+
+    def rollup(self) -> Dict[str, Any]:
+        """Persist a rollup of the current window to the ring buffer."""
+        with self._lock:
+            window = dict(self._window_counts)
+            self._window_counts.clear()
+            self._last_rollup = time.time()
+        now = time.time()
+        record = {
+            'timestamp': round(now, 3),
+            'pid': os.getpid(),
+            'date': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(now)),
+            'window': window,
+            'routes': self.route_latency(),
+            'stages': self.stage_latency(),
+            'cache_hits': self.counter_totals('cache_hits_total', 'cache'),
+            'db_queries': self.counter_totals('db_queries_total').get('total', 0),
+        }
+        self.ring.append(record)
+        return record
+
+    def _maybe_rollup(self) -> None:
+        if time.time() - self._last_rollup < self.rollup_interval:
+            return
+        try:
+            self.rollup()
+        except Exception as e:
+            logger.warning(f"Metrics rollup failed: {e}")
+
+    def render_prometheus(self) -> str:
+        """Render all metrics in the Prometheus text exposition format."""
+        def fmt_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+            pairs = list(key) + ([extra] if extra else [])
+            if not pairs:
+                return ''
+            escaped = ','.join(
+                '{}="{}"'.format(k, v.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+                for k, v in pairs
+            )
+            return '{' + escaped + '}'
+
+        lines = []
+        with self._lock:
+            for name, series in sorted(self._histograms.items()):
+                metric = f"agt_{name}"
+                lines.append(f"# TYPE {metric} histogram")
+                for key, hist in series.items():
+                    for bound, count in zip(hist.buckets, hist.bucket_counts):
+                        lines.append(f"{metric}_bucket{fmt_labels(key, ('le', repr(bound)))} {count}")
+                    lines.append(f"{metric}_bucket{fmt_labels(key, ('le', '+Inf'))} {hist.count}")
+                    lines.append(f"{metric}_sum{fmt_labels(key)} {hist.total}")
+                    lines.append(f"{metric}_count{fmt_labels(key)} {hist.count}")
+            for name, series in sorted(self._counters.items()):
+                metric = f"agt_{name}"
+                lines.append(f"# TYPE {metric} counter")
+                for key, value in series.items():
+                    lines.append(f"{metric}{fmt_labels(key)} {value}")
+        return '\n'.join(lines) + '\n'
+
+    def reset(self) -> None:
+        """Drop in-memory metrics (persisted rollups are kept)."""
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+            self._window_counts.clear()
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_metrics_registry() -> MetricsRegistry:
+    """Return the process-wide metrics registry, creating it on first use."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                ring_path = os.environ.get('AGT_METRICS_FILE')
+                if ring_path is None:
+                    base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+                    ring_path = os.path.join(base_dir, 'uploads', 'metrics_rollups.jsonl')
+                # Several workers share the location, so each writes its own file
+                _registry = MetricsRegistry(ring_path=ring_path or None, per_worker_ring=True)
+    return _registry
+
+
+def stage_timer(stage_name: str):
+    """Shortcut for timing a pipeline stage on the process-wide registry."""
+    return get_metrics_registry().stage(stage_name)
+
+
+def record_stage(stage_name: str, seconds: float) -> None:
+    """Record an already measured pipeline stage duration."""
+    get_metrics_registry().observe('stage_duration_seconds', seconds, {'stage': stage_name})
+
+
+def timed_stage(stage_name: str):
+    """Decorator timing every call of a function as a pipeline stage."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record_stage(stage_name, time.perf_counter() - start)
+        return wrapper
+    return decorator
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Canonical string normalization for product, vendor and strain names.
+
+The matchers, the product database and the Excel processor normalize the same
+names many times over while building tags and scoring candidates. Every
+normalizer lives here with precompiled regexes, and results are memoized in
+bounded LRU caches and interned so repeated names share one string object.
+"""
+
+import logging
+import re
+import sys
+from functools import lru_cache
+from typing import Any, Dict, FrozenSet, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Distinct names seen per normalizer before the least recently used are evicted
+NORMALIZE_CACHE_SIZE = 65536
+
+MEDICALLY_COMPLIANT_PREFIXES = [
+    'medically compliant -',
+    'med compliant -',
+    'med compliant-',
+    'medically compliant-',
+]
+
+_UNITS = r'(?:g|gram|grams|mg|oz|ounce|ounces|pk|pack|packs|piece|pieces|roll|rolls|stix|stick|sticks)'
+_WEIGHT_SUFFIX_RES = [
+    re.compile(r'\s*-\s*\d+(?:\.\d+)?\s*' + _UNITS + r'\b', re.IGNORECASE),
+    re.compile(r'\s*\d+(?:\.\d+)?\s*' + _UNITS + r'\b', re.IGNORECASE),
+    re.compile(r'\s*-\s*\d+(?:\.\d+)?\s*$', re.IGNORECASE),  # Just numbers at the end
+    re.compile(r'\s+\d+(?:\.\d+)?\s*$', re.IGNORECASE),  # Numbers at the end without dash
+]
+_DIGIT_UNIT_RE = re.compile(r"\b\d+(?:g|mg)\b")
+_NON_WORD_RE = re.compile(r"[^\w\s-]")
+_HYPHEN_SPACE_RE = re.compile(r"[-\s]+")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+_STRAIN_INVALID = {'mixed', 'unknown', 'n/a', 'none', ''}
+_STRAIN_RULES = [
+    # Remove common prefixes/suffixes that don't affect strain identity
+    (re.compile(r'^(strain|variety|cultivar)\s+'), ''),
+    (re.compile(r'\s+(strain|variety|cultivar)$'), ''),
+    # Normalize common abbreviations and variations
+    (re.compile(r'\bog\b'), 'og kush'),
+    (re.compile(r'\bblue\s*dream\b'), 'blue dream'),
+    (re.compile(r'\bwhite\s*widow\b'), 'white widow'),
+    (re.compile(r'\bpurple\s*haze\b'), 'purple haze'),
+    (re.compile(r'\bjack\s*herer\b'), 'jack herer'),
+    (re.compile(r'\bnorthern\s*lights\b'), 'northern lights'),
+    (re.compile(r'\bsour\s*diesel\b'), 'sour diesel'),
+    (re.compile(r'\bafghan\s*kush\b'), 'afghan kush'),
+    (re.compile(r'\bcheese\b'), 'uk cheese'),
+    (re.compile(r'\bamnesia\s*haze\b'), 'amnesia haze'),
+]
+
+# Common strain name variations and abbreviations
+STRAIN_ALIASES = {
+    'og': 'og kush',
+    'kush': 'og kush',
+    'blue': 'blue dream',
+    'dream': 'blue dream',
+    'sour': 'sour diesel',
+    'diesel': 'sour diesel',
+    'wedding': 'wedding cake',
+    'cake': 'wedding cake',
+    'runtz': 'runtz',
+    'gelato': 'gelato',
+    'cookies': 'girl scout cookies',
+    'gsc': 'girl scout cookies',
+    'mac': 'mac 1',
+    'mac1': 'mac 1'
+}
+
+_KEY_TERM_STOP_WORDS = {
+    'medically', 'compliant', '1g', '2g', '3.5g', '7g', '14g', '28g', 'oz', 'gram', 'grams',
+    'pk', 'pack', 'packs', 'piece', 'pieces', 'roll', 'rolls', 'stix', 'stick', 'sticks', 'brand', 'vendor', 'product',
+    'the', 'and', 'or', 'with', 'for', 'of', 'by', 'from', 'to', 'in', 'on', 'at', 'a', 'an', 'mg', 'thc', 'cbd'
+}
+_KEY_TERM_PRODUCT_TYPES = {
+    'rosin', 'wax', 'shatter', 'live', 'resin', 'distillate', 'cartridge', 'pre-roll', 'pre-rolls',
+    'blunt', 'blunts', 'edible', 'edibles', 'tincture', 'tinctures', 'topical', 'topicals',
+    'concentrate', 'concentrates', 'flower', 'buds', 'infused', 'flavour', 'flavor'
+}
+_KEY_TERM_STRAINS = {
+    'gmo', 'runtz', 'cookies', 'cream', 'wedding', 'cake', 'blueberry', 'banana', 'strawberry',
+    'grape', 'lemon', 'lime', 'orange', 'cherry', 'apple', 'mango', 'pineapple', 'passion',
+    'dragon', 'fruit', 'guava', 'pink', 'lemonade', 'haze', 'kush', 'diesel', 'og', 'sherbet',
+    'gelato', 'mintz', 'grinch', 'cosmic', 'combo', 'honey', 'bread', 'tricho', 'jordan',
+    'super', 'boof', 'grandy', 'candy', 'afghani', 'hashplant', 'yoda', 'amnesia'
+}
+_KEY_TERM_VENDOR_PREFIXES = {'medically', 'compliant', 'by'}
+
+
+def coerce_name(value: Any, caller: str) -> str:
+    """Turn the lists and non-string cells that reach the normalizers into a string."""
+    if isinstance(value, str):
+        return value
+    if isinstance(value, list):
+        logger.warning(f"{caller} received a list instead of string: {value}")
+        return str(value[0]) if value else ""
+    logger.warning(f"{caller} received non-string type: {type(value)} - {value}")
+    return str(value) if value is not None else ""
+
+
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def _strip_prefix(name: str) -> str:
+    name = name.strip()
+    lowered = name.lower()
+    for prefix in MEDICALLY_COMPLIANT_PREFIXES:
+        if lowered.startswith(prefix):
+            return sys.intern(name[len(prefix):].strip())
+    return sys.intern(name)
+
+
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def _product_name(name: str) -> str:
+    name = _strip_prefix(name).lower().strip()
+    # Remove weight/measurement suffixes (e.g., " - 1g", " - 3.5g", " - 7g", etc.)
+    for pattern in _WEIGHT_SUFFIX_RES:
+        name = pattern.sub('', name)
+    name = _NON_WORD_RE.sub('', name)  # remove non-alphanumeric except hyphen/space
+    name = _HYPHEN_SPACE_RE.sub(' ', name)  # collapse hyphens and spaces
+    return sys.intern(name.strip())
+
+
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def _match_text(s: str) -> str:
+    s = _DIGIT_UNIT_RE.sub("", s.lower())
+    s = _NON_WORD_RE.sub(" ", s)
+    return sys.intern(_HYPHEN_SPACE_RE.sub(" ", s).strip())
+
+
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def _text(text: str) -> str:
+    text = _NON_WORD_RE.sub(' ', text.lower().strip())
+    return sys.intern(_WHITESPACE_RE.sub(' ', text).strip())
+
+
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def _name(name: str) -> str:
+    name = name.lower().strip().replace('\u2011', '-')  # non-breaking hyphen to normal
+    name = _HYPHEN_SPACE_RE.sub(' ', name)
+    return sys.intern(_NON_WORD_RE.sub('', name))
+
+
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def _strain_name(strain: str) -> str:
+    strain = strain.strip()
+    if strain.lower() in _STRAIN_INVALID:
+        return ""
+    strain = strain.lower()
+    for pattern, replacement in _STRAIN_RULES:
+        strain = pattern.sub(replacement, strain)
+    strain = _WHITESPACE_RE.sub(' ', strain)
+    return sys.intern(_NON_WORD_RE.sub('', strain).strip())
+
+
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def _key_terms(name: str) -> FrozenSet[str]:
+    name_lower = name.lower()
+    # Split on both spaces and hyphens to break compound terms
+    words = set()
+    for part in name_lower.replace('_', ' ').split():
+        for sub_part in part.split('-'):
+            if sub_part.strip():
+                words.add(sub_part.strip())
+    key_terms = {word for word in words if word not in _KEY_TERM_STOP_WORDS and len(word) >= 2}
+    key_terms.update(words & _KEY_TERM_PRODUCT_TYPES)
+    key_terms.update(words & _KEY_TERM_STRAINS)
+    # Single vendor/brand words, excluding the compliance prefix
+    for part in name_lower.split():
+        if part not in _KEY_TERM_VENDOR_PREFIXES and len(part) >= 3:
+            key_terms.add(part)
+    return frozenset(sys.intern(term) for term in key_terms)
+
+
+def strip_medically_compliant_prefix(name) -> str:
+    """Remove a leading "Medically Compliant -" style prefix."""
+    return _strip_prefix(coerce_name(name, 'strip_medically_compliant_prefix'))
+
+
+def normalize_product_name(name) -> str:
+    """Lowercase a product name and drop the compliance prefix, weight suffix and punctuation."""
+    return _product_name(coerce_name(name, 'normalize_product_name'))
+
+
+def normalize_match_text(s) -> str:
+    """Normalize text for matching by removing digits, units, and special characters."""
+    return _match_text(str(s or ""))
+
+
+def normalize_text(text) -> str:
+    """Lowercase, replace punctuation (except hyphens) with spaces and collapse whitespace."""
+    if not isinstance(text, str):
+        return ""
+    return _text(text)
+
+
+def normalize_name(name) -> str:
+    """Normalize product names for robust matching."""
+    if not isinstance(name, str):
+        return ""
+    return _name(name)
+
+
+def normalize_strain_name(strain) -> str:
+    """Normalize strain names for accurate matching."""
+    if not isinstance(strain, str):
+        return ""
+    return _strain_name(strain)
+
+
+def canonical_strain_alias(strain) -> Optional[str]:
+    """Map a short strain word ("og", "gsc") to its full name; other strains are lowercased."""
+    if not strain:
+        return None
+    strain_lower = str(strain).lower().strip()
+    return STRAIN_ALIASES.get(strain_lower, strain_lower)
+
+
+def extract_key_terms(name) -> Set[str]:
+    """Meaningful product terms, excluding common prefixes/suffixes (a fresh set per call)."""
+    try:
+        return set(_key_terms(coerce_name(name, '_extract_key_terms')))
+    except Exception as e:
+        logger.warning(f"Error in _extract_key_terms: {e}")
+        return set()
+
+
+_CACHED = {
+    'strip_medically_compliant_prefix': _strip_prefix,
+    'normalize_product_name': _product_name,
+    'normalize_match_text': _match_text,
+    'normalize_text': _text,
+    'normalize_name': _name,
+    'normalize_strain_name': _strain_name,
+    'extract_key_terms': _key_terms,
+}
+
+
+def get_normalization_stats() -> Dict[str, Dict[str, Any]]:
+    """Hit/miss counts and occupancy of each normalizer cache."""
+    stats = {}
+    for name, func in _CACHED.items():
+        info = func.cache_info()
+        lookups = info.hits + info.misses
+        stats[name] = {
+            'hits': info.hits,
+            'misses': info.misses,
+            'size': info.currsize,
+            'max_size': info.maxsize,
+            'hit_rate': round(info.hits / lookups, 4) if lookups else 0.0,
+        }
+    return stats
+
+
+def clear_normalization_caches() -> None:
+    """Drop every memoized result (e.g. after a large inventory is replaced)."""
+    for func in _CACHED.values():
+        func.cache_clear()
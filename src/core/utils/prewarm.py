@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+In-process worker prewarm.
+
+Builds a worker's hot caches at boot instead of on the first user requests.
+These include the default upload, the matcher caches, the expanded
+templates, the font-size tables and the tag payload. warmup_caches.py used
+HTTP calls, which only reached whichever worker answered them. This runs
+inside each worker, started from the WSGI entry. Stages run in order on one
+background thread. /api/health reports readiness, so the proxy can keep
+traffic off a worker that is still warming.
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from src.core.utils.metrics import record_stage
+
+logger = logging.getLogger(__name__)
+
+# Set AGT_PREWARM=0 to skip the prewarm (the worker is then reported ready at once)
+PREWARM_ENV_VAR = 'AGT_PREWARM'
+
+# A worker still warming after this long is reported ready anyway, so a stuck
+# stage cannot keep it out of rotation for good
+READY_TIMEOUT_SECONDS = 180
+
+
+class WorkerPrewarm:
+    """
+    Named prewarm stages run in registration order on a background thread.
+    A stage that raises is recorded as failed and the rest still run; the
+    worker is ready once every stage has finished either way.
+    """
+
+    def __init__(self):
+        self._stages: List[Tuple[str, Callable[[], Any]]] = []
+        self._status: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._done = threading.Event()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    def add_stage(self, name: str, func: Callable[[], Any]) -> None:
+        with self._lock:
+            if any(existing == name for existing, _ in self._stages):
+                raise ValueError(f"Prewarm stage '{name}' is already registered")
+            self._stages.append((name, func))
+            self._status[name] = {'status': 'pending'}
+
+    @property
+    def stage_names(self) -> List[str]:
+        with self._lock:
+            return [name for name, _ in self._stages]
+
+    @property
+    def state(self) -> str:
+        """'idle' before start, 'warming' while stages run, then 'ready'."""
+        if self._done.is_set():
+            return 'ready'
+        return 'warming' if self.started_at is not None else 'idle'
+
+    @property
+    def ready(self) -> bool:
+        # A worker that never prewarms serves requests as before
+        if self.state != 'warming':
+            return True
+        return time.time() - self.started_at > READY_TIMEOUT_SECONDS
+
+    def start(self) -> bool:
+        """Run the stages on a daemon thread; returns False if already started or disabled."""
+        if os.environ.get(PREWARM_ENV_VAR, '1') == '0':
+            logger.info("Worker prewarm disabled")
+            return False
+        with self._lock:
+            if self.started_at is not None:
+                return False
+            self.started_at = time.time()
+            self._thread = threading.Thread(target=self._run, name='worker-prewarm', daemon=True)
+        self._thread.start()
+        return True
+
+    def run(self) -> Dict[str, Any]:
+        """Run the stages on the calling thread (for scripts and tests)."""
+        with self._lock:
+            if self.started_at is None:
+                self.started_at = time.time()
+        self._run()
+        return self.status()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._done.wait(timeout)
+
+    def _run(self) -> None:
+        with self._lock:
+            stages = list(self._stages)
+        for name, func in stages:
+            self._update(name, status='running')
+            start = time.perf_counter()
+            try:
+                detail = func()
+            except Exception as e:
+                elapsed = time.perf_counter() - start
+                logger.warning(f"Prewarm stage '{name}' failed after {elapsed:.2f}s: {e}")
+                self._update(name, status='failed', seconds=round(elapsed, 3), error=str(e))
+            else:
+                elapsed = time.perf_counter() - start
+                logger.info(f"Prewarm stage '{name}' finished in {elapsed:.2f}s")
+                self._update(name, status='done', seconds=round(elapsed, 3), detail=detail)
+            record_stage(f'prewarm_{name}', elapsed)
+        self.finished_at = time.time()
+        self._done.set()
+        logger.info(f"Worker prewarm finished in {self.finished_at - self.started_at:.2f}s")
+
+    def _update(self, name: str, **fields) -> None:
+        with self._lock:
+            self._status[name] = fields
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            stages = {name: dict(info) for name, info in self._status.items()}
+        if self.finished_at is not None:
+            elapsed = self.finished_at - self.started_at
+        elif self.started_at is not None:
+            elapsed = time.time() - self.started_at
+        else:
+            elapsed = None
+        return {
+            'state': self.state,
+            'ready': self.ready,
+            'seconds': round(elapsed, 3) if elapsed is not None else None,
+            'failed': [name for name, info in stages.items() if info['status'] == 'failed'],
+            'stages': stages,
+        }
+
+
+_worker_prewarm: Optional[WorkerPrewarm] = None
+_worker_prewarm_lock = threading.Lock()
+
+
+def get_worker_prewarm() -> WorkerPrewarm:
+    """Return the process-wide worker prewarm."""
+    global _worker_prewarm
+    if _worker_prewarm is None:
+        with _worker_prewarm_lock:
+            if _worker_prewarm is None:
+                _worker_prewarm = WorkerPrewarm()
+    return _worker_prewarm
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Test script for the set-based batch lineage engine across the current
+DataFrame and the product database.
+"""
+
+import os
+import sys
+import tempfile
+from unittest import mock
+
+import pandas as pd
+
+# Add the project root to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from src.core.data.excel_processor import ExcelProcessor
+from src.core.data.product_database import ProductDatabase
+
+
+def test_dataframe_updates_in_one_pass():
+    """Many tags update in a single mask pass, paraphernalia stays PARAPHERNALIA."""
+    print("🧪 Testing vectorized DataFrame lineage updates")
+    processor = ExcelProcessor()
+    processor.df = pd.DataFrame({
+        'ProductName': ['Blue Dream Flower', 'OG Kush Cart', 'Glass Pipe', 'Blue Dream Flower'],
+        'Product Name*': ['Blue Dream Flower', 'OG Kush Cart', 'Glass Pipe', 'Blue Dream Flower'],
+        'Product Type*': ['flower', 'vape cartridge', 'Paraphernalia', 'flower'],
+        'Product Strain': ['Blue Dream', 'OG Kush', '', 'Blue Dream'],
+        'Lineage': pd.Categorical(['HYBRID', 'INDICA', 'PARAPHERNALIA', 'HYBRID']),
+    })
+
+    results = processor.apply_lineage_updates({
+        'Blue Dream Flower': 'SATIVA',
+        'Glass Pipe': 'INDICA',
+        'Missing Product': 'HYBRID',
+    })
+
+    by_key = {r['key']: r for r in results}
+    assert list(processor.df['Lineage']) == ['SATIVA', 'INDICA', 'PARAPHERNALIA', 'SATIVA']
+    assert by_key['Blue Dream Flower']['rows_affected'] == 2
+    assert by_key['Blue Dream Flower']['original'] == 'HYBRID'
+    assert by_key['Blue Dream Flower']['strain_name'] == 'Blue Dream'
+    assert by_key['Glass Pipe']['new'] == 'PARAPHERNALIA'
+    assert not by_key['Missing Product']['success']
+    print("✅ DataFrame updates correct")
+
+
+def test_database_batch_is_one_transaction():
+    """Strains, products and lineage history update together with per-item results."""
+    print("🧪 Testing set-based database lineage updates")
+    with tempfile.TemporaryDirectory() as tmp:
+        db = ProductDatabase(db_path=os.path.join(tmp, 'products.db'))
+        with mock.patch('src.core.data.database_notifier.notify_strain_add'):
+            blue_id = db.add_or_update_strain('Blue Dream', 'HYBRID')
+            db.add_or_update_strain('OG Kush', 'INDICA')
+        conn = db._get_connection()
+        conn.execute('''
+            INSERT INTO products ("Product Name*", normalized_name, strain_id, "Product Type*", "Lineage",
+                                  first_seen_date, last_seen_date, created_at, updated_at)
+            VALUES ('Blue Dream Flower', 'blue dream flower', ?, 'flower', 'HYBRID', 'd', 'd', 'd', 'd')
+        ''', (blue_id,))
+        conn.commit()
+
+        with mock.patch('src.core.data.database_notifier.notify_batch_lineage_update') as notify:
+            results = db.batch_update_lineages([
+                {'strain_name': 'Blue Dream', 'lineage': 'SATIVA'},
+                {'strain_name': 'OG Kush', 'lineage': 'INDICA'},
+                {'strain_name': 'Unknown Strain', 'lineage': 'HYBRID'},
+            ], create_missing=False)
+
+        assert [r['success'] for r in results] == [True, True, False]
+        assert results[0]['old_lineage'] == 'HYBRID'
+        assert results[0]['products_affected'] == 1
+        notify.assert_called_once()
+        assert [c['strain_name'] for c in notify.call_args[0][0]] == ['Blue Dream']
+
+        cursor = conn.cursor()
+        cursor.execute('SELECT canonical_lineage, sovereign_lineage FROM strains WHERE strain_name = ?', ('Blue Dream',))
+        assert cursor.fetchone() == ('SATIVA', 'SATIVA')
+        cursor.execute('SELECT "Lineage" FROM products WHERE strain_id = ?', (blue_id,))
+        assert cursor.fetchone()[0] == 'SATIVA'
+        cursor.execute('SELECT old_lineage, new_lineage FROM lineage_history WHERE strain_id = ?', (blue_id,))
+        assert cursor.fetchall() == [('HYBRID', 'SATIVA')]
+        cursor.execute("SELECT COUNT(*) FROM strains WHERE strain_name = 'Unknown Strain'")
+        assert cursor.fetchone()[0] == 0
+        db.close_connections()
+    print("✅ Database batch update correct")
+
+
+def test_created_strains_and_sovereign_only():
+    """New strains report no old lineage and get a history row; update_canonical=False keeps canonical_lineage."""
+    print("🧪 Testing created strains and sovereign-only updates")
+    with tempfile.TemporaryDirectory() as tmp:
+        db = ProductDatabase(db_path=os.path.join(tmp, 'products.db'))
+        with mock.patch('src.core.data.database_notifier.notify_strain_add'):
+            og_id = db.add_or_update_strain('OG Kush', 'INDICA')
+        conn = db._get_connection()
+
+        with mock.patch('src.core.data.database_notifier.notify_batch_lineage_update') as notify:
+            results = db.batch_update_lineages([{'strain_name': 'New Strain', 'lineage': 'SATIVA'}])
+        assert results[0]['success'] and results[0]['strain_id'] is not None
+        assert results[0]['old_lineage'] is None and results[0]['lineage'] == 'SATIVA'
+        assert notify.call_args[0][0] == [{'strain_name': 'New Strain', 'old_lineage': None, 'new_lineage': 'SATIVA'}]
+        cursor = conn.cursor()
+        cursor.execute('SELECT old_lineage, new_lineage FROM lineage_history WHERE strain_id = ?', (results[0]['strain_id'],))
+        assert cursor.fetchall() == [(None, 'SATIVA')]
+
+        with mock.patch('src.core.data.database_notifier.notify_batch_lineage_update'):
+            results = db.batch_update_lineages([{'strain_name': 'OG Kush', 'lineage': 'HYBRID'}],
+                                               create_missing=False, update_canonical=False)
+        assert results[0]['old_lineage'] == 'INDICA' and results[0]['lineage'] == 'HYBRID'
+        cursor.execute('SELECT canonical_lineage, sovereign_lineage FROM strains WHERE id = ?', (og_id,))
+        assert cursor.fetchone() == ('INDICA', 'HYBRID')
+        cursor.execute('SELECT COUNT(*) FROM lineage_history WHERE strain_id = ?', (og_id,))
+        assert cursor.fetchone()[0] == 0
+        db.close_connections()
+    print("✅ Created strains and sovereign-only updates correct")
+
+
+if __name__ == "__main__":
+    test_dataframe_updates_in_one_pass()
+    test_database_batch_is_one_transaction()
+    test_created_strains_and_sovereign_only()
+    print("\n🎉 All batch lineage tests passed")
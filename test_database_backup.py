@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Test script for database backups: paged online backups of a database that is
+being written, table and incremental backups from one snapshot, compression,
+and the /api/database-backup endpoint.
+"""
+
+import gzip
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from unittest import mock
+
+# Add the project root to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from src.core.data.database_backup import create_backup, last_backup, load_manifest, online_backup
+
+
+def make_database(path, products=500):
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute('''CREATE TABLE products (id INTEGER PRIMARY KEY AUTOINCREMENT, "Product Name*" TEXT,
+                    "Vendor/Supplier*" TEXT, last_seen_date TEXT NOT NULL, updated_at TEXT NOT NULL)''')
+    conn.execute('''CREATE TABLE strains (id INTEGER PRIMARY KEY AUTOINCREMENT, strain_name TEXT,
+                    last_seen_date TEXT NOT NULL, updated_at TEXT NOT NULL)''')
+    old = '2025-01-01T00:00:00'
+    conn.executemany('INSERT INTO products ("Product Name*", "Vendor/Supplier*", last_seen_date, updated_at) VALUES (?, ?, ?, ?)',
+                     [(f'Product {i} ' + 'x' * 200, f'Vendor {i % 7}', old, old) for i in range(products)])
+    conn.executemany('INSERT INTO strains (strain_name, last_seen_date, updated_at) VALUES (?, ?, ?)',
+                     [(f'Strain {i}', old, old) for i in range(50)])
+    conn.commit()
+    conn.close()
+
+
+def test_online_backup_while_writing():
+    """A paged backup finishes while another connection keeps writing, and the copy is intact."""
+    print("🧪 Testing online backup under writes")
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, 'products.db')
+        make_database(source, products=3000)
+        stop = threading.Event()
+        writes = []
+
+        def writer():
+            conn = sqlite3.connect(source, timeout=30)
+            while not stop.is_set():
+                conn.execute('UPDATE strains SET updated_at = ? WHERE id = 1', (str(time.time()),))
+                conn.commit()
+                writes.append(1)
+                time.sleep(0.002)
+            conn.close()
+
+        thread = threading.Thread(target=writer)
+        thread.start()
+        try:
+            copy = os.path.join(directory, 'copy.db')
+            steps = []
+            stats = online_backup(source, copy, pages=8, step_sleep=0.001, progress=lambda done, total: steps.append(done))
+        finally:
+            stop.set()
+            thread.join()
+        assert writes, "writer was blocked for the whole backup"
+        assert stats['steps'] > 1 and steps and stats['pages'] > 8
+        conn = sqlite3.connect(copy)
+        assert conn.execute('PRAGMA integrity_check').fetchone()[0] == 'ok'
+        assert conn.execute('SELECT COUNT(*) FROM products').fetchone()[0] == 3000
+        conn.close()
+    print("✅ Online backup under writes correct")
+
+
+def test_full_then_incremental():
+    """Incremental backups hold only rows changed since the previous backup; files are compressed."""
+    print("🧪 Testing full and incremental backups")
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, 'products.db')
+        backups = Path(directory) / 'backups'
+        make_database(source)
+
+        # Without a previous backup, incremental falls back to full
+        full = create_backup(source, backups, 'nightly', backup_type='incremental', compression='gzip')
+        assert full['type'] == 'full' and full['path'].endswith('.db.gz')
+        restored = os.path.join(directory, 'restored.db')
+        with gzip.open(full['path'], 'rb') as f_in, open(restored, 'wb') as f_out:
+            f_out.write(f_in.read())
+        conn = sqlite3.connect(restored)
+        assert conn.execute('SELECT COUNT(*) FROM products').fetchone()[0] == 500
+        conn.close()
+
+        conn = sqlite3.connect(source)
+        now = '2999-01-01T00:00:00'
+        conn.execute('UPDATE products SET updated_at = ? WHERE id IN (3, 4)', (now,))
+        conn.execute('UPDATE strains SET last_seen_date = ? WHERE id = 9', (now,))
+        conn.commit()
+        conn.close()
+
+        incremental = create_backup(source, backups, 'nightly', backup_type='incremental', compression='none')
+        assert incremental['type'] == 'incremental' and incremental['since'] == full['started_at']
+        assert incremental['rows'] == {'products': 2, 'strains': 1}
+        conn = sqlite3.connect(incremental['path'])
+        assert [row[0] for row in conn.execute('SELECT id FROM products ORDER BY id')] == [3, 4]
+        assert dict(conn.execute('SELECT key, value FROM _backup_meta'))['since'] == full['started_at']
+        conn.close()
+
+        assert [entry['type'] for entry in load_manifest(backups)] == ['full', 'incremental']
+        assert last_backup(backups, source)['path'] == incremental['path']
+
+        strains = create_backup(source, backups, 'strains_only', backup_type='strains', compression='none')
+        conn = sqlite3.connect(strains['path'])
+        assert strains['rows'] == {'strains': 50}
+        assert [row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'products'")] == []
+        conn.close()
+
+        # A table backup taken after a product change is not a base for the next incremental
+        conn = sqlite3.connect(source)
+        conn.execute('UPDATE products SET updated_at = ? WHERE id = 5', (datetime.now().isoformat(),))
+        conn.commit()
+        conn.close()
+        create_backup(source, backups, 'strains_only', backup_type='strains', compression='none')
+        assert last_backup(backups, source)['type'] == 'strains'
+        assert last_backup(backups, source, types=('full', 'incremental'))['path'] == incremental['path']
+        latest = create_backup(source, backups, 'nightly', backup_type='incremental', compression='none')
+        assert latest['since'] == incremental['started_at']
+        conn = sqlite3.connect(latest['path'])
+        assert [row[0] for row in conn.execute('SELECT id FROM products ORDER BY id')] == [3, 4, 5]
+        conn.close()
+    print("✅ Full and incremental backups correct")
+
+
+def test_backup_endpoint():
+    """The endpoint backs up the store database and reports the backup."""
+    print("🧪 Testing backup endpoint")
+    import app as app_module
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, 'products.db')
+        make_database(source)
+        product_db = mock.Mock(db_path=source)
+        cwd = os.getcwd()
+        os.chdir(directory)
+        try:
+            with mock.patch.object(app_module, 'get_product_database', return_value=product_db), \
+                    app_module.app.test_client() as client:
+                response = client.post('/api/database-backup', json={'backup_name': 'manual/../x', 'compress': False})
+                data = response.get_json()
+                assert response.status_code == 200 and data['success'], data
+                assert data['backup_type'] == 'full' and data['compression'] == 'none'
+                assert Path(data['backup_path']).parent == Path('backups')
+                assert os.path.getsize(data['backup_path']) == data['backup_size']
+
+                response = client.post('/api/database-backup', json={'backup_name': 'x', 'backup_type': 'everything'})
+                assert response.status_code == 400
+        finally:
+            os.chdir(cwd)
+    print("✅ Backup endpoint correct")
+
+
+if __name__ == "__main__":
+    test_online_backup_while_writing()
+    test_full_then_incremental()
+    test_backup_endpoint()
+    print("\n🎉 All database backup tests passed")
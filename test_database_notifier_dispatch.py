@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Test script for the coalescing database change dispatcher and the
+cursor-based session change log.
+"""
+
+import os
+import sys
+import threading
+from datetime import datetime
+
+# Add the project root to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from src.core.data.session_manager import SessionManager, DatabaseChange
+from src.core.data import database_notifier as notifier_module
+from src.core.data.database_notifier import DatabaseNotifier
+
+
+def _isolated_session_manager():
+    """Route the notifier's change recording into a private SessionManager."""
+    manager = SessionManager()
+    notifier_module.record_database_change = lambda **kwargs: manager._record_change_sync(
+        DatabaseChange(timestamp=datetime.now(), **kwargs)
+    )
+    return manager
+
+
+def test_batch_lineage_updates_are_coalesced():
+    """Hundreds of updates to a few strains become one change per strain, with no thread per change."""
+    print("🧪 Testing coalesced lineage notifications")
+    original = notifier_module.record_database_change
+    try:
+        manager = _isolated_session_manager()
+        notifier = DatabaseNotifier(coalesce_window=0.2)
+        calls = []
+        notifier.register_change_handler('lineage_update', lambda *args: calls.append(args))
+
+        threads_before = threading.active_count()
+        for i in range(300):
+            strain = f"Strain {i % 3}"
+            notifier.notify_lineage_update(strain, f"L{i}", f"L{i + 1}")
+        assert threading.active_count() <= threads_before + 3  # dispatcher + 2 workers
+        assert notifier.flush(timeout=5)
+
+        changes = manager.get_changes_since(0)
+        assert len(changes) == 3
+        assert sorted(c.entity_id for c in changes) == ['Strain 0', 'Strain 1', 'Strain 2']
+        first = next(c for c in changes if c.entity_id == 'Strain 0')
+        assert first.details['old_lineage'] == 'L0'
+        assert first.details['new_lineage'] == 'L298'
+        assert len(calls) == 3
+        assert notifier.get_stats()['coalesced'] == 297
+    finally:
+        notifier_module.record_database_change = original
+    print("✅ Coalescing correct")
+
+
+def test_session_cursors_read_change_log():
+    """Sessions read the shared log with cursors; recording does not touch sessions."""
+    print("🧪 Testing cursor-based change log")
+    manager = SessionManager()
+    manager._session_cursors['a'] = manager.change_version
+    for i in range(5):
+        manager._record_change_sync(DatabaseChange('lineage_update', f"S{i}", 'strain', datetime.now()))
+    manager._session_cursors['b'] = manager.change_version
+
+    assert manager.has_pending_changes('a')
+    assert not manager.has_pending_changes('b')
+    pending = manager.get_pending_changes('a')
+    assert [c.entity_id for c in pending] == ['S0', 'S1', 'S2', 'S3', 'S4']
+    assert [c.version for c in pending] == [1, 2, 3, 4, 5]
+    assert not manager.has_pending_changes('a')
+    assert manager.get_pending_changes('a') == []
+    print("✅ Cursor reads correct")
+
+
+if __name__ == "__main__":
+    test_batch_lineage_updates_are_coalesced()
+    test_session_cursors_read_change_log()
+    print("\n🎉 All notifier dispatch tests passed")
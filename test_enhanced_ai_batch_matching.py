@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Test script for batched ensemble inference in EnhancedAIProductMatcher:
+the batched path must agree with the pair-by-pair path.
+"""
+
+import os
+import random
+import sys
+
+import numpy as np
+
+# Add the project root to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from src.core.data.enhanced_ai_matcher import EnhancedAIProductMatcher
+
+STRAINS = ['Blue Dream', 'OG Kush', 'Wedding Cake', 'Gelato', 'Sour Diesel', 'Jack Herer', 'Zkittlez']
+TYPES = ['Flower', 'Pre-Roll', 'Vape Cartridge', 'Edible']
+VENDORS = ['Hustler\'s Ambition', 'Airo Brands', 'Dank Czar', 'Omega Labs']
+
+
+def _products(seed, count):
+    rng = random.Random(seed)
+    json_products, db_products = [], []
+    for _ in range(count):
+        strain, ptype, vendor = rng.choice(STRAINS), rng.choice(TYPES), rng.choice(VENDORS)
+        weight = rng.choice(['1g', '3.5g', '0.5g', '100mg', '1/8 oz'])
+        json_products.append({
+            'inventory_name': f"{strain} {ptype} {weight} {rng.randint(15, 30)}% THC",
+            'vendor_name': vendor,
+            'brand_name': vendor.split()[0],
+            'inventory_type': ptype,
+            'price': str(rng.choice([10, 25, 40, ''])),
+        })
+        db_products.append({
+            'Product Name*': f"{rng.choice(STRAINS)} {rng.choice(TYPES)} {rng.choice(['1g', '3.5g', '2g'])}",
+            'Vendor/Supplier*': rng.choice(VENDORS),
+            'Product Brand': rng.choice(VENDORS).split()[0],
+            'Product Type': rng.choice(TYPES),
+            'Price': rng.choice([12, 25, 38, None]),
+        })
+    db_products.append({'Product Name*': 'A', 'Vendor/Supplier*': None})  # single-char name, no n-grams
+    return json_products, db_products
+
+
+def _assert_same(pairwise, batched):
+    assert len(pairwise) == len(batched)
+    for a, b in zip(pairwise, batched):
+        assert a.match_data is b.match_data
+        assert abs(a.score - b.score) < 1e-9
+        assert abs(a.confidence - b.confidence) < 1e-9
+        assert np.allclose(list(vars(a.features).values()), list(vars(b.features).values()), atol=1e-9)
+        assert a.explanation == b.explanation
+
+
+def test_batched_matches_pairwise_untrained():
+    """Default (untrained) scoring is identical in both paths, for both strategies."""
+    print("🧪 Testing batched vs pairwise (untrained)")
+    json_products, db_products = _products(1, 25)
+    matcher = EnhancedAIProductMatcher()
+    for strategy in ('ml_enhanced', 'feature_based'):
+        pairwise = matcher.match_products(json_products, db_products, strategy=strategy, batch=False)
+        batched = matcher.match_products(json_products, db_products, strategy=strategy, candidate_k=None)
+        _assert_same(pairwise, batched)
+    print("✅ Untrained paths agree")
+
+
+def test_batched_matches_pairwise_trained():
+    """With trained ensemble models, matrix predict equals per-pair predict."""
+    print("🧪 Testing batched vs pairwise (trained ensemble)")
+    json_products, db_products = _products(2, 15)
+    matcher = EnhancedAIProductMatcher()
+    rng = random.Random(3)
+    training = [(j, d, rng.random()) for j in json_products for d in db_products[:4]]
+    matcher.train_from_feedback(training)
+    assert matcher.ensemble_matcher.is_trained
+
+    pairwise = matcher.match_products(json_products, db_products, batch=False)
+    batched = matcher.match_products(json_products, db_products, candidate_k=None)
+    _assert_same(pairwise, batched)
+    print("✅ Trained paths agree")
+
+
+def test_candidate_k_limits_scored_pairs():
+    """Top-K candidate selection bounds matches per product and keeps the best name matches."""
+    print("🧪 Testing top-K candidate selection")
+    json_products, db_products = _products(4, 30)
+    matcher = EnhancedAIProductMatcher()
+    batched = matcher.match_products(json_products, db_products, candidate_k=5)
+    full = matcher.match_products(json_products, db_products, candidate_k=None)
+    assert len(batched) <= 5 * len(json_products)
+    assert max(m.score for m in batched) == max(m.score for m in full)
+    print("✅ Candidate selection correct")
+
+
+if __name__ == "__main__":
+    test_batched_matches_pairwise_untrained()
+    test_batched_matches_pairwise_trained()
+    test_candidate_k_limits_scored_pairs()
+    print("\n🎉 All batched AI matching tests passed")
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Test script for the facet index: filter masks as ANDs of per-value masks,
+cascaded dropdown options counted under the other filters, reuse of unchanged
+facets after an edit, and filter changes on a 20k-row inventory.
+"""
+
+import os
+import sys
+import time
+
+# Add the project root to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+import pandas as pd
+
+from src.core.data.excel_processor import ExcelProcessor
+from src.core.data.facet_index import ColumnFacet
+from src.core.data.inventory_schema import apply_inventory_schema
+
+
+def make_processor(df):
+    processor = ExcelProcessor()
+    processor.df = df
+    return processor
+
+
+def make_frame():
+    return pd.DataFrame({
+        'Product Name*': ['Blue Dream 1g', 'Wedding Cake 3.5g', 'CBD Gummies', 'Sample Flower', 'Glass Pipe'],
+        'Vendor': ['Vendor A', 'vendor a ', 'Vendor B', 'Vendor A', None],
+        'Product Brand': ['Brand A', 'Brand B', 'Brand C', 'Brand A', 'Brand D'],
+        'Product Type*': ['pre-roll', 'flower', 'High CBD Edible', 'Trade Sample - Not For Sale', 'paraphernalia'],
+        'Lineage': ['SATIVA', 'HYBRID', 'CBD', 'HYBRID', 'MIXED'],
+        'Weight*': [1, 3.5, 100, 1, 1],
+        'Units': ['g', 'g', 'mg', 'g', 'g'],
+        'CombinedWeight': ['1g', '3.5g', '100mg', '1g', '1g'],
+        'Product Strain': ['Blue Dream', 'Wedding Cake', 'CBD Blend', 'Mixed', 'Mixed'],
+        'DOH': ['YES', 'no', 'No', '', None],
+    })
+
+
+def test_column_facet():
+    """Masks ignore case and whitespace, missing values have no code, counts follow the mask."""
+    print("🧪 Testing column facet")
+    facet = ColumnFacet(pd.Series(['Vendor A', ' vendor a', 'Vendor B', None]))
+    assert facet.codes.tolist() == [0, 1, 2, -1]
+    assert facet.mask('VENDOR A ').tolist() == [True, True, False, False]
+    assert facet.mask('nobody').tolist() == [False] * 4
+    assert facet.present(np.array([False, False, True, True])) == ['Vendor B']
+    categorical = ColumnFacet(pd.Series(['x', 'y', 'x'], dtype='category').cat.add_categories(['unused']))
+    assert categorical.present() == ['x', 'y']
+    print("✅ Column facet correct")
+
+
+def test_dropdown_options_cascade():
+    """Each dropdown shows the values present under every other filter."""
+    print("🧪 Testing cascaded dropdown options")
+    processor = make_processor(make_frame())
+    options = processor.get_dynamic_filter_options({})
+    assert options['vendor'] == ['Vendor A', 'Vendor B', 'vendor a ']
+    assert options['productType'] == ['High CBD Edible', 'Pre-roll', 'flower', 'paraphernalia']
+    assert options['doh'] == ['NO', 'YES']
+    assert options['highCbd'] == ['High CBD Products', 'Non-High CBD Products']
+    # Same weights as formatting every row
+    formatted = {processor._format_weight_units(row, excel_priority=True) for row in processor.df.to_dict('records')}
+    assert options['weight'] == sorted(formatted) and {'1.0g', '3.5g', '100mg'} <= formatted
+
+    options = processor.get_dynamic_filter_options({'vendor': 'VENDOR A', 'lineage': 'hybrid'})
+    assert options['brand'] == ['Brand A', 'Brand B']
+    assert options['vendor'] == ['Vendor A', 'vendor a ']  # its own filter is not applied
+    assert options['lineage'] == ['HYBRID', 'SATIVA']
+    assert options['highCbd'] == ['Non-High CBD Products']
+
+    # highCbd narrows the other dropdowns like apply_filters does
+    options = processor.get_dynamic_filter_options({'highCbd': 'High CBD Products'})
+    assert options['vendor'] == ['Vendor B'] and options['weight'] == ['100mg']
+    print("✅ Cascaded dropdown options correct")
+
+
+def test_filters_and_rebuilds():
+    """apply_filters uses the facet masks; an edit rebuilds only the changed facets."""
+    print("🧪 Testing filters and rebuilds")
+    df, _ = apply_inventory_schema(make_frame())
+    processor = make_processor(df)
+    assert processor.filter_positions({'vendor': 'vendor a', 'weight': '1.0'}).tolist() == [0, 3]
+    assert processor.filter_positions({'highCbd': 'Non-High CBD Products', 'doh': 'NO'}).tolist() == [1]
+    assert processor.apply_filters({'lineage': 'HYBRID', 'brand': 'All'})['Product Name*'].tolist() == [
+        'Wedding Cake 3.5g', 'Sample Flower']
+
+    first = processor.get_facet_index()
+    assert processor.get_facet_index() is first
+    processor.update_lineage_in_current_data('Blue Dream 1g', 'INDICA')
+    second = processor.get_facet_index()
+    assert second is not first
+    assert second.facets['Vendor'] is first.facets['Vendor']
+    assert second.facets['Lineage'] is not first.facets['Lineage']
+    assert processor.filter_positions({'lineage': 'indica'}).tolist() == [0]
+    assert 'INDICA' in processor.get_dynamic_filter_options({})['lineage']
+    print("✅ Filters and rebuilds correct")
+
+
+def test_reassignment_rebuilds():
+    """Every assignment of self.df rebuilds the index, even when the new frame reuses the old one's id."""
+    print("🧪 Testing rebuilds on reassignment")
+    processor = make_processor(make_frame())
+    for round_ in range(20):
+        # The old frame is freed on assignment, so the new one often gets its id and length
+        frame = make_frame()
+        frame['Vendor'] = f'Vendor {round_}'
+        processor.df = frame
+        assert processor.get_dynamic_filter_options({})['vendor'] == [f'Vendor {round_}']
+        assert processor.filter_positions({'vendor': f'Vendor {round_}'}).tolist() == [0, 1, 2, 3, 4]
+
+    # Same object, edited outside the processor and assigned back
+    frame = processor.df
+    frame['Vendor'] = 'Vendor X'
+    processor.df = frame
+    assert processor.get_dynamic_filter_options({})['vendor'] == ['Vendor X']
+    print("✅ Rebuilds on reassignment correct")
+
+
+def test_large_inventory_filters():
+    """Filter changes on 20k rows are answered from the index in milliseconds."""
+    print("🧪 Testing 20k-row filter changes")
+    rows = 20000
+    rng = np.random.default_rng(7)
+    pick = lambda values: np.array(values, dtype=object)[rng.integers(0, len(values), rows)]
+    df = pd.DataFrame({
+        'Product Name*': [f'Product {i}' for i in range(rows)],
+        'Vendor': pick([f'Vendor {i}' for i in range(40)]),
+        'Product Brand': pick([f'Brand {i}' for i in range(150)]),
+        'Product Type*': pick(['flower', 'pre-roll', 'vape cartridge', 'edible (solid)', 'High CBD Tincture']),
+        'Lineage': pick(['SATIVA', 'INDICA', 'HYBRID', 'CBD', 'MIXED']),
+        'Weight*': pick([1, 3.5, 7, 28]),
+        'Units': pick(['g']),
+        'CombinedWeight': pick(['1g', '3.5g', '7g', '28g']),
+        'Product Strain': pick([f'Strain {i}' for i in range(2000)]),
+        'DOH': pick(['YES', 'NO']),
+    })
+    processor = make_processor(df)
+    processor.get_dynamic_filter_options({})  # builds the index and the weight facet
+
+    started = time.perf_counter()
+    for vendor in range(10):
+        filters = {'vendor': f'Vendor {vendor}', 'lineage': 'HYBRID', 'doh': 'YES'}
+        options = processor.get_dynamic_filter_options(filters)
+        positions = processor.filter_positions(filters)
+    elapsed = (time.perf_counter() - started) / 10
+    expected = np.flatnonzero((df['Vendor'] == 'Vendor 9') & (df['Lineage'] == 'HYBRID') & (df['DOH'] == 'YES'))
+    assert positions.tolist() == expected.tolist()
+    assert options['strain'] == sorted(df.loc[(df['Lineage'] == 'HYBRID') & (df['DOH'] == 'YES') &
+                                              (df['Vendor'] == 'Vendor 9'), 'Product Strain'].unique())
+    print(f"   {elapsed * 1000:.1f}ms per filter change")
+    assert elapsed < 0.25
+    print("✅ 20k-row filter changes correct")
+
+
+if __name__ == "__main__":
+    test_column_facet()
+    test_dropdown_options_cascade()
+    test_filters_and_rebuilds()
+    test_reassignment_rebuilds()
+    test_large_inventory_filters()
+    print("\n🎉 All facet index tests passed")
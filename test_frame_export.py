@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Test script for streamed exports: XLSX, CSV and Parquet written chunk by chunk
+from a position selection, and the download endpoints streaming them.
+"""
+
+import io
+import os
+import sys
+import tempfile
+from unittest import mock
+
+# Add the project root to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+import pandas as pd
+
+from src.core.data.excel_processor import ExcelProcessor
+from src.core.data.frame_export import export_format, open_export, stream_frame, write_xlsx, iter_frame_chunks
+from src.core.data.inventory_schema import apply_inventory_schema
+
+
+def make_frame():
+    df = pd.DataFrame({
+        'Product Name*': ['Blue Dream 1g', 'Wedding Cake 3.5g', 'Gummies', 'Glass Pipe', 'Kush 7g'],
+        'ProductName': ['Blue Dream 1g', 'Wedding Cake 3.5g', 'Gummies', 'Glass Pipe', 'Kush 7g'],
+        'Vendor': ['Vendor A', 'Vendor B', 'Vendor A', 'Vendor C', 'Vendor A'],
+        'Lineage': ['SATIVA', 'HYBRID', None, 'MIXED', 'INDICA'],
+        'Weight*': [1, 3.5, np.nan, 1, 7],
+        'Total THC': ['21.5', '', 'n/a', None, '18'],
+    })
+    df, _ = apply_inventory_schema(df)
+    return df
+
+
+def test_formats_round_trip():
+    """Every format holds the selected rows in order, with blanks for missing values."""
+    print("🧪 Testing export formats")
+    df = make_frame()
+    positions = np.array([4, 0, 2])
+    columns = ['Product Name*', 'Lineage', 'Weight*', 'Missing column']
+    readers = {
+        'xlsx': lambda data: pd.read_excel(io.BytesIO(data)),
+        'csv': lambda data: pd.read_csv(io.BytesIO(data)),
+        'parquet': lambda data: pd.read_parquet(io.BytesIO(data)),
+    }
+    for fmt, read in readers.items():
+        blocks = list(stream_frame(df, fmt, columns=columns, positions=positions, chunk_rows=2))
+        result = read(b''.join(blocks))
+        assert list(result.columns) == ['Product Name*', 'Lineage', 'Weight*'], fmt
+        assert result['Product Name*'].tolist() == ['Kush 7g', 'Blue Dream 1g', 'Gummies'], fmt
+        assert result['Lineage'].fillna('').tolist() == ['INDICA', 'SATIVA', ''], fmt
+        assert result['Weight*'].tolist()[:2] == [7.0, 1.0] and pd.isna(result['Weight*'].iloc[2]), fmt
+
+    empty = pd.read_csv(io.BytesIO(b''.join(stream_frame(df, 'csv', positions=np.array([], dtype=int)))))
+    assert empty.empty and 'Vendor' in empty.columns
+    assert export_format('Excel') == 'xlsx' and export_format('.PARQUET') == 'parquet'
+    assert export_format('pdf') == 'xlsx' and export_format(None, default='csv') == 'csv'
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'out.xlsx')
+        assert write_xlsx(path, iter_frame_chunks(df, chunk_rows=2), list(df.columns)) == 5
+        assert pd.read_excel(path)['Vendor'].tolist() == df['Vendor'].tolist()
+    print("✅ Export formats correct")
+
+
+def test_download_endpoints_stream():
+    """The processed and library downloads stream the chosen format without the numeric companions."""
+    print("🧪 Testing streamed download endpoints")
+    import app as app_module
+    processor = ExcelProcessor()
+    processor.df = make_frame()
+    with mock.patch.object(app_module, 'get_excel_processor', return_value=processor), \
+            app_module.app.test_client() as client:
+        response = client.post('/api/download-processed-excel',
+                               json={'filters': {'vendor': 'Vendor A'}, 'format': 'csv'})
+        assert response.status_code == 200 and response.is_streamed
+        assert response.mimetype == 'text/csv'
+        assert 'AGT_Vendor_A_Processed_Data_3RECORDS' in response.headers['Content-Disposition']
+        result = pd.read_csv(io.BytesIO(response.get_data()))
+        assert result['Product Name*'].tolist() == ['Blue Dream 1g', 'Gummies', 'Kush 7g']
+        assert not [column for column in result.columns if column.endswith('[num]')]
+
+        response = client.post('/api/download-processed-excel', json={'selected_tags': ['Glass Pipe']})
+        assert response.mimetype.endswith('spreadsheetml.sheet')
+        assert pd.read_excel(io.BytesIO(response.get_data()))['Vendor'].tolist() == ['Vendor C']
+
+        response = client.post('/api/download-processed-excel', json={'filters': {'vendor': 'Nobody'}})
+        assert response.status_code == 400
+
+        response = client.post('/api/download-transformed-excel',
+                               json={'selected_tags': ['Wedding Cake 3.5g', 'Gummies'], 'format': 'parquet'})
+        result = pd.read_parquet(io.BytesIO(response.get_data()))
+        assert result['Weight*'].tolist() == ['3.5', '']
+        assert result['ProductType'].tolist() == ['', '']
+
+        response = client.get('/api/library/export')
+        assert response.mimetype == 'text/csv' and '.csv' in response.headers['Content-Disposition']
+        assert len(pd.read_csv(io.BytesIO(response.get_data()))) == 5
+    print("✅ Streamed download endpoints correct")
+
+
+def test_export_snapshot_and_errors():
+    """Exports read a snapshot taken up front, and a failing XLSX/Parquet build answers 500 before streaming."""
+    print("🧪 Testing export snapshots and early failures")
+    df = make_frame()
+    blocks = open_export(df, 'csv', columns=['Product Name*', 'Lineage'], chunk_rows=2)
+    df.iloc[4, df.columns.get_loc('Product Name*')] = 'Edited'  # after the first chunk was written
+    result = pd.read_csv(io.BytesIO(b''.join(blocks)))
+    assert result['Product Name*'].tolist()[-1] == 'Kush 7g'
+
+    import app as app_module
+    processor = ExcelProcessor()
+    processor.df = make_frame()
+    with mock.patch.object(app_module, 'get_excel_processor', return_value=processor), \
+            mock.patch('src.core.data.frame_export.write_xlsx', side_effect=ValueError('bad cell')), \
+            app_module.app.test_client() as client:
+        response = client.post('/api/download-processed-excel', json={'filters': {'vendor': 'Vendor A'}})
+        assert response.status_code == 500 and response.get_json()['error'] == 'bad cell'
+        with mock.patch('pyarrow.parquet.ParquetWriter', side_effect=OSError('disk full')):
+            response = client.post('/api/download-transformed-excel',
+                                   json={'selected_tags': ['Gummies'], 'format': 'parquet'})
+        assert response.status_code == 500 and response.get_json()['error'] == 'disk full'
+    print("✅ Export snapshots and early failures correct")
+
+
+def test_records_frame_matches_process_record():
+    """process_records_frame gives the values process_record gives row by row, numpy scalars included."""
+    print("🧪 Testing process_records_frame")
+    import app as app_module
+    df = pd.DataFrame({
+        'Product Name*': ['Blue Dream 1g', 'Gummies'],
+        'Weight*': [3.5, np.nan],
+        'Units': pd.Series([np.int64(4), np.float32(2.5)], dtype=object),
+        'Active': pd.Series([np.bool_(True), None], dtype=object),
+    })
+    result = app_module.process_records_frame(df)
+    expected = pd.DataFrame([app_module.process_record(row, '', None) for _, row in df.iterrows()])
+    for column in df.columns:
+        assert result[column].tolist() == expected[column].tolist(), column
+    assert result['Weight*'].tolist() == ['3.5', '']
+    assert result['Units'].tolist() == ['4', '2.5']
+    assert result['Active'].tolist() == ['True', '']
+    print("✅ process_records_frame correct")
+
+
+if __name__ == "__main__":
+    test_formats_round_trip()
+    test_download_endpoints_stream()
+    test_export_snapshot_and_errors()
+    test_records_frame_matches_process_record()
+    print("\n🎉 All frame export tests passed")
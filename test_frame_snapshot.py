@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Test script for copy-on-write frame sharing: processors loading the same file
+share one snapshot, edits copy only the touched column, and filters take the
+matching rows once by position.
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+from unittest import mock
+
+# Add the project root to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import pandas as pd
+
+from src.core.data.excel_processor import ExcelProcessor
+from src.core.data.frame_snapshot import FrameSnapshot, copy_on_write_enabled, get_snapshot_cache
+
+
+def write_inventory(directory):
+    path = os.path.join(directory, 'A Greener Today Bothell_inventory.xlsx')
+    pd.DataFrame({
+        'Product Name*': ['Blue Dream Pre-Roll 1g', 'Wedding Cake Flower 3.5g', 'Gummies 100mg', 'Glass Pipe'],
+        'Product Type*': ['pre-roll', 'flower', 'edible (solid)', 'paraphernalia'],
+        'Lineage': ['SATIVA', 'HYBRID', 'MIXED', 'MIXED'],
+        'Vendor/Supplier*': ['Vendor A', 'Vendor B', 'Vendor A', 'Vendor C'],
+        'Product Brand': ['Brand A', 'Brand B', 'Brand A', 'Brand C'],
+        'Weight*': [1, 3.5, 100, 1],
+        'Units': ['g', 'g', 'mg', 'g'],
+        'Price': [10, 30, 15, 20],
+        'Product Strain': ['Blue Dream', 'Wedding Cake', 'Mixed', 'Mixed'],
+    }).to_excel(path, index=False)
+    return path
+
+
+def test_import_leaves_pandas_options_alone():
+    """Importing the processor does not switch pandas to Copy-on-Write; the app does at startup."""
+    print("🧪 Testing no Copy-on-Write import side effect")
+    project_root = os.path.dirname(os.path.abspath(__file__))
+    script = ("import pandas as pd, src.core.data.excel_processor, src.core.data.frame_snapshot; "
+              "print(pd.get_option('mode.copy_on_write'))")
+    result = subprocess.run([sys.executable, '-c', script], cwd=project_root, capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr[-2000:]
+    assert result.stdout.strip().splitlines()[-1] == 'False'
+    print("✅ No import side effect")
+
+
+def test_snapshot_is_detached():
+    """A snapshot never sees later writes to the frame it was built from or to its views, with or without Copy-on-Write."""
+    print("🧪 Testing snapshot isolation")
+    for cow in (True, False):
+        with pd.option_context('mode.copy_on_write', cow):
+            assert copy_on_write_enabled() is cow
+            source = pd.DataFrame({'Lineage': ['SATIVA', 'INDICA'], 'Vendor': ['A', 'B']})
+            snapshot = FrameSnapshot(source, 'inventory.xlsx')
+            source.loc[0, 'Lineage'] = 'CBD'
+
+            view = snapshot.view()
+            # Views share every column only under Copy-on-Write; otherwise they are deep copies
+            assert snapshot.shares_column(view, 'Lineage') is cow and snapshot.shares_column(view, 'Vendor') is cow
+            view.iloc[1, 0] = 'HYBRID'
+            assert not snapshot.shares_column(view, 'Lineage') and snapshot.shares_column(view, 'Vendor') is cow
+            assert snapshot.take([1, 0])['Lineage'].tolist() == ['INDICA', 'SATIVA']
+            assert snapshot.info()['views'] == 1
+    print("✅ Snapshot isolation correct")
+
+
+def test_processors_share_snapshot():
+    """A second processor loading the same file reuses the snapshot; its edits stay its own."""
+    print("🧪 Testing processors sharing one snapshot")
+    cache = get_snapshot_cache()
+    with tempfile.TemporaryDirectory() as directory, pd.option_context('mode.copy_on_write', True):
+        path = write_inventory(directory)
+        cache.discard_source(path)
+        first, second = ExcelProcessor(), ExcelProcessor()
+        assert first.load_file(path)
+        with mock.patch.object(ExcelProcessor, '_load_lineage_from_database', side_effect=AssertionError('reprocessed')):
+            assert second.load_file(path)
+
+        snapshot = next(cache.get(key) for key in cache.keys() if cache.get(key).source == path)
+        for column in second.df.columns:
+            assert snapshot.shares_column(second.df, column), column
+
+        assert second.update_lineage_in_current_data('Wedding Cake Flower 3.5g', 'INDICA')
+        assert not snapshot.shares_column(second.df, 'Lineage')
+        assert snapshot.shares_column(second.df, 'Product Brand')
+        assert first.df.loc[first.df['ProductName'] == 'Wedding Cake Flower 3.5g', 'Lineage'].tolist() == ['HYBRID']
+        assert snapshot.take([1])['Lineage'].tolist() == ['HYBRID']
+        cache.discard_source(path)
+    print("✅ Shared snapshot correct")
+
+
+def test_filters_take_positions():
+    """apply_filters takes the rows matching every filter once, by position."""
+    print("🧪 Testing positional filters")
+    processor = ExcelProcessor()
+    processor.df = pd.DataFrame({
+        'Vendor': ['Vendor A', 'vendor a ', 'Vendor B', 'Vendor A'],
+        'Product Type*': ['High CBD Edible', 'flower', 'flower', 'pre-roll'],
+        'Lineage': pd.Categorical(['CBD', 'HYBRID', 'HYBRID', 'SATIVA']),
+    })
+    assert processor.filter_positions({'vendor': 'vendor a'}).tolist() == [0, 1, 3]
+    assert processor.filter_positions({'vendor': 'Vendor A', 'highCbd': 'Non-High CBD Products'}).tolist() == [1, 3]
+    filtered = processor.apply_filters({'vendor': 'Vendor A', 'lineage': 'hybrid', 'brand': 'All'})
+    assert filtered.index.tolist() == [1] and filtered['Product Type*'].tolist() == ['flower']
+    assert processor.apply_filters({'vendor': 'Nobody'}).empty
+    print("✅ Positional filters correct")
+
+
+if __name__ == "__main__":
+    test_import_leaves_pandas_options_alone()
+    test_snapshot_is_detached()
+    test_processors_share_snapshot()
+    test_filters_take_positions()
+    print("\n🎉 All frame snapshot tests passed")
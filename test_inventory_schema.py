@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Test script for the typed inventory schema stage: category columns, parsed
+numeric companions, dropped empty columns, and the filter/dropdown helpers
+working on category codes.
+"""
+
+import os
+import sys
+import tempfile
+
+# Add the project root to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import pandas as pd
+
+from src.core.data.excel_processor import ExcelProcessor
+from src.core.data.inventory_schema import (
+    apply_inventory_schema, distinct_values, equals_mask, numeric_column_name, numeric_values,
+)
+
+
+def make_frame():
+    return pd.DataFrame({
+        'ProductName': ['Blue Dream 1g', 'Wedding Cake 3.5g', 'Gummies', 'Glass Pipe'],
+        'Vendor': ['Vendor A', 'Vendor B', 'Vendor A', 'Vendor A'],
+        'Units': ['g', 'g', 'mg', 'g'],
+        'DOH': ['YES', 'NO', 'NO', None],
+        'Total THC': ['21.5', '', 'n/a', None],
+        'THC Content': ['25', '3', '', ' 7.5 '],
+        'Price': [10, 30, 15, 20],
+        'Unnamed: 14': [None, '', ' ', None],
+        'Barcode*': [None, None, None, None],
+    })
+
+
+def test_schema_stage():
+    """Low-cardinality columns become categories, numerics get companions, empty extras are dropped."""
+    print("🧪 Testing schema stage")
+    df, report = apply_inventory_schema(make_frame())
+    assert report['categorized'] == ['Vendor', 'Units', 'DOH']
+    assert report['dropped'] == ['Unnamed: 14']  # Barcode* is read by name elsewhere, so kept
+    assert report['bytes_after'] != report['bytes_before']
+    assert isinstance(df['Vendor'].dtype, pd.CategoricalDtype) and '' in df['Vendor'].cat.categories
+    assert df['DOH'].fillna('').tolist() == ['YES', 'NO', 'NO', '']
+
+    # Unparseable text becomes 0.0, as safe_float did
+    assert df[numeric_column_name('Total THC')].tolist() == [21.5, 0.0, 0.0, 0.0]
+    assert df[numeric_column_name('THC Content')].tolist() == [25.0, 3.0, 0.0, 7.5]
+    assert numeric_values(df, 'Price').tolist() == [10.0, 30.0, 15.0, 20.0]
+    assert numeric_values(df, 'Total CBD').tolist() == [0.0] * 4
+    # Display strings are untouched
+    assert df['Total THC'].tolist() == ['21.5', '', 'n/a', None]
+    print("✅ Schema stage correct")
+
+
+def test_category_code_helpers():
+    """equals_mask and distinct_values read categories once and compare codes."""
+    print("🧪 Testing category code helpers")
+    series = pd.Series(['Vendor A', ' vendor a', 'Vendor B', None], dtype='category')
+    series = series.cat.add_categories(['Unused'])
+    with_text = pd.Series(['Vendor A', ' vendor a', 'Vendor B', None])
+    for values in (series, with_text):
+        assert equals_mask(values, 'VENDOR A ').tolist() == [True, True, False, False]
+    assert sorted(distinct_values(series)) == [' vendor a', 'Vendor A', 'Vendor B']
+    print("✅ Category code helpers correct")
+
+
+def test_processor_uses_schema():
+    """Tags use the parsed THC values; edits extend categories and refresh companions; saves omit them."""
+    print("🧪 Testing processor integration")
+    processor = ExcelProcessor()
+    processor.df, processor.schema_report = apply_inventory_schema(make_frame())
+    processor._cache_dropdown_values()
+    assert processor.dropdown_cache['vendor'] == ['Vendor A', 'Vendor B']
+
+    assert processor.filter_positions({'vendor': 'vendor a', 'doh': 'no'}).tolist() == [2]
+
+    tags = {tag['Product Name*']: tag for tag in processor.get_available_tags()}
+    assert tags['Blue Dream 1g']['THC'] == '25'  # THC Content beats Total THC
+    assert tags['Wedding Cake 3.5g']['THC'] == '3'
+    assert tags['Gummies']['THC'] == ''
+
+    processor.set_row_values(1, {'Vendor': 'Vendor C', 'Price': '32.5', 'Notes': 'restock'})
+    assert processor.df.loc[1, 'Vendor'] == 'Vendor C'
+    assert processor.df.loc[1, numeric_column_name('Price')] == 32.5
+    assert processor.df.loc[1, 'Notes'] == 'restock'
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'saved.xlsx')
+        assert processor.save_data(path)
+        saved = pd.read_excel(path)
+    assert not [column for column in saved.columns if column.endswith('[num]')]
+    assert 'Total THC' in saved.columns
+    print("✅ Processor integration correct")
+
+
+if __name__ == "__main__":
+    test_schema_stage()
+    test_category_code_helpers()
+    test_processor_uses_schema()
+    print("\n🎉 All inventory schema tests passed")
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Test script for the TF-IDF candidate retrieval stage in EnhancedJSONMatcher:
+batched top-K agrees with brute-force cosine similarity, fitted indexes are
+persisted by inventory fingerprint, and the type matchers only see candidates.
+"""
+
+import os
+import random
+import sys
+import tempfile
+from unittest import mock
+
+import numpy as np
+from sklearn.metrics.pairwise import cosine_similarity
+
+# Add the project root to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import src.core.data.enhanced_json_matcher as ejm
+from src.core.data.enhanced_json_matcher import EnhancedJSONMatcher, TfidfRetrievalIndex
+
+STRAINS = ['blue dream', 'og kush', 'wedding cake', 'gelato', 'sour diesel', 'jack herer', 'zkittlez', 'runtz']
+TYPES = ['flower', 'pre roll', 'vape cartridge', 'gummies', 'live resin']
+VENDORS = ['Dank Czar', 'Airo Brands', 'Omega Labs']
+
+
+def _names(seed, count):
+    rng = random.Random(seed)
+    return [f"{rng.choice(STRAINS)} {rng.choice(TYPES)} {rng.choice(['1g', '3 5g', '100mg'])}" for _ in range(count)]
+
+
+def test_top_k_matches_brute_force():
+    """Batched sparse top-K equals per-query cosine ranking, with and without row restrictions."""
+    print("🧪 Testing batched top-K retrieval")
+    names = _names(1, 400)
+    index = TfidfRetrievalIndex.build(names, cache_dir='')
+    queries = _names(2, 30)
+    brute = cosine_similarity(index.vectorizer.transform(queries), index.vectorizer.transform(names))
+
+    for (rows, scores), expected in zip(index.top_k(queries, k=10), brute):
+        assert len(rows) == 10
+        assert np.all(np.diff(scores) <= 1e-12)
+        assert np.allclose(scores, np.sort(expected)[::-1][:10])
+        assert np.allclose(expected[rows], scores)
+
+    subset = np.arange(0, 400, 7)
+    allowed = [subset if i % 2 else None for i in range(len(queries))]
+    for i, (rows, scores) in enumerate(index.top_k(queries, k=5, allowed=allowed)):
+        if i % 2:
+            assert set(rows) <= set(subset)
+            assert np.allclose(scores, np.sort(brute[i][subset])[::-1][:5])
+    print("✅ Top-K retrieval correct")
+
+
+def test_index_persisted_by_fingerprint():
+    """A second process (empty memory) loads the persisted index; a new inventory refits."""
+    print("🧪 Testing retrieval index persistence")
+    names = _names(3, 200)
+    with tempfile.TemporaryDirectory() as tmp:
+        fitted = TfidfRetrievalIndex.build(names, cache_dir=tmp)
+        assert os.path.exists(os.path.join(tmp, f'tfidf_index_{fitted.fingerprint}.joblib'))
+
+        TfidfRetrievalIndex._memory.clear()
+        with mock.patch.object(ejm.TfidfVectorizer, 'fit_transform', side_effect=AssertionError('refit')):
+            loaded = TfidfRetrievalIndex.build(names, cache_dir=tmp)
+        assert loaded is not fitted and loaded.fingerprint == fitted.fingerprint
+        assert (loaded.matrix != fitted.matrix).nnz == 0
+        assert TfidfRetrievalIndex.build(names, cache_dir=tmp) is loaded  # in-memory hit
+
+        changed = TfidfRetrievalIndex.build(names + ['brand new product'], cache_dir=tmp)
+        assert changed.fingerprint != fitted.fingerprint
+    print("✅ Persistence correct")
+
+
+def test_type_matcher_only_sees_candidates():
+    """Each manifest item reaches match_by_type with at most K vendor-matched candidates."""
+    print("🧪 Testing candidate narrowing in match_products")
+    rng = random.Random(4)
+    database_products = [{
+        'Product Name*': name.title(),
+        'Vendor/Supplier*': rng.choice(VENDORS),
+        'Product Type*': 'flower',
+    } for name in _names(5, 600)]
+    json_data = [{
+        'inventory_name': database_products[i]['Product Name*'],
+        'vendor': database_products[i]['Vendor/Supplier*'],
+        'inventory_type': 'flower',
+    } for i in range(0, 600, 60)]
+
+    matcher = EnhancedJSONMatcher(excel_processor=None)
+    seen_sizes = []
+    match_by_type = matcher.product_matcher.match_by_type
+
+    def recording_match_by_type(product_type, json_product, products):
+        seen_sizes.append(len(products))
+        assert all(p['Vendor/Supplier*'] == json_product['vendor'] for p in products)
+        return match_by_type(product_type, json_product, products)
+
+    with mock.patch.object(ejm, 'RETRIEVAL_CACHE_DIR', ''), \
+            mock.patch.object(ejm, 'RETRIEVAL_TOP_K', 25), \
+            mock.patch.object(matcher, '_get_database_products', return_value=database_products), \
+            mock.patch.object(matcher.product_matcher, 'match_by_type', side_effect=recording_match_by_type):
+        matcher._build_ml_models(database_products)
+        candidates = matcher._retrieve_candidates(json_data, database_products)
+        matches = matcher.match_products(json_data)
+
+    assert len(seen_sizes) == len(json_data)
+    assert max(seen_sizes) <= 25
+    for item, item_candidates in zip(json_data, candidates):
+        products, scores = item_candidates
+        assert products[0]['Product Name*'].lower() == item['inventory_name'].lower() or scores[0] >= 0.999
+    matched_names = {m.match_data['Product Name*'] for m in matches}
+    assert all(item['inventory_name'] in matched_names for item in json_data)
+    print("✅ Candidate narrowing correct")
+
+
+if __name__ == "__main__":
+    test_top_k_matches_brute_force()
+    test_index_persisted_by_fingerprint()
+    test_type_matcher_only_sees_candidates()
+    print("\n🎉 All JSON matcher retrieval tests passed")
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Test script for the shared manifest fetcher: conditional GETs, gzip decoding
+and the content-addressed parsed-manifest cache, against a local HTTP server.
+"""
+
+import base64
+import gzip
+import json
+import os
+import sys
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+# Add the project root to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from src.core.data import manifest_fetcher
+from src.core.data.manifest_fetcher import (
+    ManifestFetcher, SOURCE_CONTENT, SOURCE_DATA_URL, SOURCE_NETWORK, SOURCE_NOT_MODIFIED
+)
+
+MANIFEST = {
+    'from_license_name': 'Dank Czar',
+    'inventory_transfer_items': [
+        {'product_name': f'Blue Dream Flower {i}g', 'inventory_id': str(i), 'qty': i} for i in range(50)
+    ],
+}
+
+
+class _ManifestServer:
+    """Local stand-in for a manifest host; records what each request sent."""
+
+    def __init__(self, validators=True, compress=False):
+        body = json.dumps(MANIFEST).encode('utf-8')
+        self.requests = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.requests.append(dict(self.headers))
+                if validators and self.headers.get('If-None-Match') == '"v1"':
+                    self.send_response(304)
+                    self.end_headers()
+                    return
+                payload = gzip.compress(body) if compress else body
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                if compress:
+                    self.send_header('Content-Encoding', 'gzip')
+                if validators:
+                    self.send_header('ETag', '"v1"')
+                    self.send_header('Last-Modified', 'Tue, 01 Jul 2025 00:00:00 GMT')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.httpd.server_address[1]}/manifest.json'
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def test_conditional_get_skips_transfer_and_parse():
+    """The second fetch sends validators, gets a 304 and reuses the parsed copy."""
+    print("🧪 Testing conditional GET")
+    server = _ManifestServer()
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            fetcher = ManifestFetcher(cache_dir=tmp)
+            first = fetcher.fetch(server.url)
+            assert first.source == SOURCE_NETWORK and first.payload == MANIFEST
+            first.payload['inventory_transfer_items'][0]['vendor'] = 'mutated'
+
+            with mock.patch.object(manifest_fetcher.json, 'loads', side_effect=AssertionError('re-parsed')):
+                second = fetcher.fetch(server.url)
+            assert second.source == SOURCE_NOT_MODIFIED
+            assert second.payload == MANIFEST  # callers get fresh copies
+            assert server.requests[1]['If-None-Match'] == '"v1"'
+            assert server.requests[1]['If-Modified-Since'] == 'Tue, 01 Jul 2025 00:00:00 GMT'
+
+            # A new process reuses the on-disk index and parsed manifest
+            restarted = ManifestFetcher(cache_dir=tmp)
+            assert restarted.fetch(server.url).source == SOURCE_NOT_MODIFIED
+            assert fetcher.get_stats()['bytes_downloaded'] == len(json.dumps(MANIFEST))
+    finally:
+        server.close()
+    print("✅ Conditional GET correct")
+
+
+def test_gzip_body_is_content_addressed():
+    """Without validators, identical (gzip-decoded) bytes are not parsed twice."""
+    print("🧪 Testing gzip decoding and content-addressed cache")
+    server = _ManifestServer(validators=False, compress=True)
+    try:
+        fetcher = ManifestFetcher(cache_dir=None)
+        assert fetcher.fetch(server.url).payload == MANIFEST
+        with mock.patch.object(manifest_fetcher.json, 'loads', side_effect=AssertionError('re-parsed')):
+            again = fetcher.fetch(server.url + '?copy=1')
+        assert again.source == SOURCE_CONTENT and again.payload == MANIFEST
+        assert 'gzip' in server.requests[0]['Accept-Encoding']
+        assert server.requests[0]['Connection'] == 'keep-alive'
+    finally:
+        server.close()
+    print("✅ Gzip and content cache correct")
+
+
+def test_stream_replays_cached_manifest():
+    """Streaming downloads incrementally, and replays a cached manifest on 304."""
+    print("🧪 Testing streamed fetch")
+    server = _ManifestServer(compress=True)
+    try:
+        fetcher = ManifestFetcher(cache_dir=None)
+        streamed = fetcher.stream(server.url)
+        assert list(streamed) == MANIFEST['inventory_transfer_items']
+        assert streamed.header['from_license_name'] == 'Dank Czar'
+
+        fetcher.fetch(server.url)  # populate the parsed cache
+        replay = fetcher.stream(server.url)
+        assert replay.header['from_license_name'] == 'Dank Czar'
+        assert len(list(replay)) == 50
+        assert server.requests[-1]['If-None-Match'] == '"v1"'
+        stats = fetcher.get_stats()
+        assert stats['streamed'] == 1 and stats[SOURCE_NOT_MODIFIED] == 1
+    finally:
+        server.close()
+    print("✅ Streamed fetch correct")
+
+
+def test_data_url():
+    """data: URLs are decoded and share the parsed cache."""
+    print("🧪 Testing data URLs")
+    fetcher = ManifestFetcher(cache_dir=None)
+    encoded = base64.b64encode(json.dumps(MANIFEST).encode()).decode()
+    result = fetcher.fetch(f'data:application/json;base64,{encoded}')
+    assert result.source == SOURCE_DATA_URL and result.payload == MANIFEST
+    assert fetcher.fetch_json('data:application/json,{"a": 1}') == {'a': 1}
+    print("✅ Data URLs correct")
+
+
+def test_credentials_only_for_bamboo():
+    """The fetcher sends only the caller's headers; the matcher adds Bamboo credentials for Bamboo hosts only."""
+    print("🧪 Testing credential scoping")
+    from src.core.data.json_matcher import JSONMatcher
+    server = _ManifestServer()
+    env = {'BAMBOO_API_KEY': 'secret-key', 'BAMBOO_AUTH_TOKEN': 'secret-token'}
+    try:
+        with mock.patch.dict(os.environ, env):
+            fetcher = ManifestFetcher(cache_dir=None)
+            fetcher.fetch(server.url)
+            list(fetcher.stream(server.url + '?stream=1'))
+            assert not [h for h in server.requests if 'X-API-Key' in h or 'Authorization' in h]
+
+            assert manifest_fetcher.is_bamboo_url('https://api-trace.getbamboo.com/shared/manifests/json/1')
+            assert not manifest_fetcher.is_bamboo_url('https://getbamboo.com.attacker.example/x')
+            assert not manifest_fetcher.is_bamboo_url('http://api-trace.getbamboo.com/x')
+            assert not manifest_fetcher.is_bamboo_url(server.url)
+
+            shared = mock.Mock()
+            with mock.patch('src.core.data.json_matcher.get_manifest_fetcher', return_value=shared):
+                JSONMatcher._fetch_manifest_payload(None, server.url)
+                assert shared.fetch_json.call_args.kwargs['headers'] == {}
+                JSONMatcher._fetch_manifest_payload(None, 'https://api-trace.getbamboo.com/manifest/1')
+                assert shared.fetch_json.call_args.kwargs['headers'] == {
+                    'X-API-Key': 'secret-key', 'Authorization': 'Bearer secret-token'}
+        with mock.patch.dict(os.environ, {'BAMBOO_API_HOSTS': 'manifests.example.org'}):
+            assert manifest_fetcher.is_bamboo_url('https://manifests.example.org/1')
+            assert not manifest_fetcher.is_bamboo_url('https://api-trace.getbamboo.com/1')
+    finally:
+        server.close()
+    print("✅ Credential scoping correct")
+
+
+if __name__ == "__main__":
+    test_conditional_get_skips_transfer_and_parse()
+    test_gzip_body_is_content_addressed()
+    test_stream_replays_cached_manifest()
+    test_data_url()
+    test_credentials_only_for_bamboo()
+    print("\n🎉 All manifest fetcher tests passed")
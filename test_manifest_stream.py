@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Test script for the streaming manifest parser: items are yielded before the
+whole document has arrived, with either ijson or the pure-Python parser.
+"""
+
+import json
+import os
+import sys
+
+# Add the project root to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from src.core.data.manifest_stream import (
+    IJSON_AVAILABLE, ManifestStream, iter_batches, iter_manifest_products
+)
+
+MANIFEST = {
+    'from_license_name': 'Dank Czar',
+    'est_arrival_at': '2025-07-01T10:00:00',
+    'inventory_transfer_items': [{
+        'product_name': f'Blue Dream Flower {i}g – Grün',
+        'inventory_id': str(i),
+        'qty': i * 1.5,
+        'lab_result_data': {
+            'potency': [{'type': 'thc', 'value': 21.37, 'unit': 'pct'}, {'type': 'cbd', 'value': 0.4, 'unit': 'pct'}],
+            'coa': f'https://example.com/coa/{i}.pdf',
+            'raw_panels': ['x' * 200] * 20,
+        },
+    } for i in range(200)],
+}
+
+
+def _parsers():
+    return [True, False] if IJSON_AVAILABLE else [False]
+
+
+class _CountingChunks:
+    """Byte chunks that record how far the consumer has read."""
+
+    def __init__(self, data, size):
+        self.data, self.size, self.consumed = data, size, 0
+
+    def __iter__(self):
+        for start in range(0, len(self.data), self.size):
+            self.consumed += 1
+            yield self.data[start:start + self.size]
+
+
+def test_items_stream_before_document_ends():
+    """The first item is yielded after a fraction of the body, and all items match json.loads."""
+    print("🧪 Testing incremental item parsing")
+    body = json.dumps(MANIFEST, ensure_ascii=False).encode('utf-8')
+    for use_ijson in _parsers():
+        chunks = _CountingChunks(body, 997)  # odd size splits multi-byte characters
+        stream = ManifestStream(chunks, use_ijson=use_ijson)
+        iterator = iter(stream)
+        first = next(iterator)
+        total_chunks = -(-len(body) // 997)
+        assert chunks.consumed < total_chunks / 10, (use_ijson, chunks.consumed, total_chunks)
+        assert stream.header['from_license_name'] == 'Dank Czar'
+        assert [first] + list(iterator) == MANIFEST['inventory_transfer_items']
+        assert stream.items_seen == 200
+    print("✅ Incremental parsing correct")
+
+
+def test_bare_list_and_payload_replay():
+    """Bare item lists stream too, and cached payloads replay through the same interface."""
+    print("🧪 Testing list manifests and payload replay")
+    items = [{'product_name': 'A'}, {'product_name': 'B'}]
+    for use_ijson in _parsers():
+        assert list(ManifestStream.from_bytes(json.dumps(items).encode(), chunk_size=3, use_ijson=use_ijson)) == items
+    replay = ManifestStream.from_payload(MANIFEST)
+    assert replay.header == {'from_license_name': 'Dank Czar', 'est_arrival_at': '2025-07-01T10:00:00'}
+    assert len(list(replay)) == 200
+    print("✅ List and replay correct")
+
+
+def test_products_prepared_on_the_fly():
+    """Vendor and cannabinoids are extracted per item and raw lab data is dropped."""
+    print("🧪 Testing per-item preparation")
+    body = json.dumps(MANIFEST).encode('utf-8')
+    stream = ManifestStream.from_bytes(body, chunk_size=4096)
+    batches = list(iter_batches(iter_manifest_products(stream), 64))
+    assert [len(b) for b in batches] == [64, 64, 64, 8]
+    product = batches[0][0]
+    assert product['vendor'] == 'Dank Czar'
+    assert product['thc'] == 21.4 and product['cbd'] == 0.4
+    assert product['coa'] == 'https://example.com/coa/0.pdf'
+    assert 'lab_result_data' not in product
+    print("✅ Per-item preparation correct")
+
+
+if __name__ == "__main__":
+    test_items_stream_before_document_ends()
+    test_bare_list_and_payload_replay()
+    test_products_prepared_on_the_fly()
+    print("\n🎉 All manifest stream tests passed")
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Test script for the in-process metrics registry behind /api/performance.
+"""
+
+import json
+import os
+import sys
+import tempfile
+from unittest import mock
+
+# Add the project root to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from src.core.utils.metrics import MetricsRegistry, STAGES
+
+
+def test_route_percentiles():
+    """Per-route histograms report p50/p95/p99 over recorded requests."""
+    print("🧪 Testing route latency percentiles")
+    registry = MetricsRegistry(ring_path=None)
+    for i in range(1, 101):
+        registry.observe_request('/api/generate', 'POST', 200, i / 1000.0)
+
+    summary = registry.route_latency()['POST /api/generate']
+    assert summary['count'] == 100
+    assert summary['p50'] == 0.05
+    assert summary['p95'] == 0.095
+    assert summary['p99'] == 0.099
+    print("✅ Route percentiles correct")
+
+
+def test_stage_timers_and_counters():
+    """Stage timers and cache/DB counters are aggregated by label."""
+    print("🧪 Testing stage timers and counters")
+    registry = MetricsRegistry(ring_path=None)
+    for stage in STAGES:
+        with registry.stage(stage):
+            pass
+    registry.cache_hit('excel_file')
+    registry.cache_hit('excel_file')
+    registry.cache_miss('product_db')
+    registry.inc('db_queries_total', 5)
+
+    assert set(registry.stage_latency()) == set(STAGES)
+    assert registry.counter_totals('cache_hits_total', 'cache') == {'excel_file': 2}
+    assert registry.counter_totals('db_queries_total') == {'total': 5}
+    print("✅ Stage timers and counters correct")
+
+
+def test_rollups_persist_to_ring_buffer():
+    """Rollups survive a new registry and the file is capped at capacity."""
+    print("🧪 Testing ring-buffer persistence")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'metrics.jsonl')
+        registry = MetricsRegistry(ring_path=path, ring_capacity=3)
+        for _ in range(5):
+            registry.observe_request('/api/status', 'GET', 200, 0.01)
+            registry.rollup()
+
+        reloaded = MetricsRegistry(ring_path=path, ring_capacity=3)
+        history = reloaded.history()
+        assert len(history) == 3
+        assert history[-1]['routes']['GET /api/status']['count'] == 5
+        with open(path) as f:
+            assert len(f.readlines()) == 3
+        assert reloaded.history(0) == []
+    print("✅ Ring buffer persistence correct")
+
+
+def test_worker_ring_files_merge():
+    """Each worker writes its own rollup file; history merges them instead of one overwriting another."""
+    print("🧪 Testing per-worker rollup files")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'metrics_rollups.jsonl')
+        worker = MetricsRegistry(ring_path=path, per_worker_ring=True)
+        # Another worker's rollups, already on disk
+        with open(os.path.join(tmp, 'metrics_rollups.99999999.jsonl'), 'w') as f:
+            f.write(json.dumps({'timestamp': 1.0, 'pid': 99999999, 'window': {}}) + '\n')
+        worker.observe_request('/api/status', 'GET', 200, 0.01)
+        worker.rollup()
+        worker.rollup()
+
+        assert os.path.exists(os.path.join(tmp, f'metrics_rollups.{os.getpid()}.jsonl'))
+        assert not os.path.exists(path)
+        history = MetricsRegistry(ring_path=path, per_worker_ring=True).history()
+        assert [record['pid'] for record in history] == [99999999, os.getpid(), os.getpid()]
+        assert len(worker.history(1)) == 1 and worker.history(0) == []
+    print("✅ Per-worker rollup files correct")
+
+
+def test_prometheus_exposition():
+    """Prometheus output contains histogram buckets and counters."""
+    print("🧪 Testing Prometheus exposition")
+    registry = MetricsRegistry(ring_path=None)
+    registry.observe_request('/api/json-match', 'POST', 200, 0.2)
+    registry.inc('db_queries_total', 3)
+
+    text = registry.render_prometheus()
+    assert '# TYPE agt_http_request_duration_seconds histogram' in text
+    assert 'agt_http_request_duration_seconds_bucket{method="POST",route="/api/json-match",le="0.25"} 1' in text
+    assert 'agt_http_request_duration_seconds_bucket{method="POST",route="/api/json-match",le="0.1"} 0' in text
+    assert 'agt_db_queries_total 3' in text
+    print("✅ Prometheus exposition correct")
+
+
+def test_db_queries_are_sampled():
+    """SQL statements are counted in samples, so the registry lock is not taken per statement."""
+    print("🧪 Testing sampled DB query counter")
+    from src.core.data import product_database
+    from src.core.data.product_database import DB_QUERY_SAMPLE_EVERY, ProductDatabase
+    registry = MetricsRegistry(ring_path=None)
+    with tempfile.TemporaryDirectory() as tmp, \
+            mock.patch.object(product_database, 'get_metrics_registry', return_value=registry), \
+            mock.patch.object(registry, 'inc', wraps=registry.inc) as inc:
+        db = ProductDatabase(db_path=os.path.join(tmp, 'queries.db'))
+        conn = db._get_connection()
+        for _ in range(DB_QUERY_SAMPLE_EVERY * 3 - 1):
+            conn.execute("SELECT 1")
+        assert inc.call_count == 2
+        conn.execute("SELECT 1")
+        conn.close()
+    # Every DB_QUERY_SAMPLE_EVERY-th statement records a whole sample
+    assert inc.call_count == 3
+    assert registry.counter_totals('db_queries_total') == {'total': DB_QUERY_SAMPLE_EVERY * 3}
+    print("✅ Sampled DB query counter correct")
+
+
+if __name__ == "__main__":
+    test_route_percentiles()
+    test_stage_timers_and_counters()
+    test_rollups_persist_to_ring_buffer()
+    test_worker_ring_files_merge()
+    test_prometheus_exposition()
+    test_db_queries_are_sampled()
+    print("\n🎉 All metrics registry tests passed")
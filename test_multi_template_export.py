@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Test script for multi-template export: one selection rendered in several
+template types and returned as a single zip.
+"""
+
+import io
+import os
+import sys
+import zipfile
+from unittest import mock
+
+# Add the project root to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import app as app_module
+from docx import Document
+
+RECORDS = [
+    {
+        'ProductName': 'Blue Dream Pre-Roll', 'Product Name*': 'Blue Dream Pre-Roll', 'ProductType': 'Pre-Roll',
+        'Lineage': 'SATIVA', 'ProductBrand': 'Omega', 'Product Brand': 'Omega', 'Vendor': 'Omega Labs',
+        'Price': '10', 'Weight*': '1', 'Units': 'g', 'DescAndWeight': 'Blue Dream Pre-Roll - 1g',
+        'Description': 'Blue Dream Pre-Roll', 'THC test result': '22', 'CBD test result': '0',
+        'Ratio_or_THC_CBD': 'THC: 22% CBD: 0%', 'DOH': 'No', 'Product Strain': 'Blue Dream',
+    },
+    {
+        'ProductName': 'Wedding Cake Flower', 'Product Name*': 'Wedding Cake Flower', 'ProductType': 'Flower',
+        'Lineage': 'HYBRID', 'ProductBrand': 'Omega', 'Product Brand': 'Omega', 'Vendor': 'Omega Labs',
+        'Price': '35', 'Weight*': '3.5', 'Units': 'g', 'DescAndWeight': 'Wedding Cake Flower - 3.5g',
+        'Description': 'Wedding Cake Flower', 'THC test result': '25', 'CBD test result': '0',
+        'Ratio_or_THC_CBD': 'THC: 25% CBD: 0%', 'DOH': 'No', 'Product Strain': 'Wedding Cake',
+    },
+]
+
+
+def post_multi(payload):
+    with app_module.app.test_client() as client:
+        return client.post('/api/generate-multi', json=payload)
+
+
+def test_zip_contains_each_template_in_request_order():
+    """Records are resolved once and every requested template lands in the zip, in order."""
+    print("🧪 Testing multi-template zip export")
+    with mock.patch.object(app_module, '_resolve_generation_records', return_value=(RECORDS, None)) as resolve:
+        response = post_multi({'template_types': ['mini', 'vertical', 'horizontal', 'vertical'], 'selected_tags': ['x']})
+    assert response.status_code == 200, response.get_data(as_text=True)
+    assert response.mimetype == 'application/zip'
+    assert resolve.call_count == 1
+
+    with zipfile.ZipFile(io.BytesIO(response.get_data())) as archive:
+        names = archive.namelist()
+        assert [name.split('_')[2] for name in names] == ['MINI', 'VERT', 'HORIZ'], names
+        for name in names:
+            assert name.endswith('.docx')
+            Document(io.BytesIO(archive.read(name)))
+    print("✅ Multi-template zip correct")
+
+
+def test_rejects_unknown_or_missing_types():
+    """Requests without template types, or with unknown ones, fail before any record lookup."""
+    print("🧪 Testing template type validation")
+    with mock.patch.object(app_module, '_resolve_generation_records') as resolve:
+        assert post_multi({'template_types': [], 'selected_tags': ['x']}).status_code == 400
+        response = post_multi({'template_types': ['vertical', 'poster'], 'selected_tags': ['x']})
+        assert response.status_code == 400 and 'poster' in response.get_json()['error']
+    assert resolve.call_count == 0
+    print("✅ Template type validation correct")
+
+
+def test_resolution_errors_pass_through():
+    """An empty selection reports the same error /api/generate would."""
+    print("🧪 Testing record resolution errors")
+    error = ('No tags selected. Please select at least one tag before generating labels.', 400)
+    with mock.patch.object(app_module, '_resolve_generation_records', return_value=(None, error)):
+        response = post_multi({'template_types': ['vertical']})
+    assert response.status_code == 400 and response.get_json()['error'] == error[0]
+    print("✅ Record resolution errors correct")
+
+
+if __name__ == "__main__":
+    test_zip_contains_each_template_in_request_order()
+    test_rejects_unknown_or_missing_types()
+    test_resolution_errors_pass_through()
+    print("\n🎉 All multi-template export tests passed")
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Test script for the shared memoized normalization module and the call sites
+routed through it.
+"""
+
+import os
+import sys
+
+# Add the project root to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from src.core.utils import normalization
+from src.core.utils.normalization import (
+    canonical_strain_alias, extract_key_terms, normalize_match_text, normalize_name,
+    normalize_product_name, normalize_strain_name, normalize_text, strip_medically_compliant_prefix
+)
+
+
+def test_normalizer_outputs():
+    """Each normalizer keeps the behaviour of the function it replaced."""
+    print("🧪 Testing normalizer outputs")
+    assert strip_medically_compliant_prefix('  Medically Compliant - Blue Dream ') == 'Blue Dream'
+    assert normalize_product_name('Med Compliant- Blue Dream Pre-Roll - 1g') == 'blue dream pre roll'
+    assert normalize_product_name(['Gelato 3.5g']) == 'gelato'
+    assert normalize_match_text('Dank Czar Wax 1g!') == 'dank czar wax'
+    assert normalize_text('  Dcz Holdings, Inc. ') == 'dcz holdings inc'
+    assert normalize_text(None) == ''
+    assert normalize_name('Blue\u2011Dream  Flower!') == 'blue dream flower'
+    assert normalize_strain_name('strain Blue  Dream') == 'blue dream'
+    assert normalize_strain_name('OG') == 'og kush'
+    assert normalize_strain_name('Mixed') == '' and normalize_strain_name(3) == ''
+    assert canonical_strain_alias(' GSC ') == 'girl scout cookies' and canonical_strain_alias('') is None
+    assert extract_key_terms('Medically Compliant - Runtz Live-Resin 1g') == {'runtz', 'live', 'resin', 'live-resin'}
+    print("✅ Normalizer outputs correct")
+
+
+def test_memoized_and_interned():
+    """Repeated names hit the cache, share one string, and key terms are safe to mutate."""
+    print("🧪 Testing memoization")
+    normalization.clear_normalization_caches()
+    first = normalize_product_name('Wedding Cake Flower - 3.5g')
+    second = normalize_product_name(''.join(['Wedding Cake ', 'Flower - 3.5g']))
+    assert first is second
+    stats = normalization.get_normalization_stats()['normalize_product_name']
+    assert stats['hits'] == 1 and stats['misses'] == 1 and stats['hit_rate'] == 0.5
+
+    terms = extract_key_terms('Gelato Wax')
+    terms.add('mutated')
+    assert 'mutated' not in extract_key_terms('Gelato Wax')
+    print("✅ Memoization correct")
+
+
+def test_call_sites_route_to_module():
+    """The matchers and the Excel processor use the shared implementations."""
+    print("🧪 Testing routed call sites")
+    from src.core.data import excel_processor, json_matcher
+    from src.core.data.advanced_matcher import AdvancedMatcher
+
+    assert json_matcher.normalize_product_name is normalize_product_name
+    assert excel_processor.normalize_strain_name is normalize_strain_name
+    matcher = json_matcher.JSONMatcher.__new__(json_matcher.JSONMatcher)
+    assert matcher._normalize('Blue Dream 1g') == 'blue dream'
+    assert matcher._normalize_vendor_name('Omega Labs!') == 'omega labs'
+    assert matcher._extract_key_terms('Omega Gelato Wax') == {'omega', 'gelato', 'wax'}
+    assert AdvancedMatcher().normalize_text('Airo  Pro.') == 'airo pro'
+    print("✅ Routed call sites correct")
+
+
+if __name__ == "__main__":
+    test_normalizer_outputs()
+    test_memoized_and_interned()
+    test_call_sites_route_to_module()
+    print("\n🎉 All normalization tests passed")
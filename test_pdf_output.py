@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Test script for PDF output of generated labels: the content-hash cached
+converter and the output_format option of the generation endpoints.
+"""
+
+import io
+import os
+import sys
+import threading
+import zipfile
+from unittest import mock
+
+# Add the project root to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import app as app_module
+from src.core.generation import pdf_converter
+from src.core.generation.pdf_converter import PdfConverter
+from test_multi_template_export import RECORDS
+
+
+def fake_pdf(docx_bytes):
+    return b'%PDF-1.7 ' + pdf_converter.document_hash(docx_bytes).encode()
+
+
+def test_converter_caches_by_content_hash():
+    """Identical documents are converted once, concurrent requests share one conversion."""
+    print("🧪 Testing PDF cache by content hash")
+    converter = PdfConverter(max_workers=2)
+    release = threading.Event()
+    calls = []
+
+    def convert(docx_bytes):
+        calls.append(docx_bytes)
+        release.wait(5)
+        return fake_pdf(docx_bytes)
+
+    with mock.patch.object(converter, '_convert', side_effect=convert):
+        first, second = converter.submit(b'doc-a'), converter.submit(b'doc-a')
+        assert first is second
+        release.set()
+        assert first.result(5) == fake_pdf(b'doc-a')
+        assert converter.convert(b'doc-a') == fake_pdf(b'doc-a')
+        assert converter.convert(b'doc-b') == fake_pdf(b'doc-b')
+    assert calls == [b'doc-a', b'doc-b']
+    stats = converter.stats()
+    assert stats['converted'] == 2 and stats['cache_hits'] == 1 and stats['cached_documents'] == 2
+    converter.shutdown()
+    print("✅ PDF cache correct")
+
+
+def test_soffice_instances_do_not_share_profiles():
+    """Concurrent soffice runs get one profile each, and every listener its own ports and profile."""
+    print("🧪 Testing LibreOffice profile and port isolation")
+    converter = PdfConverter(max_workers=2)
+    both_running = threading.Barrier(2, timeout=5)
+    profiles = []
+
+    def run(args, **kwargs):
+        profiles.append(next(arg for arg in args if arg.startswith('-env:UserInstallation=')))
+        both_running.wait()
+        with open(os.path.join(args[args.index('--outdir') + 1], 'labels.pdf'), 'wb') as f:
+            f.write(b'%PDF-1.7')
+        return mock.Mock(returncode=0, stderr=b'')
+
+    with mock.patch.object(pdf_converter, 'PDF_AVAILABLE', True), \
+            mock.patch.object(pdf_converter, 'LISTENER_AVAILABLE', False), \
+            mock.patch.object(pdf_converter, 'SOFFICE_BINARY', 'soffice'), \
+            mock.patch.object(pdf_converter.subprocess, 'run', side_effect=run):
+        futures = [converter.submit(b'doc-a'), converter.submit(b'doc-b')]
+        assert [future.result(10) for future in futures] == [b'%PDF-1.7', b'%PDF-1.7']
+    assert len(set(profiles)) == 2, profiles
+    assert all(str(os.getpid()) in profile for profile in profiles)
+    converter.shutdown()
+
+    listeners = [PdfConverter(max_workers=1), PdfConverter(max_workers=1)]
+    commands = []
+
+    def popen(args, **kwargs):
+        commands.append(args)
+        return mock.Mock(poll=mock.Mock(return_value=None))
+
+    with mock.patch.object(pdf_converter, 'UNOSERVER_BINARY', 'unoserver'), \
+            mock.patch.object(pdf_converter, 'SOFFICE_BINARY', 'soffice'), \
+            mock.patch.object(pdf_converter.subprocess, 'Popen', side_effect=popen), \
+            mock.patch.object(PdfConverter, '_listener_ready', return_value=True):
+        assert all(listener._ensure_listener() for listener in listeners)
+
+    def option(args, name):
+        return args[args.index(name) + 1]
+    ports = [option(args, '--port') for args in commands] + [option(args, '--uno-port') for args in commands]
+    assert len(set(ports)) == 4, ports
+    assert option(commands[0], '--user-installation').startswith(pdf_converter.PDF_PROFILE_DIR)
+    assert [listener._listener_port for listener in listeners] == [int(option(args, '--port')) for args in commands]
+
+    # A listener that never becomes ready is stopped, and the next call starts a new one
+    stuck = PdfConverter(max_workers=1)
+    started = []
+
+    def popen_stuck(args, **kwargs):
+        started.append(mock.Mock(poll=mock.Mock(return_value=None)))
+        return started[-1]
+
+    with mock.patch.object(pdf_converter, 'UNOSERVER_BINARY', 'unoserver'), \
+            mock.patch.object(pdf_converter, 'SOFFICE_BINARY', 'soffice'), \
+            mock.patch.object(pdf_converter, 'LISTENER_STARTUP_TIMEOUT', 0.01), \
+            mock.patch.object(pdf_converter.subprocess, 'Popen', side_effect=popen_stuck), \
+            mock.patch.object(PdfConverter, '_listener_ready', return_value=False):
+        assert not stuck._ensure_listener()
+        started[0].terminate.assert_called_once()
+        assert stuck._listener is None and stuck._listener_port is None
+        assert not stuck._ensure_listener()
+    assert len(started) == 2
+    print("✅ Profile and port isolation correct")
+
+
+def test_generate_output_formats():
+    """/api/generate returns a PDF, or a zip with both documents, when asked."""
+    print("🧪 Testing output_format on /api/generate")
+    converter = PdfConverter(max_workers=1)
+    payload = {'template_type': 'vertical', 'selected_tags': ['x']}
+    with mock.patch.object(app_module, '_resolve_generation_records', return_value=(RECORDS, None)), \
+            mock.patch.object(app_module, 'PDF_AVAILABLE', True), \
+            mock.patch.object(app_module, 'get_pdf_converter', return_value=converter), \
+            mock.patch.object(converter, '_convert', side_effect=fake_pdf), \
+            app_module.app.test_client() as client:
+        response = client.post('/api/generate', json={**payload, 'output_format': 'pdf'})
+        assert response.status_code == 200, response.get_data(as_text=True)
+        assert response.mimetype == 'application/pdf'
+        assert response.get_data().startswith(b'%PDF')
+        assert '.pdf' in response.headers['Content-Disposition']
+
+        response = client.post('/api/generate', json={**payload, 'output_format': 'both'})
+        assert response.mimetype == 'application/zip'
+        with zipfile.ZipFile(io.BytesIO(response.get_data())) as archive:
+            names = archive.namelist()
+            assert [os.path.splitext(name)[1] for name in names] == ['.docx', '.pdf']
+            assert archive.read(names[1]) == fake_pdf(archive.read(names[0]))
+
+        response = client.post('/api/generate-multi', json={**payload, 'template_types': ['vertical', 'mini'], 'output_format': 'pdf'})
+        with zipfile.ZipFile(io.BytesIO(response.get_data())) as archive:
+            assert [name.split('_')[2] for name in archive.namelist()] == ['VERT', 'MINI']
+            assert all(name.endswith('.pdf') for name in archive.namelist())
+    converter.shutdown()
+    print("✅ output_format correct")
+
+
+def test_rejects_unknown_or_unavailable_formats():
+    """Unknown formats are a client error; PDF without LibreOffice is reported as unavailable."""
+    print("🧪 Testing output_format validation")
+    with mock.patch.object(app_module, '_resolve_generation_records') as resolve, \
+            app_module.app.test_client() as client:
+        assert client.post('/api/generate', json={'output_format': 'tiff'}).status_code == 400
+        with mock.patch.object(app_module, 'PDF_AVAILABLE', False):
+            assert client.post('/api/generate', json={'output_format': 'pdf'}).status_code == 503
+            assert client.post('/api/generate-multi', json={'template_types': ['vertical'], 'output_format': 'both'}).status_code == 503
+    assert resolve.call_count == 0
+    print("✅ output_format validation correct")
+
+
+if __name__ == "__main__":
+    test_converter_caches_by_content_hash()
+    test_soffice_instances_do_not_share_profiles()
+    test_generate_output_formats()
+    test_rejects_unknown_or_unavailable_formats()
+    print("\n🎉 All PDF output tests passed")
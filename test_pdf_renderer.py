@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Test script for the direct PDF label renderer: grid geometry against the
+expanded Word templates, field extraction, a rendering speed floor and (when
+LibreOffice and PyMuPDF are installed) a per-region visual diff against the
+docx -> pdf output.
+"""
+
+import os
+import statistics
+import sys
+import time
+
+import pytest
+
+# Add the project root to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from docx.oxml.ns import qn
+
+from src.core.generation.pdf_converter import PDF_AVAILABLE, get_pdf_converter
+from src.core.generation.pdf_renderer import (
+    QR_BORDER, QRCODE_AVAILABLE, REPORTLAB_AVAILABLE, SUPPORTED_TEMPLATES, label_fields, lineage_color,
+    page_geometry, qr_pixels, render_labels_pdf
+)
+from src.core.generation.template_processor import TemplateProcessor, get_font_scheme
+from test_multi_template_export import RECORDS
+
+try:
+    import fitz  # PyMuPDF, only used to rasterize PDFs for the visual diff
+    FITZ_AVAILABLE = True
+except ImportError:
+    FITZ_AVAILABLE = False
+
+
+def test_geometry_matches_expanded_templates():
+    """Cell sizes and counts equal the expanded .docx grid after enforce_fixed_cell_dimensions; cells sit inside the page."""
+    print("🧪 Testing page geometry")
+    from docx import Document
+    from src.core.generation.docx_formatting import enforce_fixed_cell_dimensions
+    for template_type in SUPPORTED_TEMPLATES:
+        geometry = page_geometry(template_type)
+        processor = TemplateProcessor(template_type, get_font_scheme(template_type), 1.0)
+        table = enforce_fixed_cell_dimensions(Document(processor._expanded_template_buffer).tables[0], template_type)
+        grid_widths = [int(col.get(qn('w:w'))) / 20 for col in table._tbl.tblGrid.findall(qn('w:gridCol'))]
+        assert len(geometry.cells) == len(table.rows) * len(grid_widths), template_type
+        for cell in geometry.cells:
+            assert abs(cell.width - grid_widths[0]) < 1, (template_type, cell.width, grid_widths[0])
+            assert abs(cell.height - table.rows[0].height.pt) < 1, (template_type, cell.height)
+            assert cell.x >= 0 and cell.y >= 0
+            assert cell.x + cell.width <= geometry.width + 0.01 and cell.y + cell.height <= geometry.height
+    assert page_geometry('horizontal').width > page_geometry('horizontal').height  # landscape sheet
+    print("✅ Page geometry correct")
+
+
+def test_label_fields():
+    """Records are reduced to the values each label shows, markers stripped, lineage colors from the map."""
+    print("🧪 Testing label fields")
+    fields = label_fields({**RECORDS[0], 'ProductType': 'pre-roll', 'Lineage': 'LINEAGE_STARTsativaLINEAGE_END', 'Price': '10'})
+    assert fields['Lineage'] == 'SATIVA' and fields['Price'] == '$10' and fields['ProductStrain'] == 'Blue Dream'
+    edible = label_fields({'ProductName': 'Gummies', 'ProductType': 'Edible (Solid)', 'Lineage': 'INDICA', 'WeightUnits': '100mg'})
+    assert edible['LineageKey'] == 'MIXED' and edible['Lineage'] == '' and edible['DescAndWeight'] == 'Gummies - 100mg'
+    assert lineage_color('HYBRID') == (0x27 / 255, 0xAE / 255, 0x60 / 255)
+    assert lineage_color('UNKNOWN') == lineage_color('MIXED')
+    print("✅ Label fields correct")
+
+
+def test_qr_pixels():
+    """qr_pixels gives one gray pixel per module of qrcode's matrix, quiet zone included, and caches it."""
+    print("🧪 Testing QR pixels")
+    if not QRCODE_AVAILABLE:
+        pytest.skip("qrcode not installed")
+    import qrcode
+    qr_pixels.cache_clear()
+    for text in ('Blue Dream Pre-Roll - 1g', 'Gelato #41 — 3.5g ✓', 'Product 7 ' * 40):
+        qr = qrcode.QRCode(error_correction=qrcode.constants.ERROR_CORRECT_L, border=QR_BORDER)
+        qr.add_data(text)
+        matrix = qr.get_matrix()
+        side, pixels = qr_pixels(text)
+        assert side == len(matrix) and len(pixels) == side * side
+        assert set(pixels[:side]) == {0xff}  # quiet zone row
+        assert pixels[QR_BORDER * side + QR_BORDER] == 0x00  # finder pattern corner
+    assert qr_pixels('Blue Dream Pre-Roll - 1g') is qr_pixels('Blue Dream Pre-Roll - 1g')
+    print("✅ QR pixels correct")
+
+
+MIN_LABELS_PER_SECOND = 1200   # cold renders, fresh QR code per label; ~1,700-2,000/s on a dev laptop
+
+
+def test_render_throughput():
+    """Thousands of labels, each with its own QR code, render at over MIN_LABELS_PER_SECOND on every template."""
+    print("🧪 Testing direct render throughput")
+    if not REPORTLAB_AVAILABLE:
+        pytest.skip("reportlab not installed")
+    records = [{**RECORDS[i % 2], 'ProductName': f"Product {i}", 'DOH': 'YES' if i % 3 else 'NO'} for i in range(2000)]
+    render_labels_pdf(records[:20], 'vertical')  # page geometry, fonts and DOH images loaded once
+    for template_type in SUPPORTED_TEMPLATES:
+        best = 0.0
+        for _ in range(2):
+            qr_pixels.cache_clear()  # every label encodes its QR code
+            start = time.perf_counter()
+            pdf_bytes = render_labels_pdf(records, template_type)
+            best = max(best, len(records) / (time.perf_counter() - start))
+        print(f"   {template_type}: {best:,.0f} labels/second")
+        assert pdf_bytes.startswith(b'%PDF')
+        assert b'/Count %d' % -(-len(records) // len(page_geometry(template_type).cells)) in pdf_bytes
+        assert best >= MIN_LABELS_PER_SECOND, (template_type, round(best))
+    print("✅ Direct render throughput correct")
+
+
+def test_direct_engine_without_libreoffice():
+    """engine=direct serves a PDF even when LibreOffice, which only the docx engine needs, is missing."""
+    print("🧪 Testing engine=direct without LibreOffice")
+    if not REPORTLAB_AVAILABLE:
+        pytest.skip("reportlab not installed")
+    from unittest import mock
+    import app as app_module
+    with mock.patch.object(app_module, '_resolve_generation_records', return_value=(RECORDS, None)), \
+            mock.patch.object(app_module, 'PDF_AVAILABLE', False), \
+            app_module.app.test_client() as client:
+        for output_format in ('pdf', None):
+            payload = {'template_type': 'vertical', 'selected_tags': ['x'], 'engine': 'direct', 'output_format': output_format}
+            response = client.post('/api/generate', json=payload)
+            assert response.status_code == 200, response.get_data(as_text=True)
+            assert response.mimetype == 'application/pdf' and response.get_data().startswith(b'%PDF')
+        docx_pdf = {'template_type': 'vertical', 'selected_tags': ['x'], 'output_format': 'pdf'}
+        assert client.post('/api/generate', json=docx_pdf).status_code == 503
+    print("✅ engine=direct without LibreOffice correct")
+
+
+# Visual diff: both PDFs rasterized at DIFF_DPI; each label cell is split into a REGION_GRID
+DIFF_DPI = 36
+REGION_GRID = (3, 3)
+BACKGROUND_TOLERANCE = 24    # per RGB channel (0-255), median color of the cell
+INK_THRESHOLD = 96           # a pixel this far from the cell background is text or image
+INK_TOLERANCE = 0.25         # share of a region's pixels; absorbs line spacing and font metric differences
+LINE_TOLERANCE = 2           # points, words on one line
+
+
+def _cell_box(geometry, cell):
+    """Cell as (x0, top, x1, bottom) in points from the top-left page corner."""
+    top = geometry.height - cell.y - cell.height
+    return cell.x, top, cell.x + cell.width, top + cell.height
+
+
+def _cell_regions(page, geometry, count):
+    """Per cell: median background color and, per region, the share of ink pixels."""
+    pixmap = page.get_pixmap(dpi=DIFF_DPI, colorspace=fitz.csRGB, alpha=False)
+    scale = DIFF_DPI / 72
+    rows, cols = REGION_GRID
+    cells = []
+    for cell in geometry.cells[:count]:
+        x0, top, x1, bottom = (value * scale for value in _cell_box(geometry, cell))
+        regions = []
+        for row in range(rows):
+            for col in range(cols):
+                xs = range(int(x0 + col * (x1 - x0) / cols) + 1, int(x0 + (col + 1) * (x1 - x0) / cols) - 1)
+                ys = range(int(top + row * (bottom - top) / rows) + 1, int(top + (row + 1) * (bottom - top) / rows) - 1)
+                regions.append([pixmap.pixel(x, y) for y in ys for x in xs])
+        background = tuple(statistics.median_low(channel) for channel in zip(*(p for r in regions for p in r)))
+        ink = [sum(1 for pixel in region if max(abs(a - b) for a, b in zip(pixel, background)) > INK_THRESHOLD) / len(region)
+               for region in regions]
+        cells.append((background, ink))
+    return cells
+
+
+def _cell_words(page, geometry, count):
+    """Per cell: lowercased words in reading order, each with the top of its line."""
+    words = page.get_text('words')
+    cells = []
+    for cell in geometry.cells[:count]:
+        x0, top, x1, bottom = _cell_box(geometry, cell)
+        inside = [w for w in words if x0 <= (w[0] + w[2]) / 2 <= x1 and top <= (w[1] + w[3]) / 2 <= bottom]
+        inside.sort(key=lambda w: (round(w[1] / LINE_TOLERANCE), w[0]))
+        cells.append([(w[4].lower(), w[1]) for w in inside])
+    return cells
+
+
+def test_visual_diff_against_docx():
+    """
+    Every template's direct PDF matches the converted .docx label by label:
+    same background color, similar ink in every region, and each drawn word
+    present in the same cell in the same top-to-bottom order.
+    """
+    print("🧪 Testing visual diff against docx -> pdf")
+    if not REPORTLAB_AVAILABLE:
+        pytest.skip("reportlab not installed")
+    if not PDF_AVAILABLE:
+        pytest.skip("LibreOffice not installed")
+    if not FITZ_AVAILABLE:
+        pytest.skip("PyMuPDF not installed")
+    from app import _render_label_document
+    for template_type in SUPPORTED_TEMPLATES:
+        geometry = page_geometry(template_type)
+        docx_buffer = _render_label_document(template_type, [dict(r) for r in RECORDS], {}, 1.0)
+        expected_page = fitz.open(stream=get_pdf_converter().convert(docx_buffer.getvalue()), filetype='pdf')[0]
+        actual_page = fitz.open(stream=render_labels_pdf(RECORDS, template_type), filetype='pdf')[0]
+
+        expected = _cell_regions(expected_page, geometry, len(RECORDS))
+        actual = _cell_regions(actual_page, geometry, len(RECORDS))
+        for index, ((want_bg, want_ink), (got_bg, got_ink)) in enumerate(zip(expected, actual)):
+            assert max(abs(a - b) for a, b in zip(want_bg, got_bg)) <= BACKGROUND_TOLERANCE, (template_type, index, want_bg, got_bg)
+            for region, (want, got) in enumerate(zip(want_ink, got_ink)):
+                assert abs(want - got) <= INK_TOLERANCE, (template_type, index, region, round(want, 3), round(got, 3))
+
+        expected_words = _cell_words(expected_page, geometry, len(RECORDS))
+        actual_words = _cell_words(actual_page, geometry, len(RECORDS))
+        for index, (want, got) in enumerate(zip(expected_words, actual_words)):
+            assert got, (template_type, index, 'no text drawn')
+            # The docx may show fields the direct renderer leaves out, never the other way round
+            available = {}
+            for word, line_top in want:
+                available.setdefault(word, []).append(line_top)
+            tops = []
+            for word, _ in got:
+                assert available.get(word), (template_type, index, word, [w for w, _ in want])
+                tops.append(available[word].pop(0))
+            assert all(b >= a - LINE_TOLERANCE for a, b in zip(tops, tops[1:])), (template_type, index, got, want)
+    print("✅ Visual diff correct")
+
+
+if __name__ == "__main__":
+    test_geometry_matches_expanded_templates()
+    test_label_fields()
+    test_qr_pixels()
+    test_render_throughput()
+    test_direct_engine_without_libreoffice()
+    test_visual_diff_against_docx()
+    print("\n🎉 All direct PDF renderer tests passed")
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Test script for the server-side selection store: ordered tag-id sets,
+diff-based undo/redo and the move/undo endpoints built on it.
+"""
+
+import os
+import sys
+from types import SimpleNamespace
+from unittest import mock
+
+# Add the project root to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import pandas as pd
+
+from src.core.data.selection_store import SelectionStore, SessionSelection, get_tag_name_index, sync_from_processor
+from src.core.data.tag_index import TagIdRegistry, TagIndex
+
+
+def test_moves_record_only_changed_tags():
+    """Select/deselect/undo/redo keep order and store only the changed ids."""
+    print("🧪 Testing diff-based undo and redo")
+    index = TagIndex(pd.DataFrame({'Product Name*': ['A', 'B', 'C', 'D', 'B', None, ' E ']}))
+    assert len(index) == 5 and index.id_for_name('E') == 4 and index.positions[1] == [1, 4]
+    selection = SessionSelection(index)
+
+    selection.select(index.ids_for(['C', 'A', 'B', 'D'])[0])
+    selection.deselect(index.ids_for(['A', 'D'])[0])
+    assert selection.selected_names() == ['C', 'B']
+    assert selection._undo[-1].removed == ((1, 0), (3, 3)) and not selection._undo[-1].added
+
+    selection.undo()
+    assert selection.selected_names() == ['C', 'A', 'B', 'D']
+    selection.redo()
+    assert selection.selected_names() == ['C', 'B']
+
+    selection.reorder(index.ids_for(['B'])[0])
+    assert selection.selected_names() == ['B', 'C']
+    selection.undo()
+    assert selection.selected_names() == ['C', 'B']
+    selection.redo()
+    assert selection.selected_names() == ['B', 'C']
+    assert selection.available_names() == ['A', 'D', 'E']
+
+    selection.select(index.ids_for(['E'])[0])
+    assert selection.redo_depth == 0 and selection._undo[-1].added == (4,)
+    selection.clear()
+    selection.undo()
+    assert selection.selected_names() == ['B', 'C', 'E']
+    print("✅ Diff-based undo and redo correct")
+
+
+def test_store_rebinds_on_new_data():
+    """A reloaded DataFrame gets a new index with the same tag ids; the selection and history carry over."""
+    print("🧪 Testing rebinding to new data")
+    processor = SimpleNamespace(df=pd.DataFrame({'Product Name*': ['A', 'B', 'C']}))
+    store = SelectionStore(max_sessions=2)
+    selection = store.get('s1', get_tag_name_index(processor))
+    assert get_tag_name_index(processor) is selection.index
+    selection.select(selection.index.ids_for(['C', 'A'])[0])
+
+    processor.df = pd.DataFrame({'Product Name*': ['C', 'X', 'A']})
+    selection = store.get('s1', get_tag_name_index(processor))
+    assert selection.selected_ids == [2, 0] and selection.selected_names() == ['C', 'A']
+    assert selection.undo_depth == 1 and selection.index.id_for_name('X') == 3
+
+    for names in (['C', 'X', 'A'], ['A', 'C', 'X'], ['X', 'A', 'C']):
+        # Freeing the old frame first lets the new one of the same shape take its id
+        processor.df = None
+        processor.df = pd.DataFrame({'Product Name*': names})
+        index = get_tag_name_index(processor)
+        assert index.positions[index.id_for_name('C')] == [names.index('C')]
+
+    store.get('s2', selection.index)
+    store.get('s3', selection.index)
+    assert store.stats()['sessions'] == 2
+    print("✅ Rebinding correct")
+
+
+def test_endpoints_do_not_rebuild_tags():
+    """/api/move-tags and /api/undo-move answer from the store without calling get_available_tags."""
+    print("🧪 Testing move/undo endpoints")
+    import app as app_module
+    names = [f"Product {i}" for i in range(5000)]
+    processor = SimpleNamespace(df=pd.DataFrame({'Product Name*': names}), selected_tags=[])
+    processor.get_available_tags = mock.Mock(side_effect=AssertionError('full tag build'))
+
+    with mock.patch.object(app_module, 'get_session_excel_processor', return_value=processor), \
+            app_module.app.test_client() as client:
+        response = client.post('/api/move-tags', json={'tags': names[:3], 'direction': 'to_selected'})
+        assert response.status_code == 200, response.get_data(as_text=True)
+        body = response.get_json()
+        assert body['selected_tags'] == names[:3] and len(body['available_tags']) == 4997
+        assert processor.selected_tags == names[:3]
+
+        client.post('/api/move-tags', json={'tags': [names[1]], 'direction': 'to_available'})
+        client.post('/api/move-tags', json={'action': 'reorder', 'newOrder': [names[2], names[0]]})
+        assert processor.selected_tags == [names[2], names[0]]
+
+        # A selection made by another endpoint is folded in as one undoable change
+        processor.selected_tags = [names[10]]
+        assert client.post('/api/save-selection-state', json={}).get_json()['undo_stack_size'] == 4
+
+        for expected in ([names[2], names[0]], [names[0], names[2]], [names[0], names[1], names[2]]):
+            body = client.post('/api/undo-move').get_json()
+            assert body['selected_tags'] == expected, body['selected_tags']
+        assert client.post('/api/redo-move').get_json()['selected_tags'] == [names[0], names[2]]
+        with client.session_transaction() as flask_session:
+            assert flask_session['selected_tags'] == [names[0], names[2]]
+            assert 'undo_stack' not in flask_session
+    processor.get_available_tags.assert_not_called()
+    print("✅ Move/undo endpoints correct")
+
+
+def test_names_outside_the_data_are_kept():
+    """Selected names missing from the DataFrame (product database matches) survive moves, undo and rebinds."""
+    print("🧪 Testing selected names outside the data")
+    registry = TagIdRegistry()
+    index = TagIndex(pd.DataFrame({'Product Name*': ['A', 'B', 'C']}), registry)
+    selection = SessionSelection(index)
+    selection.synced_list = []
+    sync_from_processor(selection, ['B', 'DB Only', {'Product Name*': 'DB Two'}])
+    assert selection.selected_names() == ['B', 'DB Only', 'DB Two'] and selection.extras == ['DB Only', 'DB Two']
+
+    selection.select(index.ids_for(['A'])[0])
+    selection.deselect([], extras=['DB Only'])
+    assert selection.selected_names() == ['B', 'A', 'DB Two']
+    selection.undo()
+    assert selection.selected_names() == ['B', 'A', 'DB Only', 'DB Two']
+    selection.clear()
+    assert selection.selected_names() == []
+    selection.undo()
+    assert selection.selected_names() == ['B', 'A', 'DB Only', 'DB Two']
+
+    # After a reload, missing tags are kept by name and names now present become ids again
+    selection.rebind(TagIndex(pd.DataFrame({'Product Name*': ['A', 'DB Only']}), registry))
+    assert sorted(selection.selected_names()) == ['A', 'B', 'DB Only', 'DB Two']
+    assert sorted(selection.extras) == ['B', 'DB Two']
+    print("✅ Selected names outside the data correct")
+
+
+def test_history_shared_between_workers():
+    """Undo works when consecutive requests of one session land on different workers."""
+    print("🧪 Testing undo across workers")
+    import app as app_module
+    names = [f"Product {i}" for i in range(20)]
+    # Two workers: each has its own processor copy and selection store, the session is shared
+    workers = [(SimpleNamespace(df=pd.DataFrame({'Product Name*': names}), selected_tags=[]), SelectionStore())
+               for _ in range(2)]
+
+    def on(worker, path, **body):
+        processor, store = workers[worker]
+        with mock.patch.object(app_module, 'get_session_excel_processor', return_value=processor), \
+                mock.patch.object(app_module, 'get_selection_store', return_value=store):
+            return client.post(path, json=body).get_json()
+
+    with app_module.app.test_client() as client:
+        on(0, '/api/move-tags', tags=names[:2], direction='to_selected')
+        on(1, '/api/move-tags', tags=[names[5]], direction='to_selected')
+        assert on(0, '/api/move-tags', tags=[names[0]], direction='to_available')['selected_tags'] == [names[1], names[5]]
+        # JSON matching on worker 1 selects a product that only exists in the product database
+        workers[1][0].selected_tags = [names[1], names[5], 'DB Only Product']
+        with client.session_transaction() as flask_session:
+            flask_session['selected_tags'] = workers[1][0].selected_tags
+        assert on(1, '/api/move-tags', tags=[names[7]], direction='to_selected')['selected_tags'] == [
+            names[1], names[5], names[7], 'DB Only Product']
+
+        for worker, expected in ((0, [names[1], names[5], 'DB Only Product']),
+                                 (1, [names[1], names[5]]),
+                                 (0, [names[0], names[1], names[5]]),
+                                 (1, [names[0], names[1]])):
+            body = on(worker, '/api/undo-move')
+            assert body['selected_tags'] == expected, (worker, body)
+        assert on(0, '/api/redo-move')['selected_tags'] == [names[0], names[1], names[5]]
+        assert workers[0][0].selected_tags == [names[0], names[1], names[5]]
+    print("✅ Undo across workers correct")
+
+
+if __name__ == "__main__":
+    test_moves_record_only_changed_tags()
+    test_store_rebinds_on_new_data()
+    test_endpoints_do_not_rebuild_tags()
+    test_names_outside_the_data_are_kept()
+    test_history_shared_between_workers()
+    print("\n🎉 All selection store tests passed")
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Test script for the dashboard statistics tables: summaries built from the
+product database, writes marking them stale through the change triggers,
+background refreshes, and the dashboard endpoints reading them.
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+from unittest import mock
+
+# Add the project root to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from src.core.data.product_database import ProductDatabase
+from src.core.data.stats_tables import StatsTables
+
+
+def make_database(path):
+    now = '2025-01-01T00:00:00'
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute('''CREATE TABLE strains (id INTEGER PRIMARY KEY AUTOINCREMENT, strain_name TEXT UNIQUE NOT NULL,
+                    normalized_name TEXT NOT NULL, canonical_lineage TEXT, first_seen_date TEXT NOT NULL,
+                    last_seen_date TEXT NOT NULL, total_occurrences INTEGER DEFAULT 1, created_at TEXT NOT NULL,
+                    updated_at TEXT NOT NULL)''')
+    conn.execute('''CREATE TABLE products (id INTEGER PRIMARY KEY AUTOINCREMENT, "Product Name*" TEXT NOT NULL,
+                    strain_id INTEGER, "Product Type*" TEXT NOT NULL, "Vendor/Supplier*" TEXT, "Product Brand" TEXT,
+                    "Lineage" TEXT)''')
+    conn.execute('''CREATE TABLE strain_brand_lineage (id INTEGER PRIMARY KEY AUTOINCREMENT, strain_name TEXT NOT NULL,
+                    brand TEXT NOT NULL, lineage TEXT NOT NULL, created_at TEXT NOT NULL, updated_at TEXT NOT NULL)''')
+    conn.executemany('INSERT INTO strains (strain_name, normalized_name, canonical_lineage, first_seen_date, '
+                     'last_seen_date, total_occurrences, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                     [('Blue Dream', 'blue dream', 'SATIVA', now, now, 9, now, now),
+                      ('Wedding Cake', 'wedding cake', 'HYBRID', now, now, 5, now, now),
+                      ('Mixed', 'mixed', 'MIXED', now, now, 20, now, now)])
+    conn.executemany('INSERT INTO products ("Product Name*", strain_id, "Product Type*", "Vendor/Supplier*", '
+                     '"Product Brand", "Lineage") VALUES (?, ?, ?, ?, ?, ?)',
+                     [('Blue Dream 1g', 1, 'flower', 'Vendor A', 'Brand A', 'SATIVA'),
+                      ('Blue Dream Roll', 1, 'pre-roll', 'Vendor A', 'Brand A', 'HYBRID'),
+                      ('Wedding Cake 3.5g', 2, 'flower', 'Vendor B', 'Brand B', 'HYBRID'),
+                      ('Header', None, 'Product Type*', 'Vendor/Supplier*', 'Product Brand', ''),
+                      ('Pipe', None, 'paraphernalia', '', None, None)])
+    conn.execute("INSERT INTO strain_brand_lineage (strain_name, brand, lineage, created_at, updated_at) "
+                 "VALUES ('Blue Dream', 'Brand A', 'SATIVA', ?, ?)", (now, now))
+    conn.commit()
+    conn.close()
+
+
+def test_summaries_and_staleness():
+    """Summaries match the source tables; a write marks them stale until the background refresh."""
+    print("🧪 Testing summary tables and staleness")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'products.db')
+        make_database(path)
+        stats_tables = StatsTables(path, debounce=0)
+        assert not stats_tables.is_current()
+
+        with stats_tables.snapshot() as snapshot:
+            assert snapshot.totals() == {'total_products': 5, 'total_strains': 3, 'recent_products': 5}
+            vendors = snapshot.rows('stats_vendors', order_by='product_count DESC')
+            assert vendors[0] == {'vendor': 'Vendor A', 'product_count': 2, 'unique_brands': 1, 'unique_product_types': 2}
+            assert snapshot.count('stats_vendors') == 3
+            assert snapshot.count('stats_vendors', exclude={'vendor': 'Vendor/Supplier*'}) == 2
+            assert snapshot.staleness['stale'] is False
+            data_version = snapshot.staleness['data_version']
+        assert stats_tables.is_current()
+
+        conn = sqlite3.connect(path)
+        conn.execute('''INSERT INTO products ("Product Name*", "Product Type*", "Vendor/Supplier*", "Product Brand")
+                        VALUES ('Gummies', 'edible (solid)', 'Vendor C', 'Brand C')''')
+        conn.commit()
+        conn.close()
+
+        with mock.patch.object(stats_tables, 'schedule_refresh') as schedule:
+            with stats_tables.snapshot() as snapshot:
+                # Served from the previous build, marked stale
+                assert snapshot.totals()['total_products'] == 5
+                assert snapshot.staleness['stale'] is True
+                assert snapshot.staleness['current_version'] > data_version
+            schedule.assert_called_once()
+
+        assert stats_tables.schedule_refresh()
+        stats_tables.wait_for_refresh(10)
+        with stats_tables.snapshot() as snapshot:
+            assert snapshot.totals()['total_products'] == 6
+            assert snapshot.staleness['stale'] is False and snapshot.staleness['refreshing'] is False
+
+        # Dropping and recreating a source table reinstalls its triggers
+        conn = sqlite3.connect(path)
+        conn.execute('DROP TABLE strain_brand_lineage')
+        conn.execute('CREATE TABLE strain_brand_lineage (strain_name TEXT, brand TEXT, lineage TEXT)')
+        conn.commit()
+        conn.close()
+        assert not stats_tables.is_current()
+    print("✅ Summary tables and staleness correct")
+
+
+def test_product_database_statistics():
+    """The strain and vendor strain statistics keep their shape and read from the summaries."""
+    print("🧪 Testing ProductDatabase statistics")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'products.db')
+        make_database(path)
+        product_db = ProductDatabase(path)
+        product_db._initialized = True
+
+        stats = product_db.get_strain_statistics()
+        assert stats['total_strains'] == 3 and stats['total_products'] == 5
+        assert stats['lineage_distribution'] == {'HYBRID': 1, 'SATIVA': 1}
+        assert stats['top_strains'] == [{'name': 'Blue Dream', 'occurrences': 9}, {'name': 'Wedding Cake', 'occurrences': 5}]
+        assert stats['vendor_statistics'][0] == {'vendor': 'Vendor A', 'count': 2}
+        assert 'stale' in stats['staleness']
+
+        vendor_stats = product_db.get_vendor_strain_statistics()
+        assert vendor_stats['vendor_stats'] == [{'brand': 'Brand A', 'strain_count': 1, 'lineages': ['SATIVA']}]
+        assert vendor_stats['vendor_strains']['Vendor A - Brand A'] == {'Blue Dream': {'SATIVA', 'HYBRID'}}
+        assert list(vendor_stats['strain_vendor_conflicts']) == ['Blue Dream']
+        assert sorted(vendor_stats['strain_vendor_conflicts']['Blue Dream']['Vendor A - Brand A']) == ['HYBRID', 'SATIVA']
+    print("✅ ProductDatabase statistics correct")
+
+
+def test_dashboard_endpoints():
+    """The dashboard endpoints answer from the summaries and report their staleness."""
+    print("🧪 Testing dashboard endpoints")
+    import app as app_module
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'products.db')
+        make_database(path)
+        product_db = mock.Mock(db_path=path, _initialized=True)
+        product_db.cleanup_blank_entries.return_value = {'cleaned': 0}
+        with mock.patch.object(app_module, 'get_product_database', return_value=product_db), \
+                app_module.app.test_client() as client:
+            data = client.get('/api/database-stats').get_json()
+            assert data['stats']['total_products'] == 5
+            assert data['stats']['unique_vendors'] == 2 and data['stats']['unique_product_types'] == 3
+            assert data['vendor_stats']['vendors'][0] == {'vendor': 'Vendor A', 'product_count': 2}
+            assert data['staleness']['stale'] is False
+            product_db.cleanup_blank_entries.assert_called_once()
+
+            # Nothing changed, so the cleanup scan is skipped
+            client.get('/api/database-stats')
+            product_db.cleanup_blank_entries.assert_called_once()
+
+            data = client.get('/api/database-vendor-stats').get_json()
+            assert data['summary']['total_vendors'] == 3 and data['summary']['total_vendor_brand_combinations'] == 3
+            assert 'staleness' in data
+
+            data = client.get('/api/database-analytics').get_json()
+            assert data['lineage_distribution'] == {'HYBRID': 1, 'MIXED': 1, 'SATIVA': 1}
+            assert data['vendor_performance'][0]['unique_types'] == 2
+            assert data['recent_activity'] == [{'date': 'Recent', 'new_products': 5}]
+
+            data = client.get('/api/trend-analysis').get_json()
+            assert len(data['trend_data']) == 5 and data['trend_data'][0]['date'] == 'Recent'
+            assert data['staleness']['data_version'] == data['staleness']['current_version']
+    print("✅ Dashboard endpoints correct")
+
+
+if __name__ == "__main__":
+    test_summaries_and_staleness()
+    test_product_database_statistics()
+    test_dashboard_endpoints()
+    print("\n🎉 All statistics table tests passed")
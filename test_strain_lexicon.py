@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Test script for the Aho–Corasick strain lexicon and its use by the product
+database and the JSON matcher.
+"""
+
+import os
+import random
+import sys
+import tempfile
+from unittest import mock
+
+# Add the project root to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from src.core.data.json_matcher import JSONMatcher
+from src.core.data.product_database import ProductDatabase
+from src.core.data.strain_lexicon import StrainAutomaton
+
+
+def test_automaton_matches_naive_scan():
+    """All occurrences, overlapping ones included, agree with a per-strain substring scan."""
+    print("🧪 Testing automaton against a naive scan")
+    rng = random.Random(7)
+    strains = ['og', 'og kush', 'kush', 'blue dream', 'dream', 'gelato 33', 'gelato', 'sour diesel', 'ak-47', 'a']
+    automaton = StrainAutomaton(strains + ['OG', '', None])
+    assert len(automaton) == len(strains)
+
+    words = ['OG', 'Kush', 'Blue', 'Dream', 'Gelato', '33', 'Sour', 'Diesel', 'AK-47', 'Flower', '-', '1g']
+    for _ in range(300):
+        text = ' '.join(rng.choice(words) for _ in range(rng.randint(0, 8)))
+        lowered = text.lower()
+        expected = sorted(
+            (start, start + len(strain), strain)
+            for strain in strains
+            for start in range(len(lowered))
+            if lowered.startswith(strain, start)
+        )
+        assert sorted(hit[:3] for hit in automaton.find_all(text)) == expected, text
+    print("✅ Automaton scan correct")
+
+
+def test_word_boundaries_and_priority():
+    """whole_words drops partial-word hits, first_listed honours list order."""
+    print("🧪 Testing word boundaries and list priority")
+    automaton = StrainAutomaton(['sour', 'og', 'sour og', 'honey'])
+    assert [h.strain for h in automaton.find_all('Dog Food', whole_words=True)] == []
+    assert automaton.find_strains('Sour OG Honey Oil') == ['sour og', 'honey', 'sour', 'og']
+    assert automaton.first_listed('Sour OG') == 'sour'
+    assert automaton.first_listed('Honey OG', exclude={'og'}) == 'honey'
+    assert automaton.first_listed('Flower') is None
+
+    db = ProductDatabase.__new__(ProductDatabase)
+    assert db._extract_strain_from_name('Grape Ape Wedding Cake Pre-Roll') == 'Wedding Cake'
+    matcher = JSONMatcher.__new__(JSONMatcher)
+    assert matcher._extract_strain_from_product_name('1g honey gsc diamonds') == 'Gsc'
+    print("✅ Word boundaries and priority correct")
+
+
+def test_database_automaton_rebuilt_on_strain_add():
+    """The shared automaton is built once per database and rebuilt when a strain is added."""
+    print("🧪 Testing automaton invalidation")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'products.db')
+        db = ProductDatabase(db_path=path)
+        with mock.patch('src.core.data.database_notifier.notify_strain_add'):
+            db.add_or_update_strain('Blue Dream', 'SATIVA')
+            first = db.get_strain_automaton()
+            assert db.get_strain_automaton() is first
+            assert ProductDatabase(db_path=path).get_strain_automaton() is first
+
+            db.add_or_update_strain('Blue Dream', 'SATIVA')  # existing strain: no rebuild
+            assert db.get_strain_automaton() is first
+            db.add_or_update_strain('Wedding Cake', 'HYBRID')
+        second = db.get_strain_automaton()
+        assert second is not first
+        assert second.find_strains('Wedding Cake x Blue Dream Flower') == ['wedding cake', 'blue dream']
+
+        matcher = JSONMatcher.__new__(JSONMatcher)
+        matcher._strain_cache = None
+        with mock.patch('src.core.data.json_matcher.ProductDatabase', return_value=db):
+            assert matcher._find_strains_in_text('Blue Dream Wedding Cake 1g') == [
+                ('wedding cake', 'HYBRID'), ('blue dream', 'SATIVA')
+            ]
+    print("✅ Automaton invalidation correct")
+
+
+if __name__ == "__main__":
+    test_automaton_matches_naive_scan()
+    test_word_boundaries_and_priority()
+    test_database_automaton_rebuilt_on_strain_add()
+    print("\n🎉 All strain lexicon tests passed")
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Test script for stable tag ids and the name -> row index on ExcelProcessor.
+"""
+
+import os
+import sys
+from unittest import mock
+
+# Add the project root to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import pandas as pd
+
+from src.core.data.excel_processor import ExcelProcessor
+
+
+def make_processor():
+    processor = ExcelProcessor()
+    processor.df = pd.DataFrame({
+        'ProductName': ['Blue Dream Pre-Roll', 'Wedding Cake Flower', 'Gummies', 'Blue Dream Pre-Roll', 'Glass Pipe'],
+        'Product Type*': ['pre-roll', 'flower', 'edible (solid)', 'pre-roll', 'paraphernalia'],
+        'Lineage': pd.Categorical(['SATIVA', 'HYBRID', 'MIXED', 'SATIVA', 'MIXED']),
+        'DOH': ['NO', 'NO', 'YES', 'NO', 'NO'],
+        'Description': ['Blue Dream', 'Wedding Cake', 'Gummies', 'Blue Dream', 'Glass Pipe'],
+    })
+    return processor
+
+
+def test_ids_are_stable_across_dataframe_changes():
+    """The index is rebuilt only for a new DataFrame and a product keeps its tag id."""
+    print("🧪 Testing stable tag ids")
+    processor = make_processor()
+    index = processor.get_tag_index()
+    assert processor.get_tag_index() is index
+    assert index.name_column == 'ProductName'
+    assert index.positions[index.id_for_name('Blue Dream Pre-Roll')] == [0, 3]
+    assert index.id_for_name('  blue dream pre roll ') == index.id_for_name('Blue Dream Pre-Roll')
+    gummies = index.id_for_name('Gummies')
+
+    processor.df.loc[2, 'DOH'] = 'NO'  # in-place edits keep the index
+    assert processor.get_tag_index() is index
+
+    processor.df = processor.df.iloc[[2, 4]].reset_index(drop=True)
+    filtered = processor.get_tag_index()
+    assert filtered is not index and filtered.id_for_name('Gummies') == gummies
+    assert filtered.positions[gummies] == [0]
+    assert processor.get_tag_ids(['Gummies', 'Wedding Cake Flower']) == [gummies]
+    print("✅ Stable tag ids correct")
+
+
+def test_id_based_records_and_edits():
+    """Records and lineage/DOH edits resolve by iloc without masking the DataFrame."""
+    print("🧪 Testing id-based records and edits")
+    processor = make_processor()
+    blue, pipe = processor.get_tag_ids(['Blue Dream Pre-Roll', 'Glass Pipe'])
+    records = processor.get_records_by_tag_ids([pipe, blue])
+    assert [r['ProductName'] for r in records] == ['Glass Pipe', 'Blue Dream Pre-Roll', 'Blue Dream Pre-Roll']
+
+    with mock.patch.object(pd.Series, '__eq__', side_effect=AssertionError('mask scan')):
+        assert processor.update_lineage_in_current_data('Blue Dream Pre-Roll', 'HYBRID/SATIVA')
+        assert processor.update_lineage_by_tag_id(pipe, 'INDICA')
+        assert processor.update_doh_in_current_data('Gummies', 'NO')
+    assert processor.df['Lineage'].tolist() == ['HYBRID/SATIVA', 'HYBRID', 'MIXED', 'HYBRID/SATIVA', 'PARAPHERNALIA']
+    assert processor.df['DOH'].tolist() == ['NO'] * 5
+    assert not processor.update_lineage_in_current_data('Unknown Product', 'SATIVA')
+    print("✅ Id-based records and edits correct")
+
+
+def test_index_follows_reassignment_and_name_edits():
+    """Each assignment of self.df and each product name edit rebuilds the index, even when ids repeat."""
+    print("🧪 Testing tag index invalidation")
+    processor = make_processor()
+    for _ in range(20):
+        # The old frame is freed on assignment, so the new one often reuses its id and shape
+        processor.df = processor.df.iloc[::-1].reset_index(drop=True)
+        index = processor.get_tag_index()
+        names = processor.df['ProductName'].tolist()
+        assert [names[p] for p in index.positions[index.id_for_name('Gummies')]] == ['Gummies']
+
+    index = processor.get_tag_index()
+    processor.set_row_values(index.positions[index.id_for_name('Glass Pipe')][0], {'ProductName': 'Bong'})
+    renamed = processor.get_tag_index()
+    assert renamed is not index and renamed.id_for_name('Glass Pipe') is None
+    assert renamed.id_for_name('Bong') is not None
+
+    processor.df = processor.df.rename(columns={'ProductName': 'Product Name*'})
+    processor.df.loc[0, 'Product Name*'] = ' Blue Dream Pre-Roll'
+    processor.apply_minimal_processing()
+    assert processor.get_tag_index().name_column == 'Product Name*'
+    assert processor.get_tag_index().positions[processor.get_tag_index().id_for_name('Gummies')] == [
+        processor.df['Product Name*'].tolist().index('Gummies')]
+    print("✅ Tag index invalidation correct")
+
+
+def test_name_edits_match_exact_names_only():
+    """Name-based lineage/DOH edits touch exact-name rows; tag-id edits cover spelling variants too."""
+    print("🧪 Testing exact-name edits")
+    processor = make_processor()
+    processor.df.loc[3, 'ProductName'] = 'blue dream pre roll'
+    processor.mark_names_changed()
+    blue = processor.get_tag_ids(['Blue Dream Pre-Roll'])[0]
+    assert processor.get_tag_index().positions[blue] == [0, 3]
+
+    assert processor.update_lineage_in_current_data('Blue Dream Pre-Roll', 'INDICA')
+    assert processor.df['Lineage'].tolist()[:4] == ['INDICA', 'HYBRID', 'MIXED', 'SATIVA']
+    assert processor.update_doh_in_current_data('blue dream pre roll', 'YES')
+    assert processor.df['DOH'].tolist() == ['NO', 'NO', 'YES', 'YES', 'NO']
+    assert not processor.update_doh_in_current_data('Blue-Dream Pre Roll', 'YES')
+
+    assert processor.update_lineage_by_tag_id(blue, 'CBD')
+    assert processor.df['Lineage'].tolist()[:4] == ['CBD', 'HYBRID', 'MIXED', 'CBD']
+    print("✅ Exact-name edits correct")
+
+
+def test_validate_tags_uses_index():
+    """Generate-time tag validation reads the maintained index instead of iterating rows."""
+    print("🧪 Testing tag validation against the index")
+    from app import _validate_tags_against_excel
+    processor = make_processor()
+    processor.get_tag_index()
+    with mock.patch.object(pd.DataFrame, 'iterrows', side_effect=AssertionError('row scan')):
+        valid, invalid = _validate_tags_against_excel(
+            processor, ['blue dream pre-roll', 'Wedding Cake Flower', 'Gummies by Vendor', 'Nope'])
+    assert valid == ['Blue Dream Pre-Roll', 'Wedding Cake Flower', 'Gummies'] and invalid == ['Nope']
+    print("✅ Tag validation correct")
+
+
+if __name__ == "__main__":
+    test_ids_are_stable_across_dataframe_changes()
+    test_id_based_records_and_edits()
+    test_index_follows_reassignment_and_name_edits()
+    test_name_edits_match_exact_names_only()
+    test_validate_tags_uses_index()
+    print("\n🎉 All tag index tests passed")
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Test script for the process-wide cache of expanded template buffers.
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+# Add the project root to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from src.core.generation.template_cache import TemplateBufferCache, get_template_cache, prewarm_template_cache
+from src.core.generation.template_processor import TemplateProcessor, get_font_scheme
+
+
+def test_processors_share_expanded_template():
+    """A second processor for the same template is served from the cache with its own buffer."""
+    print("🧪 Testing shared template expansion")
+    cache = get_template_cache()
+    cache.clear()
+    first = TemplateProcessor('vertical', get_font_scheme('vertical'), 1.0)
+    hits = cache.hits
+    start = time.perf_counter()
+    second = TemplateProcessor('vertical', get_font_scheme('vertical'), 1.0)
+    print(f"   cached construction took {time.perf_counter() - start:.4f}s")
+    assert cache.hits == hits + 1
+    assert second._expanded_template_buffer is not first._expanded_template_buffer
+    assert second._expanded_template_buffer.getvalue() == first._expanded_template_buffer.getvalue()
+
+    forced = first._expand_template_if_needed(force_expand=True)
+    assert 'vertical@1:forced' in cache.stats()['templates']
+    assert TemplateProcessor('vertical', get_font_scheme('vertical'), 1.5)._expanded_template_buffer.getvalue()
+    assert 'vertical@1.5:default' in cache.stats()['templates']
+    assert forced.getvalue()
+    print("✅ Shared template expansion correct")
+
+
+def test_inventory_template_expands():
+    """The inventory template expands to a 2x2 grid whose cells python-docx can still walk."""
+    print("🧪 Testing inventory template expansion")
+    from docx import Document
+    get_template_cache().clear()
+    processor = TemplateProcessor('inventory', get_font_scheme('inventory'), 1.0)
+    table = Document(processor._expanded_template_buffer).tables[0]
+    cells = [cell for row in table.rows for cell in row.cells]
+    assert len(cells) == 4
+    assert [f'Label{n}' in cells[n - 1]._tc.xml for n in range(1, 5)] == [True] * 4
+    print("✅ Inventory template expansion correct")
+
+
+def test_key_includes_mtime_and_evicts_lru():
+    """Touching the template file rebuilds it; the oldest entry is evicted past max_entries."""
+    print("🧪 Testing cache keys and eviction")
+    cache = TemplateBufferCache(max_entries=2)
+    builds = []
+
+    def builder():
+        builds.append(1)
+        return b'expanded-%d' % len(builds)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'vertical.docx')
+        with open(path, 'wb') as f:
+            f.write(b'base')
+        assert cache.get_buffer(path, 'vertical', 1.0, builder).read() == b'expanded-1'
+        assert cache.get_buffer(path, 'vertical', 1.0, builder).read() == b'expanded-1'
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        assert cache.get_buffer(path, 'vertical', 1.0, builder).read() == b'expanded-2'
+        cache.get_buffer(path, 'mini', 1.0, builder)
+        assert cache.stats()['entries'] == 2 and cache.evictions == 1
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 3 and cache.stats()['hit_rate'] == 0.25
+    print("✅ Cache keys and eviction correct")
+
+
+def test_prewarm_and_status_endpoint():
+    """Prewarming covers every template type and the status endpoint reports hit rates."""
+    print("🧪 Testing prewarm and performance status")
+    get_template_cache().clear()
+    result = prewarm_template_cache()
+    assert {'horizontal', 'vertical', 'mini', 'double'} <= set(result['warmed'])
+    assert set(result['warmed']) | set(result['failed']) == {'horizontal', 'vertical', 'mini', 'double', 'inventory'}
+
+    from app import app
+    with app.test_client() as client:
+        status = client.get('/api/performance/status').get_json()
+    assert status['template_cache']['entries'] >= 4
+    assert 'hit_rate' in status['template_cache']
+    print("✅ Prewarm and performance status correct")
+
+
+if __name__ == "__main__":
+    test_processors_share_expanded_template()
+    test_inventory_template_expands()
+    test_key_includes_mtime_and_evicts_lru()
+    test_prewarm_and_status_endpoint()
+    print("\n🎉 All template cache tests passed")
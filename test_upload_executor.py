@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Test script for the bounded upload executor: per-store fairness,
+superseded-upload cancellation and status reporting.
+"""
+
+import multiprocessing
+import os
+import sys
+import threading
+from unittest import mock
+
+import pandas as pd
+
+# Add the project root to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from src.core.data import upload_executor
+from src.core.data.upload_executor import UploadExecutor, PARQUET_AVAILABLE, STAGE_READY, STAGE_CANCELLED
+
+
+class _GatedWorker:
+    """Worker that blocks until released so queue order can be observed."""
+
+    def __init__(self):
+        self.started = []
+        self.release = threading.Event()
+        self._lock = threading.Lock()
+
+    def __call__(self, file_path, serialize):
+        with self._lock:
+            self.started.append(file_path)
+        self.release.wait(5)
+        return {'df': pd.DataFrame({'Product Name*': [file_path]}), 'rows': 1}
+
+
+def test_round_robin_across_stores():
+    """A store with many uploads cannot starve another store."""
+    print("🧪 Testing per-store fairness")
+    worker = _GatedWorker()
+    executor = UploadExecutor(max_workers=1, worker=worker, use_processes=False)
+    jobs = [executor.submit('bothell', f'b{i}.xlsx', f'b{i}', supersede=False) for i in range(3)]
+    jobs.append(executor.submit('everett', 'e0.xlsx', 'e0', supersede=False))
+    worker.release.set()
+    for job in jobs:
+        assert executor.wait(job, timeout=5)
+    # b0 was already running; everett is served before bothell's backlog
+    assert worker.started == ['b0', 'e0', 'b1', 'b2']
+    executor.shutdown(wait=True)
+    print("✅ Fairness correct")
+
+
+def test_newer_upload_supersedes_older():
+    """Queued uploads are cancelled and a running upload's result is discarded."""
+    print("🧪 Testing superseded upload cancellation")
+    worker = _GatedWorker()
+    statuses = []
+    accepted = []
+    executor = UploadExecutor(max_workers=1, worker=worker, use_processes=False,
+                              status_callback=lambda f, status, stage: statuses.append((f, status, stage)),
+                              result_callback=lambda job, df: accepted.append(job.filename))
+    running = executor.submit('bothell', 'old.xlsx', 'old')
+    queued = executor.submit('everett', 'other.xlsx', 'other')
+    newest = executor.submit('bothell', 'new.xlsx', 'new')
+    worker.release.set()
+
+    assert not executor.wait(running, timeout=5)
+    assert executor.wait(queued, timeout=5)
+    assert executor.wait(newest, timeout=5)
+    assert running.stage == STAGE_CANCELLED
+    assert newest.stage == STAGE_READY
+    assert sorted(accepted) == ['new.xlsx', 'other.xlsx']
+    assert ('old.xlsx', 'cancelled: superseded by a newer upload', 'cancelled') in statuses
+    assert ('new.xlsx', 'processing', 'queued') in statuses
+    assert ('new.xlsx', 'ready', 'ready') in statuses
+    executor.shutdown(wait=True)
+    print("✅ Superseding correct")
+
+
+def _dies_in_worker_process(file_path, serialize):
+    """Worker that kills its process when run in the pool, and parses normally in a thread."""
+    if multiprocessing.parent_process() is not None:
+        os._exit(1)
+    return {'df': pd.DataFrame({'Product Name*': [file_path]}), 'rows': 1}
+
+
+def test_broken_process_pool_falls_back_to_threads():
+    """Uploads still complete when the process pool cannot start or a worker process dies."""
+    print("🧪 Testing process pool fallback")
+    accepted = []
+
+    class _UnstartablePool:
+        def __init__(self, *args, **kwargs):
+            pass
+
+        def submit(self, *args):
+            raise OSError('cannot spawn worker')
+
+        def shutdown(self, wait=False):
+            pass
+
+    with mock.patch.object(upload_executor, 'ProcessPoolExecutor', _UnstartablePool):
+        executor = UploadExecutor(max_workers=1, worker=_dies_in_worker_process, use_processes=True,
+                                  result_callback=lambda job, df: accepted.append(job.filename))
+        job = executor.submit('bothell', 'spawn.xlsx', 'spawn')
+        assert executor.wait(job, timeout=5), job.error
+    stats = executor.get_stats()
+    assert stats['mode'] == 'thread' and stats['pool_failures'] == 1
+    executor.shutdown(wait=True)
+
+    # A real spawn pool whose worker process exits mid-job
+    executor = UploadExecutor(max_workers=1, worker=_dies_in_worker_process, use_processes=True,
+                              result_callback=lambda job, df: accepted.append(job.filename))
+    job = executor.submit('bothell', 'crash.xlsx', 'crash')
+    assert executor.wait(job, timeout=60), job.error
+    assert executor.get_stats()['mode'] == 'thread'
+    later = executor.submit('bothell', 'later.xlsx', 'later')
+    assert executor.wait(later, timeout=5), later.error
+    assert accepted == ['spawn.xlsx', 'crash.xlsx', 'later.xlsx']
+    executor.shutdown(wait=True)
+    print("✅ Process pool fallback correct")
+
+
+def test_parquet_round_trip():
+    """Results cross the process boundary as Parquet bytes with categoricals intact."""
+    if not PARQUET_AVAILABLE:
+        print("⏭️  pyarrow not installed, skipping parquet round trip")
+        return
+    from src.core.data.upload_executor import dataframe_to_parquet_bytes, parquet_bytes_to_dataframe
+    df = pd.DataFrame({
+        'Product Name*': ['A', 'B', 'C'],
+        'Lineage': pd.Categorical(['HYBRID', 'INDICA', 'HYBRID']),
+    })
+    data = dataframe_to_parquet_bytes(df)
+    assert data[:4] == b'PAR1'
+    restored = parquet_bytes_to_dataframe(data)
+    assert list(restored['Product Name*']) == ['A', 'B', 'C']
+    assert isinstance(restored['Lineage'].dtype, pd.CategoricalDtype)
+
+    # Arrow rejects the mixed column; it comes back as strings with nulls kept, still as Parquet
+    df['Mixed'] = [1, 'two', None]
+    df['Units'] = pd.Series([1, 2, 3], dtype=object)
+    data = dataframe_to_parquet_bytes(df)
+    assert data[:4] == b'PAR1'
+    restored = parquet_bytes_to_dataframe(data)
+    assert list(restored['Mixed']) == ['1', 'two', None]
+    assert list(restored['Units']) == [1, 2, 3]
+    assert isinstance(restored['Lineage'].dtype, pd.CategoricalDtype)
+
+    # A frame Parquet cannot hold at all raises instead of falling back to another format
+    try:
+        dataframe_to_parquet_bytes(pd.DataFrame([[1, 2]], columns=['a', 'a']))
+    except ValueError:
+        pass
+    else:
+        raise AssertionError('unwritable frame did not raise')
+    print("✅ Parquet round trip correct")
+
+
+if __name__ == "__main__":
+    test_round_robin_across_stores()
+    test_newer_upload_supersedes_older()
+    test_broken_process_pool_falls_back_to_threads()
+    test_parquet_round_trip()
+    print("\n🎉 All upload executor tests passed")
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Test script for the in-process worker prewarm: stage ordering and failure
+handling, readiness through /api/health, and the app's prewarm stages
+loading the default upload and serving /api/initial-data from the tag
+payload cache.
+"""
+
+import os
+import sys
+import tempfile
+import threading
+from unittest import mock
+
+# Add the project root to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import pandas as pd
+
+from src.core.utils.prewarm import WorkerPrewarm
+
+
+def write_inventory(directory):
+    path = os.path.join(directory, 'A Greener Today Bothell_inventory.xlsx')
+    pd.DataFrame({
+        'Product Name*': ['Blue Dream Pre-Roll 1g', 'Wedding Cake Flower 3.5g', 'Gummies 100mg'],
+        'Product Type*': ['pre-roll', 'flower', 'edible (solid)'],
+        'Lineage': ['SATIVA', 'HYBRID', 'MIXED'],
+        'Vendor/Supplier*': ['Vendor A', 'Vendor B', 'Vendor C'],
+        'Product Brand': ['Brand A', 'Brand B', 'Brand C'],
+        'Weight*': [1, 3.5, 100],
+        'Units': ['g', 'g', 'mg'],
+        'Price': [10, 30, 15],
+        'Product Strain': ['Blue Dream', 'Wedding Cake', 'Mixed'],
+    }).to_excel(path, index=False)
+    return path
+
+
+def test_stages_and_readiness():
+    """Stages run in order on a background thread; a failing stage is recorded and the rest still run."""
+    print("🧪 Testing prewarm stages and readiness")
+    prewarm = WorkerPrewarm()
+    release = threading.Event()
+    order = []
+    prewarm.add_stage('first', lambda: order.append('first') or {'rows': 3})
+    prewarm.add_stage('blocked', lambda: release.wait(10) and order.append('blocked'))
+    prewarm.add_stage('broken', lambda: 1 / 0)
+    prewarm.add_stage('last', lambda: order.append('last'))
+    assert prewarm.state == 'idle' and prewarm.ready
+
+    assert prewarm.start() and not prewarm.start()
+    assert prewarm.state == 'warming' and not prewarm.ready
+    release.set()
+    assert prewarm.wait(10)
+
+    status = prewarm.status()
+    assert status['ready'] and status['state'] == 'ready'
+    assert order == ['first', 'blocked', 'last']
+    assert status['stages']['first'] == {'status': 'done', 'seconds': status['stages']['first']['seconds'], 'detail': {'rows': 3}}
+    assert status['failed'] == ['broken'] and 'division' in status['stages']['broken']['error']
+    print("✅ Prewarm stages and readiness correct")
+
+
+def test_app_prewarm_and_health():
+    """The app's stages load the default upload and cache the tag payload; /api/health is 503 until ready."""
+    print("🧪 Testing app prewarm and /api/health")
+    import app as app_module
+    from src.core.data.excel_processor import ExcelProcessor
+
+    processor = ExcelProcessor()
+    prewarm = WorkerPrewarm()
+    release = threading.Event()
+    load_default_upload = app_module._prewarm_default_upload
+
+    def gated_default_upload():
+        release.wait(10)
+        return load_default_upload()
+
+    with tempfile.TemporaryDirectory() as directory, \
+            mock.patch.object(app_module, 'get_worker_prewarm', return_value=prewarm), \
+            mock.patch.object(app_module, 'get_excel_processor', return_value=processor), \
+            mock.patch.object(app_module, 'get_default_upload_file', return_value=write_inventory(directory)), \
+            mock.patch.object(app_module, 'get_json_matcher') as get_json_matcher, \
+            mock.patch.object(app_module, 'prewarm_template_cache', return_value={'warmed': ['vertical']}), \
+            mock.patch.object(app_module, '_prewarm_default_upload', gated_default_upload), \
+            mock.patch.object(app_module, 'PDF_AVAILABLE', True), \
+            mock.patch.object(app_module, 'get_pdf_converter') as get_pdf_converter, \
+            mock.patch.object(app_module, 'enable_copy_on_write') as enable_copy_on_write, \
+            app_module.app.test_client() as client:
+        get_json_matcher.return_value = mock.Mock(spec=['warm_cache'])
+        assert app_module.start_worker_prewarm()
+        enable_copy_on_write.assert_called_once()
+        get_pdf_converter.return_value.warm.return_value = True
+        assert prewarm.stage_names == ['default_upload', 'json_matcher', 'templates', 'font_sizes', 'tag_payload',
+                                       'pdf_listener']
+
+        response = client.get('/api/health')
+        assert response.status_code == 503 and response.get_json()['status'] == 'warming'
+        release.set()
+        assert prewarm.wait(60)
+
+        status = prewarm.status()
+        assert status['failed'] == [], status
+        assert status['stages']['default_upload']['detail']['rows'] == 3
+        assert status['stages']['tag_payload']['detail'] == {'tags': 3}
+        get_json_matcher.return_value.warm_cache.assert_called_once()
+        assert status['stages']['pdf_listener']['detail'] == {'listener': True}
+        get_pdf_converter.return_value.warm.assert_called_once()
+
+        # The first page load is answered from the prewarmed payload
+        with mock.patch.object(processor, 'get_available_tags', side_effect=AssertionError('payload rebuilt')):
+            body = client.get('/api/initial-data').get_json()
+        assert body['total_records'] == 3 and len(body['available_tags']) == 3
+
+        # An in-place edit invalidates it
+        assert processor.update_lineage_in_current_data('Gummies 100mg', 'INDICA')
+        assert app_module.get_cached_initial_data(app_module._tag_payload_key(processor)) is None
+        # So does another processor, even at the same data version and file
+        other = ExcelProcessor()
+        other.data_version, other._last_loaded_file = processor.data_version, processor._last_loaded_file
+        assert app_module._tag_payload_key(other) != app_module._tag_payload_key(processor)
+        assert app_module._tag_payload_key(processor) == app_module._tag_payload_key(processor)
+
+        with mock.patch.object(app_module, 'get_session_excel_processor', return_value=processor):
+            health = client.get('/api/health')
+        assert health.status_code == 200 and health.get_json()['prewarm']['ready']
+    app_module.clear_initial_data_cache()
+    print("✅ App prewarm and /api/health correct")
+
+
+if __name__ == "__main__":
+    test_stages_and_readiness()
+    test_app_prewarm_and_health()
+    print("\n🎉 All worker prewarm tests passed")
@@ -41,7 +41,7 @@ for logger_name in ['werkzeug', 'urllib3', 'requests', 'pandas', 'openpyxl', 'xl
 
 try:
     # Import the Flask application
-    from app import app as application
+    from app import app as application, start_worker_prewarm
     
     # Production configuration optimized for PythonAnywhere
     application.config.update(
@@ -54,6 +54,9 @@ try:
     
     logging.info("WSGI application loaded successfully with recovered database")
     
+    # Build this worker's caches in the background; /api/health answers 503 until they are ready
+    start_worker_prewarm()
+    
 except ImportError as e:
     logging.error(f"Failed to import Flask app: {e}")
     logging.error(f"Python path: {sys.path}")